@@ -21,6 +21,7 @@ from oslo_service import service
 
 from ovn_bgp_agent import config
 from ovn_bgp_agent.drivers import driver_api
+from ovn_bgp_agent.utils import adaptive_interval
 
 
 CONF = cfg.CONF
@@ -34,6 +35,11 @@ class BGPAgent(service.Service):
         super(BGPAgent, self).__init__()
         self.agent_driver = driver_api.AgentDriverBase.get_instance(
             CONF.driver)
+        self.sync_interval = adaptive_interval.AdaptiveInterval(
+            CONF.reconcile_interval, CONF.max_reconcile_interval,
+            CONF.reconcile_jitter)
+        self.frr_sync_interval = adaptive_interval.AdaptiveInterval(
+            CONF.frr_reconcile_interval, jitter=CONF.reconcile_jitter)
 
     def start(self):
         LOG.info("Service '%s' starting", self.__class__.__name__)
@@ -41,18 +47,26 @@ class BGPAgent(service.Service):
         self.agent_driver.start()
 
         LOG.info("Service '%s' started", self.__class__.__name__)
-        sync_routes = loopingcall.FixedIntervalLoopingCall(self.sync)
-        sync_routes.start(interval=CONF.reconcile_interval)
-        sync_frr = loopingcall.FixedIntervalLoopingCall(self.frr_sync)
-        sync_frr.start(interval=CONF.frr_reconcile_interval)
+        # The loops wait for the time returned by each run
+        sync_routes = loopingcall.DynamicLoopingCall(self.sync)
+        sync_routes.start(initial_delay=self.sync_interval.initial_delay())
+        sync_frr = loopingcall.DynamicLoopingCall(self.frr_sync)
+        sync_frr.start(initial_delay=self.frr_sync_interval.initial_delay())
 
     def sync(self):
         LOG.info("Running reconciliation loop to ensure routes/rules are "
                  "in place.")
+        repairs = None
         try:
-            self.agent_driver.sync()
+            repairs = self.agent_driver.reconcile()
         except Exception as e:
             LOG.exception("Unexpected exception while running the sync: %s", e)
+        if self.agent_driver.pop_reconnected():
+            self.sync_interval.reset()
+        interval = self.sync_interval.next(repairs)
+        LOG.debug("Reconciliation loop repaired %s item(s), next run in "
+                  "%.1f seconds", repairs, interval)
+        return interval
 
     def frr_sync(self):
         LOG.info("Running reconciliation loop to ensure frr configuration is "
@@ -62,6 +76,7 @@ class BGPAgent(service.Service):
         except Exception as e:
             LOG.exception("Unexpected exception while running the frr sync: "
                           "%s", e)
+        return self.frr_sync_interval.next()
 
     def wait(self):
         super(BGPAgent, self).wait()
@@ -19,6 +19,7 @@ from oslo_log import log as logging
 from oslo_privsep import priv_context
 
 from ovn_bgp_agent import constants
+from ovn_bgp_agent import privileged
 
 LOG = logging.getLogger(__name__)
 
@@ -26,10 +27,83 @@ agent_opts = [
     cfg.IntOpt('reconcile_interval',
                help='Time (seconds) between re-sync actions.',
                default=300),
+    cfg.IntOpt('max_reconcile_interval',
+               help='Maximum time (seconds) between re-sync actions. The '
+                    'time between them is doubled, up to this value, after '
+                    'each re-sync finding nothing to repair, and goes back '
+                    'to reconcile_interval after one repairing something or '
+                    'after reconnecting to the OVN database. Only the '
+                    'drivers reporting the repairs done by their re-syncs '
+                    'support it, i.e., ovn_bgp_driver and '
+                    'nb_ovn_bgp_driver. The default, 0, keeps the time '
+                    'fixed at reconcile_interval.',
+               default=0),
+    cfg.FloatOpt('reconcile_jitter',
+                 help='Fraction of the time between re-sync actions, and '
+                      'between frr re-sync actions, randomly added or '
+                      'subtracted to each of them. The first ones are also '
+                      'randomly delayed up to this fraction of the interval, '
+                      'so that the agents do not reach the OVN databases '
+                      'and FRR at the same time.',
+                 min=0,
+                 max=1,
+                 default=0.1),
+    cfg.IntOpt('full_sync_interval',
+               help='Minimum time (seconds) between full re-syncs. In '
+                    'between, the re-sync actions only reprocess the objects '
+                    'found drifted by the kernel and OVS monitors (e.g., a '
+                    'route or an IP removed outside the agent), for the '
+                    'drivers supporting it. The drift the monitors do not '
+                    'report (e.g., a flow removed) is repaired by the next '
+                    'full re-sync. The default, 0, runs a full re-sync '
+                    'every time.',
+               default=0),
+    cfg.IntOpt('sync_workers',
+               help='Number of threads used by the re-sync actions to sync '
+                    'the provider bridges and the router gateway ports in '
+                    'parallel. The default, 1, syncs them sequentially.',
+               min=1,
+               default=1),
+    cfg.FloatOpt('sync_chunk_time',
+                 help='Maximum time (seconds) a full re-sync holds the '
+                      'driver lock at once. When it is over, the lock is '
+                      'released so that the pending events are processed, '
+                      'and the re-sync resumes where it was left, with the '
+                      'cleanup done once all the objects are processed. The '
+                      'default, 0, holds the lock for the whole re-sync. '
+                      'Supported by the ovn_bgp_driver and nb_ovn_bgp_driver '
+                      'drivers.',
+                 min=0,
+                 default=0),
     cfg.IntOpt('frr_reconcile_interval',
                help='Time (seconds) between re-sync actions to ensure frr '
                     'configuration is correct, in case frr is restart.',
                default=15),
+    cfg.BoolOpt('frr_vty_session',
+                help='Push the FRR configuration through long-lived '
+                     'connections to the FRR daemons vty sockets instead of '
+                     'spawning vtysh for every configuration change. If the '
+                     'sockets cannot be used, vtysh is used instead.',
+                default=False),
+    cfg.IntOpt('frr_vty_session_idle_timeout',
+               help='Time (seconds) after which an unused connection to the '
+                    'FRR vty sockets is closed. 0 keeps it open forever.',
+               default=300),
+    cfg.BoolOpt('frr_config_cache',
+                help='Remember the FRR configuration stanzas applied by the '
+                     'frr reconciliation loop and only push the ones that '
+                     'are missing or differ. The cache is dropped when FRR '
+                     'is restarted.',
+                default=True),
+    cfg.IntOpt('frr_config_cache_max_age',
+               help='Time (seconds) after which the cached FRR stanzas are '
+                    'verified again against the FRR running configuration.',
+               default=300),
+    cfg.IntOpt('frr_router_id_check_interval',
+               help='Time (seconds) after which the BGP router-id discovered '
+                    'from FRR is queried again to detect changes. It is '
+                    'also queried again when FRR is restarted.',
+               default=300),
     cfg.BoolOpt('expose_tenant_networks',
                 help='Expose VM IPs on tenant networks. '
                      'If this flag is enabled, it takes precedence over '
@@ -45,6 +119,43 @@ agent_opts = [
                default=constants.ADVERTISEMENT_METHOD_HOST,
                choices=[constants.ADVERTISEMENT_METHOD_HOST,
                         constants.ADVERTISEMENT_METHOD_SUBNET]),
+    cfg.StrOpt('advertisement_backend',
+               help='How the IPs are exposed on the bgp_nic so that FRR '
+                    'advertises them. "address" adds them as /32 or /128 '
+                    'addresses on the bgp_nic, redistributed as connected '
+                    'routes. "route" installs them as /32 or /128 routes '
+                    'through the bgp_nic in the bgp_vrf_table_id table, '
+                    'redistributed as kernel routes, which avoids having '
+                    'thousands of addresses on a single device. IPs exposed '
+                    'with the other backend are migrated on startup.',
+               default=constants.ADVERTISEMENT_BACKEND_ADDRESS,
+               choices=[constants.ADVERTISEMENT_BACKEND_ADDRESS,
+                        constants.ADVERTISEMENT_BACKEND_ROUTE]),
+    cfg.StrOpt('exposed_ips_forwarding',
+               help='How the traffic to the exposed IPs is steered into the '
+                    'routing table of their provider bridge when using the '
+                    'underlay exposing method. "rules" creates an ip rule '
+                    'per exposed IP. "aggregated" creates a single rule per '
+                    'bridge table and IP family that looks up the table '
+                    'while ignoring its default route, so that only the '
+                    'host and subnet routes already present in the bridge '
+                    'table match and the number of rules does not grow '
+                    'with the number of exposed IPs. Rules created with the '
+                    'other mode are migrated on resync.',
+               default=constants.EXPOSED_IPS_FORWARDING_RULES,
+               choices=[constants.EXPOSED_IPS_FORWARDING_RULES,
+                        constants.EXPOSED_IPS_FORWARDING_AGGREGATED]),
+    cfg.BoolOpt('kernel_nexthops',
+                help='Install the routes through a gateway, e.g., the '
+                     'tenant subnets behind a cr-lrp, pointing to a kernel '
+                     'nexthop object shared by all the routes through the '
+                     'same cr-lrp and device, instead of with their own '
+                     'inline gateway. Changing the cr-lrp gateway is then '
+                     'a single nexthop update. Requires kernel nexthop '
+                     'support (Linux 5.3 or newer), and the ip command from '
+                     'iproute2 to adopt the nexthops left by a previous '
+                     'run.',
+                default=False),
     cfg.BoolOpt('require_snat_disabled_for_tenant_networks',
                 help='Require SNAT on the router port to be disabled before '
                      'exposing the tenant networks. Otherwise the exposed '
@@ -99,8 +210,55 @@ agent_opts = [
                 help='The UDP port used for EVPN VXLAN communication. By '
                      'default 4789 is being used.'),
     cfg.BoolOpt('clear_vrf_routes_on_startup',
-                help='If enabled, all routes are removed from the VRF table'
-                     '(specified by bgp_vrf_table_id option) at startup.',
+                help='If enabled, all the routes installed by the agent '
+                     '(tagged with the routes_protocol) are removed from the '
+                     'VRF table (specified by bgp_vrf_table_id option) at '
+                     'startup.',
+                default=False),
+    cfg.BoolOpt('warm_restart',
+                help='If enabled, the agent adopts the routes, IPs, flows '
+                     'and FRR configuration left by its previous run instead '
+                     'of rebuilding them, so that the exposed prefixes are '
+                     'not withdrawn while it restarts. The '
+                     'clear_vrf_routes_on_startup option is ignored, and the '
+                     'first re-sync, which only fixes the differences, waits '
+                     'for the OVSDB IDLs to get the databases contents (see '
+                     'warm_restart_hold_time). Supported by the '
+                     'ovn_bgp_driver and nb_ovn_bgp_driver drivers.',
+                default=False),
+    cfg.IntOpt('warm_restart_hold_time',
+               help='Maximum time (seconds) the first re-sync after a warm '
+                    'restart waits for the OVSDB IDLs to converge, i.e., to '
+                    'get the initial contents of the databases and stop '
+                    'changing. Once over, the re-sync is run anyway.',
+               min=0,
+               default=60),
+    cfg.BoolOpt('bgp_graceful_restart',
+                help='If enabled, BGP graceful restart is configured in '
+                     'FRR, so that the peers keep forwarding to the exposed '
+                     'prefixes while FRR restarts, e.g., during upgrades. '
+                     'It is best paired with the warm_restart option.',
+                default=False),
+    cfg.IntOpt('routes_protocol',
+               help='Protocol number the routes installed by the agent are '
+                    'tagged with, so that they can be told apart from the '
+                    'ones installed by other tools and flushed at once. It '
+                    'is registered as "ovn-bgp-agent" in rt_protos. It must '
+                    'not be one of the protocols used by the kernel or FRR '
+                    '(186 to 198). The routes left by previous versions '
+                    'through the provider bridges and the bgp_nic, tagged '
+                    'with protocol boot or static, are re-tagged with it at '
+                    'startup. IPs exposed as routes (see '
+                    'advertisement_backend) are tagged with it too.',
+               default=200, min=5, max=255),
+    cfg.BoolOpt('privsep_in_process',
+                help='Run the privileged network operations (routes, '
+                     'rules, addresses, devices, ...) directly in the agent '
+                     'process instead of through the privsep daemon, saving '
+                     'the IPC of each of them. It requires the agent to '
+                     'already have all the capabilities set for the '
+                     '[privsep] context, e.g., when running in a container '
+                     'with them, otherwise the privsep daemon is used.',
                 default=False),
     cfg.StrOpt('bgp_nic',
                default='bgp-nic',
@@ -272,6 +430,8 @@ def get_root_helper(conf):
 
 def setup_privsep():
     priv_context.init(root_helper=shlex.split(get_root_helper(cfg.CONF)))
+    if cfg.CONF.privsep_in_process:
+        privileged.run_in_process(privileged.default)
 
 
 def list_opts():
@@ -130,6 +130,36 @@ EXPOSE_METHOD_DYNAMIC = 'dynamic'
 ADVERTISEMENT_METHOD_HOST = 'host'
 ADVERTISEMENT_METHOD_SUBNET = 'subnet'
 
+ADVERTISEMENT_BACKEND_ADDRESS = 'address'
+ADVERTISEMENT_BACKEND_ROUTE = 'route'
+
+# Forwarding modes for the traffic to the IPs exposed on the provider bridges
+EXPOSED_IPS_FORWARDING_RULES = 'rules'
+EXPOSED_IPS_FORWARDING_AGGREGATED = 'aggregated'
+
+# Name registered on rt_protos for the protocol tagging the agent routes
+ROUTES_PROTO_NAME = 'ovn-bgp-agent'
+ROUTING_PROTOS_DIR = '/etc/iproute2/rt_protos.d'
+# Protocols the agent routes were tagged with by previous versions
+# (RTPROT_BOOT, and RTPROT_STATIC for the IPs exposed as routes), they are
+# re-tagged with the routes_protocol at startup
+LEGACY_ROUTES_PROTOS = (3, 4)
+
+# Kernel nexthop objects used by the routes through a gateway are tagged
+# with the agent routes protocol and their ids are allocated well above the
+# ones used by zebra
+NEXTHOP_ID_BASE = 1 << 30
+# Route attribute pointing to a nexthop object, not decoded by all the
+# pyroute2 versions
+RTA_NH_ID = 30
+# Nexthop object messages and attributes, not known by all the pyroute2
+# versions either
+RTM_NEWNEXTHOP = 104
+RTM_DELNEXTHOP = 105
+NHA_ID = 1
+NHA_OIF = 5
+NHA_GATEWAY = 6
+
 # OVN Cluster related constants
 OVN_CLUSTER_ROUTER = 'bgp-router'
 OVN_CLUSTER_ROUTER_INTERNAL_MAC = '40:44:00:00:00:06'
@@ -148,7 +178,27 @@ AF_INET6 = socket.AF_INET6
 
 # Path to file containing routing tables
 ROUTING_TABLES_FILE = '/etc/iproute2/rt_tables'
+ROUTING_TABLES_DIR = '/etc/iproute2/rt_tables.d'
 ROUTING_TABLE_MIN = 1
 ROUTING_TABLE_MAX = 252
 
 VLAN_ID_UNTAGGED = 0
+
+# Kinds of objects reprocessed by the incremental reconciliation
+DIRTY_PORT = 'port'
+DIRTY_SUBNET = 'subnet'
+DIRTY_LOGICAL_SWITCH = 'logical_switch'
+DIRTY_ROUTER = 'router'
+DIRTY_BRIDGE = 'bridge'
+# Kinds of the kernel changes marked dirty by the netlink monitor, mapped by
+# the drivers to the objects to reprocess
+DIRTY_ADDRESS = 'address'
+DIRTY_ROUTE = 'route'
+DIRTY_RULE = 'rule'
+
+# Time (seconds) the sync releases the driver lock for between chunks
+SYNC_CHUNK_PAUSE = 0.01
+
+# Time (seconds) the IDLs contents must stay unchanged to be considered
+# converged after a warm restart
+WARM_RESTART_SETTLE_TIME = 1
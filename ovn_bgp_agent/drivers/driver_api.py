@@ -54,3 +54,31 @@ class AgentDriverBase(object, metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def withdraw_subnet(self, subnet):
         raise NotImplementedError()
+
+    # Whether the connection to the OVN database was established again
+    # since the last check
+    _reconnected = False
+
+    def reconcile(self):
+        """Ensure the exposed routes/IPs match the OVN information
+
+        By default it runs a full sync. Drivers tracking the objects changed
+        since the previous run can reprocess just those instead.
+
+        :return: (int) number of repairs done, i.e., the drift found between
+                 the OVN information and the host, or None if unknown
+        """
+        return self.sync()
+
+    def notify_reconnected(self):
+        """Record a reconnection to the OVN database
+
+        The periodic reconcile gets back to its base interval, as drift is
+        more likely after it.
+        """
+        self._reconnected = True
+
+    def pop_reconnected(self):
+        """Check, and forget, if there was a reconnection since last check"""
+        reconnected, self._reconnected = self._reconnected, False
+        return reconnected
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import collections
-import ipaddress
+import functools
 import threading
 
 from oslo_concurrency import lockutils
@@ -24,12 +24,21 @@ from ovn_bgp_agent import constants
 from ovn_bgp_agent.drivers import driver_api
 from ovn_bgp_agent.drivers.openstack.utils import bgp as bgp_utils
 from ovn_bgp_agent.drivers.openstack.utils import driver_utils
+from ovn_bgp_agent.drivers.openstack.utils import exposed_ips
 from ovn_bgp_agent.drivers.openstack.utils import ovn
 from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent.drivers.openstack.utils import wire as wire_utils
+from ovn_bgp_agent.drivers.openstack.watchers import base_watcher
 from ovn_bgp_agent.drivers.openstack.watchers import nb_bgp_watcher as watcher
 from ovn_bgp_agent import exceptions
+from ovn_bgp_agent.utils import dirty_set
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import netlink_monitor
+from ovn_bgp_agent.utils import prefix_trie
+from ovn_bgp_agent.utils import reconciler
+from ovn_bgp_agent.utils import route_ledger
+from ovn_bgp_agent.utils import warm_restart
+from ovn_bgp_agent.utils import workers
 
 
 CONF = cfg.CONF
@@ -50,6 +59,15 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
     def __init__(self):
         self.allowed_address_scopes = set(CONF.address_scopes or [])
+        # routers, logical switches and bridges to reprocess on the next
+        # reconcile, as they drifted
+        self._dirty = dirty_set.DirtySet(CONF.full_sync_interval)
+        self._netlink_monitor = netlink_monitor.NetlinkMonitor(
+            self._dirty, CONF.routes_protocol)
+        self._reconciler = reconciler.ChunkedReconciler(
+            'nbbgp', CONF.sync_chunk_time)
+        self._warm_restart = warm_restart.WarmRestart(
+            CONF.warm_restart_hold_time)
 
         self._init_vars()
 
@@ -83,26 +101,33 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         self._local_nb_idl = val
 
     def _init_vars(self):
-        self.ovn_bridge_mappings = {}  # {'public': 'br-ex'}
-        self.ovs_flows = {}
+        for name, value in self._new_vars().items():
+            setattr(self, name, value)
 
-        self.ovn_routing_tables = {}  # {'br-ex': 200}
-        # {'br-ex': [route1, route2]}
-        self.ovn_routing_tables_routes = collections.defaultdict(list)
+    def _new_vars(self):
+        return {
+            'ovn_bridge_mappings': {},  # {'public': 'br-ex'}
+            'ovs_flows': {},
 
-        self.ovn_local_cr_lrps = {}
-        self.ovn_local_lrps = {}
+            'ovn_routing_tables': {},  # {'br-ex': 200}
+            # {'br-ex': [route1, route2]}
+            'ovn_routing_tables_routes': route_ledger.RouteLedger(),
 
-        # {'ls_name': ['ip': {'bridge_device': X, 'bridge_vlan': Y}]}
-        self._exposed_ips = {}
-        self._ovs_flows = collections.defaultdict()
-        self.ovn_provider_ls = {}
-        # dict instead of list to speed up look ups
-        self.ovn_tenant_ls = {}  # {'ls_name': True}
+            'ovn_local_cr_lrps': {},
+            'ovn_local_lrps': {},
+
+            # {'ls_name': ['ip': {'bridge_device': X, 'bridge_vlan': Y}]}
+            '_exposed_ips': exposed_ips.ExposedIPs(),
+            '_ovs_flows': collections.defaultdict(),
+            'ovn_provider_ls': {},
+            # dict instead of list to speed up look ups
+            'ovn_tenant_ls': {},  # {'ls_name': True}
+        }
 
     def start(self):
         self.ovs_idl = ovs.OvsIdl()
-        self.ovs_idl.start(CONF.ovsdb_connection)
+        self.ovs_idl.start(CONF.ovsdb_connection,
+                           events=self._get_ovs_events())
         self.chassis = self.ovs_idl.get_own_chassis_name()
         self.chassis_id = self.ovs_idl.get_own_chassis_id()
 
@@ -112,11 +137,13 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         LOG.info("Loaded chassis %s.", self.chassis)
 
         LOG.info("Starting VRF configuration for advertising routes")
+        # Routes protocol, re-tagging the routes of previous versions
+        bgp_utils.ensure_routes_protocol()
         # Base BGP configuration
         bgp_utils.ensure_base_bgp_configuration()
 
-        # Clear vrf routing table
-        if CONF.clear_vrf_routes_on_startup:
+        # Clear vrf routing table, unless its routes are adopted
+        if CONF.clear_vrf_routes_on_startup and not CONF.warm_restart:
             linux_net.delete_routes_from_table(CONF.bgp_vrf_table_id)
 
         LOG.info("VRF configuration for advertising routes completed")
@@ -140,9 +167,24 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
                 events=[],
                 leader_only=True).start()
 
+        if CONF.warm_restart:
+            idls = [self.nb_idl.idl, self.ovs_idl.idl_ovs.idl]
+            if self._local_nb_idl:
+                idls.append(self._local_nb_idl.idl)
+            self._warm_restart.start(idls)
+
+        # The drift is only looked for by the incremental reconciliations
+        if CONF.full_sync_interval > 0:
+            self._netlink_monitor.start()
+
         # Now IDL connections can be safely used
         self._post_start_event.set()
 
+    def _get_ovs_events(self):
+        if CONF.full_sync_interval <= 0:
+            return []
+        return [base_watcher.BridgePortsUpdateEvent(self)]
+
     def _get_events(self):
         events = {watcher.LogicalSwitchPortProviderCreateEvent(self),
                   watcher.LogicalSwitchPortProviderDeleteEvent(self),
@@ -178,9 +220,40 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         # Base BGP configuration
         bgp_utils.ensure_base_bgp_configuration()
 
-    @lockutils.synchronized('nbbgp')
-    def sync(self):
-        self._init_vars()
+    def mark_bridge_dirty(self, bridge):
+        self._dirty.mark(constants.DIRTY_BRIDGE, bridge)
+
+    def reconcile(self):
+        if self._dirty.full_sync_due():
+            return self.sync()
+        return self._sync_dirty()
+
+    def sync(self, wait=True):
+        # after a warm restart, the state left is only reconciled once the
+        # IDLs have the databases contents. The syncs triggered by the events
+        # do not wait, as that would block the watcher thread
+        if wait:
+            self._warm_restart.wait()
+        # the state is rebuilt aside, and only replaces the current one once
+        # the sync is completed
+        staged = reconciler.StagedState(self, **self._new_vars())
+        try:
+            return self._reconciler.run(self._sync, staged,
+                                        measure=bgp_utils.get_exposed_ips)
+        finally:
+            self._dirty.full_sync_finished()
+
+    def _sync(self):
+        """Full sync, as a generator yielding after each unit of work
+
+        The reconciler holds the driver lock while running it, releasing
+        it at the yields if the sync takes too long. The events processed
+        meanwhile see the state of the previous sync, as the new one is
+        staged. Their withdrawals are replayed on the new state, and the
+        routers and logical switches they changed reprocessed, before the
+        cleanup of the leftovers.
+        """
+        self._dirty.full_sync_started()
 
         LOG.debug("Configuring default wiring for each provider network")
         # Apply base configuration for each bridge
@@ -188,12 +261,17 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
             wire_utils.ensure_base_wiring_config(
                 self.nb_idl, self.ovs_idl, ovn_idl=self.local_nb_idl,
                 routing_tables=self.ovn_routing_tables))
+        yield
 
         LOG.debug("Syncing current routes.")
         # add missing routes/ips for OVN router gateway ports
-        ports = self.nb_idl.get_active_cr_lrp_on_chassis(self.chassis_id)
-        for port in ports:
-            self._ensure_crlrp_exposed(port)
+        ports = list(self.nb_idl.get_active_cr_lrp_on_chassis(
+            self.chassis_id))
+        for index in range(0, len(ports), CONF.sync_workers):
+            workers.run_in_parallel(
+                self._ensure_crlrp_exposed,
+                ports[index:index + CONF.sync_workers], CONF.sync_workers)
+            yield
         # add missing routes/ips for subnets connected to local gateway ports
         ports = self.nb_idl.get_active_local_lrps(
             self.ovn_local_cr_lrps.keys())
@@ -207,6 +285,7 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
                     constants.OVN_LS_NAME_EXT_ID_KEY),
                 'address_scopes': driver_utils.get_addr_scopes(port)}
             self._expose_subnet(ips, subnet_info)
+            yield
 
         # add missing routes/ips for IPs on provider network
         ports = self.nb_idl.get_active_lsp_on_chassis(self.chassis)
@@ -215,9 +294,15 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
                                  constants.OVN_VIRTUAL_VIF_PORT_TYPE]:
                 continue
             self._ensure_lsp_exposed(port)
+            yield
 
         # add missing routes/ips for OVN loadbalancers
         self._expose_lbs(self.ovn_local_cr_lrps.keys())
+        yield
+
+        # reprocess the objects changed by the events processed in between
+        # the chunks, before removing what is not exposed
+        self._process_dirty()
 
         # remove extra wiring leftovers
         wire_utils.cleanup_wiring(self.nb_idl,
@@ -227,6 +312,94 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
                                   self.ovn_routing_tables,
                                   self.ovn_routing_tables_routes)
 
+        # the IPs exposed or withdrawn are counted by the reconciler
+        return 0
+
+    @lockutils.synchronized('nbbgp')
+    def _sync_dirty(self):
+        # the withdrawals were applied on the current state already
+        self._dirty.pop_withdrawn()
+        if not len(self._dirty):
+            LOG.debug("Nothing changed since the previous sync.")
+            return 0
+        found_ips = bgp_utils.get_exposed_ips()
+        self._process_dirty()
+        # the drift repaired: the IPs exposed or withdrawn, the events
+        # waiting for the lock meanwhile
+        return bgp_utils.count_exposed_ips_changes(found_ips)
+
+    def _process_dirty(self):
+        # the withdrawals happening during a sync are replayed on the state
+        # it rebuilt, before the objects are reprocessed
+        self._dirty.replay(self._dirty.pop_withdrawn())
+        dirty = self._dirty.pop()
+        if not dirty:
+            LOG.debug("Nothing changed since the previous sync.")
+            return
+        self._map_kernel_drift(dirty)
+        LOG.debug("Syncing the routers, logical switches and bridges changed "
+                  "since the previous sync: %s", dirty)
+        self._dirty.process(
+            dirty, constants.DIRTY_BRIDGE,
+            lambda bridge: wire_utils.sync_bridge_flows(self.ovs_flows,
+                                                        bridge))
+        self._dirty.process(dirty, constants.DIRTY_ROUTER,
+                            self._ensure_router_exposed)
+        self._dirty.process(dirty, constants.DIRTY_LOGICAL_SWITCH,
+                            self._ensure_ls_exposed)
+
+    def _map_kernel_drift(self, dirty):
+        """Map the kernel changes found dirty to the objects to reprocess
+
+        The addresses, routes and rules removed from the kernel are mapped
+        to the logical switches still exposing them, and to the routers
+        whose gateway port is on those. The ones the agent removed itself
+        are no longer exposed, and not mapped to anything.
+        """
+        switches = set()
+        for table, dst, dst_len in dirty.pop(constants.DIRTY_ROUTE, ()):
+            switches.update(self.ovn_routing_tables_routes.get_owners(
+                table, dst, dst_len))
+            switches.add(self._find_exposing_switch(dst, dst_len))
+        for _table, dst, dst_len in dirty.pop(constants.DIRTY_RULE, ()):
+            switches.add(self._find_exposing_switch(dst, dst_len))
+        for ip in dirty.pop(constants.DIRTY_ADDRESS, ()):
+            switches.add(self._find_exposing_switch(ip))
+        switches.discard(None)
+        if not switches:
+            return
+        dirty.setdefault(constants.DIRTY_LOGICAL_SWITCH, set()).update(
+            switches)
+        routers = {router for router, cr_lrp_info in
+                   self.ovn_local_cr_lrps.items()
+                   if cr_lrp_info.get('provider_switch') in switches}
+        if routers:
+            dirty.setdefault(constants.DIRTY_ROUTER, set()).update(routers)
+
+    def _find_exposing_switch(self, ip, prefixlen=None):
+        if prefixlen is not None:
+            host_prefixlen = (
+                128 if linux_net.get_ip_version(ip) == constants.IP_VERSION_6
+                else 32)
+            if prefixlen != host_prefixlen:
+                ip = '{}/{}'.format(ip, prefixlen)
+        found = self._exposed_ips.find(ip)
+        return found[0] if found else None
+
+    def _ensure_router_exposed(self, router):
+        # Exposing the cr-lrp also exposes the router subnets and lbs
+        ports = self.nb_idl.get_active_cr_lrp_on_chassis(self.chassis_id)
+        for port in ports:
+            if (port.external_ids.get(constants.OVN_LR_NAME_EXT_ID_KEY) ==
+                    router):
+                self._ensure_crlrp_exposed(port)
+
+    def _ensure_ls_exposed(self, logical_switch):
+        for port in self.nb_idl.get_active_lsp(logical_switch):
+            if driver_utils.get_port_chassis(port, self.chassis) == (
+                    self.chassis):
+                self._ensure_lsp_exposed(port)
+
     def _ensure_lsp_exposed(self, port):
         port_fip = port.external_ids.get(constants.OVN_FIP_EXT_ID_KEY)
         if port_fip:
@@ -275,17 +448,20 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
             proxy_cidrs = []
         # Connect to OVN
         try:
+            # The routes are owned by the logical switch exposing the IPs,
+            # as the exposed IPs are
             if wire_utils.wire_provider_port(
                     self.ovn_routing_tables_routes, self.ovs_flows, port_ips,
                     bridge_device, bridge_vlan, localnet,
                     self.ovn_routing_tables, proxy_cidrs, mac=mac,
-                    ovn_idl=self.local_nb_idl):
+                    ovn_idl=self.local_nb_idl, owner=logical_switch):
                 # Expose the IP now that it is connected
                 bgp_utils.announce_ips(port_ips)
                 for ip in port_ips:
-                    self._exposed_ips.setdefault(logical_switch, {}).update(
-                        {ip: {'bridge_device': bridge_device,
-                              'bridge_vlan': bridge_vlan}})
+                    self._exposed_ips.add(
+                        logical_switch, ip,
+                        {'bridge_device': bridge_device,
+                         'bridge_vlan': bridge_vlan})
             else:
                 return False
         except Exception as e:
@@ -306,13 +482,13 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
             wire_utils.unwire_provider_port(
                 self.ovn_routing_tables_routes, port_ips, bridge_device,
                 bridge_vlan, self.ovn_routing_tables, proxy_cidrs,
-                ovn_idl=self.local_nb_idl)
+                ovn_idl=self.local_nb_idl, owner=logical_switch)
         except Exception as e:
             LOG.exception("Unexpected exception while unwiring provider port: "
                           "%s", e)
         for ip in port_ips:
-            if self._exposed_ips.get(logical_switch, {}).get(ip):
-                self._exposed_ips[logical_switch].pop(ip)
+            if self._exposed_ips.get(logical_switch, ip):
+                self._exposed_ips.remove(logical_switch, ip)
 
     def _get_bridge_for_localnet_port(self, localnet):
         bridge_device = None
@@ -383,7 +559,7 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
             ips = [ips]
 
         for ip in ips:
-            if ip in self._exposed_ips.get(logical_switch, {}):
+            if self._exposed_ips.contains(logical_switch, ip):
                 return True
 
         return False
@@ -402,6 +578,12 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         - VM IP on the provider network
         '''
         logical_switch = ips_info.get('logical_switch')
+        if ips_info['type'] == constants.OVN_CR_LRP_PORT_TYPE:
+            self._dirty.mark_changed(constants.DIRTY_ROUTER,
+                                     ips_info.get('router'))
+        else:
+            self._dirty.mark_changed(constants.DIRTY_LOGICAL_SWITCH,
+                                     logical_switch)
         if not self.is_ls_provider(logical_switch):
             return False
 
@@ -425,6 +607,7 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
             return []
 
         if router and port_type == constants.OVN_CR_LRP_PORT_TYPE:
+            old_cr_lrp_info = self.ovn_local_cr_lrps.get(router)
             # Store information about local CR-LRPs that will later be used
             # to expose networks
             self.ovn_local_cr_lrps[router] = {
@@ -433,6 +616,9 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
                 'provider_switch': logical_switch,
                 'ips': ips,
             }
+            if old_cr_lrp_info and set(old_cr_lrp_info['ips']) != set(ips):
+                self._update_cr_lrp_gateway(router, old_cr_lrp_info,
+                                            self.ovn_local_cr_lrps[router])
             # Expose associated subnets
             ports = self.nb_idl.get_active_local_lrps([router])
             for port in ports:
@@ -452,6 +638,29 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         LOG.debug("Added BGP route for logical port with ip %s", ips)
         return ips
 
+    def _update_cr_lrp_gateway(self, router, old_cr_lrp_info, cr_lrp_info):
+        '''Move the router subnets to the new ips of its cr-lrp
+
+        The routes through the cr-lrp follow its nexthop (if any) before the
+        subnets are exposed again, and its old ips are withdrawn.
+        '''
+        old_ips = [ip for ip in old_cr_lrp_info['ips']
+                   if ip not in cr_lrp_info['ips']]
+        if (old_cr_lrp_info['bridge_device'] ==
+                cr_lrp_info['bridge_device'] and
+                old_cr_lrp_info['bridge_vlan'] == cr_lrp_info['bridge_vlan']):
+            if wire_utils.update_lrp_port_gateway(
+                    self.ovn_routing_tables_routes, router,
+                    cr_lrp_info['bridge_device'], cr_lrp_info['bridge_vlan'],
+                    cr_lrp_info['ips']):
+                LOG.debug("Moved the routes of router %s from %s to %s",
+                          router, old_ips, cr_lrp_info['ips'])
+        if old_ips:
+            self._withdraw_provider_port(
+                old_ips, old_cr_lrp_info['provider_switch'],
+                old_cr_lrp_info['bridge_device'],
+                old_cr_lrp_info['bridge_vlan'])
+
     @lockutils.synchronized('nbbgp')
     def withdraw_ip(self, ips, ips_info):
         '''Withdraw BGP route by removing IP from device.
@@ -465,6 +674,17 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         VRF), and removes the IP of:
         - VM IP on the provider network
         '''
+        withdraw_fn = functools.partial(self._withdraw_ip, ips, ips_info)
+        if ips_info.get('type') == constants.OVN_CR_LRP_PORT_TYPE:
+            self._dirty.mark_withdrawn(constants.DIRTY_ROUTER,
+                                       ips_info.get('router'), withdraw_fn)
+        else:
+            self._dirty.mark_withdrawn(constants.DIRTY_LOGICAL_SWITCH,
+                                       ips_info.get('logical_switch'),
+                                       withdraw_fn)
+        self._withdraw_ip(ips, ips_info)
+
+    def _withdraw_ip(self, ips, ips_info):
         logical_switch = ips_info.get('logical_switch')
         if not logical_switch:
             return
@@ -572,6 +792,9 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         VRF), and adds the IP of:
         - VM FIP
         '''
+        self._dirty.mark_changed(constants.DIRTY_LOGICAL_SWITCH,
+                                 row.external_ids.get(
+                                     constants.OVN_LS_NAME_EXT_ID_KEY))
         return self._expose_fip(ip, mac, logical_switch, row)
 
     def _expose_fip(self, ip, mac, logical_switch, row):
@@ -607,11 +830,18 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         VRF), and removes the IP of:
         - VM FIP
         '''
+        self._dirty.mark_withdrawn(
+            constants.DIRTY_LOGICAL_SWITCH,
+            row.external_ids.get(constants.OVN_LS_NAME_EXT_ID_KEY),
+            functools.partial(self._withdraw_fip, ip, row))
+        self._withdraw_fip(ip, row)
+
+    def _withdraw_fip(self, ip, row):
         tenant_logical_switch = row.external_ids.get(
             constants.OVN_LS_NAME_EXT_ID_KEY)
         if not tenant_logical_switch:
             return
-        fip_info = self._exposed_ips.get(tenant_logical_switch, {}).get(ip)
+        fip_info = self._exposed_ips.get(tenant_logical_switch, ip)
         if not fip_info:
             # No information to withdraw the FIP
             return
@@ -632,9 +862,7 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         self._withdraw_remote_ip(ips, ips_info)
 
     def _get_exposed_ip(self, exposed_ip):
-        for ls, ip_info in self._exposed_ips.items():
-            if exposed_ip in ip_info:
-                return ls, ip_info[exposed_ip]
+        return self._exposed_ips.find(exposed_ip)
 
     def _get_router_port_info_for_ls(self, ls):
         # LOG.debug('Searching router port info for ls %s', ls)
@@ -676,8 +904,8 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
         bgp_utils.announce_ips(ips_to_expose, ips_info=ips_info)
         for ip in ips_to_expose:
-            self._exposed_ips.setdefault(
-                ips_info['logical_switch'], {}).setdefault(ip, {})
+            self._exposed_ips.add(ips_info['logical_switch'], ip,
+                                  replace=False)
 
         LOG.debug("Added BGP route for tenant IP(s) %s on chassis %s",
                   ips_to_expose, self.chassis)
@@ -711,17 +939,22 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
         bgp_utils.withdraw_ips(ips_to_withdraw, ips_info=ips_info)
         for ip in ips_to_withdraw:
-            self._exposed_ips.get(ips_info['logical_switch'], {}).pop(ip, None)
+            self._exposed_ips.remove(ips_info['logical_switch'], ip)
 
         LOG.debug("Deleted BGP route for tenant IP(s) %s on chassis %s",
                   ips_to_withdraw, self.chassis)
 
     @lockutils.synchronized('nbbgp')
     def expose_subnet(self, ips, subnet_info):
+        self._dirty.mark_changed(constants.DIRTY_ROUTER,
+                                 subnet_info.get('associated_router'))
         return self._expose_subnet(ips, subnet_info)
 
     @lockutils.synchronized('nbbgp')
     def withdraw_subnet(self, ips, subnet_info):
+        self._dirty.mark_withdrawn(
+            constants.DIRTY_ROUTER, subnet_info.get('associated_router'),
+            functools.partial(self._withdraw_subnet, ips, subnet_info))
         return self._withdraw_subnet(ips, subnet_info)
 
     def _expose_subnet(self, ips, subnet_info):
@@ -740,13 +973,13 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
             # Check if there is a SNAT entry for this LRP
             router = self.nb_idl.get_router(gateway_router)
 
-            ips_without_snat = set(ips)
+            snat_networks = prefix_trie.PrefixTrie()
             for nat in router.nat:
                 if nat.type == constants.OVN_SNAT:
-                    net = ipaddress.ip_network(nat.logical_ip, strict=False)
-                    for ip in list(ips_without_snat):
-                        if ipaddress.ip_address(ip.split('/')[0]) in net:
-                            ips_without_snat.discard(ip)
+                    snat_networks.add(nat.logical_ip)
+            ips_without_snat = set(
+                ip for ip in ips
+                if not snat_networks.longest_match(ip.split('/')[0]))
 
             if len(ips_without_snat) == 0:
                 LOG.info('All ips (%s) were removed due to SNAT requirement '
@@ -894,14 +1127,15 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
                         self.ovn_routing_tables_routes, ip,
                         cr_lrp_info.get('bridge_device'),
                         cr_lrp_info.get('bridge_vlan'),
-                        self.ovn_routing_tables, cr_lrp_info.get('ips')):
+                        self.ovn_routing_tables, cr_lrp_info.get('ips'),
+                        owner=cr_lrp_info.get('provider_switch'),
+                        gateway_owner=subnet_info.get('associated_router')):
 
                     logical_switch = cr_lrp_info['provider_switch']
-                    self._exposed_ips.setdefault(logical_switch, {}).update(
-                        {ip: {
-                            'bridge_device': cr_lrp_info.get('bridge_device'),
-                            'bridge_vlan': cr_lrp_info.get('bridge_vlan'),
-                            'via': cr_lrp_info.get('ips')}})
+                    self._exposed_ips.add(logical_switch, ip, {
+                        'bridge_device': cr_lrp_info.get('bridge_device'),
+                        'bridge_vlan': cr_lrp_info.get('bridge_vlan'),
+                        'via': cr_lrp_info.get('ips')})
 
                     self.ovn_local_lrps.setdefault(
                         subnet_info['network'], set()).add(ip)
@@ -970,10 +1204,11 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
                         self.ovn_routing_tables_routes, ip,
                         cr_lrp_info.get('bridge_device'),
                         cr_lrp_info.get('bridge_vlan'),
-                        self.ovn_routing_tables, cr_lrp_info.get('ips')):
+                        self.ovn_routing_tables, cr_lrp_info.get('ips'),
+                        owner=cr_lrp_info.get('provider_switch')):
 
                     logical_switch = cr_lrp_info['provider_switch']
-                    self._exposed_ips.get(logical_switch, {}).pop(ip, None)
+                    self._exposed_ips.remove(logical_switch, ip)
                 else:
                     error_msg = ("Something happened while withdrawing subnet"
                                  "and they have not been properly removed")
@@ -991,6 +1226,7 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
     @lockutils.synchronized('nbbgp')
     def expose_ovn_lb_vip(self, lb):
+        self._mark_lb_dirty(lb, constants.OVN_LB_LR_REF_EXT_ID_KEY)
         self._expose_ovn_lb_vip(lb)
 
     def _expose_ovn_lb_vip(self, lb):
@@ -1018,6 +1254,8 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
     @lockutils.synchronized('nbbgp')
     def withdraw_ovn_lb_vip(self, lb):
+        self._mark_lb_dirty(lb, constants.OVN_LB_LR_REF_EXT_ID_KEY,
+                            functools.partial(self._withdraw_ovn_lb_vip, lb))
         self._withdraw_ovn_lb_vip(lb)
 
     def _withdraw_ovn_lb_vip(self, lb):
@@ -1029,7 +1267,7 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
         if not cr_lrp_info:
             return
         provider_ls = cr_lrp_info['provider_switch']
-        if self._exposed_ips.get(provider_ls, {}).get(vip_ip):
+        if self._exposed_ips.get(provider_ls, vip_ip):
             # VIP is on provider network
             self._withdraw_provider_port([vip_ip],
                                          cr_lrp_info['provider_switch'],
@@ -1042,6 +1280,7 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
     @lockutils.synchronized('nbbgp')
     def expose_ovn_lb_fip(self, lb):
+        self._mark_lb_dirty(lb, constants.OVN_LB_LR_REF_EXT_ID_KEY)
         self._expose_ovn_lb_fip(lb)
 
     def _expose_ovn_lb_fip(self, lb):
@@ -1059,6 +1298,15 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
             return
         self._expose_fip(external_ip, external_mac, ls_name, vip_lsp)
 
+    def _mark_lb_dirty(self, lb, router_key, withdraw_fn=None):
+        # The lbs are reprocessed along with their router
+        router = lb.external_ids.get(router_key, '').replace('neutron-', "", 1)
+        if withdraw_fn:
+            self._dirty.mark_withdrawn(constants.DIRTY_ROUTER, router,
+                                       withdraw_fn)
+        else:
+            self._dirty.mark_changed(constants.DIRTY_ROUTER, router)
+
     def _get_parameters_from_lb(self, lb, include_mac_and_localnet=False):
         for fipport in lb.vips.keys():
             fip, port = fipport.split(':')
@@ -1089,10 +1337,14 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
     @lockutils.synchronized('nbbgp')
     def expose_ovn_pf_lb_fip(self, lb):
+        self._mark_lb_dirty(lb, constants.OVN_LR_NAME_EXT_ID_KEY)
         self._expose_ovn_pf_lb_fip(lb)
 
     @lockutils.synchronized('nbbgp')
     def withdraw_ovn_pf_lb_fip(self, lb):
+        self._mark_lb_dirty(lb, constants.OVN_LR_NAME_EXT_ID_KEY,
+                            functools.partial(self._withdraw_ovn_pf_lb_fip,
+                                              lb))
         self._withdraw_ovn_pf_lb_fip(lb)
 
     def _withdraw_ovn_pf_lb_fip(self, lb):
@@ -1105,6 +1357,8 @@ class NBOVNBGPDriver(driver_api.AgentDriverBase):
 
     @lockutils.synchronized('nbbgp')
     def withdraw_ovn_lb_fip(self, lb):
+        self._mark_lb_dirty(lb, constants.OVN_LB_LR_REF_EXT_ID_KEY,
+                            functools.partial(self._withdraw_ovn_lb_fip, lb))
         self._withdraw_ovn_lb_fip(lb)
 
     def _withdraw_ovn_lb_fip(self, lb):
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import collections
+import functools
 import ipaddress
 import threading
 
@@ -27,10 +28,17 @@ from ovn_bgp_agent.drivers.openstack.utils import driver_utils
 from ovn_bgp_agent.drivers.openstack.utils import ovn
 from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent.drivers.openstack.utils import wire as wire_utils
+from ovn_bgp_agent.drivers.openstack.watchers import base_watcher
 from ovn_bgp_agent.drivers.openstack.watchers import bgp_watcher as watcher
 from ovn_bgp_agent import exceptions as agent_exc
+from ovn_bgp_agent.utils import dirty_set
 from ovn_bgp_agent.utils import helpers
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import netlink_monitor
+from ovn_bgp_agent.utils import reconciler
+from ovn_bgp_agent.utils import route_ledger
+from ovn_bgp_agent.utils import warm_restart
+from ovn_bgp_agent.utils import workers
 
 
 CONF = cfg.CONF
@@ -54,11 +62,22 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         self.ovn_local_cr_lrps = {}
         self.ovn_local_lrps = {}
         # {'br-ex': [route1, route2]}
-        self.ovn_routing_tables_routes = collections.defaultdict()
+        self.ovn_routing_tables_routes = route_ledger.RouteLedger()
         # {ovn_lb: {'ips': [VIP1, VIP2], 'gateway_port': cr-lrpX}
         self.provider_ovn_lbs = collections.defaultdict()
         # {datapath: localnet_port_name}
         self.ovn_provider_datapath = {}
+        # ports, subnets and bridges to reprocess on the next reconcile, as
+        # they drifted
+        self._dirty = dirty_set.DirtySet(CONF.full_sync_interval)
+        self._netlink_monitor = netlink_monitor.NetlinkMonitor(
+            self._dirty, CONF.routes_protocol)
+        # protects the IPs and ip rules shared by the sync workers
+        self._sync_lock = threading.Lock()
+        self._reconciler = reconciler.ChunkedReconciler(
+            'bgp', CONF.sync_chunk_time)
+        self._warm_restart = warm_restart.WarmRestart(
+            CONF.warm_restart_hold_time)
 
         self._sb_idl = None
         self._post_fork_event = threading.Event()
@@ -75,17 +94,20 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
 
     def start(self):
         self.ovs_idl = ovs.OvsIdl()
-        self.ovs_idl.start(CONF.ovsdb_connection)
+        self.ovs_idl.start(CONF.ovsdb_connection,
+                           events=self._get_ovs_events())
         self.chassis = self.ovs_idl.get_own_chassis_id()
         self.ovn_remote = self.ovs_idl.get_ovn_remote()
         LOG.info("Loaded chassis %s.", self.chassis)
 
         LOG.info("Starting VRF configuration for advertising routes")
+        # Routes protocol, re-tagging the routes of previous versions
+        bgp_utils.ensure_routes_protocol()
         # Base BGP configuration
         bgp_utils.ensure_base_bgp_configuration()
 
-        # Clear vrf routing table
-        if CONF.clear_vrf_routes_on_startup:
+        # Clear vrf routing table, unless its routes are adopted
+        if CONF.clear_vrf_routes_on_startup and not CONF.warm_restart:
             linux_net.delete_routes_from_table(CONF.bgp_vrf_table_id)
 
         LOG.info("VRF configuration for advertising routes completed")
@@ -101,10 +123,22 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
             chassis=self.chassis,
             tables=OVN_TABLES,
             events=events).start()
+        if CONF.warm_restart:
+            self._warm_restart.start([self.sb_idl.idl,
+                                      self.ovs_idl.idl_ovs.idl])
+
+        # The drift is only looked for by the incremental reconciliations
+        if CONF.full_sync_interval > 0:
+            self._netlink_monitor.start()
 
         # Now IDL connections can be safely used
         self._post_fork_event.set()
 
+    def _get_ovs_events(self):
+        if CONF.full_sync_interval <= 0:
+            return []
+        return [base_watcher.BridgePortsUpdateEvent(self)]
+
     def _get_events(self):
         events = {watcher.PortBindingChassisCreatedEvent(self),
                   watcher.PortBindingChassisDeletedEvent(self),
@@ -129,17 +163,46 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         # Base BGP configuration
         bgp_utils.ensure_base_bgp_configuration()
 
-    @lockutils.synchronized('bgp')
-    def sync(self):
+    def mark_bridge_dirty(self, bridge):
+        self._dirty.mark(constants.DIRTY_BRIDGE, bridge)
+
+    def reconcile(self):
+        if self._dirty.full_sync_due():
+            return self.sync()
+        return self._sync_dirty()
+
+    def sync(self, wait=True):
+        # after a warm restart, the state left is only reconciled once the
+        # IDLs have the databases contents. The syncs triggered by the events
+        # do not wait, as that would block the watcher thread
+        if wait:
+            self._warm_restart.wait()
+        # the state is rebuilt aside, and only replaces the current one once
+        # the sync is completed
+        staged = reconciler.StagedState(
+            self, ovn_routing_tables={}, ovn_bridge_mappings={},
+            ovn_local_cr_lrps={}, ovn_local_lrps={},
+            ovn_routing_tables_routes=route_ledger.RouteLedger(),
+            provider_ovn_lbs=collections.defaultdict(), ovs_flows={})
+        try:
+            return self._reconciler.run(self._sync, staged,
+                                        measure=bgp_utils.get_exposed_ips)
+        finally:
+            self._dirty.full_sync_finished()
+
+    def _sync(self):
+        """Full sync, as a generator yielding after each unit of work
+
+        It is run by the reconciler, which holds the driver lock while
+        running it, but may release the lock at any of the yields to let
+        the events be processed. Those events see the state of the previous
+        sync, as the new one is staged, and mark the objects they change
+        dirty. Their withdrawals are replayed on the new state, and the
+        objects reprocessed, before the cleanup.
+        """
+        self._dirty.full_sync_started()
         self._expose_tenant_networks = (CONF.expose_tenant_networks or
                                         CONF.expose_ipv6_gua_tenant_networks)
-        self.ovn_routing_tables = {}
-        self.ovn_bridge_mappings = {}
-        self.ovn_local_cr_lrps = {}
-        self.ovn_local_lrps = {}
-        self.ovn_routing_tables_routes = collections.defaultdict()
-        self.provider_ovn_lbs = collections.defaultdict()
-        self.ovs_flows = {}
 
         LOG.debug("Configuring br-ex default rule and routing tables for "
                   "each provider network")
@@ -147,6 +210,7 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         bridge_mappings = self.ovs_idl.get_ovn_bridge_mappings()
         # 2) Get macs for bridge mappings
         extra_routes = {}
+        bridge_networks = {}
 
         for bridge_index, bridge_mapping in enumerate(bridge_mappings, 1):
             network, bridge = helpers.parse_bridge_mapping(bridge_mapping)
@@ -154,6 +218,8 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
                 continue
             self.ovn_bridge_mappings[network] = bridge
 
+            # NOTE: the routing tables are allocated sequentially, as they
+            # update the same rt_tables file
             if not extra_routes.get(bridge):
                 extra_routes[bridge] = (
                     linux_net.ensure_routing_table_for_bridge(
@@ -161,44 +227,25 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
                         CONF.bgp_vrf_table_id))
             vlan_tags = self.sb_idl.get_network_vlan_tag_by_network_name(
                 network)
+            bridge_networks.setdefault(bridge, []).append(
+                (bridge_index, vlan_tags))
 
-            for vlan_tag in vlan_tags:
-                linux_net.ensure_vlan_device_for_network(bridge,
-                                                         vlan_tag)
-
-            linux_net.ensure_arp_ndp_enabled_for_bridge(bridge,
-                                                        bridge_index,
-                                                        vlan_tags)
-
-            if self.ovs_flows.get(bridge):
-                continue
-
-            mac = linux_net.get_interface_address(bridge)
-            self.ovs_flows[bridge] = {
-                'mac': mac,
-                'in_port': set([])}
-            # 3) Get in_port for bridge mappings (br-ex, br-ex2)
-            self.ovs_flows[bridge]['in_port'] = (
-                ovs.get_ovs_patch_ports_info(bridge))
-
-            # 4) Add/Remove flows for each bridge mappings
-            ovs.ensure_mac_tweak_flows(bridge,
-                                       self.ovs_flows[bridge]['mac'],
-                                       self.ovs_flows[bridge]['in_port'],
-                                       constants.OVS_RULE_COOKIE)
-            ovs.remove_extra_ovs_flows(self.ovs_flows, bridge,
-                                       constants.OVS_RULE_COOKIE)
+        workers.run_in_parallel(
+            lambda bridge: self._sync_bridge(bridge, bridge_networks[bridge]),
+            list(bridge_networks), CONF.sync_workers)
+        linux_net.delete_stale_routing_tables(self.ovn_routing_tables)
+        yield
 
         LOG.debug("Syncing current routes.")
-        exposed_ips = linux_net.get_exposed_ips(CONF.bgp_nic)
+        exposed_ips = bgp_utils.get_exposed_ips()
         # get the rules pointing to ovn bridges
-        ovn_ip_rules = linux_net.get_ovn_ip_rules(
-            self.ovn_routing_tables.values())
+        ovn_ip_rules = wire_utils.get_ovn_ip_rules(self.ovn_routing_tables)
 
         # add missing routes/ips for IPs on provider network
         ports = self.sb_idl.get_ports_on_chassis(self.chassis)
         for port in ports:
             self._ensure_port_exposed(port, exposed_ips, ovn_ip_rules)
+            yield
 
         # this information is only available when there are cr-lrps add
         # missing routes/ips for FIPs associated to VMs/LBs on the chassis
@@ -207,41 +254,207 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         for cr_lrp_port in cr_lrp_ports:
             self._ensure_cr_lrp_associated_ports_exposed(
                 cr_lrp_port, exposed_ips, ovn_ip_rules)
+            yield
+
+        cr_lrps = list(self.ovn_local_cr_lrps.items())
+        for index in range(0, len(cr_lrps), CONF.sync_workers):
+            workers.run_in_parallel(
+                lambda cr_lrp: self._ensure_cr_lrp_networks_exposed(
+                    cr_lrp[0], cr_lrp[1], exposed_ips, ovn_ip_rules),
+                cr_lrps[index:index + CONF.sync_workers], CONF.sync_workers)
+            yield
 
-        for cr_lrp_port, cr_lrp_info in self.ovn_local_cr_lrps.items():
-            lrp_ports = self.sb_idl.get_lrp_ports_for_router(
-                cr_lrp_info['router_datapath'])
-            for lrp in lrp_ports:
-                self._process_lrp_port(lrp, cr_lrp_port, exposed_ips,
-                                       ovn_ip_rules)
-
-            # add missing routes/ips related to ovn-octavia loadbalancers
-            # on the provider networks
-            provider_ovn_lbs = self.sb_idl.get_provider_ovn_lbs_on_cr_lrp(
-                cr_lrp_info['provider_datapath'],
-                cr_lrp_info['router_datapath'])
-            for ovn_lb, ovn_lb_ip in provider_ovn_lbs.items():
-                self._expose_ovn_lb_on_provider(ovn_lb_ip,
-                                                ovn_lb,
-                                                cr_lrp_port,
-                                                exposed_ips,
-                                                ovn_ip_rules)
+        # reprocess the objects changed by the events processed in between
+        # the chunks, so that their IPs are kept
+        self._process_dirty(exposed_ips, ovn_ip_rules)
 
         # remove extra routes/ips
         # remove all the leftovers on the list of current ips on dev OVN
-        linux_net.delete_exposed_ips(exposed_ips, CONF.bgp_nic)
+        bgp_utils.delete_exposed_ips(exposed_ips)
         # remove all the leftovers on the list of current ip rules for ovn
-        # bridges
+        # bridges, but the ones the events removed meanwhile
+        if ovn_ip_rules:
+            current_ip_rules = linux_net.get_ovn_ip_rules(
+                self.ovn_routing_tables.values())
+            ovn_ip_rules = {dst: rule for dst, rule in ovn_ip_rules.items()
+                            if dst in current_ip_rules}
         linux_net.delete_ip_rules(ovn_ip_rules)
 
         # remove all the extra rules not needed
         linux_net.delete_bridge_ip_routes(self.ovn_routing_tables,
                                           self.ovn_routing_tables_routes,
                                           extra_routes)
+        wire_utils.sync_ndp_proxies(set(self.ovn_bridge_mappings.values()))
 
         wire_utils.delete_vlan_devices_leftovers(self.sb_idl,
                                                  self.ovn_bridge_mappings)
 
+        # the ip rules removed, the IPs exposed or withdrawn being counted by
+        # the reconciler
+        return len(ovn_ip_rules or ())
+
+    def _sync_bridge(self, bridge, networks):
+        for bridge_index, vlan_tags in networks:
+            for vlan_tag in vlan_tags:
+                linux_net.ensure_vlan_device_for_network(bridge,
+                                                         vlan_tag)
+
+            linux_net.ensure_arp_ndp_enabled_for_bridge(bridge,
+                                                        bridge_index,
+                                                        vlan_tags)
+
+        mac = linux_net.get_interface_address(bridge)
+        # 3) Get in_port for bridge mappings (br-ex, br-ex2)
+        self.ovs_flows[bridge] = {
+            'mac': mac,
+            'in_port': ovs.get_ovs_patch_ports_info(bridge)}
+
+        # 4) Add/Remove flows for each bridge mappings
+        ovs.ensure_mac_tweak_flows(bridge,
+                                   self.ovs_flows[bridge]['mac'],
+                                   self.ovs_flows[bridge]['in_port'],
+                                   constants.OVS_RULE_COOKIE)
+        ovs.remove_extra_ovs_flows(self.ovs_flows, bridge,
+                                   constants.OVS_RULE_COOKIE)
+
+    def _keep_exposed_ip(self, ip, exposed_ips, ovn_ip_rules, ip_dst=None):
+        """Keep an exposed IP, and its ip rule, from the sync cleanup
+
+        :param ip_dst: destination of the ip rule, by default the IP as a
+                       /32 or /128
+        """
+        # The sync workers share the lists found on the host
+        with self._sync_lock:
+            if exposed_ips and ip in exposed_ips:
+                exposed_ips.remove(ip)
+            if not ovn_ip_rules:
+                return
+            if ip_dst is None:
+                if linux_net.get_ip_version(ip) == constants.IP_VERSION_6:
+                    ip_dst = "{}/128".format(ip)
+                else:
+                    ip_dst = "{}/32".format(ip)
+            ovn_ip_rules.pop(ip_dst, None)
+
+    @lockutils.synchronized('bgp')
+    def _sync_dirty(self):
+        # the withdrawals were applied on the current state already
+        self._dirty.pop_withdrawn()
+        if not len(self._dirty):
+            LOG.debug("Nothing changed since the previous sync.")
+            return 0
+        found_ips = bgp_utils.get_exposed_ips()
+        self._process_dirty()
+        # the drift repaired: the IPs exposed or withdrawn, the events
+        # waiting for the lock meanwhile
+        return bgp_utils.count_exposed_ips_changes(found_ips)
+
+    def _process_dirty(self, exposed_ips=None, ovn_ip_rules=None):
+        # the withdrawals happening during a sync are replayed on the state
+        # it rebuilt, before the objects are reprocessed
+        self._dirty.replay(self._dirty.pop_withdrawn())
+        dirty = self._dirty.pop()
+        if not dirty:
+            LOG.debug("Nothing changed since the previous sync.")
+            return
+        self._map_kernel_drift(dirty)
+        LOG.debug("Syncing the ports, subnets and bridges changed since the "
+                  "previous sync: %s", dirty)
+        self._dirty.process(
+            dirty, constants.DIRTY_BRIDGE,
+            lambda bridge: wire_utils.sync_bridge_flows(self.ovs_flows,
+                                                        bridge))
+        self._dirty.process(
+            dirty, constants.DIRTY_PORT,
+            lambda port_name: self._ensure_dirty_port_exposed(
+                port_name, exposed_ips, ovn_ip_rules))
+        self._dirty.process(
+            dirty, constants.DIRTY_SUBNET,
+            lambda port_name: self._ensure_dirty_subnet_exposed(
+                port_name, exposed_ips, ovn_ip_rules))
+
+    def _map_kernel_drift(self, dirty):
+        """Map the kernel changes found dirty to the ports to reprocess
+
+        The addresses, routes and rules removed from the kernel are mapped
+        to the local ports and cr-lrps with their IPs, to the cr-lrps of the
+        load balancers with them, and to the cr-lrps owning the routes. The
+        other ones (e.g., the FIPs) are only repaired by the full sync.
+        """
+        ips = set(dirty.pop(constants.DIRTY_ADDRESS, ()))
+        ports = set()
+        for table, dst, dst_len in dirty.pop(constants.DIRTY_ROUTE, ()):
+            ports.update(
+                owner for owner in self.ovn_routing_tables_routes.get_owners(
+                    table, dst, dst_len)
+                if owner in self.ovn_local_cr_lrps)
+            ips.add(dst)
+        ips.update(dst for _table, dst, _dst_len in dirty.pop(
+            constants.DIRTY_RULE, ()))
+        if ips:
+            for lb_info in self.provider_ovn_lbs.values():
+                if ips.intersection(lb_info.get('ips', ())):
+                    ports.add(lb_info.get('gateway_port'))
+            for port in self.sb_idl.get_ports_on_chassis(self.chassis):
+                if ips.intersection(self._get_port_ips(port)):
+                    ports.add(port.logical_port)
+        ports.discard(None)
+        if ports:
+            dirty.setdefault(constants.DIRTY_PORT, set()).update(ports)
+
+    def _get_port_ips(self, port):
+        # e.g., ['mac 10.0.0.5 fd00::5'] or, for cr-lrps,
+        # ['mac 172.24.4.10/24']
+        return [ip.split('/')[0] for address in port.mac
+                for ip in address.strip().split(' ')[1:]]
+
+    def _ensure_dirty_port_exposed(self, port_name, exposed_ips=None,
+                                   ovn_ip_rules=None):
+        port = self.sb_idl.get_port_by_name(port_name)
+        if not port or not port.chassis or (
+                port.chassis[0].name != self.chassis):
+            return
+        self._ensure_port_exposed(port, exposed_ips, ovn_ip_rules)
+        if port.type != constants.OVN_CHASSISREDIRECT_VIF_PORT_TYPE:
+            return
+        self._ensure_cr_lrp_associated_ports_exposed(port_name, exposed_ips,
+                                                     ovn_ip_rules)
+        cr_lrp_info = self.ovn_local_cr_lrps.get(port_name)
+        if cr_lrp_info:
+            self._ensure_cr_lrp_networks_exposed(port_name, cr_lrp_info,
+                                                 exposed_ips, ovn_ip_rules)
+
+    def _ensure_dirty_subnet_exposed(self, port_name, exposed_ips=None,
+                                     ovn_ip_rules=None):
+        port = self.sb_idl.get_port_by_name(port_name)
+        if not port or port.type != constants.OVN_PATCH_VIF_PORT_TYPE:
+            return
+        try:
+            ip_address = port.mac[0].strip().split(' ')[1]
+        except IndexError:
+            return
+        self._expose_subnet(ip_address, port, exposed_ips, ovn_ip_rules)
+
+    def _ensure_cr_lrp_networks_exposed(self, cr_lrp_port, cr_lrp_info,
+                                        exposed_ips, ovn_ip_rules):
+        lrp_ports = self.sb_idl.get_lrp_ports_for_router(
+            cr_lrp_info['router_datapath'])
+        for lrp in lrp_ports:
+            self._process_lrp_port(lrp, cr_lrp_port, exposed_ips,
+                                   ovn_ip_rules)
+
+        # add missing routes/ips related to ovn-octavia loadbalancers
+        # on the provider networks
+        provider_ovn_lbs = self.sb_idl.get_provider_ovn_lbs_on_cr_lrp(
+            cr_lrp_info['provider_datapath'],
+            cr_lrp_info['router_datapath'])
+        for ovn_lb, ovn_lb_ip in provider_ovn_lbs.items():
+            self._expose_ovn_lb_on_provider(ovn_lb_ip,
+                                            ovn_lb,
+                                            cr_lrp_port,
+                                            exposed_ips,
+                                            ovn_ip_rules)
+
     def _ensure_cr_lrp_associated_ports_exposed(self, cr_lrp_port,
                                                 exposed_ips, ovn_ip_rules):
         ips, patch_port_row = self.sb_idl.get_cr_lrp_nat_addresses_info(
@@ -251,15 +464,7 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         ips_adv = self._expose_ip(ips, patch_port_row,
                                   associated_port=cr_lrp_port)
         for ip in ips_adv:
-            if exposed_ips and ip in exposed_ips:
-                exposed_ips.remove(ip)
-            if ovn_ip_rules:
-                ip_version = linux_net.get_ip_version(ip)
-                if ip_version == constants.IP_VERSION_6:
-                    ip_dst = "{}/128".format(ip)
-                else:
-                    ip_dst = "{}/32".format(ip)
-                ovn_ip_rules.pop(ip_dst, None)
+            self._keep_exposed_ip(ip, exposed_ips, ovn_ip_rules)
 
     def _ensure_port_exposed(self, port, exposed_ips, ovn_ip_rules):
         if port.type not in constants.OVN_VIF_PORT_TYPES or not port.mac:
@@ -289,17 +494,8 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         ips_adv = self._expose_ip(port_ips, port)
 
         for port_ip in ips_adv:
-            ip_address = port_ip.split("/")[0]
-            if exposed_ips and ip_address in exposed_ips:
-                # remove each ip to add from the list of current ips on dev OVN
-                exposed_ips.remove(ip_address)
-            if ovn_ip_rules:
-                ip_version = linux_net.get_ip_version(port_ip)
-                if ip_version == constants.IP_VERSION_6:
-                    ip_dst = "{}/128".format(ip_address)
-                else:
-                    ip_dst = "{}/32".format(ip_address)
-                ovn_ip_rules.pop(ip_dst, None)
+            self._keep_exposed_ip(port_ip.split("/")[0], exposed_ips,
+                                  ovn_ip_rules)
 
     def _expose_provider_port(self, port_ips, provider_datapath,
                               bridge_device=None, bridge_vlan=None,
@@ -332,10 +528,12 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
 
         # Connect to OVN
         try:
+            # The routes are owned by the provider network exposing them
             if wire_utils.wire_provider_port(
                     self.ovn_routing_tables_routes, self.ovs_flows, port_ips,
                     bridge_device, bridge_vlan, localnet,
-                    self.ovn_routing_tables, proxy_cidrs, mac=lladdr):
+                    self.ovn_routing_tables, proxy_cidrs, mac=lladdr,
+                    owner=provider_datapath):
                 # Expose the IP now that it is connected
                 bgp_utils.announce_ips(port_ips)
                 return True
@@ -354,10 +552,8 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
             if ext_n_cidr:
                 ovn_lb_ip = ext_n_cidr.split(" ")[0].split("/")[0]
                 bgp_utils.announce_ips([ovn_lb_ip])
-                if exposed_ips and ovn_lb_ip in exposed_ips:
-                    exposed_ips.remove(ovn_lb_ip)
-                if ovn_ip_rules:
-                    ovn_ip_rules.pop(ext_n_cidr.split(" ")[0], None)
+                self._keep_exposed_ip(ovn_lb_ip, exposed_ips, ovn_ip_rules,
+                                      ip_dst=ext_n_cidr.split(" ")[0])
             return
         elif (not port.mac or
                 port.type not in (
@@ -385,14 +581,7 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
             port_ip_version = linux_net.get_ip_version(port_ip)
             if port_ip_version == ip_version:
                 bgp_utils.announce_ips([port_ip])
-                if exposed_ips and port_ip in exposed_ips:
-                    exposed_ips.remove(port_ip)
-                if ovn_ip_rules:
-                    if port_ip_version == constants.IP_VERSION_6:
-                        ip_dst = "{}/128".format(port_ip)
-                    else:
-                        ip_dst = "{}/32".format(port_ip)
-                    ovn_ip_rules.pop(ip_dst, None)
+                self._keep_exposed_ip(port_ip, exposed_ips, ovn_ip_rules)
 
     def _withdraw_provider_port(self, port_ips, provider_datapath,
                                 bridge_device=None, bridge_vlan=None,
@@ -413,7 +602,7 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
             return wire_utils.unwire_provider_port(
                 self.ovn_routing_tables_routes, port_ips, bridge_device,
                 bridge_vlan, self.ovn_routing_tables, proxy_cidrs,
-                mac=lladdr)
+                mac=lladdr, owner=provider_datapath)
         except Exception as e:
             LOG.exception("Unexpected exception while unwiring provider port: "
                           "%s", e)
@@ -457,10 +646,15 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
 
     @lockutils.synchronized('bgp')
     def expose_ovn_lb_on_provider(self, ip, lb_name, cr_lrp_port):
+        self._dirty.mark_changed(constants.DIRTY_PORT, cr_lrp_port)
         self._expose_ovn_lb_on_provider(ip, lb_name, cr_lrp_port)
 
     @lockutils.synchronized('bgp')
     def withdraw_ovn_lb_on_provider(self, lb_name, cr_lrp_port):
+        self._dirty.mark_withdrawn(
+            constants.DIRTY_PORT, cr_lrp_port,
+            functools.partial(self._withdraw_ovn_lb_on_provider, lb_name,
+                              cr_lrp_port))
         self._withdraw_ovn_lb_on_provider(lb_name, cr_lrp_port)
 
     def _expose_ovn_lb_on_provider(self, ip, lb_name, cr_lrp,
@@ -485,18 +679,13 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
             LOG.debug("Failure adding BGP route for loadbalancer VIP %s", ip)
             return False
         LOG.debug("Added BGP route for loadbalancer VIP %s", ip)
-        if exposed_ips and ip in exposed_ips:
-            exposed_ips.remove(ip)
-        if ovn_ip_rules:
-            ip_version = linux_net.get_ip_version(ip)
-            if ip_version == constants.IP_VERSION_6:
-                ip_dst = "{}/128".format(ip)
-            else:
-                ip_dst = "{}/32".format(ip)
-            ovn_ip_rules.pop(ip_dst, None)
+        self._keep_exposed_ip(ip, exposed_ips, ovn_ip_rules)
         return True
 
     def _withdraw_ovn_lb_on_provider(self, lb_name, cr_lrp):
+        if lb_name not in self.provider_ovn_lbs:
+            # Not exposed, e.g., by a sync running meanwhile
+            return True
         try:
             bridge_device = self.ovn_local_cr_lrps[cr_lrp]['bridge_device']
             bridge_vlan = self.ovn_local_cr_lrps[cr_lrp]['bridge_vlan']
@@ -505,10 +694,12 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
                       "%s", self.provider_ovn_lbs[lb_name].get('ips'))
             return False
 
+        provider_datapath = self.ovn_local_cr_lrps[cr_lrp].get(
+            'provider_datapath')
         for ip in self.provider_ovn_lbs[lb_name].get('ips').copy():
             LOG.debug("Deleting BGP route for loadbalancer VIP %s", ip)
             if not self._withdraw_provider_port(
-                    [ip], None, bridge_device=bridge_device,
+                    [ip], provider_datapath, bridge_device=bridge_device,
                     bridge_vlan=bridge_vlan):
                 LOG.debug("Failure deleting BGP route for loadbalancer VIP "
                           "%s", ip)
@@ -537,6 +728,8 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         - VM FIP, or
         - CR-LRP OVN port
         '''
+        self._dirty.mark_changed(constants.DIRTY_PORT,
+                                 associated_port or row.logical_port)
         self._expose_ip(ips, row, associated_port)
 
     def _expose_ip(self, ips, row, associated_port=None):
@@ -667,6 +860,12 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         - VM FIP, or
         - CR-LRP OVN port
         '''
+        self._dirty.mark_withdrawn(
+            constants.DIRTY_PORT, associated_port or row.logical_port,
+            functools.partial(self._withdraw_ip, ips, row, associated_port))
+        self._withdraw_ip(ips, row, associated_port)
+
+    def _withdraw_ip(self, ips, row, associated_port=None):
         if (row.type == constants.OVN_VM_VIF_PORT_TYPE or
                 row.type == constants.OVN_VIRTUAL_VIF_PORT_TYPE):
             try:
@@ -1003,7 +1202,8 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         try:
             if not wire_utils.wire_lrp_port(
                     self.ovn_routing_tables_routes, ip, bridge_device,
-                    bridge_vlan, self.ovn_routing_tables, cr_lrp_ips):
+                    bridge_vlan, self.ovn_routing_tables, cr_lrp_ips,
+                    owner=associated_cr_lrp, gateway_owner=associated_cr_lrp):
                 LOG.warning("Not able to expose subnet with IP %s", ip)
                 return
         except Exception as e:
@@ -1064,21 +1264,24 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         # Check if there are VMs on the network
         # and if so withdraw the routes
         if net:
-            vms_on_net = linux_net.get_exposed_ips_on_network(
-                CONF.bgp_nic, net)
-            linux_net.delete_exposed_ips(vms_on_net, CONF.bgp_nic)
+            vms_on_net = bgp_utils.get_exposed_ips_on_network(net)
+            bgp_utils.delete_exposed_ips(vms_on_net)
 
         # Disconnect the network to OVN
         try:
             wire_utils.unwire_lrp_port(
                 self.ovn_routing_tables_routes, ip, bridge_device, bridge_vlan,
-                self.ovn_routing_tables, cr_lrp_ips)
+                self.ovn_routing_tables, cr_lrp_ips, owner=associated_cr_lrp)
         except Exception as e:
             LOG.exception("Unexpected exception while unwiring lrp port: %s",
                           e)
 
     @lockutils.synchronized('bgp')
     def expose_subnet(self, ip, row):
+        self._dirty.mark_changed(constants.DIRTY_SUBNET, row.logical_port)
+        self._expose_subnet(ip, row)
+
+    def _expose_subnet(self, ip, row, exposed_ips=None, ovn_ip_rules=None):
         try:
             cr_lrp = self.sb_idl.is_router_gateway_on_chassis(
                 row.datapath, self.chassis)
@@ -1101,10 +1304,18 @@ class OVNBGPDriver(driver_api.AgentDriverBase):
         if not self._address_scope_allowed(ip, row.options['peer']):
             return
 
-        self._expose_lrp_port(ip, row.logical_port, cr_lrp, subnet_datapath)
+        self._expose_lrp_port(ip, row.logical_port, cr_lrp, subnet_datapath,
+                              exposed_ips=exposed_ips,
+                              ovn_ip_rules=ovn_ip_rules)
 
     @lockutils.synchronized('bgp')
     def withdraw_subnet(self, ip, row):
+        self._dirty.mark_withdrawn(
+            constants.DIRTY_SUBNET, row.logical_port,
+            functools.partial(self._withdraw_subnet, ip, row))
+        self._withdraw_subnet(ip, row)
+
+    def _withdraw_subnet(self, ip, row):
         try:
             cr_lrp = self.sb_idl.is_router_gateway_on_chassis(
                 row.datapath, self.chassis)
@@ -29,6 +29,7 @@ from ovn_bgp_agent.drivers.openstack.watchers import evpn_watcher as \
     watcher
 from ovn_bgp_agent.utils import helpers
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import route_ledger
 
 
 CONF = cfg.CONF
@@ -49,7 +50,7 @@ class OVNEVPNDriver(driver_api.AgentDriverBase):
         self.ovn_local_cr_lrps = {}
         self.ovn_local_lrps = {}
         # {'br-ex': [route1, route2]}
-        self._ovn_routing_tables_routes = collections.defaultdict()
+        self._ovn_routing_tables_routes = route_ledger.RouteLedger()
         self._ovn_exposed_evpn_ips = collections.defaultdict()
 
         self._sb_idl = None
@@ -106,7 +107,7 @@ class OVNEVPNDriver(driver_api.AgentDriverBase):
     def sync(self):
         self.ovn_local_cr_lrps = {}
         self.ovn_local_lrps = {}
-        self._ovn_routing_tables_routes = collections.defaultdict()
+        self._ovn_routing_tables_routes = route_ledger.RouteLedger()
         self._ovn_exposed_evpn_ips = collections.defaultdict()
 
         # 1) Get bridge mappings: xxxx:br-ex,yyyy:br-ex2
@@ -697,9 +698,10 @@ class OVNEVPNDriver(driver_api.AgentDriverBase):
         linux_net.delete_routes_from_table(vni)
 
         if cleanup_ndp_proxy:
-            for ip in ips:
-                if linux_net.get_ip_version(ip) == constants.IP_VERSION_6:
-                    linux_net.del_ndp_proxy(ip, datapath_bridge)
+            ipv6_ips = [ip for ip in ips if linux_net.get_ip_version(ip) ==
+                        constants.IP_VERSION_6]
+            if ipv6_ips:
+                linux_net.del_ndp_proxies(ipv6_ips, datapath_bridge)
 
     def _remove_extra_vrfs(self):
         vrfs, los, bridges, vxlans, veths, vlans = ([], [], [], [], [], [])
@@ -711,9 +713,9 @@ class OVNEVPNDriver(driver_api.AgentDriverBase):
             veths.append(cr_lrp_info['veth_vrf'])
             vlans.append(cr_lrp_info['vlan'])
 
-        filter_out = ["{}.{}".format(key, value[0]['vlan'])
-                      for key, value in self._ovn_routing_tables_routes.items()
-                      if value[0]['vlan']]
+        filter_out = list({"{}.{}".format(route_info.dev, route_info.vlan)
+                           for route_info in self._ovn_routing_tables_routes
+                           if route_info.vlan})
 
         interfaces = linux_net.get_interfaces(filter_out)
         for interface in interfaces:
@@ -744,27 +746,25 @@ class OVNEVPNDriver(driver_api.AgentDriverBase):
         vrf_routes = linux_net.get_routes_on_tables(table_ids)
         if not vrf_routes:
             return
-        # remove from vrf_routes the routes that should be kept
-        for device, routes_info in self._ovn_routing_tables_routes.items():
-            for route_info in routes_info:
-                oif = linux_net.get_interface_index(device)
-                if 'gateway' in route_info['route'].keys():  # subnet route
-                    possible_matchings = [
-                        r for r in vrf_routes
-                        if (r.get('dst') == route_info['route']['dst'] and
-                            r['dst_len'] == route_info['route']['dst_len'] and
-                            r.get('gateway') == (
-                                route_info['route']['gateway']) and
-                            r['table'] == route_info['route']['table'])]
-                else:  # cr-lrp
-                    possible_matchings = [
-                        r for r in vrf_routes
-                        if (r.get('dst') == route_info['route']['dst'] and
-                            r['dst_len'] == route_info['route']['dst_len'] and
-                            r.get('oif') == oif and
-                            r['table'] == route_info['route']['table'])]
-                for r in possible_matchings:
-                    vrf_routes.remove(r)
+        # remove from vrf_routes the routes that should be kept, subnet
+        # routes are matched by their gateway, cr-lrp ones by their device
+        kept = set()
+        for table_id in table_ids:
+            for route_info in self._ovn_routing_tables_routes.get_table_routes(
+                    int(table_id)):
+                if route_info.gateway:
+                    kept.add((route_info.dst, route_info.dst_len,
+                              route_info.table, 'gateway', route_info.gateway))
+                else:
+                    kept.add((route_info.dst, route_info.dst_len,
+                              route_info.table, 'oif',
+                              linux_net.get_interface_index(route_info.dev)))
+        vrf_routes = [
+            r for r in vrf_routes
+            if ((r.get('dst'), r['dst_len'], r['table'], 'gateway',
+                 r.get('gateway')) not in kept and
+                (r.get('dst'), r['dst_len'], r['table'], 'oif',
+                 r.get('oif')) not in kept)]
 
         linux_net.delete_ip_routes(vrf_routes)
 
@@ -809,11 +809,11 @@ class OVNEVPNDriver(driver_api.AgentDriverBase):
                             nw_src_mask = int(
                                 flow_info['ipv6_src'].split('/')[1])
 
-                        for route_info in self._ovn_routing_tables_routes[
-                                dev]:
-                            if (route_info['route']['dst'] == nw_src_ip and
-                                    route_info['route'][
-                                        'dst_len'] == nw_src_mask):
+                        for route_info in (
+                                self._ovn_routing_tables_routes.
+                                get_device_routes(dev)):
+                            if (route_info.dst == nw_src_ip and
+                                    route_info.dst_len == nw_src_mask):
                                 matching_dst = True
                         if not matching_dst:
                             ovs.del_flow(flow, bridge,
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import collections
 import dataclasses
 import ipaddress
 import threading
@@ -31,6 +30,8 @@ from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent.drivers.openstack.watchers import bgp_watcher as watcher
 from ovn_bgp_agent import exceptions as agent_exc
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import prefix_trie
+from ovn_bgp_agent.utils import route_ledger
 
 
 CONF = cfg.CONF
@@ -50,7 +51,9 @@ class OVNBGPStretchedL2Driver(driver_api.AgentDriverBase):
     def __init__(self):
         self.ovn_local_cr_lrps = {}
         self.vrf_routes = set()
-        self.ovn_routing_tables_routes = collections.defaultdict()
+        # gateways of the vrf_routes
+        self.vrf_routes_gateways = prefix_trie.PrefixTrie()
+        self.ovn_routing_tables_routes = route_ledger.RouteLedger()
         self.allowed_address_scopes = set(CONF.address_scopes or [])
         self.propagated_lrp_ports = {}
 
@@ -71,6 +74,8 @@ class OVNBGPStretchedL2Driver(driver_api.AgentDriverBase):
         self.ovs_idl = ovs.OvsIdl()
         self.ovs_idl.start(CONF.ovsdb_connection)
 
+        # Routes protocol, re-tagging the routes of previous versions
+        bgp_utils.ensure_routes_protocol()
         # Base BGP configuration
         # Ensure FRR is configured to leak only kernel routes by default
         frr.set_default_redistribute(['kernel'])
@@ -119,8 +124,9 @@ class OVNBGPStretchedL2Driver(driver_api.AgentDriverBase):
     @lockutils.synchronized("bgp")
     def sync(self):
         self.ovn_local_cr_lrps = {}
-        self.ovn_routing_tables_routes = collections.defaultdict()
+        self.ovn_routing_tables_routes = route_ledger.RouteLedger()
         self.vrf_routes = set()
+        self.vrf_routes_gateways = prefix_trie.PrefixTrie()
         self.propagated_lrp_ports = {}
 
         LOG.debug("Syncing current routes.")
@@ -165,6 +171,8 @@ class OVNBGPStretchedL2Driver(driver_api.AgentDriverBase):
             prefix_len=prefix_len,
             dst=dst)
         self.vrf_routes.add(r)
+        if dst:
+            self.vrf_routes_gateways.add(dst, r)
 
         LOG.debug("Added BGP route for Network %s/%d via %s",
                   network, prefix_len, dst)
@@ -187,10 +195,16 @@ class OVNBGPStretchedL2Driver(driver_api.AgentDriverBase):
             dst=dst)
         if r in self.vrf_routes:
             self.vrf_routes.remove(r)
+            if dst:
+                self.vrf_routes_gateways.remove(dst, r)
 
         LOG.debug("Deleted BGP route for Network %s/%d via %s",
                   network, prefix_len, dst)
 
+    def _has_routes_via(self, network):
+        # Whether any of the routes uses a gateway on the network
+        return self.vrf_routes_gateways.has_within(str(network))
+
     def _address_scope_allowed(self, scope1, scope2, ip_version):
         if not self.allowed_address_scopes:
             # No address scopes to filter on => announce everything
@@ -281,11 +295,7 @@ class OVNBGPStretchedL2Driver(driver_api.AgentDriverBase):
                     dst=str(gateway_ip.ip))
 
             # Check if can delete the link-local route
-            exposed_routes = linux_net.get_exposed_routes_on_network(
-                [CONF.bgp_vrf_table_id],
-                gateway_ip.network)
-
-            if not exposed_routes:
+            if not self._has_routes_via(gateway_ip.network):
                 self._del_route(
                     network=str(gateway_ip.network.network_address),
                     prefix_len=gateway_ip.network.prefixlen)
@@ -445,12 +455,7 @@ class OVNBGPStretchedL2Driver(driver_api.AgentDriverBase):
             # a tenant network
             if ips_to_delete:
                 # Check if can delete the link-local route
-                exposed_routes = linux_net.get_exposed_routes_on_network(
-                    [CONF.bgp_vrf_table_id],
-                    gateway_ip.network
-                )
-
-                if not exposed_routes:
+                if not self._has_routes_via(gateway_ip.network):
                     self._del_route(
                         network=str(gateway_ip.network.network_address),
                         prefix_len=gateway_ip.network.prefixlen)
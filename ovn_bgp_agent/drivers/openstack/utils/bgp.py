@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import ipaddress
+
 from oslo_config import cfg
 from oslo_log import log as logging
 
@@ -25,6 +27,15 @@ from ovn_bgp_agent.utils import linux_net
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
+# Whether the IPs exposed with the other advertisement backend were already
+# migrated by this process
+_exposed_ips_migrated = False
+
+
+def _exposes_routes():
+    return (CONF.advertisement_backend ==
+            constants.ADVERTISEMENT_BACKEND_ROUTE)
+
 
 def announce_ips(port_ips, ips_info=None):
     if CONF.exposing_method in [constants.EXPOSE_METHOD_VRF]:
@@ -47,6 +58,11 @@ def announce_ips(port_ips, ips_info=None):
                 vlan_dev.add_route(None, ip, ips_info['mac'])
         return
 
+    if _exposes_routes():
+        linux_net.add_exposed_routes(port_ips, CONF.bgp_nic,
+                                     CONF.bgp_vrf_table_id)
+        return
+
     linux_net.add_ips_to_dev(CONF.bgp_nic, port_ips)
 
 
@@ -64,9 +80,81 @@ def withdraw_ips(port_ips, ips_info=None):
             vlan_dev.del_route(None, ip)
         return
 
+    if _exposes_routes():
+        linux_net.delete_exposed_routes(port_ips, CONF.bgp_nic,
+                                        CONF.bgp_vrf_table_id)
+        return
+
     linux_net.del_ips_from_dev(CONF.bgp_nic, port_ips)
 
 
+def get_exposed_ips():
+    if _exposes_routes():
+        return linux_net.get_exposed_routes(CONF.bgp_nic,
+                                            CONF.bgp_vrf_table_id)
+    return linux_net.get_exposed_ips(CONF.bgp_nic)
+
+
+def count_exposed_ips_changes(found_ips):
+    """Count the IPs exposed or withdrawn since found_ips were read"""
+    return len(set(found_ips).symmetric_difference(get_exposed_ips()))
+
+
+def get_exposed_ips_on_network(network):
+    if _exposes_routes():
+        return [ip for ip in get_exposed_ips()
+                if ipaddress.ip_address(ip) in network]
+    return linux_net.get_exposed_ips_on_network(CONF.bgp_nic, network)
+
+
+def delete_exposed_ips(ips):
+    if _exposes_routes():
+        linux_net.delete_exposed_routes(ips, CONF.bgp_nic,
+                                        CONF.bgp_vrf_table_id)
+        return
+    linux_net.delete_exposed_ips(ips, CONF.bgp_nic)
+
+
+def migrate_exposed_ips():
+    """Move the IPs exposed with the other backend to the configured one
+
+    The IPs are first exposed with the configured backend and then removed
+    from the other one, so they are not withdrawn in between.
+    """
+    if _exposes_routes():
+        ips = linux_net.get_exposed_ips(CONF.bgp_nic)
+        if not ips:
+            return
+        LOG.info("Migrating %d IPs exposed as addresses on %s to routes",
+                 len(ips), CONF.bgp_nic)
+        linux_net.add_exposed_routes(ips, CONF.bgp_nic,
+                                     CONF.bgp_vrf_table_id)
+        linux_net.delete_exposed_ips(ips, CONF.bgp_nic)
+    else:
+        ips = linux_net.get_exposed_routes(CONF.bgp_nic,
+                                           CONF.bgp_vrf_table_id)
+        if not ips:
+            return
+        LOG.info("Migrating %d IPs exposed as routes through %s to "
+                 "addresses", len(ips), CONF.bgp_nic)
+        linux_net.add_ips_to_dev(CONF.bgp_nic, ips)
+        linux_net.delete_exposed_routes(ips, CONF.bgp_nic,
+                                        CONF.bgp_vrf_table_id)
+
+
+def ensure_routes_protocol():
+    """Register the agent routes protocol, re-tagging the old VRF routes
+
+    Only needed once, when the driver starts.
+    """
+    linux_net.ensure_routes_protocol()
+    if CONF.exposing_method not in [constants.EXPOSE_METHOD_UNDERLAY,
+                                    constants.EXPOSE_METHOD_DYNAMIC,
+                                    constants.EXPOSE_METHOD_OVN]:
+        return
+    linux_net.migrate_routes_protocol(CONF.bgp_vrf_table_id, CONF.bgp_nic)
+
+
 def ensure_base_bgp_configuration(template=frr.LEAK_VRF_TEMPLATE):
     if CONF.exposing_method not in [constants.EXPOSE_METHOD_UNDERLAY,
                                     constants.EXPOSE_METHOD_DYNAMIC,
@@ -76,8 +164,10 @@ def ensure_base_bgp_configuration(template=frr.LEAK_VRF_TEMPLATE):
     # Create VRF
     linux_net.ensure_vrf(CONF.bgp_vrf, CONF.bgp_vrf_table_id)
 
-    # If we expose subnet routes, we should add kernel routes too.
-    if CONF.advertisement_method_tenant_networks == 'subnet':
+    # If we expose subnet routes or IPs as routes, we should add kernel
+    # routes too.
+    if (CONF.advertisement_method_tenant_networks == 'subnet' or
+            _exposes_routes()):
         frr.set_default_redistribute(['connected', 'kernel'])
 
     # Ensure FRR is configure to leak the routes
@@ -86,3 +176,8 @@ def ensure_base_bgp_configuration(template=frr.LEAK_VRF_TEMPLATE):
 
     # Create OVN dummy device
     linux_net.ensure_ovn_device(CONF.bgp_nic, CONF.bgp_vrf)
+
+    global _exposed_ips_migrated
+    if not _exposed_ips_migrated:
+        migrate_exposed_ips()
+        _exposed_ips_migrated = True
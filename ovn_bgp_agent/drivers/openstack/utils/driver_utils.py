@@ -12,23 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import ipaddress
 from oslo_log import log as logging
 
 from ovn_bgp_agent import constants
-from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import ip_parser
 
 LOG = logging.getLogger(__name__)
 
 
 def is_ipv6_gua(ip):
-    if linux_net.get_ip_version(ip) != constants.IP_VERSION_6:
-        return False
-
-    ipv6 = ipaddress.IPv6Address(ip.split('/')[0])
-    if ipv6.is_global:
-        return True
-    return False
+    return ip_parser.parse_ip(ip).is_gua
 
 
 def get_addr_scopes(port):
@@ -95,8 +88,8 @@ def ips_per_version(ips: 'list[str]') -> 'dict[int, str]':
                constants.IP_VERSION_6: None}
 
     for ip in ips:
-        ver = linux_net.get_ip_version(ip)
-        ip_list[ver] = ipaddress.ip_address(ip.split('/')[0]).compressed
+        parsed_ip = ip_parser.parse_ip(ip)
+        ip_list[parsed_ip.version] = parsed_ip.address
 
     return ip_list
 
@@ -106,8 +99,7 @@ def get_prefixes_from_ips(ips: 'list[str]') -> 'list[str]':
 
     For a list like ['192.168.0.1/24'] it will return ['192.168.0.0/24']
     '''
-    return ['/'.join([ipaddress.ip_network(ip, strict=False)[0].compressed,
-                      ip.split('/')[-1]])
+    return ['/'.join([ip_parser.parse_ip(ip).network, ip.split('/')[-1]])
             for ip in ips]
 
 
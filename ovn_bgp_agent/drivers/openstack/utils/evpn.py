@@ -12,9 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import collections
-import netaddr
-
 from oslo_config import cfg
 from oslo_log import log as logging
 
@@ -23,13 +20,19 @@ from ovn_bgp_agent.drivers.openstack.utils import driver_utils
 from ovn_bgp_agent.drivers.openstack.utils import frr
 from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent import exceptions
+from ovn_bgp_agent.utils import ip_parser
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import route_ledger
 
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
-# dictionary to hold all evpn bridge classes
-local_bridges: 'dict[str, EvpnBridge]' = {}
+# dictionary to hold all evpn bridge classes, based on vni
+local_bridges: 'dict[int, EvpnBridge]' = {}
+
+# dictionary to hold the evpn bridge of every connected vlan, based on the
+# ovs bridge and vlan tag
+local_bridge_vlans: 'dict[tuple[str, str], EvpnBridge]' = {}
 
 # dictionary to hold all vlandev mappings, based on port uuid
 local_vlandevs: 'dict[str, VlanDev]' = {}
@@ -128,9 +131,24 @@ class EvpnBridge:
         vlan_tag = driver_utils.get_port_vlan(port)
         if vlan_tag not in self.vlans:
             self.vlans[vlan_tag] = VlanDev(self, port)
+            local_bridge_vlans.setdefault((self.ovs_bridge, vlan_tag), self)
 
         return self.vlans[vlan_tag]
 
+    def disconnect_vlan(self, vlan_tag: str):
+        del self.vlans[vlan_tag]
+        key = (self.ovs_bridge, vlan_tag)
+        if local_bridge_vlans.get(key) is not self:
+            return
+        del local_bridge_vlans[key]
+        # Fall back to any other bridge with the same vlan (e.g., on vni
+        # changes)
+        for bridge in local_bridges.values():
+            if (bridge.ovs_bridge == self.ovs_bridge and
+                    vlan_tag in bridge.vlans):
+                local_bridge_vlans[key] = bridge
+                break
+
     def get_vlan(self, vlan: 'int|str|None') -> 'VlanDev':
         if vlan is None:
             vlan = constants.VLAN_ID_UNTAGGED
@@ -173,13 +191,36 @@ class VlanDev:
         # ipv6 neighbor discovery, or to add ip's to the interface.
         self._post_setup_tasks = []
 
-        self._agent_routing_tables_routes = collections.defaultdict(list)
-        self._route_table_routes = {}
+        # Routes ledger of the agent, where the routes of this vlan device
+        # are kept (under the veth_vrf device)
+        self._agent_routing_tables_routes = route_ledger.RouteLedger()
+        # Mac addresses of the neighbors of the routes of this vlan device,
+        # as {(ip, mask): mac}, with the network address of the route as ip
+        self._route_macs = {}
 
     def _set_agent_cache(self, routing_tables_routes):
         if routing_tables_routes is not None:
-            self._agent_routing_tables_routes = (
-                routing_tables_routes[self.veth_vrf])
+            self._agent_routing_tables_routes = routing_tables_routes
+
+    def _find_route(self, ip: str, mask: 'str | None' = None):
+        '''Return the route of this vlan device for the ip (and mask)
+
+        The key of the route, (ip, mask), is returned along with it (or
+        with None, if the route is not found).
+        '''
+        if mask:
+            # routes are kept with the network address as destination
+            parsed_ip = ip_parser.parse_ip('{}/{}'.format(ip, mask))
+            ip, dst_len = parsed_ip.network, parsed_ip.prefixlen
+        else:
+            dst_len = None
+        for route in self._agent_routing_tables_routes.get_device_routes(
+                self.veth_vrf, dst=ip):
+            if dst_len in (None, route.dst_len):
+                return (route.dst, route.dst_len), route
+        if dst_len is None:
+            dst_len = ip_parser.parse_ip(ip).prefixlen
+        return (ip, dst_len), None
 
     @property
     def lladdr(self):
@@ -281,11 +322,13 @@ class VlanDev:
         if not self._setup_done:
             return
 
-        if len(self._agent_routing_tables_routes) == 0:
+        routes = self._agent_routing_tables_routes.count_device_routes(
+            self.veth_vrf)
+        if routes == 0:
             return self.disconnect()
 
         LOG.debug('No disconnect needed, there are still %s announcements',
-                  len(self._agent_routing_tables_routes))
+                  routes)
 
     def disconnect(self):
         LOG.info('Disconnecting vlan interface %s.%s',
@@ -306,7 +349,7 @@ class VlanDev:
     def teardown(self):
         LOG.info('Running teardown for vlandev %s (vni change)', self.veth_vrf)
         self.disconnect()
-        del self.bridge.vlans[self.vlan_tag]
+        self.bridge.disconnect_vlan(self.vlan_tag)
 
     def _run(self, method, *a, **kw):
         # Run the method if setup is done, otherwise, run them when setup
@@ -329,7 +372,7 @@ class VlanDev:
         '''
 
         for opt in dhcp_opts:
-            ver = netaddr.IPNetwork(opt.cidr).version
+            ver = ip_parser.parse_ip(opt.cidr).version
 
             if opt.options.get('router', False):
                 LOG.debug('Adding IPv%s gateway ip: %s',
@@ -348,14 +391,20 @@ class VlanDev:
         self._custom_ips.update(ips)
         self._run(linux_net.add_ips_to_dev, self.veth_vrf, ips=ips)
 
-    def add_route(self, routing_tables_routes: 'dict | None', ip: str,
-                  mac: 'str | None', via: 'str | None' = None):
+    def add_route(self,
+                  routing_tables_routes: 'route_ledger.RouteLedger | None',
+                  ip: str, mac: 'str | None', via: 'str | None' = None,
+                  owner=None, gateway_owner=None):
         '''Will add route to the routing table for this vlan_dev
 
-        Please make sure pass along the routing_tables_routes dictionary at
+        Please make sure pass along the routing_tables_routes ledger at
         least the first time a route is added (for example when exposing the
         lrp or lsp). Then with a expose_remote_ip we can re-use the reference
         from the agent set earlier.
+
+        owner is the exposure requesting the route, which is kept until all
+        its owners delete it. gateway_owner is what via belongs to (e.g., the
+        cr-lrp), see linux_net.add_ip_route.
         '''
         self.setup()  # setup the bridge and vlan, if not already done.
         self._set_agent_cache(routing_tables_routes)
@@ -367,13 +416,15 @@ class VlanDev:
         if '/' in ip:
             ip, mask = ip.split('/')
 
-        self._agent_routing_tables_routes.append({
-            'ip': ip, 'mask': mask, 'mac': mac, 'via': via,
-        })
+        parsed_ip = ip_parser.parse_ip(ip if mask is None else
+                                       '{}/{}'.format(ip, mask))
+        self._route_macs[parsed_ip.network, parsed_ip.prefixlen] = mac
         LOG.debug('Add route %s/%s via %s dev %s table %s',
                   ip, mask, via, self.veth_vrf, self.bridge.vni)
-        linux_net.add_ip_route(self._route_table_routes, ip, self.bridge.vni,
-                               self.veth_vrf, mask=mask, via=via)
+        linux_net.add_ip_route(self._agent_routing_tables_routes, ip,
+                               self.bridge.vni, self.veth_vrf, mask=mask,
+                               via=via, owner=owner,
+                               gateway_owner=gateway_owner)
 
         # When a floating ip is passed along, it is a set of mac
         # addresses, so ensure we are always processing a list.
@@ -381,17 +432,19 @@ class VlanDev:
             LOG.debug('Add neigh %s -> %s dev %s', ip, mac, self.veth_vrf)
             linux_net.add_ip_nei(ip, lladdr, self.veth_vrf)
 
-    def del_route(self, routing_tables_routes: 'dict | None', ip: str,
-                  lladdr: 'str | None' = None):
+    def del_route(self,
+                  routing_tables_routes: 'route_ledger.RouteLedger | None',
+                  ip: str, lladdr: 'str | None' = None, owner=None):
         '''Will remove the route from the routing table for this vlan_dev
 
-        Please make sure pass along the routing_tables_routes dictionary at
+        Please make sure pass along the routing_tables_routes ledger at
         least the first time a route is added (for example when exposing the
         lrp or lsp). Then with a withdraw_remote_ip we can re-use the reference
         from the agent set earlier.
 
-        lladdr is optional, as it will be fetched from the internal
-        route table dictionary
+        lladdr is optional, as it will be fetched from the mac addresses
+        kept when the route was added. The route, and its neighbor entries,
+        are kept while other owners still use it.
         '''
 
         if self.bridge.mode != constants.OVN_EVPN_TYPE_L3:
@@ -405,23 +458,28 @@ class VlanDev:
         if '/' in ip:
             ip, mask = ip.split('/')
 
-        route = _find_route_info(self._agent_routing_tables_routes, ip)
+        key, route = self._find_route(ip, mask)
+        if route is not None:
+            mask = route.dst_len
 
         # Remove route from vrf
-        linux_net.del_ip_route(self._route_table_routes, ip, self.bridge.vni,
-                               self.veth_vrf, mask=mask or route['mask'],
-                               via=route['via'])
+        if not linux_net.del_ip_route(self._agent_routing_tables_routes, ip,
+                                      self.bridge.vni, self.veth_vrf,
+                                      mask=mask,
+                                      via=route.gateway if route else None,
+                                      owner=owner):
+            LOG.debug('Route %s/%s still in use, keeping it', ip, mask)
+            return
 
         # Remove any neighbor information for route.
-        for mac in _ensure_list(lladdr or route['mac']):
+        route_mac = self._route_macs.pop(key, None)
+        for mac in _ensure_list(lladdr or route_mac):
             linux_net.del_ip_nei(ip, mac, self.veth_vrf)
 
-        if route in self._agent_routing_tables_routes:
-            self._agent_routing_tables_routes.remove(route)
-
         self._eval_disconnect()
 
-    def cleanup_excessive_routes(self, routing_tables_routes: dict):
+    def cleanup_excessive_routes(
+            self, routing_tables_routes: 'route_ledger.RouteLedger'):
         if not self._setup_done:
             return
 
@@ -431,7 +489,8 @@ class VlanDev:
         intf_idx = linux_net.get_interface_index(self.veth_vrf)
         current_routes = dict([
             (r.get_attr('RTA_DST'), r)
-            for r in linux_net._get_table_routes(self.bridge.vni)
+            for r in linux_net._get_table_routes(self.bridge.vni,
+                                                 oif=intf_idx)
             if r.get_attr('RTA_OIF') == intf_idx and
             r['type'] == constants.ROUTE_TYPE_UNICAST and
             r.get_attr('RTA_DST') not in ('fe80::') and
@@ -443,8 +502,9 @@ class VlanDev:
         prefixes = {r.get_attr('RTA_DST') for r in current_routes.values()}
 
         # Create set with prefixes we maintain
-        exposed_prefixes = {r['ip']
-                            for r in self._agent_routing_tables_routes}
+        exposed_prefixes = {
+            r.dst for r in self._agent_routing_tables_routes.get_device_routes(
+                self.veth_vrf)}
 
         if len(prefixes - exposed_prefixes) == 0:
             LOG.debug('No excessive routes to remove.')
@@ -452,16 +512,11 @@ class VlanDev:
         for ip in prefixes - exposed_prefixes:
             LOG.info('Remove excessive route %s', ip)
             kernel_route = current_routes[ip]
-            route = _find_route_info(self._agent_routing_tables_routes, ip)
-            if ((route['mask'] and
-                    int(route['mask']) != kernel_route['dst_len']) or
-                    route['via'] != kernel_route.get_attr('RTA_GATEWAY')):
-                self._agent_routing_tables_routes.append({
-                    'ip': ip, 'mask': kernel_route['dst_len'], 'mac': None,
-                    'via': kernel_route.get_attr('RTA_GATEWAY'),
-                })
-
-            self.del_route(routing_tables_routes, ip)
+            linux_net.del_ip_route(self._agent_routing_tables_routes, ip,
+                                   self.bridge.vni, self.veth_vrf,
+                                   mask=kernel_route['dst_len'],
+                                   via=kernel_route.get_attr('RTA_GATEWAY'))
+            self._eval_disconnect()
 
 
 def _ensure_list(var):
@@ -474,14 +529,6 @@ def _ensure_list(var):
     return var
 
 
-def _find_route_info(routes: 'list[dict]', ip: str):
-    for r in routes:
-        if r['ip'] == ip:
-            return r
-
-    return {'ip': ip, 'mask': None, 'mac': None, 'via': None}
-
-
 def _offset_for_vni_and_vlan(vni: int, vlan: str):
     '''Generate a offset (in numeric system), based on the vni and vlan
 
@@ -527,10 +574,9 @@ def lookup(ovs_bridge: str, vlan: str) -> EvpnBridge:
     if vlan is None:
         vlan = constants.VLAN_ID_UNTAGGED
 
-    for br in local_bridges.values():
-        if br.ovs_bridge == ovs_bridge:
-            if str(vlan) in br.vlans:
-                return br
+    bridge = local_bridge_vlans.get((ovs_bridge, str(vlan)))
+    if bridge is not None:
+        return bridge
 
     raise KeyError('Could not locate EVPN for bridge %s and/or vlan %s' % (
                    ovs_bridge, vlan))
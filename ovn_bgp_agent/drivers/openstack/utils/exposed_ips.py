@@ -0,0 +1,197 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ipaddress
+import threading
+
+from ovn_bgp_agent.utils import ip_parser
+
+# Prefix length stored for the IPs with no prefix
+_NO_PREFIX = 0xff
+
+
+def encode_ip(ip):
+    """Encode an IP address, or a CIDR, as an integer
+
+    The address goes in the higher bits, followed by the prefix length (or
+    0xff if there is none) and a bit for the IP version, so IPv4 and IPv6
+    addresses never collide.
+    """
+    parsed = ip_parser.parse_ip(ip)
+    prefixlen = parsed.prefixlen if '/' in ip else _NO_PREFIX
+    return ((int.from_bytes(parsed.packed, 'big') << 9) | (prefixlen << 1) |
+            (parsed.version == 6))
+
+
+def decode_ip(code):
+    """Decode an IP encoded by encode_ip"""
+    if code & 1:
+        address = ipaddress.IPv6Address(code >> 9)
+    else:
+        address = ipaddress.IPv4Address(code >> 9)
+    prefixlen = (code >> 1) & 0xff
+    if prefixlen == _NO_PREFIX:
+        return str(address)
+    return '{}/{}'.format(address, prefixlen)
+
+
+def _freeze_info(info):
+    return tuple(sorted(
+        ((key, tuple(value) if isinstance(value, list) else value)
+         for key, value in info.items()),
+        key=lambda item: item[0]))
+
+
+def _thaw_info(info):
+    return {key: list(value) if isinstance(value, tuple) else value
+            for key, value in info}
+
+
+class ExposedIPs(object):
+    """IPs exposed by the agent, per logical switch
+
+    The IPs are kept encoded as integers (see encode_ip), pointing to their
+    wiring information (e.g., bridge device, bridge vlan and, for router
+    ports, the IPs of the gateway port), which is interned as only a few
+    different ones exist. The IPs are also indexed by code, so both
+    finding the logical switch of an IP and comparing the IPs against the
+    ones found on the host take a dict lookup per IP. The accesses hold a
+    lock, as the sync workers add IPs concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # {logical_switch: {ip code: interned info}}
+        self._switches = {}
+        # {ip code: (logical switches with it)}
+        self._codes = {}
+        # {info: info} and {info: references}
+        self._infos = {}
+        self._info_refs = {}
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(ips) for ips in self._switches.values())
+
+    def __contains__(self, ip):
+        code = self._get_code(ip)
+        with self._lock:
+            return code is not None and code in self._codes
+
+    def add(self, logical_switch, ip, info=None, replace=True):
+        """Add an exposed IP with its wiring information
+
+        :param info: (dict) wiring information, e.g., bridge_device and
+                     bridge_vlan keys
+        :param replace: if False, an already existing IP is left unchanged
+        """
+        code = encode_ip(ip)
+        with self._lock:
+            ips = self._switches.setdefault(logical_switch, {})
+            if code in ips:
+                if not replace:
+                    return
+                self._release(ips[code])
+            else:
+                self._codes[code] = self._codes.get(code, ()) + (
+                    logical_switch,)
+            ips[code] = self._intern(_freeze_info(info or {}))
+
+    def remove(self, logical_switch, ip):
+        """Remove an exposed IP
+
+        :return: (dict) the wiring information of the IP, None if it was not
+                 exposed on the logical switch
+        """
+        code = self._get_code(ip)
+        with self._lock:
+            ips = self._switches.get(logical_switch)
+            if not ips or code not in ips:
+                return None
+            info = ips.pop(code)
+            if not ips:
+                del self._switches[logical_switch]
+            switches = tuple(ls for ls in self._codes[code]
+                             if ls != logical_switch)
+            if switches:
+                self._codes[code] = switches
+            else:
+                del self._codes[code]
+            self._release(info)
+            return _thaw_info(info)
+
+    def get(self, logical_switch, ip):
+        """Get the wiring information of an exposed IP
+
+        :return: (dict) the wiring information, empty if the IP was exposed
+                 without it, or None if the IP is not exposed
+        """
+        code = self._get_code(ip)
+        with self._lock:
+            info = self._switches.get(logical_switch, {}).get(code)
+            if info is None:
+                return None
+            return _thaw_info(info)
+
+    def contains(self, logical_switch, ip):
+        code = self._get_code(ip)
+        with self._lock:
+            return code in self._switches.get(logical_switch, {})
+
+    def find(self, ip):
+        """Find the logical switch an IP is exposed on
+
+        :return: (tuple) logical switch and wiring information of the IP, or
+                 None if the IP is not exposed
+        """
+        code = self._get_code(ip)
+        with self._lock:
+            switches = self._codes.get(code)
+            if not switches:
+                return None
+            logical_switch = switches[0]
+            return (logical_switch,
+                    _thaw_info(self._switches[logical_switch][code]))
+
+    def get_ips(self, logical_switch=None):
+        """Get the exposed IPs, optionally of a logical switch"""
+        with self._lock:
+            if logical_switch is not None:
+                codes = self._switches.get(logical_switch, ())
+            else:
+                codes = self._codes
+            return [decode_ip(code) for code in codes]
+
+    def get_not_exposed(self, ips):
+        """Get the IPs, e.g., found on the host, that are not exposed"""
+        with self._lock:
+            return [ip for ip in ips if self._get_code(ip) not in self._codes]
+
+    def _get_code(self, ip):
+        try:
+            return encode_ip(ip)
+        except ValueError:
+            return None
+
+    def _intern(self, info):
+        info = self._infos.setdefault(info, info)
+        self._info_refs[info] = self._info_refs.get(info, 0) + 1
+        return info
+
+    def _release(self, info):
+        if self._info_refs[info] == 1:
+            del self._info_refs[info]
+            del self._infos[info]
+        else:
+            self._info_refs[info] -= 1
@@ -12,14 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+import functools
+import hashlib
 import json
+import os
 import tempfile
+import threading
+import time
 
 from jinja2 import Template
 from oslo_config import cfg
 from oslo_log import log as logging
 
 from ovn_bgp_agent import constants
+from ovn_bgp_agent import exceptions as agent_exc
 import ovn_bgp_agent.privileged.vtysh
 
 CONF = cfg.CONF
@@ -28,6 +35,25 @@ LOG = logging.getLogger(__name__)
 
 DEFAULT_REDISTRIBUTE = {'connected'}
 
+# Daemons whose vty sockets identify the running FRR instance. They are
+# recreated every time FRR (re)starts.
+FRR_DAEMONS = ('zebra', 'bgpd')
+# Top level lines closing a stanza rather than opening a new one.
+STANZA_END_LINES = ('!', 'exit', 'exit-vrf', 'end')
+
+# Applied configuration stanzas, keyed by stanza header, with the hash of
+# the rendered stanza as value.
+_frr_config_cache = {}
+_frr_config_cache_state = {'identity': None, 'verified_at': 0}
+
+# BGP router-id discovered from FRR, together with the FRR identity it was
+# read from, and the number of times it changed
+_router_id_cache = {'router_id': None, 'identity': None, 'checked_at': 0,
+                    'changes': 0}
+
+# Change set open in the current thread, see config_change_set()
+_change_sets = threading.local()
+
 CONFIGURE_ND_TEMPLATE = '''
 interface {{ intf }}
 {% if is_dhcpv6 %}
@@ -88,6 +114,11 @@ no router bgp {{ bgp_as }} vrf {{ vrf_name }}
 
 LEAK_VRF_TEMPLATE = '''
 router bgp {{ bgp_as }}
+{% if graceful_restart %}
+  bgp graceful-restart
+{% else %}
+  no bgp graceful-restart
+{% endif %}
   address-family ipv4 unicast
     import vrf {{ vrf_name }}
   exit-address-family
@@ -113,12 +144,96 @@ router bgp {{ bgp_as }} vrf {{ vrf_name }}
 '''
 
 
+# Compiled templates, keyed by template source.
+_compiled_templates = {}
+
+
+def _get_template(template):
+    compiled = _compiled_templates.get(template)
+    if compiled is None:
+        compiled = _compiled_templates[template] = Template(template)
+    return compiled
+
+
+def _normalize_opt(value):
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+@functools.lru_cache(maxsize=512)
+def _render_normalized(template, opts):
+    return _get_template(template).render(**dict(opts))
+
+
+def render_template(template, **opts):
+    """Render one of the FRR templates, reusing previous renders.
+
+    Sets in the options are rendered in sorted order, so the same options
+    always give the same configuration.
+    """
+    opts = tuple(sorted((k, _normalize_opt(v)) for k, v in opts.items()))
+    try:
+        return _render_normalized(template, opts)
+    except TypeError:
+        # Unhashable options, cannot be cached
+        return _get_template(template).render(**dict(opts))
+
+
+def _run_vtysh_command(command):
+    if CONF.frr_vty_session:
+        try:
+            return ovn_bgp_agent.privileged.vtysh.run_vty_session_command(
+                command, idle_timeout=CONF.frr_vty_session_idle_timeout)
+        except agent_exc.FrrVtySessionError as e:
+            LOG.warning("Falling back to vtysh to run '%s': %s", command, e)
+    return ovn_bgp_agent.privileged.vtysh.run_vtysh_command(command=command)
+
+
 def _get_router_id():
-    output = ovn_bgp_agent.privileged.vtysh.run_vtysh_command(
-        command='show ip bgp summary json')
+    output = _run_vtysh_command('show ip bgp summary json')
     return json.loads(output).get('ipv4Unicast', {}).get('routerId')
 
 
+def get_router_id():
+    """Return the BGP router-id used by FRR, querying it only if needed.
+
+    The router-id is read again when FRR is restarted or after
+    frr_router_id_check_interval seconds.
+    """
+    identity = _get_frr_identity()
+    now = time.monotonic()
+    if (_router_id_cache['router_id'] and
+            identity == _router_id_cache['identity'] and
+            now - _router_id_cache['checked_at'] <
+            CONF.frr_router_id_check_interval):
+        return _router_id_cache['router_id']
+
+    router_id = _get_router_id()
+    if not router_id:
+        return router_id
+
+    old_router_id = _router_id_cache['router_id']
+    if old_router_id and old_router_id != router_id:
+        _router_id_cache['changes'] += 1
+        LOG.warning("BGP router-id changed from %s to %s (%d changes so "
+                    "far)", old_router_id, router_id,
+                    _router_id_cache['changes'])
+    _router_id_cache.update(router_id=router_id, identity=identity,
+                            checked_at=now)
+    return router_id
+
+
+def invalidate_router_id_cache():
+    """Read the router-id from FRR again on the next get_router_id call.
+
+    The cached router-id is kept, so that a change is still detected.
+    """
+    _router_id_cache.update(identity=None, checked_at=0)
+
+
 def _run_vtysh_config_with_tempfile(vrf_config):
     try:
         f = tempfile.NamedTemporaryFile(mode='w')
@@ -138,6 +253,210 @@ def _run_vtysh_config_with_tempfile(vrf_config):
             f.close()
 
 
+def _run_vtysh_config(frr_config):
+    if _sets_router_id(frr_config):
+        invalidate_router_id_cache()
+    if CONF.frr_vty_session:
+        try:
+            ovn_bgp_agent.privileged.vtysh.run_vty_session_config(
+                frr_config, idle_timeout=CONF.frr_vty_session_idle_timeout)
+            return
+        except agent_exc.FrrVtySessionError as e:
+            LOG.warning("Falling back to vtysh to apply the FRR "
+                        "configuration: %s", e)
+    _run_vtysh_config_with_tempfile(frr_config)
+
+
+def _get_frr_identity():
+    identity = []
+    for daemon in FRR_DAEMONS:
+        try:
+            st = os.stat(os.path.join(constants.FRR_SOCKET_PATH,
+                                      '{}.vty'.format(daemon)))
+        except OSError:
+            return None
+        identity.append((st.st_ino, st.st_ctime))
+    return tuple(identity)
+
+
+def _split_config_stanzas(frr_config):
+    """Split an FRR configuration into its top level stanzas.
+
+    Returns a dict keyed by stanza header with the list of lines of the
+    stanza (header included) as value, in configuration order.
+    """
+    stanzas = {}
+    lines = None
+    for line in frr_config.splitlines():
+        if not line.strip():
+            continue
+        if line[0].isspace():
+            if lines is not None:
+                lines.append(line.rstrip())
+            continue
+        header = line.strip()
+        if header in STANZA_END_LINES:
+            lines = None
+            continue
+        lines = stanzas.setdefault(header, [header])
+    return stanzas
+
+
+def _sets_router_id(frr_config):
+    # Whether the configuration sets the router-id of the default BGP
+    # instance, the one get_router_id returns
+    if 'router-id' not in frr_config:
+        return False
+    for header, lines in _split_config_stanzas(frr_config).items():
+        if (header.startswith('router bgp') and ' vrf ' not in header and
+                any('router-id' in line.split() for line in lines[1:])):
+            return True
+    return False
+
+
+def _line_missing(line, running_lines):
+    line = line.strip()
+    if line.startswith('no '):
+        # FRR does not show the negated settings, they are in place as long
+        # as the setting itself is not
+        return line[len('no '):] in running_lines
+    return line not in running_lines
+
+
+def _stanza_lines_missing(lines, running_lines):
+    running_lines = {line.strip() for line in running_lines}
+    return any(_line_missing(line, running_lines) for line in lines)
+
+
+def _get_stanza_hash(lines):
+    return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+
+def invalidate_config_cache():
+    _frr_config_cache.clear()
+    _frr_config_cache_state['identity'] = None
+    _frr_config_cache_state['verified_at'] = 0
+
+
+def _run_vtysh_config_cached(frr_config):
+    """Apply the stanzas of frr_config missing or changed in FRR.
+
+    Stanzas already applied since FRR started are skipped without talking
+    to FRR at all. Unknown ones are checked against the running
+    configuration first, and only pushed if some of their lines are
+    missing there.
+    """
+    identity = _get_frr_identity() if CONF.frr_config_cache else None
+    if identity is None:
+        invalidate_config_cache()
+        _run_vtysh_config(frr_config)
+        return
+
+    now = time.monotonic()
+    if (identity != _frr_config_cache_state['identity'] or
+            now - _frr_config_cache_state['verified_at'] >
+            CONF.frr_config_cache_max_age):
+        LOG.debug("Verifying cached FRR configuration stanzas")
+        if identity != _frr_config_cache_state['identity']:
+            # FRR restarted, its router-id may have changed too
+            invalidate_router_id_cache()
+        _frr_config_cache.clear()
+        _frr_config_cache_state['identity'] = identity
+        _frr_config_cache_state['verified_at'] = now
+
+    stanzas = _split_config_stanzas(frr_config)
+    pending = {header: _get_stanza_hash(lines)
+               for header, lines in stanzas.items()
+               if _frr_config_cache.get(header) != _get_stanza_hash(lines)}
+    if not pending:
+        LOG.debug("FRR configuration already in place, nothing to push")
+        return
+
+    running = _split_config_stanzas(
+        _run_vtysh_command('show running-config'))
+    missing = [header for header in pending
+               if _stanza_lines_missing(stanzas[header],
+                                        running.get(header, []))]
+    if missing:
+        LOG.info("Pushing FRR configuration stanzas: %s", missing)
+        _run_vtysh_config('\n'.join(
+            '\n'.join(stanzas[header]) for header in missing) + '\n')
+    _frr_config_cache.update(pending)
+
+
+def _forget_config_stanzas(frr_config):
+    # Configuration pushed outside of the cache may modify or remove the
+    # cached stanzas, so they need to be verified again
+    if not _frr_config_cache:
+        return
+    for header in _split_config_stanzas(frr_config):
+        _frr_config_cache.pop(header, None)
+        if header.startswith('no '):
+            _frr_config_cache.pop(header[3:], None)
+
+
+class ConfigChangeSet(object):
+    """FRR configuration gathered to be pushed in a single vtysh load."""
+
+    def __init__(self):
+        self.configs = []
+
+    def add(self, frr_config):
+        self.configs.append(frr_config)
+
+    def commit(self):
+        if not self.configs:
+            return
+        configs, self.configs = self.configs, []
+        LOG.debug("Pushing %d FRR configuration changes at once",
+                  len(configs))
+        try:
+            _run_vtysh_config(''.join(configs))
+            return
+        except Exception as e:
+            if len(configs) == 1:
+                raise
+            LOG.warning("Failed to push the FRR configuration changes at "
+                        "once, pushing them one by one. Error: %s", e)
+
+        for frr_config in configs:
+            try:
+                _run_vtysh_config(frr_config)
+            except Exception as e:
+                LOG.exception("Failed to push FRR configuration %s. "
+                              "Error: %s", frr_config, e)
+
+
+@contextlib.contextmanager
+def config_change_set():
+    """Gather the FRR reconfigurations and push them when leaving.
+
+    nd_reconfigure and vrf_reconfigure calls done by the current thread
+    inside the context are pushed to FRR together on exit. Nested contexts
+    join the outermost one.
+    """
+    change_set = getattr(_change_sets, 'current', None)
+    if change_set is not None:
+        yield change_set
+        return
+
+    change_set = _change_sets.current = ConfigChangeSet()
+    try:
+        yield change_set
+    finally:
+        _change_sets.current = None
+        change_set.commit()
+
+
+def _push_config(frr_config):
+    _forget_config_stanzas(frr_config)
+    change_set = getattr(_change_sets, 'current', None)
+    if change_set is not None:
+        change_set.add(frr_config)
+    else:
+        _run_vtysh_config(frr_config)
+
+
 def set_default_redistribute(redist_opts):
     if not isinstance(redist_opts, set):
         redist_opts = set(redist_opts)
@@ -153,8 +472,6 @@ def set_default_redistribute(redist_opts):
 def nd_reconfigure(interface, prefix, opts):
     LOG.info('FRR IPv6 ND reconfiguration (intf %s, prefix %s)', interface,
              prefix)
-    nd_template = Template(CONFIGURE_ND_TEMPLATE)
-
     # Need to define what setting is for SLAAC
     if (not opts.get('dhcpv6_stateless', False) or
             opts.get('dhcpv6_stateless', '') not in ('true', True)):
@@ -167,29 +484,30 @@ def nd_reconfigure(interface, prefix, opts):
 
     is_dhcpv6 = True  # Need a better way to define this one.
 
-    nd_config = nd_template.render(
+    nd_config = render_template(
+        CONFIGURE_ND_TEMPLATE,
         intf=interface,
         prefix=prefix,
         dns_servers=dns_servers,
         is_dhcpv6=is_dhcpv6,
     )
 
-    _run_vtysh_config_with_tempfile(nd_config)
+    _push_config(nd_config)
 
 
 def vrf_leak(vrf, bgp_as, bgp_router_id=None, template=LEAK_VRF_TEMPLATE):
     LOG.info("Add VRF leak for VRF %s on router bgp %s", vrf, bgp_as)
     if not bgp_router_id:
-        bgp_router_id = _get_router_id()
+        bgp_router_id = get_router_id()
         if not bgp_router_id:
             LOG.error("Unknown router-id, needed for route leaking")
             return
 
-    vrf_template = Template(template)
-    vrf_config = vrf_template.render(vrf_name=vrf, bgp_as=bgp_as,
-                                     redistribute=DEFAULT_REDISTRIBUTE,
-                                     bgp_router_id=bgp_router_id)
-    _run_vtysh_config_with_tempfile(vrf_config)
+    vrf_config = render_template(template, vrf_name=vrf, bgp_as=bgp_as,
+                                 redistribute=DEFAULT_REDISTRIBUTE,
+                                 bgp_router_id=bgp_router_id,
+                                 graceful_restart=CONF.bgp_graceful_restart)
+    _run_vtysh_config_cached(vrf_config)
 
 
 def vrf_reconfigure(evpn_info, action):
@@ -217,7 +535,6 @@ def vrf_reconfigure(evpn_info, action):
         opts['vrf_name'] = "{}{}".format(constants.OVN_EVPN_VRF_PREFIX,
                                          evpn_info['vni'])
 
-    vrf_template = Template(vrf_templates.get(action))
-    vrf_config = vrf_template.render(**opts)
+    vrf_config = render_template(vrf_templates.get(action), **opts)
 
-    _run_vtysh_config_with_tempfile(vrf_config)
+    _push_config(vrf_config)
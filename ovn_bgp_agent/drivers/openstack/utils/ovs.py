@@ -17,12 +17,14 @@ from oslo_log import log as logging
 from ovs.db import idl
 from ovsdbapp.backend.ovs_idl import connection
 from ovsdbapp.backend.ovs_idl import idlutils
+from ovsdbapp import event
 from ovsdbapp.schema.open_vswitch import impl_idl as idl_ovs
 import socket
 import tenacity
 
 from ovn_bgp_agent import constants
 from ovn_bgp_agent import exceptions as agent_exc
+from ovn_bgp_agent.privileged import batch as priv_batch
 import ovn_bgp_agent.privileged.ovs_vsctl
 from ovn_bgp_agent.utils import linux_net
 
@@ -61,14 +63,20 @@ def get_ovs_ports_info(bridge):
     return ovs_ports.split("\n")
 
 
+def _ovs_cmds(commands):
+    # Run several ovs commands with a single privsep round trip
+    batch = priv_batch.Batch(ovn_bgp_agent.privileged.ovs_vsctl_cmd)
+    for command, args in commands:
+        batch.add(ovn_bgp_agent.privileged.ovs_vsctl.ovs_cmd, command, args)
+    return priv_batch.raise_on_error(batch.execute())
+
+
 def get_ovs_patch_ports_info(bridge, prefix='patch-provnet-'):
-    in_ports = []
     ovs_ports = get_ovs_ports_info(bridge)
-    for ovs_port in ovs_ports:
-        if ovs_port.startswith(prefix):
-            ovs_ofport = get_device_port_at_ovs(ovs_port)
-            in_ports.append(ovs_ofport)
-    return in_ports
+    results = _ovs_cmds(
+        ('ovs-vsctl', ['get', 'Interface', ovs_port, 'ofport'])
+        for ovs_port in ovs_ports if ovs_port.startswith(prefix))
+    return [result[0].rstrip() for result in results]
 
 
 @tenacity.retry(
@@ -98,6 +106,7 @@ def ensure_mac_tweak_flows(bridge, mac, ports, cookie):
     flows_info = [flow.split("priority")[1].replace(" ", ",")
                   for flow in current_flows]
 
+    new_flows = []
     for in_port in ports:
         exist_flow = False
         exist_flow_v6 = False
@@ -114,11 +123,10 @@ def ensure_mac_tweak_flows(bridge, mac, ports, cookie):
             exist_flow_v6 = True
 
         if not exist_flow:
-            ovn_bgp_agent.privileged.ovs_vsctl.ovs_cmd(
-                'ovs-ofctl', ['add-flow', bridge, flow])
+            new_flows.append(('ovs-ofctl', ['add-flow', bridge, flow]))
         if not exist_flow_v6:
-            ovn_bgp_agent.privileged.ovs_vsctl.ovs_cmd(
-                'ovs-ofctl', ['add-flow', bridge, flow_v6])
+            new_flows.append(('ovs-ofctl', ['add-flow', bridge, flow_v6]))
+    _ovs_cmds(new_flows)
 
 
 def remove_extra_ovs_flows(ovs_flows, bridge, cookie):
@@ -140,12 +148,13 @@ def remove_extra_ovs_flows(ovs_flows, bridge, cookie):
 
     cookie_id = "cookie={}/-1".format(cookie)
     current_flows = get_bridge_flows(bridge, cookie_id)
+    del_flows = []
     for flow in current_flows:
         if flow.split("priority")[1] not in expected_flows:
             del_flow = ('{},{}').format(
                 cookie_id, flow.split("priority=900,")[1].split(" actions")[0])
-            ovn_bgp_agent.privileged.ovs_vsctl.ovs_cmd(
-                'ovs-ofctl', ['del-flows', bridge, del_flow])
+            del_flows.append(('ovs-ofctl', ['del-flows', bridge, del_flow]))
+    _ovs_cmds(del_flows)
 
 
 def ensure_flow(bridge, flow):
@@ -270,7 +279,12 @@ def get_flow_info(flow):
 
 
 class OvsIdl(object):
-    def start(self, connection_string):
+    def start(self, connection_string, events=None):
+        """Connect to the local OVS database
+
+        :param events: the row events (e.g., on the Bridge table) to notify
+                       the changes to, if any
+        """
         helper = idlutils.get_schema_helper(connection_string,
                                             'Open_vSwitch')
         tables = ('Open_vSwitch', 'Bridge', 'Port', 'Interface')
@@ -278,6 +292,12 @@ class OvsIdl(object):
             helper.register_table(table)
         ovs_idl = idl.Idl(connection_string, helper)
         ovs_idl._session.reconnect.set_probe_interval(60000)
+        if events:
+            # the row changes are notified to the events, as done by the
+            # OVN IDLs
+            self.notify_handler = event.RowEventHandler()
+            self.notify_handler.watch_events(events)
+            ovs_idl.notify = self.notify_handler.notify
         conn = connection.Connection(
             ovs_idl, timeout=180)
         self.idl_ovs = idl_ovs.OvsdbIdl(conn)
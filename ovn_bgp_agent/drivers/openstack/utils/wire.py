@@ -13,23 +13,40 @@
 # limitations under the License.
 
 import ast
+import collections
+import threading
 
 from oslo_config import cfg
 from oslo_log import log as logging
 
 from ovn_bgp_agent import constants
+from ovn_bgp_agent.drivers.openstack.utils import bgp as bgp_utils
 from ovn_bgp_agent.drivers.openstack.utils import driver_utils
 from ovn_bgp_agent.drivers.openstack.utils import evpn
+from ovn_bgp_agent.drivers.openstack.utils import frr
 from ovn_bgp_agent.drivers.openstack.utils import ovn
 from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent import exceptions as agent_exc
 from ovn_bgp_agent.utils import helpers
+from ovn_bgp_agent.utils import ip_parser
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import workers
 
 
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
+# (table, family) of the aggregated ip rules known to be in place
+_aggregated_ip_rules = set()
+# Serializes the updates of the in_port flows info of the bridges, done by
+# the sync workers
+_mac_tweak_flows_lock = threading.Lock()
+# IPv6 NDP proxies wired per (bridge_device, bridge_vlan), with the ports
+# (as the frozenset of their IPs) needing each of them
+_ndp_proxies = collections.defaultdict(
+    lambda: collections.defaultdict(set))
+_ndp_proxies_lock = threading.Lock()
+
 
 def ensure_base_wiring_config(idl, ovs_idl, ovn_idl=None, routing_tables={}):
     if CONF.exposing_method == constants.EXPOSE_METHOD_UNDERLAY:
@@ -48,32 +65,40 @@ def _ensure_base_wiring_config_underlay(idl, ovs_idl, routing_tables):
     bridge_mappings = ovs_idl.get_ovn_bridge_mappings()
 
     ovn_bridge_mappings = {}
-    flows_info = {}
+    bridge_networks = {}
     for bridge_index, bridge_mapping in enumerate(bridge_mappings, 1):
         network, bridge = helpers.parse_bridge_mapping(bridge_mapping)
         if not network:
             continue
         ovn_bridge_mappings[network] = bridge
 
+        # NOTE: the routing tables are allocated sequentially, as they
+        # update the same rt_tables file
         linux_net.ensure_routing_table_for_bridge(
             routing_tables, bridge, CONF.bgp_vrf_table_id)
         vlan_tags = idl.get_network_vlan_tag_by_network_name(network)
+        bridge_networks.setdefault(bridge, []).append(
+            (bridge_index, vlan_tags))
+
+    def _ensure_bridge_wiring(bridge):
+        for bridge_index, vlan_tags in bridge_networks[bridge]:
+            for vlan_tag in vlan_tags:
+                linux_net.ensure_vlan_device_for_network(bridge,
+                                                         vlan_tag)
+
+            linux_net.ensure_arp_ndp_enabled_for_bridge(bridge,
+                                                        bridge_index,
+                                                        vlan_tags)
+        mac = linux_net.get_interface_address(bridge)
+        in_port = ovs.get_ovs_patch_ports_info(bridge)
+        ovs.ensure_mac_tweak_flows(bridge, mac, in_port,
+                                   constants.OVS_RULE_COOKIE)
+        return {'mac': mac, 'in_port': in_port}
 
-        for vlan_tag in vlan_tags:
-            linux_net.ensure_vlan_device_for_network(bridge,
-                                                     vlan_tag)
-
-        linux_net.ensure_arp_ndp_enabled_for_bridge(bridge,
-                                                    bridge_index,
-                                                    vlan_tags)
-        if not flows_info.get(bridge):
-            mac = linux_net.get_interface_address(bridge)
-            flows_info[bridge] = {'mac': mac, 'in_port': set()}
-            flows_info[bridge]['in_port'] = ovs.get_ovs_patch_ports_info(
-                bridge)
-            ovs.ensure_mac_tweak_flows(bridge, mac,
-                                       flows_info[bridge]['in_port'],
-                                       constants.OVS_RULE_COOKIE)
+    bridges = list(bridge_networks)
+    flows_info = dict(zip(bridges, workers.run_in_parallel(
+        _ensure_bridge_wiring, bridges, CONF.sync_workers)))
+    linux_net.delete_stale_routing_tables(routing_tables)
     return ovn_bridge_mappings, flows_info
 
 
@@ -88,71 +113,75 @@ def _ensure_base_wiring_config_evpn(idl: 'ovn.OvsdbNbOvnIdl|ovn.OvsdbSbOvnIdl',
 
     ovn_bridge_mappings = {}
     flows_info = {}  # dictionary to use for mappings with vrf's
-    for bridge_mapping in bridge_mappings:
-        try:
-            # for example: physnet1, br-ex
-            network, bridge = bridge_mapping.split(":", 1)
-        except ValueError:
-            LOG.debug('Invalid bridge mapping: %s', bridge_mapping)
-            continue
-
-        ovn_bridge_mappings[network] = bridge
-        LOG.debug('Setup EVPN base wiring for network %s on bridge %s',
-                  network, bridge)
-
-        # Make sure the bridge exists
-        ovs_idl.idl_ovs.add_br(bridge).execute(check_error=True)
-
-        if bridge not in flows_info:
-            flows_info[bridge] = {
-                'mac': linux_net.get_interface_address(bridge),
-                'in_port': ovs.get_ovs_patch_ports_info(bridge),
-                'evpn': {}
-            }
-
-        # Find all provider networks, and create the vrf's
-        localnet_ports = list(idl.get_localnet_ports_by_network_name(network))
-        if not localnet_ports:
-            LOG.debug('No localnet ports found for network %s', network)
-            continue
-
-        provnets = idl.get_bgpvpn_networks_for_ports(localnet_ports,
-                                                     vpn_type=mode)
-        if not provnets:
-            LOG.debug('No provider networks found for %s %s',
-                      constants.OVN_EVPN_TYPE_EXT_ID_KEY, mode)
-            continue
+    # Gather the FRR configuration of all the VRFs and interfaces, and push
+    # it at once when the wiring is done
+    with frr.config_change_set():
+        for bridge_mapping in bridge_mappings:
+            try:
+                # for example: physnet1, br-ex
+                network, bridge = bridge_mapping.split(":", 1)
+            except ValueError:
+                LOG.debug('Invalid bridge mapping: %s', bridge_mapping)
+                continue
 
-        for ls in provnets:
-            LOG.info('Network %s (settings: %s)', ls.name, ls.external_ids)
+            ovn_bridge_mappings[network] = bridge
+            LOG.debug('Setup EVPN base wiring for network %s on bridge %s',
+                      network, bridge)
+
+            # Make sure the bridge exists
+            ovs_idl.idl_ovs.add_br(bridge).execute(check_error=True)
+
+            if bridge not in flows_info:
+                flows_info[bridge] = {
+                    'mac': linux_net.get_interface_address(bridge),
+                    'in_port': ovs.get_ovs_patch_ports_info(bridge),
+                    'evpn': {}
+                }
+
+            # Find all provider networks, and create the vrf's
+            localnet_ports = list(
+                idl.get_localnet_ports_by_network_name(network))
+            if not localnet_ports:
+                LOG.debug('No localnet ports found for network %s', network)
+                continue
 
-            if constants.OVN_EVPN_VNI_EXT_ID_KEY not in ls.external_ids:
-                LOG.warning('Skipped, VNI required for EVPN VRF setup')
+            provnets = idl.get_bgpvpn_networks_for_ports(localnet_ports,
+                                                         vpn_type=mode)
+            if not provnets:
+                LOG.debug('No provider networks found for %s %s',
+                          constants.OVN_EVPN_TYPE_EXT_ID_KEY, mode)
                 continue
 
-            evpn_opts = {}
-            for opt, ext_id_key in constants.EVPN_EXT_ID_MAPPING.items():
-                evpn_opts[opt] = ast.literal_eval(
-                    ls.external_ids.get(ext_id_key, '[]')
+            for ls in provnets:
+                LOG.info('Network %s (settings: %s)', ls.name, ls.external_ids)
+
+                if constants.OVN_EVPN_VNI_EXT_ID_KEY not in ls.external_ids:
+                    LOG.warning('Skipped, VNI required for EVPN VRF setup')
+                    continue
+
+                evpn_opts = {}
+                for opt, ext_id_key in constants.EVPN_EXT_ID_MAPPING.items():
+                    evpn_opts[opt] = ast.literal_eval(
+                        ls.external_ids.get(ext_id_key, '[]')
+                    )
+
+                # Create or return the EVPN bridge
+                evpn_bridge = evpn.setup(
+                    ovs_bridge=bridge,
+                    vni=ls.external_ids[constants.OVN_EVPN_VNI_EXT_ID_KEY],
+                    evpn_opts=evpn_opts,
+                    mode=mode,
+                    ovs_flows=flows_info,
                 )
 
-            # Create or return the EVPN bridge
-            evpn_bridge = evpn.setup(
-                ovs_bridge=bridge,
-                vni=ls.external_ids[constants.OVN_EVPN_VNI_EXT_ID_KEY],
-                evpn_opts=evpn_opts,
-                mode=mode,
-                ovs_flows=flows_info,
-            )
-
-            # Connect all VLAN interfaces to this VRF and gather dhcp
-            # options to be configured for l3 mode.
-            evpn_dev, dhcp_opts = _ensure_evpn_vlan_dev(ls, localnet_ports,
-                                                        evpn_bridge,
-                                                        flows_info, bridge)
+                # Connect all VLAN interfaces to this VRF and gather dhcp
+                # options to be configured for l3 mode.
+                evpn_dev, dhcp_opts = _ensure_evpn_vlan_dev(ls, localnet_ports,
+                                                            evpn_bridge,
+                                                            flows_info, bridge)
 
-            if dhcp_opts and evpn_dev:
-                evpn_dev.process_dhcp_opts(dhcp_opts)
+                if dhcp_opts and evpn_dev:
+                    evpn_dev.process_dhcp_opts(dhcp_opts)
 
     return ovn_bridge_mappings, flows_info
 
@@ -493,12 +522,9 @@ def cleanup_wiring(idl, bridge_mappings, ovs_flows, exposed_ips,
 
 def _cleanup_wiring_underlay(idl, bridge_mappings, ovs_flows, exposed_ips,
                              routing_tables, routing_tables_routes):
-    current_ips = linux_net.get_exposed_ips(CONF.bgp_nic)
-    expected_ips = [ip for ip_dict in exposed_ips.values()
-                    for ip in ip_dict.keys()]
-
-    ips_to_delete = [ip for ip in current_ips if ip not in expected_ips]
-    linux_net.delete_exposed_ips(ips_to_delete, CONF.bgp_nic)
+    current_ips = bgp_utils.get_exposed_ips()
+    ips_to_delete = exposed_ips.get_not_exposed(current_ips)
+    bgp_utils.delete_exposed_ips(ips_to_delete)
 
     extra_routes = {}
     for bridge in bridge_mappings.values():
@@ -510,9 +536,9 @@ def _cleanup_wiring_underlay(idl, bridge_mappings, ovs_flows, exposed_ips,
                                    constants.OVS_RULE_COOKIE)
 
     # get rules and delete the old ones
-    ovn_ip_rules = linux_net.get_ovn_ip_rules(routing_tables.values())
+    ovn_ip_rules = get_ovn_ip_rules(routing_tables)
     if ovn_ip_rules:
-        for ip in expected_ips:
+        for ip in exposed_ips.get_ips():
             if len(ip.split("/")) == 1:
                 ip_version = linux_net.get_ip_version(ip)
                 if ip_version == constants.IP_VERSION_6:
@@ -527,6 +553,7 @@ def _cleanup_wiring_underlay(idl, bridge_mappings, ovs_flows, exposed_ips,
     # remove all the extra routes not needed
     linux_net.delete_bridge_ip_routes(routing_tables, routing_tables_routes,
                                       extra_routes)
+    sync_ndp_proxies(set(bridge_mappings.values()))
 
     # delete leaked vlan devices from previous vlan provider networks
     delete_vlan_devices_leftovers(idl, bridge_mappings)
@@ -555,19 +582,19 @@ def _cleanup_wiring_evpn(ovs_flows, routing_tables_routes):
 
 def wire_provider_port(routing_tables_routes, ovs_flows, port_ips,
                        bridge_device, bridge_vlan, localnet, routing_table,
-                       proxy_cidrs, mac=None, ovn_idl=None):
+                       proxy_cidrs, mac=None, ovn_idl=None, owner=None):
     if CONF.exposing_method == constants.EXPOSE_METHOD_UNDERLAY:
         return _wire_provider_port_underlay(routing_tables_routes, ovs_flows,
                                             port_ips, bridge_device,
                                             bridge_vlan, localnet,
                                             routing_table, proxy_cidrs,
-                                            lladdr=mac)
+                                            lladdr=mac, owner=owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_VRF:
         return _wire_provider_port_evpn(routing_tables_routes, ovs_flows,
                                         port_ips, bridge_device,
                                         bridge_vlan, localnet,
                                         proxy_cidrs,
-                                        mac=mac)
+                                        mac=mac, owner=owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_OVN:
         # We need to add a static mac binding due to proxy-arp issue in
         # core ovn that would reply on the incomming traffic from the LR,
@@ -577,16 +604,16 @@ def wire_provider_port(routing_tables_routes, ovs_flows, port_ips,
 
 def unwire_provider_port(routing_tables_routes, port_ips, bridge_device,
                          bridge_vlan, routing_table, proxy_cidrs, mac=None,
-                         ovn_idl=None):
+                         ovn_idl=None, owner=None):
     if CONF.exposing_method == constants.EXPOSE_METHOD_UNDERLAY:
         return _unwire_provider_port_underlay(routing_tables_routes, port_ips,
                                               bridge_device, bridge_vlan,
                                               routing_table, proxy_cidrs,
-                                              lladdr=mac)
+                                              lladdr=mac, owner=owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_VRF:
         return _unwire_provider_port_evpn(routing_tables_routes, port_ips,
                                           bridge_device, bridge_vlan,
-                                          mac)
+                                          mac, owner=owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_OVN:
         # We need to remove thestatic mac binding added due to proxy-arp issue
         # in core ovn that would reply on the incomming traffic from the LR,
@@ -594,19 +621,105 @@ def unwire_provider_port(routing_tables_routes, port_ips, bridge_device,
         return _unwire_provider_port_ovn(ovn_idl, port_ips)
 
 
+def _forwards_aggregated():
+    return (CONF.exposed_ips_forwarding ==
+            constants.EXPOSED_IPS_FORWARDING_AGGREGATED)
+
+
+def _ensure_aggregated_ip_rule(table, family):
+    if (table, family) in _aggregated_ip_rules:
+        return
+    linux_net.add_aggregated_ip_rule(table, family)
+    _aggregated_ip_rules.add((table, family))
+
+
+def get_ovn_ip_rules(routing_tables):
+    """Get the ip rules to remove at the end of a sync if not needed
+
+    With the aggregated forwarding the per IP rules are never needed, so
+    they are removed as soon as the aggregated rules are in place and
+    nothing is returned. Otherwise the aggregated rules, if any, are
+    returned together with the per IP ones, so that they are removed once
+    the per IP rules have been recreated.
+    """
+    ovn_ip_rules = linux_net.get_ovn_ip_rules(routing_tables.values())
+    if not _forwards_aggregated():
+        return ovn_ip_rules
+
+    _aggregated_ip_rules.clear()
+    for table in routing_tables.values():
+        for family in (constants.AF_INET, constants.AF_INET6):
+            key = linux_net.get_aggregated_rule_key(table, family)
+            if key in ovn_ip_rules:
+                _aggregated_ip_rules.add((table, family))
+            else:
+                _ensure_aggregated_ip_rule(table, family)
+    per_ip_rules = {dst: rule for dst, rule in ovn_ip_rules.items()
+                    if 'suppress_prefixlength' not in rule}
+    if per_ip_rules:
+        LOG.debug("Removing %d per IP rules replaced by the aggregated "
+                  "ones", len(per_ip_rules))
+        linux_net.delete_ip_rules(per_ip_rules)
+    return {}
+
+
+def _add_ip_rule(ip, table, **kwargs):
+    if not _forwards_aggregated():
+        linux_net.add_ip_rule(ip, table, **kwargs)
+        return
+    # NOTE: the route to the IP on the bridge table is all that is needed
+    # besides the aggregated rule. This also validates the IP, raising
+    # InvalidPortIP as add_ip_rule does
+    rule = linux_net.create_rule_from_ip(ip, table)
+    _ensure_aggregated_ip_rule(table, rule['family'])
+    if kwargs.get('lladdr'):
+        linux_net.add_ip_nei(ip, kwargs['lladdr'], kwargs.get('dev'))
+
+
+def _del_ip_rule(ip, table, **kwargs):
+    if not _forwards_aggregated():
+        linux_net.del_ip_rule(ip, table, **kwargs)
+        return
+    # The aggregated rule is shared by all the IPs on the bridge table
+    linux_net.create_rule_from_ip(ip, table)
+    linux_net.del_ip_nei(ip, kwargs.get('lladdr'), kwargs.get('dev'))
+
+
+def sync_bridge_flows(ovs_flows, bridge):
+    """Update the mac tweak flows of a bridge after its ports changed
+
+    e.g., a patch port recreated with a new ofport.
+
+    :return: False if the bridge has no mac tweak flows, True otherwise
+    """
+    if (CONF.exposing_method != constants.EXPOSE_METHOD_UNDERLAY or
+            bridge not in ovs_flows):
+        return False
+    in_port = ovs.get_ovs_patch_ports_info(bridge)
+    with _mac_tweak_flows_lock:
+        ovs_flows[bridge]['in_port'] = in_port
+    ovs.ensure_mac_tweak_flows(bridge, ovs_flows[bridge]['mac'], in_port,
+                               constants.OVS_RULE_COOKIE)
+    ovs.remove_extra_ovs_flows(ovs_flows, bridge, constants.OVS_RULE_COOKIE)
+    return True
+
+
 def _ensure_updated_mac_tweak_flows(localnet, bridge_device, ovs_flows):
     ofport = ovs.get_ovs_patch_port_ofport(localnet)
-    if ofport not in ovs_flows[bridge_device]['in_port']:
+    with _mac_tweak_flows_lock:
+        if ofport in ovs_flows[bridge_device]['in_port']:
+            return
         ovs_flows[bridge_device]['in_port'].append(ofport)
-        ovs.ensure_mac_tweak_flows(bridge_device,
-                                   ovs_flows[bridge_device]['mac'],
-                                   [ofport],
-                                   constants.OVS_RULE_COOKIE)
+    ovs.ensure_mac_tweak_flows(bridge_device,
+                               ovs_flows[bridge_device]['mac'],
+                               [ofport],
+                               constants.OVS_RULE_COOKIE)
 
 
 def _wire_provider_port_underlay(routing_tables_routes, ovs_flows, port_ips,
                                  bridge_device, bridge_vlan, localnet,
-                                 routing_table, proxy_cidrs, lladdr=None):
+                                 routing_table, proxy_cidrs, lladdr=None,
+                                 owner=None):
     if not bridge_device:
         return False
     for ip in port_ips:
@@ -615,22 +728,20 @@ def _wire_provider_port_underlay(routing_tables_routes, ovs_flows, port_ips,
                 dev = bridge_device
                 if bridge_vlan:
                     dev = '{}.{}'.format(dev, bridge_vlan)
-                linux_net.add_ip_rule(ip, routing_table[bridge_device],
-                                      dev=dev, lladdr=lladdr)
+                _add_ip_rule(ip, routing_table[bridge_device], dev=dev,
+                             lladdr=lladdr)
             else:
-                linux_net.add_ip_rule(ip, routing_table[bridge_device],
-                                      dev=bridge_device)
+                _add_ip_rule(ip, routing_table[bridge_device],
+                             dev=bridge_device)
         except agent_exc.InvalidPortIP:
             LOG.exception("Invalid IP to create a rule for port on the "
                           "provider network: %s", ip)
             return False
         linux_net.add_ip_route(routing_tables_routes, ip,
                                routing_table[bridge_device], bridge_device,
-                               vlan=bridge_vlan)
+                               vlan=bridge_vlan, owner=owner)
     # add proxy ndp config for ipv6
-    for n_cidr in proxy_cidrs:
-        if linux_net.get_ip_version(n_cidr) == constants.IP_VERSION_6:
-            linux_net.add_ndp_proxy(n_cidr, bridge_device, bridge_vlan)
+    _add_ndp_proxies(port_ips, proxy_cidrs, bridge_device, bridge_vlan)
     # NOTE(ltomasbo): This is needed as the patch ports are not created
     # until the first VM/FIP in that provider network is created in a node
     try:
@@ -646,7 +757,7 @@ def _wire_provider_port_underlay(routing_tables_routes, ovs_flows, port_ips,
 
 def _wire_provider_port_evpn(routing_tables_routes, ovs_flows, port_ips,
                              bridge_device, bridge_vlan, localnet,
-                             proxy_cidrs, mac=None, via=None):
+                             proxy_cidrs, mac=None, via=None, owner=None):
     try:
         evpn_dev = evpn.lookup_vlan(bridge_device, bridge_vlan)
     except KeyError:
@@ -660,7 +771,8 @@ def _wire_provider_port_evpn(routing_tables_routes, ovs_flows, port_ips,
 
     for ip in port_ips:
         ver = linux_net.get_ip_version(ip)
-        evpn_dev.add_route(routing_tables_routes, ip, mac, via=via.get(ver))
+        evpn_dev.add_route(routing_tables_routes, ip, mac, via=via.get(ver),
+                           owner=owner)
 
     return True
 
@@ -679,7 +791,7 @@ def _wire_provider_port_ovn(ovn_idl, port_ips, mac):
 
 def _unwire_provider_port_underlay(routing_tables_routes, port_ips,
                                    bridge_device, bridge_vlan, routing_table,
-                                   proxy_cidrs, lladdr=None):
+                                   proxy_cidrs, lladdr=None, owner=None):
     if not bridge_device:
         return False
     for ip in port_ips:
@@ -692,31 +804,96 @@ def _unwire_provider_port_underlay(routing_tables_routes, port_ips,
                 dev = bridge_device
                 if bridge_vlan:
                     dev = '{}.{}'.format(dev, bridge_vlan)
-                linux_net.del_ip_rule(cr_lrp_ip, routing_table[bridge_device],
-                                      dev=dev, lladdr=lladdr)
+                _del_ip_rule(cr_lrp_ip, routing_table[bridge_device],
+                             dev=dev, lladdr=lladdr)
             except agent_exc.InvalidPortIP:
                 LOG.exception("Invalid IP to delete a rule for the "
                               "provider port: %s", cr_lrp_ip)
                 return False
         else:
             try:
-                linux_net.del_ip_rule(ip, routing_table[bridge_device],
-                                      dev=bridge_device)
+                _del_ip_rule(ip, routing_table[bridge_device],
+                             dev=bridge_device)
             except agent_exc.InvalidPortIP:
                 LOG.exception("Invalid IP to delete a rule for the "
                               "provider port: %s", ip)
                 return False
         linux_net.del_ip_route(routing_tables_routes, ip,
                                routing_table[bridge_device], bridge_device,
-                               vlan=bridge_vlan)
-    for n_cidr in proxy_cidrs:
-        if linux_net.get_ip_version(n_cidr) == constants.IP_VERSION_6:
-            linux_net.del_ndp_proxy(n_cidr, bridge_device, bridge_vlan)
+                               vlan=bridge_vlan, owner=owner)
+    _del_ndp_proxies(port_ips, proxy_cidrs, bridge_device, bridge_vlan)
     return True
 
 
+def _get_ndp_proxy_networks(proxy_cidrs):
+    networks = set()
+    for n_cidr in proxy_cidrs:
+        parsed_cidr = ip_parser.parse_ip(n_cidr)
+        if parsed_cidr.version == constants.IP_VERSION_6:
+            networks.add(parsed_cidr.network)
+    return networks
+
+
+def _add_ndp_proxies(port_ips, proxy_cidrs, bridge_device, bridge_vlan):
+    networks = _get_ndp_proxy_networks(proxy_cidrs)
+    if not networks:
+        return
+    owner = frozenset(port_ips)
+    with _ndp_proxies_lock:
+        device_proxies = _ndp_proxies[(bridge_device, bridge_vlan)]
+        missing = [network for network in networks
+                   if not device_proxies.get(network)]
+        for network in networks:
+            device_proxies[network].add(owner)
+    # The ones already in place are checked by sync_ndp_proxies
+    if missing:
+        linux_net.add_ndp_proxies(missing, bridge_device, bridge_vlan)
+
+
+def _del_ndp_proxies(port_ips, proxy_cidrs, bridge_device, bridge_vlan):
+    networks = _get_ndp_proxy_networks(proxy_cidrs)
+    if not networks:
+        return
+    owner = frozenset(port_ips)
+    unused = []
+    with _ndp_proxies_lock:
+        device_proxies = _ndp_proxies[(bridge_device, bridge_vlan)]
+        for network in networks:
+            owners = device_proxies.get(network, set())
+            owners.discard(owner)
+            if not owners:
+                # Not needed by any other port
+                device_proxies.pop(network, None)
+                unused.append(network)
+    if unused:
+        linux_net.del_ndp_proxies(unused, bridge_device, bridge_vlan)
+
+
+def sync_ndp_proxies(bridge_devices):
+    """Make the NDP proxies of the bridges match the ones wired
+
+    :param bridge_devices: the provider bridges. Their vlan devices with
+                           NDP proxies wired are reconciled too.
+    """
+    if CONF.exposing_method != constants.EXPOSE_METHOD_UNDERLAY:
+        return
+    with _ndp_proxies_lock:
+        devices = {(bridge_device, None) for bridge_device in bridge_devices}
+        devices.update(device for device in _ndp_proxies
+                       if device[0] in bridge_devices)
+        desired = {device: list(_ndp_proxies.get(device, ()))
+                   for device in devices}
+    for (bridge_device, bridge_vlan), networks in desired.items():
+        try:
+            linux_net.sync_ndp_proxies(networks, bridge_device, bridge_vlan)
+        except Exception as e:
+            LOG.exception("Unable to sync the NDP proxies of %s (vlan %s): "
+                          "%s", bridge_device, bridge_vlan, e)
+
+
 def _unwire_provider_port_evpn(routing_tables_routes, port_ips,
-                               bridge_device, bridge_vlan, lladdr):
+                               bridge_device, bridge_vlan, lladdr,
+                               owner=None):
     # locate the evpn_dev, based on bridge and vlan
     try:
         evpn_dev = evpn.lookup_vlan(bridge_device, bridge_vlan)
@@ -728,7 +905,7 @@ def _unwire_provider_port_evpn(routing_tables_routes, port_ips,
         return
 
     for ip in port_ips:
-        evpn_dev.del_route(routing_tables_routes, ip, lladdr)
+        evpn_dev.del_route(routing_tables_routes, ip, lladdr, owner=owner)
 
     return True
 
@@ -746,14 +923,17 @@ def _unwire_provider_port_ovn(ovn_idl, port_ips):
 
 
 def wire_lrp_port(routing_tables_routes, ip, bridge_device, bridge_vlan,
-                  routing_tables, cr_lrp_ips):
+                  routing_tables, cr_lrp_ips, owner=None, gateway_owner=None):
     if CONF.exposing_method == constants.EXPOSE_METHOD_UNDERLAY:
         return _wire_lrp_port_underlay(routing_tables_routes, ip,
                                        bridge_device, bridge_vlan,
-                                       routing_tables, cr_lrp_ips)
+                                       routing_tables, cr_lrp_ips,
+                                       owner=owner,
+                                       gateway_owner=gateway_owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_VRF:
         return _wire_lrp_port_evpn(routing_tables_routes, ip, bridge_device,
-                                   bridge_vlan, cr_lrp_ips)
+                                   bridge_vlan, cr_lrp_ips, owner=owner,
+                                   gateway_owner=gateway_owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_OVN:
         # TODO(ltomasbo): Add flow on br-ex(-X)
         # ovs-ofctl add-flow br-ex
@@ -766,12 +946,13 @@ def wire_lrp_port(routing_tables_routes, ip, bridge_device, bridge_vlan,
 
 
 def _wire_lrp_port_underlay(routing_tables_routes, ip, bridge_device,
-                            bridge_vlan, routing_tables, cr_lrp_ips):
+                            bridge_vlan, routing_tables, cr_lrp_ips,
+                            owner=None, gateway_owner=None):
     if not bridge_device:
         return False
     LOG.debug("Adding IP Rules for network %s", ip)
     try:
-        linux_net.add_ip_rule(ip, routing_tables[bridge_device])
+        _add_ip_rule(ip, routing_tables[bridge_device])
     except agent_exc.InvalidPortIP:
         LOG.exception("Invalid IP to create a rule for the lrp (network "
                       "router interface) port: %s", ip)
@@ -791,7 +972,9 @@ def _wire_lrp_port_underlay(routing_tables_routes, ip, bridge_device,
                 bridge_device,
                 vlan=bridge_vlan,
                 mask=ip.split("/")[1],
-                via=cr_lrp_ip)
+                via=cr_lrp_ip,
+                owner=owner,
+                gateway_owner=gateway_owner)
 
             if (CONF.advertisement_method_tenant_networks ==
                     constants.ADVERTISEMENT_METHOD_SUBNET):
@@ -803,14 +986,17 @@ def _wire_lrp_port_underlay(routing_tables_routes, ip, bridge_device,
                     CONF.bgp_vrf_table_id,
                     CONF.bgp_nic,
                     mask=ip.split("/")[1],
-                    via=cr_lrp_ip)
+                    via=cr_lrp_ip,
+                    owner=owner,
+                    gateway_owner=gateway_owner)
             break
     LOG.debug("Added IP Routes for network %s", ip)
     return True
 
 
 def _wire_lrp_port_evpn(routing_tables_routes, ip, bridge_device,
-                        bridge_vlan, cr_lrp_ips):
+                        bridge_vlan, cr_lrp_ips, owner=None,
+                        gateway_owner=None):
 
     # Generate the via addresses
     via = driver_utils.ips_per_version(cr_lrp_ips)
@@ -825,31 +1011,68 @@ def _wire_lrp_port_evpn(routing_tables_routes, ip, bridge_device,
         return
 
     ver = linux_net.get_ip_version(ip)
-    evpn_dev.add_route(routing_tables_routes, ip, None, via=via.get(ver))
+    evpn_dev.add_route(routing_tables_routes, ip, None, via=via.get(ver),
+                       owner=owner, gateway_owner=gateway_owner)
     return True
 
 
+def update_lrp_port_gateway(routing_tables_routes, gateway_owner,
+                            bridge_device, bridge_vlan, cr_lrp_ips):
+    '''Move the lrp ports wired through a gateway owner to its new ips
+
+    With kernel_nexthops this is a nexthop update per device and ip
+    version, instead of replacing every route through the gateway owner.
+
+    Returns False if no nexthop was moved, i.e., the routes must be wired
+    again instead.
+    '''
+    if CONF.exposing_method == constants.EXPOSE_METHOD_UNDERLAY:
+        devices = [(bridge_device, bridge_vlan)]
+        if (CONF.advertisement_method_tenant_networks ==
+                constants.ADVERTISEMENT_METHOD_SUBNET):
+            devices.append((CONF.bgp_nic, None))
+    elif CONF.exposing_method == constants.EXPOSE_METHOD_VRF:
+        try:
+            evpn_dev = evpn.lookup_vlan(bridge_device, bridge_vlan)
+        except KeyError:
+            return False
+        devices = [(evpn_dev.veth_vrf, None)]
+    else:
+        return False
+
+    updated = False
+    for dev, vlan in devices:
+        for cr_lrp_ip in cr_lrp_ips:
+            if linux_net.update_nexthop_gateway(
+                    routing_tables_routes, gateway_owner, dev, cr_lrp_ip,
+                    vlan=vlan):
+                updated = True
+    return updated
+
+
 def unwire_lrp_port(routing_tables_routes, ip, bridge_device, bridge_vlan,
-                    routing_tables, cr_lrp_ips):
+                    routing_tables, cr_lrp_ips, owner=None):
     if CONF.exposing_method == constants.EXPOSE_METHOD_UNDERLAY:
         return _unwire_lrp_port_underlay(routing_tables_routes, ip,
                                          bridge_device, bridge_vlan,
-                                         routing_tables, cr_lrp_ips)
+                                         routing_tables, cr_lrp_ips,
+                                         owner=owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_VRF:
         return _unwire_lrp_port_evpn(routing_tables_routes, ip,
-                                     bridge_device, bridge_vlan)
+                                     bridge_device, bridge_vlan, owner=owner)
     elif CONF.exposing_method == constants.EXPOSE_METHOD_OVN:
         # TODO(ltomasbo): Remove flow(s) and router route
         return
 
 
 def _unwire_lrp_port_underlay(routing_tables_routes, ip, bridge_device,
-                              bridge_vlan, routing_tables, cr_lrp_ips):
+                              bridge_vlan, routing_tables, cr_lrp_ips,
+                              owner=None):
     if not bridge_device:
         return False
     LOG.debug("Deleting IP Rules for network %s", ip)
     try:
-        linux_net.del_ip_rule(ip, routing_tables[bridge_device])
+        _del_ip_rule(ip, routing_tables[bridge_device])
     except agent_exc.InvalidPortIP:
         LOG.exception("Invalid IP to delete a rule for the "
                       "lrp (network router interface) port: %s", ip)
@@ -867,7 +1090,8 @@ def _unwire_lrp_port_underlay(routing_tables_routes, ip, bridge_device,
                 bridge_device,
                 vlan=bridge_vlan,
                 mask=ip.split("/")[1],
-                via=cr_lrp_ip)
+                via=cr_lrp_ip,
+                owner=owner)
 
             if (CONF.advertisement_method_tenant_networks ==
                     constants.ADVERTISEMENT_METHOD_SUBNET):
@@ -879,13 +1103,14 @@ def _unwire_lrp_port_underlay(routing_tables_routes, ip, bridge_device,
                     CONF.bgp_vrf_table_id,
                     CONF.bgp_nic,
                     mask=ip.split("/")[1],
-                    via=cr_lrp_ip)
+                    via=cr_lrp_ip,
+                    owner=owner)
     LOG.debug("Deleted IP Routes for network %s", ip)
     return True
 
 
 def _unwire_lrp_port_evpn(routing_tables_routes, ip, bridge_device,
-                          bridge_vlan):
+                          bridge_vlan, owner=None):
     # locate the evpn_dev, based on bridge and vlan
     try:
         evpn_dev = evpn.lookup_vlan(bridge_device, bridge_vlan)
@@ -896,6 +1121,6 @@ def _unwire_lrp_port_evpn(routing_tables_routes, ip, bridge_device,
         LOG.warning(msg, bridge_device, bridge_vlan)
         return
 
-    evpn_dev.del_route(routing_tables_routes, ip)
+    evpn_dev.del_route(routing_tables_routes, ip, owner=owner)
 
     return True
@@ -161,3 +161,26 @@ class LRPChassisEvent(Event):
             'logical_switch': self._get_network(row),
             'router': row.external_ids.get(constants.OVN_LR_NAME_EXT_ID_KEY),
         }
+
+
+class BridgePortsUpdateEvent(Event):
+    """The ports of a provider bridge changed on the local OVS
+
+    e.g., ovn-controller recreated the patch port of a provider bridge, with
+    a new ofport its flows must be updated for. The bridge is marked dirty,
+    to be reprocessed by the next reconciliation.
+    """
+
+    def __init__(self, bgp_agent):
+        self.agent = bgp_agent
+        events = (self.ROW_UPDATE,)
+        super(BridgePortsUpdateEvent, self).__init__(events, 'Bridge', None)
+        self.event_name = self.__class__.__name__
+
+    def match_fn(self, event, row, old):
+        # e.g., the integration bridge ports change on each VM plugged
+        return (hasattr(old, 'ports') and
+                row.name in self.agent.ovn_bridge_mappings.values())
+
+    def _run(self, event, row, old):
+        self.agent.mark_bridge_dirty(row.name)
@@ -479,7 +479,7 @@ class LocalnetCreateDeleteEvent(base_watcher.PortBindingChassisEvent):
 
     def _run(self, event, row, old):
         with _SYNC_STATE_LOCK.read_lock():
-            self.agent.sync()
+            self.agent.sync(wait=False)
 
 
 class ChassisCreateEventBase(base_watcher.Event):
@@ -498,7 +498,8 @@ class ChassisCreateEventBase(base_watcher.Event):
             self.first_time = False
         else:
             LOG.info("Connection to OVSDB established, doing a full sync")
-            self.agent.sync()
+            self.agent.notify_reconnected()
+            self.agent.sync(wait=False)
 
 
 class ChassisCreateEvent(ChassisCreateEventBase):
@@ -230,6 +230,7 @@ class ChassisCreateEventBase(base_watcher.Event):
             self.first_time = False
         else:
             LOG.info("Connection to OVSDB established, doing a full sync")
+            self.agent.notify_reconnected()
             self.agent.sync()
 
 
@@ -345,7 +345,7 @@ class LogicalSwitchUpdateEvent(base_watcher.LogicalSwitchChassisEvent):
             # as this is triggered with a configured interval anyway and it
             # will add/remove the triggered logical switch.
             # It might make sense in the future to optimize this behaviour.
-            self.agent.sync()
+            self.agent.sync(wait=False)
 
 
 class LocalnetCreateDeleteEvent(base_watcher.LSPChassisEvent):
@@ -361,7 +361,7 @@ class LocalnetCreateDeleteEvent(base_watcher.LSPChassisEvent):
 
     def _run(self, event, row, old):
         with _SYNC_STATE_LOCK.read_lock():
-            self.agent.sync()
+            self.agent.sync(wait=False)
 
 
 class ChassisRedirectCreateEvent(base_watcher.LRPChassisEvent):
@@ -387,6 +387,11 @@ class ChassisRedirectCreateEvent(base_watcher.LRPChassisEvent):
                     constants.OVN_STATUS_CHASSIS)
                 if old_hosting_chassis != hosting_chassis:
                     return True
+
+            if hasattr(old, 'networks'):
+                # the gateway ips changed, the routes through them are
+                # moved to the new ones
+                return set(old.networks) != set(row.networks)
         except (IndexError, AttributeError):
             return False
         return False
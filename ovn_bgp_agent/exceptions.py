@@ -158,3 +158,13 @@ class InvalidArgument(RuntimeError):
     def __init__(self, message=None, device=None):
         message = message or self.message % {'device': device}
         super(InvalidArgument, self).__init__(message)
+
+
+class FrrVtySessionError(RuntimeError):
+    message = _("Unable to use the vty socket of FRR daemon %(daemon)s: "
+                "%(reason)s")
+
+    def __init__(self, message=None, daemon=None, reason=None):
+        message = message or self.message % {'daemon': daemon,
+                                             'reason': reason}
+        super(FrrVtySessionError, self).__init__(message)
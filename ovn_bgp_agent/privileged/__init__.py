@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from oslo_log import log as logging
 from oslo_privsep import capabilities
 from oslo_privsep import priv_context
 
+LOG = logging.getLogger(__name__)
+
 default = priv_context.PrivContext(
     __name__,
     cfg_section='privsep',
@@ -40,3 +43,27 @@ vtysh_cmd = priv_context.PrivContext(
     capabilities=[capabilities.CAP_SYS_ADMIN,
                   capabilities.CAP_NET_ADMIN]
 )
+
+
+def run_in_process(context):
+    """Run the entrypoints of a context directly in the agent process
+
+    This skips the privsep daemon (and the IPC of every call), and it is
+    only done if the agent process already has all the capabilities the
+    context would retain, e.g., when running in a container with them.
+
+    :return: (bool) True if the entrypoints will run in the agent process
+    """
+    effective = capabilities.get_caps()[0]
+    missing = [cap for cap in context.conf.capabilities
+               if cap not in effective]
+    if missing:
+        names = [capabilities.CAPS_BYVALUE.get(cap, str(cap))
+                 for cap in missing]
+        LOG.warning("Unable to run %s entrypoints in process, missing "
+                    "capabilities: %s. Using the privsep daemon instead.",
+                    context, ', '.join(names))
+        return False
+    context.set_client_mode(False)
+    LOG.info("Running %s entrypoints in the agent process", context)
+    return True
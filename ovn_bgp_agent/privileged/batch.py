@@ -0,0 +1,160 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import importlib
+
+from neutron_lib._i18n import _
+from oslo_log import log as logging
+
+import ovn_bgp_agent.privileged
+
+LOG = logging.getLogger(__name__)
+
+BATCH_RET = 'ret'
+BATCH_ERR = 'err'
+
+
+def _import_class(name):
+    module, _, attr = name.rpartition('.')
+    return getattr(importlib.import_module(module), attr)
+
+
+def _run_calls(context, calls):
+    results = []
+    for name, args, kwargs in calls:
+        try:
+            func = _import_class(name)
+            if not context.is_entrypoint(func):
+                raise NameError(
+                    _("Invalid privsep function: %s not exported") % name)
+            results.append((BATCH_RET, func(*args, **kwargs)))
+        except Exception as e:
+            LOG.debug("Exception running batched call %s: %s", name, e)
+            cls = e.__class__
+            results.append((BATCH_ERR,
+                            '{}.{}'.format(cls.__module__, cls.__name__),
+                            e.args))
+    return results
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def run_default_batch(calls):
+    return _run_calls(ovn_bgp_agent.privileged.default, calls)
+
+
+@ovn_bgp_agent.privileged.ovs_vsctl_cmd.entrypoint
+def run_ovs_vsctl_batch(calls):
+    return _run_calls(ovn_bgp_agent.privileged.ovs_vsctl_cmd, calls)
+
+
+@ovn_bgp_agent.privileged.vtysh_cmd.entrypoint
+def run_vtysh_batch(calls):
+    return _run_calls(ovn_bgp_agent.privileged.vtysh_cmd, calls)
+
+
+_BATCH_ENTRYPOINTS = {
+    ovn_bgp_agent.privileged.default: run_default_batch,
+    ovn_bgp_agent.privileged.ovs_vsctl_cmd: run_ovs_vsctl_batch,
+    ovn_bgp_agent.privileged.vtysh_cmd: run_vtysh_batch,
+}
+
+
+def _get_entrypoint_name(func):
+    # Entrypoints are a partial of the context wrapper and the decorated
+    # function, the same name privsep uses for single calls is built
+    if isinstance(func, functools.partial):
+        func = func.args[0]
+    return '{}.{}'.format(func.__module__, func.__name__)
+
+
+def _translate_result(result):
+    if result[0] == BATCH_RET:
+        return result[1]
+    # Same translation privsep does for the exceptions of single calls
+    exc_type = _import_class(result[1])
+    return exc_type(*result[2])
+
+
+class Batch(object):
+    """Privileged calls to be run at once by the privsep daemon
+
+    Calls are queued with add() and sent as a single message when executed,
+    the daemon runs them in order and returns all the results. This saves
+    a round trip (and context switches) per call when there are many
+    independent calls to do, e.g., while syncing.
+
+    When the context is not in client mode (i.e., already running with
+    privileges) the calls are just run in order.
+
+    It can also be used as a context manager, running the calls queued
+    inside the block on exit and leaving their results at self.results.
+    """
+
+    def __init__(self, context=ovn_bgp_agent.privileged.default):
+        self.context = context
+        self.results = None
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.results = self.execute()
+        else:
+            self._calls = []
+
+    def __len__(self):
+        return len(self._calls)
+
+    def add(self, func, *args, **kwargs):
+        """Queue a call to a privileged entrypoint of the batch context"""
+        self._calls.append((func, args, kwargs))
+
+    def execute(self):
+        """Run the queued calls
+
+        :return: (list) result of each call, in the same order they were
+                 added, or the exception raised by it
+        """
+        calls, self._calls = self._calls, []
+        if not calls:
+            return []
+        if not self.context.client_mode:
+            results = []
+            for func, args, kwargs in calls:
+                try:
+                    results.append(func(*args, **kwargs))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        request = []
+        for func, args, kwargs in calls:
+            if not self.context.is_entrypoint(func):
+                raise TypeError(_("%(func)r is not an entrypoint of "
+                                  "%(context)r") % {'func': func,
+                                                    'context': self.context})
+            request.append((_get_entrypoint_name(func), args, kwargs))
+        return [_translate_result(result)
+                for result in _BATCH_ENTRYPOINTS[self.context](request)]
+
+
+def raise_on_error(results):
+    """Raise the first exception found on the results of a batch"""
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results
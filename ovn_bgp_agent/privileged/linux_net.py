@@ -13,10 +13,9 @@
 # limitations under the License.
 
 import errno
-import ipaddress
+import json
 import os
-
-import netaddr
+import socket
 
 from oslo_concurrency import processutils
 from oslo_log import log as logging
@@ -26,18 +25,27 @@ from pyroute2 import netlink as pyroute_netlink
 from pyroute2.netlink import exceptions as netlink_exceptions
 from pyroute2.netlink import rtnl
 from pyroute2.netlink.rtnl import ndmsg
+from pyroute2.netlink.rtnl import rtmsg
+from pyroute2.requests import main as pyroute2_requests
 import tenacity
 
 import ovn_bgp_agent
 from ovn_bgp_agent import constants
 from ovn_bgp_agent import exceptions as agent_exc
 from ovn_bgp_agent.utils import common as common_utils
+from ovn_bgp_agent.utils import ip_parser
 from ovn_bgp_agent.utils import linux_net as l_net
 
 LOG = logging.getLogger(__name__)
 
 NUD_STATES = {state[1]: state[0] for state in ndmsg.states.items()}
 
+SYSCTL_DIR = '/proc/sys'
+
+# Values set through set_kernel_flag(s), keyed by /proc/sys path, together
+# with the index of the device the flag belongs to (if any)
+_kernel_flags_cache = {}
+
 
 def get_scope_name(scope):
     """Return the name of the scope or the scope number if the name is unknown.
@@ -147,6 +155,14 @@ def delete_device(device):
 
 @ovn_bgp_agent.privileged.default.entrypoint
 def route_create(route):
+    if route.get('nh_id'):
+        with iproute.IPRoute() as ip:
+            try:
+                ip.nlm_request_batch([_get_nexthop_route_msg(route)])
+            except netlink_exceptions.NetlinkError as e:
+                _translate_ip_route_exception(e, route)
+        return
+    route.pop('nh_id', None)
     scope = route.pop('scope', 'link')
     route['scope'] = get_scope_name(scope)
     if 'family' not in route:
@@ -154,25 +170,289 @@ def route_create(route):
     _run_iproute_route('replace', **route)
 
 
-@ovn_bgp_agent.privileged.default.entrypoint
-def route_delete(route):
+def _get_route_delete_args(route):
+    if route.pop('nh_id', None) is not None:
+        # Routes pointing to a nexthop object do not match a delete request
+        # with oif or gateway, they are identified by their prefix
+        route.pop('oif', None)
+        route.pop('gateway', None)
     scope = route.pop('scope', 'link')
     route['scope'] = get_scope_name(scope)
     if 'family' not in route:
         route['family'] = constants.AF_INET
-    _run_iproute_route('del', **route)
+    return route
 
 
 @ovn_bgp_agent.privileged.default.entrypoint
-def set_kernel_flag(flag, value):
-    command = ["sysctl", "-w", "{}={}".format(flag, value)]
+def route_delete(route):
+    _run_iproute_route('del', **_get_route_delete_args(route))
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def delete_routes(routes):
+    with iproute.IPRoute() as ip:
+        for route in routes:
+            route = _get_route_delete_args(route)
+            try:
+                ip.route('del', **route)
+            except netlink_exceptions.NetlinkError as e:
+                _translate_ip_route_exception(e, route)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def flush_routes(table, proto):
+    """Remove all the routes of a table tagged with the given protocol"""
+    with iproute.IPRoute() as ip:
+        for family in (constants.AF_INET, constants.AF_INET6):
+            ip.flush_routes(table=table, proto=proto, family=family)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def register_routes_protocol(proto, name):
+    path = os.path.join(constants.ROUTING_PROTOS_DIR, '{}.conf'.format(name))
+    entry = '{} {}\n'.format(proto, name)
+    try:
+        with open(path, 'r') as rt_protos:
+            if rt_protos.read() == entry:
+                return
+    except FileNotFoundError:
+        pass
     try:
-        return processutils.execute(*command)
-    except Exception as e:
+        os.makedirs(constants.ROUTING_PROTOS_DIR, exist_ok=True)
+        with open(path, 'w') as rt_protos:
+            rt_protos.write(entry)
+    except OSError as e:
+        # Only needed to show the protocol name instead of its number
+        LOG.warning("Unable to register routes protocol %s as %s at %s: %s",
+                    proto, name, path, e)
+
+
+def _run_ip_command(*args):
+    # NOTE: pyroute2 does not dump nexthop objects (RTM_GETNEXTHOP), so
+    # iproute2 is used to list them
+    command = ['ip'] + list(args)
+    env = dict(os.environ)
+    env['LC_ALL'] = 'C'
+    try:
+        return processutils.execute(*command, env_variables=env)[0]
+    except processutils.ProcessExecutionError as e:
         LOG.error("Unable to execute %s. Exception: %s", command, e)
         raise
 
 
+class _NexthopRouteMsg(rtmsg.rtmsg):
+    # Route pointing to a nexthop object, RTA_NH_ID is not known by all the
+    # pyroute2 versions
+    nla_map = ((1, 'RTA_DST', 'target'),
+               (15, 'RTA_TABLE', 'uint32'),
+               (constants.RTA_NH_ID, 'RTA_NH_ID', 'uint32'))
+    # pyroute2 flags the compiled nla_map on the class, it must not be
+    # inherited from rtmsg, or its map would be used instead of this one
+    _nlmsg_base__compiled_nla = False
+
+
+def _get_nexthop_route_msg(route):
+    msg = _NexthopRouteMsg()
+    msg['header']['type'] = rtnl.RTM_NEWROUTE
+    msg['header']['flags'] = (pyroute_netlink.NLM_F_REQUEST |
+                              pyroute_netlink.NLM_F_ACK |
+                              pyroute_netlink.NLM_F_CREATE |
+                              pyroute_netlink.NLM_F_REPLACE)
+    msg['family'] = route.get('family', constants.AF_INET)
+    msg['dst_len'] = route['dst_len']
+    # Tables over 255 only fit in the RTA_TABLE attribute
+    msg['table'] = route['table'] if route['table'] < 256 else 252
+    msg['proto'] = route.get('proto', 0)
+    msg['scope'] = 0  # universe
+    msg['type'] = 1  # unicast
+    msg['attrs'] = [('RTA_DST', route['dst']),
+                    ('RTA_TABLE', route['table']),
+                    ('RTA_NH_ID', route['nh_id'])]
+    return msg
+
+
+class _NexthopMsg(pyroute_netlink.nlmsg):
+    # Nexthop object (RTM_NEWNEXTHOP), not known by all the pyroute2
+    # versions
+    fields = (('family', 'B'),
+              ('scope', 'B'),
+              ('protocol', 'B'),
+              ('resvd', 'B'),
+              ('flags', 'I'))
+    nla_map = ((constants.NHA_ID, 'NHA_ID', 'uint32'),
+               (constants.NHA_OIF, 'NHA_OIF', 'uint32'),
+               (constants.NHA_GATEWAY, 'NHA_GATEWAY', 'target'))
+
+
+def _get_nexthop_msg(msg_type, nh_id, attrs=(), flags=0):
+    msg = _NexthopMsg()
+    msg['header']['type'] = msg_type
+    msg['header']['flags'] = (pyroute_netlink.NLM_F_REQUEST |
+                              pyroute_netlink.NLM_F_ACK | flags)
+    msg['attrs'] = [('NHA_ID', nh_id)] + list(attrs)
+    return msg
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def nexthop_replace(nh_id, gateway, oif, proto):
+    """Create a nexthop object, or update the gateway of an existing one
+
+    The routes pointing to the nexthop follow it, so a gateway change is a
+    single netlink request regardless of the number of routes using it.
+    """
+    msg = _get_nexthop_msg(
+        constants.RTM_NEWNEXTHOP, nh_id,
+        attrs=[('NHA_OIF', oif), ('NHA_GATEWAY', gateway)],
+        flags=pyroute_netlink.NLM_F_CREATE | pyroute_netlink.NLM_F_REPLACE)
+    msg['family'] = common_utils.IP_VERSION_FAMILY_MAP[
+        ip_parser.parse_ip(gateway).version]
+    msg['protocol'] = proto
+    with iproute.IPRoute() as ip:
+        ip.nlm_request_batch([msg])
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def nexthop_delete(nh_id):
+    # NOTE: the kernel removes the routes still using the nexthop
+    with iproute.IPRoute() as ip:
+        try:
+            ip.nlm_request_batch([_get_nexthop_msg(constants.RTM_DELNEXTHOP,
+                                                   nh_id)])
+        except netlink_exceptions.NetlinkError as e:
+            if e.code != errno.ENOENT:
+                raise
+            LOG.debug("Nexthop %s already deleted", nh_id)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def get_nexthops(proto):
+    output = _run_ip_command('-j', 'nexthop', 'show', 'protocol',
+                             str(proto))
+    return json.loads(output or '[]')
+
+
+def _get_exposed_route(ip_address, oif, table, proto):
+    ip_version = l_net.get_ip_version(ip_address)
+    route = {'dst': ip_address,
+             'dst_len': 32 if ip_version == constants.IP_VERSION_4 else 128,
+             'family': common_utils.IP_VERSION_FAMILY_MAP[ip_version],
+             'oif': oif,
+             'table': table,
+             'proto': proto}
+    if ip_version == constants.IP_VERSION_4:
+        route['scope'] = get_scope_name('link')
+    return route
+
+
+def _modify_exposed_routes(command, ips, nic, table, proto):
+    with iproute.IPRoute() as ip:
+        oif = _get_link_id(nic, raise_exception=(command != 'del'))
+        if not oif:
+            return
+        for ip_address in ips:
+            route = _get_exposed_route(ip_address, oif, table, proto)
+            try:
+                ip.route(command, **route)
+            except netlink_exceptions.NetlinkError as e:
+                _translate_ip_route_exception(e, route)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def add_exposed_routes(ips, nic, table, proto):
+    _modify_exposed_routes('replace', ips, nic, table, proto)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def delete_exposed_routes(ips, nic, table, proto):
+    _modify_exposed_routes('del', ips, nic, table, proto)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def get_exposed_routes(nic, table, proto):
+    """Return the IPs exposed as host routes through a device
+
+    :param nic: (string) device the routes go through
+    :param table: (int) routing table of the routes
+    :param proto: (int) protocol of the routes
+    :return: (list) destination IPs of the /32 and /128 routes
+    """
+    oif = _get_link_id(nic, raise_exception=False)
+    if not oif:
+        return []
+    ips = []
+    # NOTE: the explicit dump_filter makes pyroute2 send the filters to
+    # the kernel, which only honors them on strict checking sockets
+    with iproute.IPRoute(strict_check=True) as ip:
+        for family in common_utils.IP_VERSION_FAMILY_MAP.values():
+            for route in ip.route('dump', family=family, table=table,
+                                  oif=oif, proto=proto, dump_filter={}):
+                if route['dst_len'] in (32, 128):
+                    ips.append(get_attr(route, 'RTA_DST'))
+    return ips
+
+
+def _get_sysctl_path(flag):
+    # Same translation as sysctl: dots separate the path components and
+    # slashes stand for dots inside a component (e.g. vlan devices)
+    return os.path.join(SYSCTL_DIR, *[part.replace('/', '.')
+                                      for part in flag.split('.')])
+
+
+def _get_sysctl_device_index(flag):
+    # Only net.ipv{4,6}.{conf,neigh}.<device>.<key> flags belong to a device
+    parts = flag.split('.')
+    if (len(parts) != 5 or parts[:2] not in (['net', 'ipv4'],
+                                             ['net', 'ipv6']) or
+            parts[2] not in ('conf', 'neigh') or
+            parts[3] in ('all', 'default')):
+        return None
+    try:
+        return socket.if_nametoindex(parts[3].replace('/', '.'))
+    except OSError:
+        return None
+
+
+def _set_kernel_flag(flag, value):
+    value = str(value)
+    path = _get_sysctl_path(flag)
+    ifindex = _get_sysctl_device_index(flag)
+    # Cached values are only valid for the same device, a re-created device
+    # gets a new index and its flags are read again
+    if _kernel_flags_cache.get(path) == (value, ifindex):
+        return
+    try:
+        with open(path) as f:
+            current = f.read().strip()
+        if current != value:
+            LOG.debug("Setting sysctl %s=%s", flag, value)
+            with open(path, 'w') as f:
+                f.write(value)
+    except (IOError, OSError) as e:
+        LOG.error("Unable to set sysctl %s=%s. Exception: %s", flag, value,
+                  e)
+        _kernel_flags_cache.pop(path, None)
+        raise
+    _kernel_flags_cache[path] = (value, ifindex)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def set_kernel_flag(flag, value):
+    _set_kernel_flag(flag, value)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def set_kernel_flags(flags):
+    """Set several sysctl flags
+
+    Flags already holding the requested value are not written.
+
+    :param flags: (list) (flag, value) tuples, e.g.
+                  [('net.ipv4.conf.all.forwarding', 1)]
+    """
+    for flag, value in flags:
+        _set_kernel_flag(flag, value)
+
+
 @ovn_bgp_agent.privileged.default.entrypoint
 def delete_exposed_ips(ips, nic):
     for ip_address in ips:
@@ -192,45 +472,109 @@ def rule_delete(rule):
 @ovn_bgp_agent.privileged.default.entrypoint
 def delete_ip_rules(ip_rules):
     for rule_ip, rule_info in ip_rules.items():
-        rule = l_net.create_rule_from_ip(rule_ip, int(rule_info['table']))
+        if 'suppress_prefixlength' in rule_info:
+            rule = l_net.create_aggregated_rule(int(rule_info['table']),
+                                                rule_info['family'])
+        else:
+            rule = l_net.create_rule_from_ip(rule_ip,
+                                             int(rule_info['table']))
         _run_iproute_rule('del', **rule)
 
 
-@ovn_bgp_agent.privileged.default.entrypoint
-def add_ndp_proxy(ip, dev, vlan=None):
-    # FIXME(ltomasbo): This should use pyroute instead but I didn't find
-    # out how
-    net_ip = str(ipaddress.IPv6Network(ip, strict=False).network_address)
-    dev_name = dev
+def _get_ndp_proxy_device(dev, vlan=None):
     if vlan:
-        dev_name = "{}.{}".format(dev, vlan)
-    command = ["ip", "-6", "nei", "add", "proxy", net_ip, "dev", dev_name]
+        return "{}.{}".format(dev, vlan)
+    return dev
+
+
+def _get_ndp_proxy_address(ip):
+    return ip_parser.parse_ip(ip).network
+
+
+def _run_iproute_ndp_proxy(ip, command, ifindex, address):
     try:
-        return processutils.execute(*command)
-    except Exception as e:
-        LOG.error("Unable to execute %s. Exception: %s", command, e)
+        ip.neigh(command, dst=address, ifindex=ifindex,
+                 family=socket.AF_INET6, flags=ndmsg.NTF_PROXY)
+    except netlink_exceptions.NetlinkError as e:
+        if command == 'del' and e.code == errno.ENOENT:
+            LOG.debug("NDP proxy for %s already deleted", address)
+            return
         raise
 
 
+def _dump_ndp_proxies(ip, ifindex):
+    # Proxy entries are only dumped when the request carries the
+    # NTF_PROXY flag, which the neigh dump helper does not set
+    context = {'family': socket.AF_INET6, 'flags': ndmsg.NTF_PROXY}
+    request_filter = pyroute2_requests.RequestProcessor(context=context,
+                                                        prime=context)
+    request_filter.finalize()
+    entries = ip.neigh('dump', family=socket.AF_INET6,
+                       request_filter=request_filter,
+                       dump_filter=lambda msg: msg['ifindex'] == ifindex)
+    return [get_attr(entry, 'NDA_DST') for entry in entries]
+
+
+def _modify_ndp_proxies(command, ips, dev, vlan=None):
+    dev_name = _get_ndp_proxy_device(dev, vlan)
+    addresses = {_get_ndp_proxy_address(ip) for ip in ips}
+    with iproute.IPRoute() as ip:
+        ifindex = _get_link_id(dev_name, raise_exception=(command != 'del'))
+        if not ifindex:
+            return
+        for address in addresses:
+            _run_iproute_ndp_proxy(ip, command, ifindex, address)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def add_ndp_proxy(ip, dev, vlan=None):
+    _modify_ndp_proxies('replace', [ip], dev, vlan)
+
+
 @ovn_bgp_agent.privileged.default.entrypoint
 def del_ndp_proxy(ip, dev, vlan=None):
-    # FIXME(ltomasbo): This should use pyroute instead but I didn't find
-    # out how
-    net_ip = str(ipaddress.IPv6Network(ip, strict=False).network_address)
-    dev_name = dev
-    if vlan:
-        dev_name = "{}.{}".format(dev, vlan)
-    command = ["ip", "-6", "nei", "del", "proxy", net_ip, "dev", dev_name]
-    env = dict(os.environ)
-    env['LC_ALL'] = 'C'
-    try:
-        return processutils.execute(*command, env_variables=env)
-    except Exception as e:
-        if "No such file or directory" in e.stderr:
-            # Already deleted
-            return
-        LOG.error("Unable to execute %s. Exception: %s", command, e)
-        raise
+    _modify_ndp_proxies('del', [ip], dev, vlan)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def add_ndp_proxies(ips, dev, vlan=None):
+    _modify_ndp_proxies('replace', ips, dev, vlan)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def del_ndp_proxies(ips, dev, vlan=None):
+    _modify_ndp_proxies('del', ips, dev, vlan)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def get_ndp_proxies(dev, vlan=None):
+    dev_name = _get_ndp_proxy_device(dev, vlan)
+    with iproute.IPRoute() as ip:
+        ifindex = _get_link_id(dev_name, raise_exception=False)
+        if not ifindex:
+            return []
+        return _dump_ndp_proxies(ip, ifindex)
+
+
+@ovn_bgp_agent.privileged.default.entrypoint
+def sync_ndp_proxies(ips, dev, vlan=None):
+    """Make the NDP proxy entries of a device match the given ones
+
+    Missing entries are added and the ones not in ips are removed.
+
+    :param ips: (list) IPv6 addresses or CIDRs (the network address is used)
+    :param dev: (string) device name
+    :param vlan: (int) vlan of the device, if any
+    """
+    dev_name = _get_ndp_proxy_device(dev, vlan)
+    desired = {_get_ndp_proxy_address(ip) for ip in ips}
+    with iproute.IPRoute() as ip:
+        ifindex = _get_link_id(dev_name)
+        current = set(_dump_ndp_proxies(ip, ifindex))
+        for address in desired - current:
+            _run_iproute_ndp_proxy(ip, 'replace', ifindex, address)
+        for address in current - desired:
+            _run_iproute_ndp_proxy(ip, 'del', ifindex, address)
 
 
 @ovn_bgp_agent.privileged.default.entrypoint
@@ -257,12 +601,12 @@ def add_ip_nei(ip, lladdr, dev):
 
 @ovn_bgp_agent.privileged.default.entrypoint
 def del_ip_nei(ip, lladdr, dev):
-    ip_network = netaddr.IPNetwork(ip)
-    family = common_utils.IP_VERSION_FAMILY_MAP[ip_network.version]
+    parsed_ip = ip_parser.parse_ip(ip)
+    family = common_utils.IP_VERSION_FAMILY_MAP[parsed_ip.version]
 
     _run_iproute_neigh('del',
                        dev,
-                       dst=str(ip_network.ip),
+                       dst=parsed_ip.address,
                        lladdr=lladdr,
                        family=family,
                        state=ndmsg.states['permanent'])
@@ -321,9 +665,26 @@ def add_unreachable_route(vrf_name):
 
 
 @ovn_bgp_agent.privileged.default.entrypoint
-def create_routing_table_for_bridge(table_number, bridge):
-    with open('/etc/iproute2/rt_tables', 'a') as rt_tables:
-        rt_tables.write('{} {}\n'.format(table_number, bridge))
+def set_routing_tables(tables, name):
+    """Write the routing tables names owned by the agent
+
+    :param tables: (dict) routing table name -> number
+    :param name: (string) name of the file at rt_tables.d
+    """
+    path = os.path.join(constants.ROUTING_TABLES_DIR, '{}.conf'.format(name))
+    if not tables:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    os.makedirs(constants.ROUTING_TABLES_DIR, exist_ok=True)
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'w') as rt_tables:
+        for table_name, table in sorted(tables.items(),
+                                        key=lambda t: t[1]):
+            rt_tables.write('{} {}\n'.format(table, table_name))
+    os.replace(tmp_path, path)
 
 
 def _translate_ip_device_exception(e, device):
@@ -561,12 +922,11 @@ def set_brport_attribute(ifname, **kwargs):
 @ovn_bgp_agent.privileged.default.entrypoint
 def add_ip_address(ip_address, ifname, prefixlen=None, **kwargs):
     ifname = ifname[:15]
-    net = netaddr.IPNetwork(ip_address)
-    ip_version = l_net.get_ip_version(ip_address)
-    address = str(net.ip)
+    parsed_ip = ip_parser.parse_ip(ip_address)
+    address = parsed_ip.address
     if not prefixlen:
-        prefixlen = 32 if ip_version == 4 else 128
-    family = common_utils.IP_VERSION_FAMILY_MAP[ip_version]
+        prefixlen = 32 if parsed_ip.version == 4 else 128
+    family = common_utils.IP_VERSION_FAMILY_MAP[parsed_ip.version]
     _run_iproute_addr('add',
                       ifname,
                       address=address,
@@ -577,12 +937,11 @@ def add_ip_address(ip_address, ifname, prefixlen=None, **kwargs):
 @ovn_bgp_agent.privileged.default.entrypoint
 def delete_ip_address(ip_address, ifname, prefixlen=None, **kwargs):
     ifname = ifname[:15]
-    net = netaddr.IPNetwork(ip_address)
-    ip_version = l_net.get_ip_version(ip_address)
-    address = str(net.ip)
+    parsed_ip = ip_parser.parse_ip(ip_address)
+    address = parsed_ip.address
     if not prefixlen:
-        prefixlen = 32 if ip_version == 4 else 128
-    family = common_utils.IP_VERSION_FAMILY_MAP[ip_version]
+        prefixlen = 32 if parsed_ip.version == 4 else 128
+    family = common_utils.IP_VERSION_FAMILY_MAP[parsed_ip.version]
     _run_iproute_addr("delete",
                       ifname,
                       address=address,
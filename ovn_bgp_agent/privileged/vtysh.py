@@ -12,14 +12,44 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import socket
+import threading
+import time
+
 from oslo_concurrency import processutils
 from oslo_log import log as logging
 
 from ovn_bgp_agent import constants
+from ovn_bgp_agent import exceptions as agent_exc
 import ovn_bgp_agent.privileged.vtysh
 
 LOG = logging.getLogger(__name__)
 
+# FRR daemons the agent talks to through their vty sockets.
+VTY_ZEBRA = 'zebra'
+VTY_BGPD = 'bgpd'
+
+# Daemon(s) owning each top level configuration stanza, the same way vtysh
+# dispatches them when reading a configuration file.
+VTY_STANZA_DAEMONS = (
+    ('router bgp', (VTY_BGPD,)),
+    ('no router bgp', (VTY_BGPD,)),
+    ('vrf', (VTY_ZEBRA,)),
+    ('no vrf', (VTY_ZEBRA,)),
+    ('interface', (VTY_ZEBRA,)),
+    ('no interface', (VTY_ZEBRA,)),
+)
+
+# A vty reply is terminated by three NUL bytes followed by the status code.
+VTY_REPLY_MARKER = b'\0\0\0'
+VTY_CMD_SUCCESS = 0
+VTY_RECV_SIZE = 4096
+VTY_SOCKET_TIMEOUT = 30
+
+_vty_session = None
+_vty_session_lock = threading.Lock()
+
 
 @ovn_bgp_agent.privileged.vtysh_cmd.entrypoint
 def run_vtysh_config(frr_config_file):
@@ -43,3 +73,260 @@ def run_vtysh_command(command):
         LOG.exception("Unable to execute vtysh with %s. Exception: %s",
                       full_args, e)
         raise
+
+
+def _get_stanza_daemons(stanza_header):
+    for prefix, daemons in VTY_STANZA_DAEMONS:
+        if (stanza_header == prefix or
+                stanza_header.startswith(prefix + ' ')):
+            return daemons
+    return (VTY_ZEBRA,)
+
+
+def split_config_per_daemon(config):
+    """Split a configuration document into the lines for each FRR daemon
+
+    Top level stanzas (lines without indentation) are assigned to the
+    daemon(s) owning them and all the following indented lines, up to the
+    next stanza, travel with them.
+
+    :param config: (string) FRR configuration, as would be passed to
+                   vtysh -f
+    :return: (dict) daemon name -> list of configuration lines
+    """
+    per_daemon = {}
+    daemons = ()
+    for line in config.splitlines():
+        if not line.strip() or line.lstrip().startswith('!'):
+            continue
+        if not line[0].isspace():
+            daemons = _get_stanza_daemons(line.strip())
+        for daemon in daemons:
+            per_daemon.setdefault(daemon, []).append(line.strip())
+    return per_daemon
+
+
+class VtyConnection(object):
+    """Connection to the vty socket of a single FRR daemon
+
+    It speaks the same protocol as vtysh: every command is sent NUL
+    terminated and the daemon answers with the command output followed by
+    VTY_REPLY_MARKER and a one byte status code.
+    """
+
+    def __init__(self, daemon, socket_dir=constants.FRR_SOCKET_PATH):
+        self.daemon = daemon
+        self.path = os.path.join(socket_dir, '{}.vty'.format(daemon))
+        self._sock = None
+        self.last_used = 0
+        self.connects = 0
+        self.commands = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def connect(self):
+        if self._sock:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(VTY_SOCKET_TIMEOUT)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise agent_exc.FrrVtySessionError(daemon=self.daemon,
+                                               reason=str(e))
+        self._sock = sock
+        self.connects += 1
+        LOG.debug("Connected to FRR %s vty socket %s", self.daemon,
+                  self.path)
+        # vty sessions start at the view node
+        self.execute('enable')
+
+    def close(self):
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+
+    def _read_reply(self):
+        data = b''
+        while True:
+            chunk = self._sock.recv(VTY_RECV_SIZE)
+            if not chunk:
+                # Daemon closed the connection, i.e., FRR was restarted
+                raise agent_exc.FrrVtySessionError(
+                    daemon=self.daemon, reason='connection closed by peer')
+            data += chunk
+            idx = data.find(VTY_REPLY_MARKER)
+            if idx != -1 and len(data) > idx + len(VTY_REPLY_MARKER):
+                status = data[idx + len(VTY_REPLY_MARKER)]
+                return status, data[:idx].decode(errors='replace')
+
+    def execute(self, command):
+        """Run a command and return its (status, output)"""
+        start = time.monotonic()
+        try:
+            self._sock.sendall(command.encode() + b'\0')
+            status, output = self._read_reply()
+        except OSError as e:
+            self.close()
+            raise agent_exc.FrrVtySessionError(daemon=self.daemon,
+                                               reason=str(e))
+        except agent_exc.FrrVtySessionError:
+            self.close()
+            raise
+        elapsed = time.monotonic() - start
+        self.last_used = time.time()
+        self.commands += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if status != VTY_CMD_SUCCESS:
+            self.errors += 1
+        return status, output
+
+    def stats(self):
+        return {'connected': self.connected,
+                'connects': self.connects,
+                'commands': self.commands,
+                'errors': self.errors,
+                'total_time': self.total_time,
+                'max_time': self.max_time,
+                'avg_time': (self.total_time / self.commands
+                             if self.commands else 0.0)}
+
+
+class VtySession(object):
+    """Long lived connections to the FRR daemons vty sockets
+
+    Connections are opened lazily, closed by a timer once they were not
+    used for idle_timeout seconds and transparently re-opened (once) if the
+    daemon went away, e.g., due to an FRR restart.
+    """
+
+    def __init__(self, idle_timeout=300, socket_dir=constants.FRR_SOCKET_PATH):
+        self.idle_timeout = idle_timeout
+        self.connections = {
+            daemon: VtyConnection(daemon, socket_dir=socket_dir)
+            for daemon in (VTY_ZEBRA, VTY_BGPD)}
+        self._lock = threading.Lock()
+        self._idle_timer = None
+
+    def _schedule_idle_timer(self):
+        if self._idle_timer:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if not self.idle_timeout or not any(
+                conn.connected for conn in self.connections.values()):
+            return
+        timer = threading.Timer(self.idle_timeout, self._on_idle_timer)
+        timer.daemon = True
+        self._idle_timer = timer
+        timer.start()
+
+    def _on_idle_timer(self):
+        with self._lock:
+            if self._idle_timer is not threading.current_thread():
+                # The connections were used since this timer was armed
+                return
+            self._idle_timer = None
+            self.close()
+
+    def close(self):
+        for conn in self.connections.values():
+            if conn.connected:
+                LOG.debug("Closing idle FRR %s vty connection: %s",
+                          conn.daemon, conn.stats())
+                conn.close()
+
+    def _run_on_daemon(self, daemon, commands):
+        conn = self.connections[daemon]
+        for attempt in (1, 2):
+            try:
+                conn.connect()
+                return [(command, ) + conn.execute(command)
+                        for command in commands]
+            except agent_exc.FrrVtySessionError:
+                if attempt == 2:
+                    raise
+                LOG.info("FRR %s vty connection lost, reconnecting", daemon)
+
+    def run_config(self, config):
+        """Apply an FRR configuration, as vtysh -f would
+
+        All the lines are sent, but FrrVtySessionError is raised if any of
+        them failed, so that the caller can retry or fall back to vtysh.
+        """
+        with self._lock:
+            try:
+                return self._run_config(config)
+            finally:
+                self._schedule_idle_timer()
+
+    def _run_config(self, config):
+        output = []
+        failed = []
+        for daemon, lines in split_config_per_daemon(config).items():
+            start = time.monotonic()
+            results = self._run_on_daemon(
+                daemon, ['configure terminal'] + lines + ['end'])
+            for command, status, out in results:
+                if status != VTY_CMD_SUCCESS:
+                    LOG.error("FRR %s failed to apply '%s' (status %s): %s",
+                              daemon, command, status, out.strip())
+                    failed.append((daemon, command))
+                output.append(out)
+            stats = self.connections[daemon].stats()
+            LOG.debug("Applied %d lines of FRR configuration on %s in "
+                      "%.3f seconds (%.4f seconds per command on average, "
+                      "%.4f at most)", len(lines), daemon,
+                      time.monotonic() - start, stats['avg_time'],
+                      stats['max_time'])
+        if failed:
+            raise agent_exc.FrrVtySessionError(
+                daemon=', '.join(sorted({daemon for daemon, _ in failed})),
+                reason='failed to apply %s' % ', '.join(
+                    "'%s'" % command for _, command in failed))
+        return ''.join(output)
+
+    def run_command(self, command, daemon=VTY_BGPD):
+        with self._lock:
+            try:
+                (_, status, output), = self._run_on_daemon(daemon,
+                                                           [command])
+            finally:
+                self._schedule_idle_timer()
+        if status != VTY_CMD_SUCCESS:
+            raise agent_exc.FrrVtySessionError(
+                daemon=daemon, reason="failed to run '%s' (status %s): %s" % (
+                    command, status, output.strip()))
+        return output
+
+    def stats(self):
+        return {daemon: conn.stats()
+                for daemon, conn in self.connections.items()}
+
+
+def _get_vty_session(idle_timeout):
+    global _vty_session
+    with _vty_session_lock:
+        if _vty_session is None:
+            _vty_session = VtySession(idle_timeout=idle_timeout)
+        _vty_session.idle_timeout = idle_timeout
+        return _vty_session
+
+
+@ovn_bgp_agent.privileged.vtysh_cmd.entrypoint
+def run_vty_session_config(config, idle_timeout=300):
+    return _get_vty_session(idle_timeout).run_config(config)
+
+
+@ovn_bgp_agent.privileged.vtysh_cmd.entrypoint
+def run_vty_session_command(command, idle_timeout=300):
+    return _get_vty_session(idle_timeout).run_command(command)
@@ -0,0 +1,71 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ipaddress
+import time
+
+from oslo_log import log as logging
+from oslo_utils import uuidutils
+
+from ovn_bgp_agent import constants
+from ovn_bgp_agent.drivers.openstack.utils import bgp as bgp_utils
+from ovn_bgp_agent.privileged import linux_net as priv_linux_net
+from ovn_bgp_agent.tests.functional import base as base_functional
+
+LOG = logging.getLogger(__name__)
+
+ADDRESSES = 5000
+TABLE = 4321
+
+
+class AdvertisementBackendTestCase(base_functional.BaseFunctionalTestCase):
+
+    def setUp(self):
+        super(AdvertisementBackendTestCase, self).setUp()
+        self.ips = []
+        for i in range(ADDRESSES // 2):
+            self.ips.append(str(ipaddress.IPv4Address(0xf0000000 + i)))
+            self.ips.append(str(ipaddress.IPv6Address(
+                0xfd000000000000000000000000000000 + i)))
+
+    def _create_bgp_nic(self):
+        dev_name = uuidutils.generate_uuid()[:15]
+        priv_linux_net.create_interface(dev_name, 'dummy')
+        self.addCleanup(priv_linux_net.delete_interface, dev_name)
+        priv_linux_net.set_link_attribute(dev_name, state='up')
+        return dev_name
+
+    def _measure(self, backend):
+        self.flags(advertisement_backend=backend,
+                   bgp_nic=self._create_bgp_nic(), bgp_vrf_table_id=TABLE)
+
+        start = time.monotonic()
+        bgp_utils.announce_ips(self.ips)
+        expose_time = time.monotonic() - start
+
+        start = time.monotonic()
+        exposed_ips = bgp_utils.get_exposed_ips()
+        dump_time = time.monotonic() - start
+
+        self.assertEqual(sorted(self.ips), sorted(exposed_ips))
+        return expose_time, dump_time
+
+    def test_advertisement_backends(self):
+        address_times = self._measure(constants.ADVERTISEMENT_BACKEND_ADDRESS)
+        route_times = self._measure(constants.ADVERTISEMENT_BACKEND_ROUTE)
+
+        LOG.info('Exposing %d IPs: %.3f s with addresses, %.3f s with '
+                 'routes', ADDRESSES, address_times[0], route_times[0])
+        LOG.info('Dumping %d exposed IPs: %.3f s with addresses, %.3f s '
+                 'with routes', ADDRESSES, address_times[1], route_times[1])
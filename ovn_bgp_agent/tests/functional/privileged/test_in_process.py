@@ -0,0 +1,47 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+from oslo_log import log as logging
+
+from ovn_bgp_agent import privileged
+from ovn_bgp_agent.privileged import linux_net
+from ovn_bgp_agent.tests.functional import base as base_functional
+
+LOG = logging.getLogger(__name__)
+
+ITERATIONS = 200
+
+
+class InProcessTestCase(base_functional.BaseFunctionalTestCase):
+
+    def _measure(self, func, *args):
+        # Warm up, so the daemon start is not accounted
+        func(*args)
+        start = time.monotonic()
+        for _ in range(ITERATIONS):
+            func(*args)
+        return (time.monotonic() - start) / ITERATIONS
+
+    def test_latency(self):
+        self.addCleanup(setattr, privileged.default, 'client_mode', True)
+        privsep_latency = self._measure(linux_net.get_link_id, 'lo')
+        if not privileged.run_in_process(privileged.default):
+            self.skipTest('Missing capabilities to run in process')
+        in_process_latency = self._measure(linux_net.get_link_id, 'lo')
+
+        LOG.info('get_link_id latency: %.1f us through privsep, %.1f us in '
+                 'process', privsep_latency * 1e6, in_process_latency * 1e6)
+        self.assertLess(in_process_latency, privsep_latency)
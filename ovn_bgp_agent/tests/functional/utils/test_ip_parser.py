@@ -0,0 +1,59 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ipaddress
+import time
+
+import netaddr
+from oslo_log import log as logging
+
+from ovn_bgp_agent.tests.functional import base as base_functional
+from ovn_bgp_agent.utils import ip_parser
+from ovn_bgp_agent.utils import linux_net
+
+LOG = logging.getLogger(__name__)
+
+ADDRESSES = 100000
+# Times each IP is classified while exposing it, e.g., to build its route
+# and its ip rule
+LOOKUPS = 4
+
+
+class IPParserTestCase(base_functional.BaseFunctionalTestCase):
+
+    def setUp(self):
+        super(IPParserTestCase, self).setUp()
+        ip_parser.cache_clear()
+        self.addCleanup(ip_parser.cache_clear)
+        self.ips = []
+        for i in range(ADDRESSES // 2):
+            self.ips.append(str(ipaddress.IPv4Address(0x0a000000 + i)))
+            self.ips.append(str(ipaddress.IPv6Address(
+                0xfd000000000000000000000000000000 + i)))
+
+    def _measure(self, get_ip_version):
+        start = time.monotonic()
+        for ip in self.ips:
+            for _ in range(LOOKUPS):
+                get_ip_version(ip)
+        return time.monotonic() - start
+
+    def test_get_ip_version(self):
+        netaddr_time = self._measure(lambda ip: netaddr.IPNetwork(ip).version)
+        parser_time = self._measure(linux_net.get_ip_version)
+
+        LOG.info('Classifying %d IPs %d times: %.3f s with netaddr, %.3f s '
+                 'with the IP parser', ADDRESSES, LOOKUPS, netaddr_time,
+                 parser_time)
+        self.assertLess(parser_time, netaddr_time)
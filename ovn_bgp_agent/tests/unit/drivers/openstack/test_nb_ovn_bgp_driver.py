@@ -25,11 +25,14 @@ from ovn_bgp_agent.drivers.openstack.utils import frr
 from ovn_bgp_agent.drivers.openstack.utils import ovn
 from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent.drivers.openstack.utils import wire as wire_utils
+from ovn_bgp_agent.drivers.openstack.watchers import base_watcher
 from ovn_bgp_agent import exceptions
 from ovn_bgp_agent.tests import base as test_base
 from ovn_bgp_agent.tests.unit import fakes
 from ovn_bgp_agent.tests import utils
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import reconciler
+from ovn_bgp_agent.utils import route_ledger
 
 
 CONF = cfg.CONF
@@ -75,12 +78,14 @@ class TestNBOVNBGPDriver(test_base.TestCase):
 
         self.conf_ovsdb_connection = 'tcp:127.0.0.1:6642'
 
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
     @mock.patch.object(linux_net, 'ensure_vrf')
     @mock.patch.object(frr, 'vrf_leak')
     @mock.patch.object(linux_net, 'ensure_ovn_device')
     @mock.patch.object(linux_net, 'delete_routes_from_table')
     def test_start(self, mock_delete_routes_from_table,
-                   mock_ensure_ovn_device, mock_vrf_leak, mock_ensure_vrf):
+                   mock_ensure_ovn_device, mock_vrf_leak, mock_ensure_vrf,
+                   mock_migrate):
         CONF.set_override('clear_vrf_routes_on_startup', True)
         self.addCleanup(CONF.clear_override, 'clear_vrf_routes_on_startup')
         self.mock_ovs_idl.get_own_chassis_name.return_value = 'chassis-name'
@@ -92,7 +97,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
 
         # Verify mock object method calls and arguments
         self.mock_ovs_idl().start.assert_called_once_with(
-            CONF.ovsdb_connection)
+            CONF.ovsdb_connection, events=[])
         self.mock_ovs_idl().get_own_chassis_name.assert_called_once()
         self.mock_ovs_idl().get_own_chassis_id.assert_called_once()
 
@@ -107,13 +112,95 @@ class TestNBOVNBGPDriver(test_base.TestCase):
                                                        CONF.bgp_vrf)
         mock_delete_routes_from_table.assert_called_once_with(
             CONF.bgp_vrf_table_id)
+        mock_migrate.assert_called_once_with(CONF.bgp_vrf_table_id,
+                                             CONF.bgp_nic)
         self.mock_nbdb().start.assert_called_once_with()
 
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
+    @mock.patch.object(linux_net, 'ensure_vrf')
+    @mock.patch.object(frr, 'vrf_leak')
+    @mock.patch.object(linux_net, 'ensure_ovn_device')
+    @mock.patch.object(linux_net, 'delete_routes_from_table')
+    def test_start_warm_restart(self, mock_delete_routes_from_table, *args):
+        CONF.set_override('clear_vrf_routes_on_startup', True)
+        self.addCleanup(CONF.clear_override, 'clear_vrf_routes_on_startup')
+        CONF.set_override('warm_restart', True)
+        self.addCleanup(CONF.clear_override, 'warm_restart')
+
+        with mock.patch.object(self.nb_bgp_driver._warm_restart,
+                               'start') as mock_warm_restart:
+            self.nb_bgp_driver.start()
+
+        # The routes left by the previous run are adopted
+        mock_delete_routes_from_table.assert_not_called()
+        mock_warm_restart.assert_called_once_with(
+            [self.mock_nbdb().start().idl,
+             self.mock_ovs_idl().idl_ovs.idl])
+
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
+    @mock.patch.object(linux_net, 'ensure_vrf')
+    @mock.patch.object(frr, 'vrf_leak')
+    @mock.patch.object(linux_net, 'ensure_ovn_device')
+    def test_start_incremental_reconcile(self, *args):
+        CONF.set_override('full_sync_interval', 3600)
+        self.addCleanup(CONF.clear_override, 'full_sync_interval')
+
+        with mock.patch.object(self.nb_bgp_driver._netlink_monitor,
+                               'start') as mock_monitor_start:
+            self.nb_bgp_driver.start()
+
+        # The kernel and OVS changes are monitored for drift
+        mock_monitor_start.assert_called_once_with()
+        events = self.mock_ovs_idl().start.call_args[1]['events']
+        self.assertEqual(1, len(events))
+        self.assertIsInstance(events[0], base_watcher.BridgePortsUpdateEvent)
+
+    def test_sync_failed(self):
+        with mock.patch.object(self.nb_bgp_driver._reconciler,
+                               'run') as mock_run:
+            mock_run.side_effect = exceptions.ConfOptionRequired(
+                option='fake')
+            self.nb_bgp_driver._dirty.full_sync_started()
+            self.assertRaises(exceptions.ConfOptionRequired,
+                              self.nb_bgp_driver.sync, wait=False)
+
+        # The events are no longer recorded
+        self.nb_bgp_driver._dirty.mark_changed(constants.DIRTY_ROUTER,
+                                               'router1')
+        self.assertEqual(0, len(self.nb_bgp_driver._dirty))
+
+    def test_sync_warm_restart(self):
+        with mock.patch.object(self.nb_bgp_driver._warm_restart,
+                               'wait') as mock_wait, \
+                mock.patch.object(self.nb_bgp_driver._reconciler,
+                                  'run') as mock_run:
+            self.nb_bgp_driver.sync()
+
+        mock_wait.assert_called_once_with()
+        mock_run.assert_called_once_with(
+            self.nb_bgp_driver._sync, mock.ANY,
+            measure=bgp_utils.get_exposed_ips)
+        staged = mock_run.call_args[0][1]
+        self.assertIsInstance(staged, reconciler.StagedState)
+
+    def test_sync_no_wait(self):
+        with mock.patch.object(self.nb_bgp_driver._warm_restart,
+                               'wait') as mock_wait, \
+                mock.patch.object(self.nb_bgp_driver._reconciler,
+                                  'run') as mock_run:
+            self.nb_bgp_driver.sync(wait=False)
+
+        mock_wait.assert_not_called()
+        mock_run.assert_called_once_with(
+            self.nb_bgp_driver._sync, mock.ANY,
+            measure=bgp_utils.get_exposed_ips)
+
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
     @mock.patch.object(linux_net, 'ensure_ovn_device')
     @mock.patch.object(frr, 'vrf_leak')
     @mock.patch.object(linux_net, 'ensure_vrf')
     def test_frr_sync(self, mock_ensure_vrf, mock_vrf_leak,
-                      mock_ensure_ovn_dev):
+                      mock_ensure_ovn_dev, mock_migrate):
         self.nb_bgp_driver.frr_sync()
 
         mock_ensure_vrf.assert_called_once_with(
@@ -123,6 +210,8 @@ class TestNBOVNBGPDriver(test_base.TestCase):
             template=frr.LEAK_VRF_TEMPLATE)
         mock_ensure_ovn_dev.assert_called_once_with(
             CONF.bgp_nic, CONF.bgp_vrf)
+        # The routes are only re-tagged at startup
+        mock_migrate.assert_not_called()
 
     @mock.patch.object(linux_net, 'delete_vlan_device_for_network')
     @mock.patch.object(linux_net, 'get_bridge_vlans')
@@ -190,12 +279,16 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_routing_bridge.return_value = ['fake-route']
         mock_nic_address.return_value = self.mac
         mock_get_patch_ports.return_value = [1, 2]
+        mock_delete_stale_tables = mock.patch.object(
+            linux_net, 'delete_stale_routing_tables').start()
 
         self.nb_idl.get_network_vlan_tags.return_value = [10, 11]
         mock_get_bridge_vlans.side_effect = [[10, 12], [11]]
 
         self.nb_bgp_driver.sync()
 
+        mock_delete_stale_tables.assert_called_once_with({})
+
         expected_calls = [mock.call({}, 'bridge0', CONF.bgp_vrf_table_id),
                           mock.call({}, 'bridge1', CONF.bgp_vrf_table_id)]
         mock_routing_bridge.assert_has_calls(expected_calls)
@@ -232,6 +325,230 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         bridge = set(self.nb_bgp_driver.ovn_bridge_mappings.values()).pop()
         mock_delete_vlan_dev.assert_called_once_with(bridge, 12)
 
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    @mock.patch.object(wire_utils, 'cleanup_wiring')
+    @mock.patch.object(wire_utils, 'ensure_base_wiring_config')
+    def test__sync_events_in_between(self, mock_base_wiring, mock_cleanup,
+                                     mock_exposed_ips):
+        mock_base_wiring.return_value = ({}, {})
+        mock_exposed_ips.return_value = []
+        self.nb_idl.get_active_cr_lrp_on_chassis.return_value = []
+        self.nb_idl.get_active_local_lrps.return_value = []
+        self.nb_idl.get_active_lsp_on_chassis.return_value = []
+        mock_expose_lbs = mock.patch.object(
+            self.nb_bgp_driver, '_expose_lbs').start()
+        mock_ensure_ls_exposed = mock.patch.object(
+            self.nb_bgp_driver, '_ensure_ls_exposed').start()
+        manager = mock.Mock()
+        manager.attach_mock(mock_ensure_ls_exposed, 'ensure_ls_exposed')
+        manager.attach_mock(mock_cleanup, 'cleanup')
+
+        units = self.nb_bgp_driver._sync()
+        next(units)
+        # An event processed while the lock is released
+        self.nb_bgp_driver._dirty.mark_changed(constants.DIRTY_LOGICAL_SWITCH,
+                                               'network1')
+        for _ in units:
+            pass
+
+        mock_expose_lbs.assert_called_once_with(mock.ANY)
+        # The changed objects are reprocessed before the cleanup
+        self.assertEqual(
+            [mock.call.ensure_ls_exposed('network1'),
+             mock.call.cleanup(self.nb_idl, {}, {}, mock.ANY, mock.ANY,
+                               mock.ANY)],
+            manager.mock_calls)
+        self.assertEqual(0, len(self.nb_bgp_driver._dirty))
+
+    def test_reconcile(self):
+        mock_sync = mock.patch.object(self.nb_bgp_driver, 'sync').start()
+        mock_sync_dirty = mock.patch.object(
+            self.nb_bgp_driver, '_sync_dirty').start()
+
+        self.nb_bgp_driver.reconcile()
+
+        mock_sync.assert_called_once_with()
+        mock_sync_dirty.assert_not_called()
+
+    def test_reconcile_full_sync_not_due(self):
+        mock_sync = mock.patch.object(self.nb_bgp_driver, 'sync').start()
+        mock_sync_dirty = mock.patch.object(
+            self.nb_bgp_driver, '_sync_dirty', return_value=1).start()
+        self.nb_bgp_driver._dirty.full_sync_interval = 3600
+        self.nb_bgp_driver._dirty.full_sync_started()
+
+        # The repairs of the incremental reconcile are reported too
+        self.assertEqual(1, self.nb_bgp_driver.reconcile())
+
+        mock_sync.assert_not_called()
+        mock_sync_dirty.assert_called_once_with()
+
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    @mock.patch.object(driver_utils, 'get_port_chassis')
+    def test__sync_dirty(self, mock_get_port_chassis, mock_exposed_ips):
+        # The IP of the port is exposed again
+        mock_exposed_ips.side_effect = ([], ['10.0.0.5'])
+        crlrp_port = fakes.create_object({
+            'name': 'crlrp_port',
+            'external_ids': {constants.OVN_LR_NAME_EXT_ID_KEY: 'router1'}})
+        other_crlrp_port = fakes.create_object({
+            'name': 'other_crlrp_port',
+            'external_ids': {constants.OVN_LR_NAME_EXT_ID_KEY: 'router2'}})
+        port0 = fakes.create_object({'name': 'port-0'})
+        port1 = fakes.create_object({'name': 'port-1'})
+        self.nb_idl.get_active_cr_lrp_on_chassis.return_value = [
+            crlrp_port, other_crlrp_port]
+        self.nb_idl.get_active_lsp.return_value = [port0, port1]
+        mock_get_port_chassis.side_effect = ('fake-chassis', 'other-chassis')
+        mock_ensure_crlrp_exposed = mock.patch.object(
+            self.nb_bgp_driver, '_ensure_crlrp_exposed').start()
+        mock_ensure_lsp_exposed = mock.patch.object(
+            self.nb_bgp_driver, '_ensure_lsp_exposed').start()
+        self.nb_bgp_driver._dirty.mark(constants.DIRTY_ROUTER, 'router1')
+        self.nb_bgp_driver._dirty.mark(constants.DIRTY_LOGICAL_SWITCH,
+                                       'network1')
+
+        self.assertEqual(1, self.nb_bgp_driver._sync_dirty())
+
+        self.nb_idl.get_active_cr_lrp_on_chassis.assert_called_once_with(
+            'fake-chassis-id')
+        mock_ensure_crlrp_exposed.assert_called_once_with(crlrp_port)
+        self.nb_idl.get_active_lsp.assert_called_once_with('network1')
+        mock_ensure_lsp_exposed.assert_called_once_with(port0)
+        self.assertEqual(0, len(self.nb_bgp_driver._dirty))
+
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty_failure(self, mock_exposed_ips):
+        self.nb_idl.get_active_cr_lrp_on_chassis.side_effect = (
+            Exception('boom'))
+        self.nb_bgp_driver._dirty.mark(constants.DIRTY_ROUTER, 'router1')
+
+        self.nb_bgp_driver._sync_dirty()
+
+        # It is retried on the next reconcile
+        self.assertEqual({constants.DIRTY_ROUTER: {'router1'}},
+                         self.nb_bgp_driver._dirty.pop())
+
+    def test__process_dirty_replay_withdrawn(self):
+        self.nb_idl.get_active_lsp.return_value = []
+        mock_withdraw_ip = mock.patch.object(
+            self.nb_bgp_driver, '_withdraw_ip').start()
+        ips_info = {'logical_switch': 'network1', 'type': 'fake-type'}
+        # A withdrawal while a full sync is running
+        self.nb_bgp_driver._dirty.full_sync_started()
+        self.nb_bgp_driver.withdraw_ip(['10.0.0.5'], ips_info)
+        mock_withdraw_ip.reset_mock()
+
+        self.nb_bgp_driver._process_dirty()
+
+        # The withdrawal is replayed on the state rebuilt by the sync
+        mock_withdraw_ip.assert_called_once_with(['10.0.0.5'], ips_info)
+        self.nb_idl.get_active_lsp.assert_called_once_with('network1')
+        self.assertEqual([], self.nb_bgp_driver._dirty.pop_withdrawn())
+
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty_withdrawn_not_replayed(self, mock_exposed_ips):
+        self.nb_idl.get_active_lsp.return_value = []
+        mock_withdraw_ip = mock.patch.object(
+            self.nb_bgp_driver, '_withdraw_ip').start()
+        ips_info = {'logical_switch': 'network1', 'type': 'fake-type'}
+        # A withdrawal recorded by a full sync that failed
+        self.nb_bgp_driver._dirty.full_sync_started()
+        self.nb_bgp_driver.withdraw_ip(['10.0.0.5'], ips_info)
+        self.nb_bgp_driver._dirty.full_sync_finished()
+        mock_withdraw_ip.reset_mock()
+
+        self.nb_bgp_driver._sync_dirty()
+
+        mock_withdraw_ip.assert_not_called()
+        self.nb_idl.get_active_lsp.assert_called_once_with('network1')
+
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty_event_applied(self, mock_exposed_ips):
+        mock.patch.object(self.nb_bgp_driver, 'is_ls_provider',
+                          return_value=False).start()
+        ips_info = {'logical_switch': 'network1', 'type': 'fake-type',
+                    'mac': self.mac, 'cidrs': []}
+        self.nb_bgp_driver.expose_ip([self.ipv4], ips_info)
+
+        # The event already applied the change to the current state
+        self.assertEqual(0, self.nb_bgp_driver._sync_dirty())
+        mock_exposed_ips.assert_not_called()
+        self.nb_idl.get_active_lsp.assert_not_called()
+
+    @mock.patch.object(wire_utils, 'sync_bridge_flows')
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty_bridge(self, mock_exposed_ips, mock_sync_flows):
+        self.nb_bgp_driver.mark_bridge_dirty(self.bridge)
+
+        self.nb_bgp_driver._sync_dirty()
+
+        mock_sync_flows.assert_called_once_with(self.nb_bgp_driver.ovs_flows,
+                                                self.bridge)
+        self.assertEqual(0, len(self.nb_bgp_driver._dirty))
+
+    def _set_kernel_drift(self):
+        self.nb_bgp_driver.ovn_routing_tables_routes = (
+            route_ledger.RouteLedger())
+        route = route_ledger.Route(
+            dev=self.bridge, vlan=None, table=100, dst='10.0.0.0',
+            dst_len=24, oif=5, gateway='172.24.4.11', family=4)
+        self.nb_bgp_driver.ovn_routing_tables_routes.add(
+            route, owner='provider-ls')
+        self.nb_bgp_driver._exposed_ips.add('network1', self.ipv4)
+        self.nb_bgp_driver._exposed_ips.add('network2', self.ipv6)
+        self.nb_bgp_driver._exposed_ips.add('network3', '10.1.0.0/26')
+        self.nb_bgp_driver._exposed_ips.add('network4', self.fip)
+        dirty = self.nb_bgp_driver._dirty
+        dirty.mark(constants.DIRTY_ROUTE, (100, '10.0.0.0', 24))
+        dirty.mark(constants.DIRTY_ROUTE,
+                   (CONF.bgp_vrf_table_id, self.ipv4, 32))
+        dirty.mark(constants.DIRTY_RULE, (200, self.ipv6, 128))
+        dirty.mark(constants.DIRTY_RULE, (200, '10.1.0.0', 26))
+        dirty.mark(constants.DIRTY_ADDRESS, self.fip)
+
+    def test__process_dirty_kernel_drift(self):
+        self._set_kernel_drift()
+        mock_ensure_router_exposed = mock.patch.object(
+            self.nb_bgp_driver, '_ensure_router_exposed').start()
+        mock_ensure_ls_exposed = mock.patch.object(
+            self.nb_bgp_driver, '_ensure_ls_exposed').start()
+
+        self.nb_bgp_driver._process_dirty()
+
+        # The router with its gateway port on the provider switch too
+        mock_ensure_router_exposed.assert_called_once_with('router1')
+        self.assertCountEqual(
+            [mock.call('provider-ls'), mock.call('network1'),
+             mock.call('network2'), mock.call('network3'),
+             mock.call('network4')],
+            mock_ensure_ls_exposed.call_args_list)
+        self.assertEqual(0, len(self.nb_bgp_driver._dirty))
+
+    def test__process_dirty_kernel_drift_not_exposed(self):
+        self.nb_bgp_driver.ovn_routing_tables_routes = (
+            route_ledger.RouteLedger())
+        dirty = self.nb_bgp_driver._dirty
+        # Removed by the agent itself, as no longer exposed
+        dirty.mark(constants.DIRTY_ROUTE, (100, '10.0.0.0', 24))
+        dirty.mark(constants.DIRTY_RULE, (200, self.ipv6, 128))
+        dirty.mark(constants.DIRTY_ADDRESS, self.fip)
+        mock_ensure_router_exposed = mock.patch.object(
+            self.nb_bgp_driver, '_ensure_router_exposed').start()
+        mock_ensure_ls_exposed = mock.patch.object(
+            self.nb_bgp_driver, '_ensure_ls_exposed').start()
+
+        self.nb_bgp_driver._process_dirty()
+
+        mock_ensure_router_exposed.assert_not_called()
+        mock_ensure_ls_exposed.assert_not_called()
+
+    def test__sync_dirty_nothing_changed(self):
+        self.assertEqual(0, self.nb_bgp_driver._sync_dirty())
+
+        self.nb_idl.get_active_cr_lrp_on_chassis.assert_not_called()
+        self.nb_idl.get_active_lsp.assert_not_called()
+
     def test__ensure_lsp_exposed_fip(self):
         port0 = fakes.create_object({
             'name': 'port-0',
@@ -393,7 +710,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_wire_provider_port.assert_called_once_with(
             self.ovn_routing_tables_routes, {}, port_ips, bridge_device,
             bridge_vlan, 'fake-localnet', self.ovn_routing_tables,
-            proxy_cidrs, mac='fake-mac', ovn_idl=mock.ANY)
+            proxy_cidrs, mac='fake-mac', ovn_idl=mock.ANY, owner='test-ls')
         mock_announce_ips.assert_called_once_with(port_ips)
 
     @mock.patch.object(wire_utils, 'wire_provider_port')
@@ -413,7 +730,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_wire_provider_port.assert_called_once_with(
             self.ovn_routing_tables_routes, {}, port_ips, bridge_device,
             bridge_vlan, 'fake-localnet', self.ovn_routing_tables, proxy_cidrs,
-            mac='fake-mac', ovn_idl=mock.ANY)
+            mac='fake-mac', ovn_idl=mock.ANY, owner='test-ls')
         mock_announce_ips.assert_not_called()
 
     @mock.patch.object(wire_utils, 'unwire_provider_port')
@@ -432,7 +749,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_unwire_provider_port.assert_called_once_with(
             self.ovn_routing_tables_routes, port_ips, bridge_device,
             bridge_vlan, self.ovn_routing_tables, proxy_cidrs,
-            ovn_idl=mock.ANY)
+            ovn_idl=mock.ANY, owner='test-ls')
 
     def test__get_bridge_for_localnet_port(self):
         localnet = fakes.create_object({
@@ -455,13 +772,15 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         self.assertEqual(bridge_vlan, None)
 
     def test_is_ip_exposed(self):
-        self.nb_bgp_driver._exposed_ips['fake-switch'] = {'fake-ip': {}}
+        self.nb_bgp_driver._exposed_ips.add('fake-switch', self.ipv4)
         self.assertTrue(self.nb_bgp_driver.is_ip_exposed('fake-switch',
-                                                         'fake-ip'))
+                                                         self.ipv4))
+        self.assertTrue(self.nb_bgp_driver.is_ip_exposed(
+            'fake-switch', [self.ipv6, self.ipv4]))
         self.assertFalse(self.nb_bgp_driver.is_ip_exposed('no-switch',
-                                                          'fake-ip'))
+                                                          self.ipv4))
         self.assertFalse(self.nb_bgp_driver.is_ip_exposed('fake-switch',
-                                                          'other-ip'))
+                                                          self.ipv6))
 
     def _test_expose_ip(self, ips, ips_info):
         mock_expose_provider_port = mock.patch.object(
@@ -491,8 +810,18 @@ class TestNBOVNBGPDriver(test_base.TestCase):
             mock_expose_ovn_lb_fip = mock.patch.object(
                 self.nb_bgp_driver, '_expose_ovn_lb_fip').start()
 
+        # The changes are only recorded while a full sync is running
+        self.nb_bgp_driver._dirty.full_sync_started()
         self.nb_bgp_driver.expose_ip(ips, ips_info)
 
+        dirty = self.nb_bgp_driver._dirty.pop()
+        if ips_info['type'] == constants.OVN_CR_LRP_PORT_TYPE:
+            self.assertEqual({ips_info.get('router')} - {None},
+                             dirty.get(constants.DIRTY_ROUTER, set()))
+        else:
+            self.assertEqual({ips_info['logical_switch']} - {None},
+                             dirty.get(constants.DIRTY_LOGICAL_SWITCH, set()))
+
         if not ips_info['logical_switch']:
             mock_expose_provider_port.assert_not_called()
             mock_get_ls_localnet_info.assert_not_called()
@@ -565,9 +894,57 @@ class TestNBOVNBGPDriver(test_base.TestCase):
             'logical_switch': 'test-ls',
             'router': 'router1'
         }
+        self.nb_bgp_driver.ovn_local_cr_lrps = {}
 
         self._test_expose_ip(ips, ips_info)
 
+    @mock.patch.object(wire_utils, 'update_lrp_port_gateway')
+    def test_expose_ip_router_new_ips(self, mock_update_gateway):
+        mock_withdraw_provider_port = mock.patch.object(
+            self.nb_bgp_driver, '_withdraw_provider_port').start()
+        ips = ['172.24.4.12', self.ipv6]
+        ips_info = {
+            'mac': 'fake-mac',
+            'cidrs': ['test-cidr'],
+            'type': constants.OVN_CR_LRP_PORT_TYPE,
+            'logical_switch': 'provider-ls',
+            'router': 'router1'
+        }
+        mock.patch.object(self.nb_bgp_driver, '_get_ls_localnet_info',
+                          return_value=('fake-localnet', self.bridge,
+                                        100)).start()
+        mock_expose_provider_port = mock.patch.object(
+            self.nb_bgp_driver, '_expose_provider_port').start()
+        mock_expose_subnet = mock.patch.object(
+            self.nb_bgp_driver, '_expose_subnet').start()
+        mock.patch.object(self.nb_bgp_driver, '_expose_lbs').start()
+        lrp0 = fakes.create_object({
+            'name': 'lrp_port',
+            'external_ids': {
+                constants.OVN_CIDRS_EXT_ID_KEY: "10.0.0.1/24",
+                constants.OVN_LS_NAME_EXT_ID_KEY: 'network1',
+                constants.OVN_DEVICE_ID_EXT_ID_KEY: 'router1'}})
+        self.nb_idl.get_active_local_lrps.return_value = [lrp0]
+
+        self.nb_bgp_driver.expose_ip(ips, ips_info)
+
+        # The subnet routes follow the cr-lrp to its new ips, before the
+        # subnets are exposed again, and its old ip is withdrawn
+        mock_expose_provider_port.assert_called_once_with(
+            ips, 'fake-mac', 'provider-ls', self.bridge, 100,
+            'fake-localnet', ['test-cidr'])
+        mock_update_gateway.assert_called_once_with(
+            self.nb_bgp_driver.ovn_routing_tables_routes, 'router1',
+            self.bridge, 100, ips)
+        mock_withdraw_provider_port.assert_called_once_with(
+            ['172.24.4.11'], 'provider-ls', self.bridge, 100)
+        mock_expose_subnet.assert_called_once_with(
+            ['10.0.0.1/24'], {'associated_router': 'router1',
+                              'network': 'network1',
+                              'address_scopes': {4: None, 6: None}})
+        self.assertEqual(
+            ips, self.nb_bgp_driver.ovn_local_cr_lrps['router1']['ips'])
+
     @mock.patch.object(linux_net, 'get_ip_version')
     def _test_withdraw_ip(self, ips, ips_info, provider, mock_ip_version):
         mock_withdraw_provider_port = mock.patch.object(
@@ -795,14 +1172,14 @@ class TestNBOVNBGPDriver(test_base.TestCase):
 
         mock_get_ls_localnet_info.assert_called_once_with(logical_switch)
         mock_expose_provider_port.assert_not_called()
-        self.assertNotIn(
-            ip, self.nb_bgp_driver._exposed_ips.get('test-ls', {}).keys())
+        self.assertFalse(self.nb_bgp_driver._exposed_ips.contains('test-ls',
+                                                                  ip))
         self.assertFalse(ret)
 
     def test_withdraw_fip(self):
         ip = '10.0.0.1'
-        self.nb_bgp_driver._exposed_ips['test-ls'] = {
-            ip: {'bridge_device': 'br-ex', 'bridge_vlan': 100}}
+        self.nb_bgp_driver._exposed_ips.add(
+            'test-ls', ip, {'bridge_device': 'br-ex', 'bridge_vlan': 100})
         mock_withdraw_provider_port = mock.patch.object(
             self.nb_bgp_driver, '_withdraw_provider_port').start()
         row = fakes.create_object({
@@ -814,7 +1191,6 @@ class TestNBOVNBGPDriver(test_base.TestCase):
 
     def test_withdraw_fip_not_found(self):
         ip = '10.0.0.1'
-        self.nb_bgp_driver._exposed_ips = {}
         mock_withdraw_provider_port = mock.patch.object(
             self.nb_bgp_driver, '_withdraw_provider_port').start()
         row = fakes.create_object({
@@ -881,23 +1257,24 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         m_announce_ips.assert_called_once_with([self.ipv6], ips_info=ips_info)
 
     def test__get_exposed_ip(self):
-        self.nb_bgp_driver._exposed_ips = {
-            'provider-ls': {'vip': {'bridge_device': self.bridge,
-                                    'bridge_vlan': None}}}
+        self.nb_bgp_driver._exposed_ips.add(
+            'provider-ls', self.ipv4,
+            {'bridge_device': self.bridge, 'bridge_vlan': None})
 
-        ls, info = self.nb_bgp_driver._get_exposed_ip('vip')
+        ls, info = self.nb_bgp_driver._get_exposed_ip(self.ipv4)
         self.assertEqual('provider-ls', ls)
         self.assertDictEqual({'bridge_device': self.bridge,
                               'bridge_vlan': None}, info)
+        self.assertIsNone(self.nb_bgp_driver._get_exposed_ip(self.ipv6))
 
     def test__get_router_port_info_for_ls(self):
         ls = 'provider-ls'
-        self.nb_bgp_driver._exposed_ips = {
-            ls: {'vip': {'bridge_device': self.bridge, 'bridge_vlan': None}}
-        }
+        self.nb_bgp_driver._exposed_ips.add(
+            ls, self.ipv4, {'bridge_device': self.bridge,
+                            'bridge_vlan': None})
 
         tenant_ls = 'tenant_ls'
-        self.nb_bgp_driver.ovn_local_lrps[tenant_ls] = {'vip'}
+        self.nb_bgp_driver.ovn_local_lrps[tenant_ls] = {self.ipv4}
 
         info = self.nb_bgp_driver._get_router_port_info_for_ls(tenant_ls)
         self.assertDictEqual({'bridge_device': self.bridge,
@@ -989,9 +1366,12 @@ class TestNBOVNBGPDriver(test_base.TestCase):
             })
         self.nb_idl.get_active_lsp.return_value = [port0, port1]
 
+        self.nb_bgp_driver._dirty.full_sync_started()
         self.nb_bgp_driver.expose_subnet(ips, subnet_info)
         mock_expose_router_lsp.assert_called_once_with(
             ips, subnet_info, self.router1_info)
+        self.assertEqual({constants.DIRTY_ROUTER: {'router1'}},
+                         self.nb_bgp_driver._dirty.pop())
         ips_info0 = {'mac': 'mac',
                      'cidrs': ['192.168.0.5/24'],
                      'type': constants.OVN_VM_VIF_PORT_TYPE,
@@ -1220,7 +1600,8 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_wire.assert_called_once_with(
             mock.ANY, '10.0.0.0/24', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls',
+            gateway_owner='other-router')
 
     @mock.patch.object(wire_utils, 'wire_lrp_port')
     def test__expose_router_lsp_per_host(self, mock_wire):
@@ -1237,7 +1618,8 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_wire.assert_called_once_with(
             mock.ANY, '10.0.0.1/24', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls',
+            gateway_owner='other-router')
 
     @mock.patch.object(wire_utils, 'wire_lrp_port')
     def test__expose_router_lsp_exception(self, mock_wire):
@@ -1260,7 +1642,8 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_wire.assert_called_once_with(
             mock.ANY, '10.0.0.0/24', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls',
+            gateway_owner='other-router')
 
     @mock.patch.object(wire_utils, 'wire_lrp_port')
     def test__expose_router_lsp_no_tenants(self, mock_wire):
@@ -1304,7 +1687,8 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_wire.assert_called_once_with(
             mock.ANY, '2002::/64', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls',
+            gateway_owner='other-router')
 
     @mock.patch.object(wire_utils, 'unwire_lrp_port')
     def test__withdraw_router_lsp(self, mock_unwire):
@@ -1326,7 +1710,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_unwire.assert_called_once_with(
             mock.ANY, '10.0.0.0/24', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls')
 
     @mock.patch.object(wire_utils, 'unwire_lrp_port')
     def test__withdraw_router_lsp_per_host(self, mock_unwire):
@@ -1343,7 +1727,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_unwire.assert_called_once_with(
             mock.ANY, '10.0.0.1/24', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls')
 
     @mock.patch.object(wire_utils, 'unwire_lrp_port')
     def test__withdraw_router_lsp_exception(self, mock_unwire):
@@ -1366,7 +1750,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_unwire.assert_called_once_with(
             mock.ANY, '10.0.0.0/24', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls')
 
     @mock.patch.object(wire_utils, 'unwire_lrp_port')
     def test__withdraw_router_lsp_no_tenants(self, mock_unwire):
@@ -1416,7 +1800,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         mock_unwire.assert_called_once_with(
             mock.ANY, '2002::/64', self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'], mock.ANY,
-            self.router1_info['ips'])
+            self.router1_info['ips'], owner='provider-ls')
 
     def test__ips_in_address_scope(self):
         subnet_pool_addr_scope4 = '88e8aec3-da29-402d-becf-9fa2c38e69b8'
@@ -1565,15 +1949,15 @@ class TestNBOVNBGPDriver(test_base.TestCase):
             ['vip'], {'logical_switch': 'router1'})
 
     def test_withdraw_ovn_lb_vip_provider(self):
-        self.nb_bgp_driver._exposed_ips = {
-            'provider-ls': {'vip': {'bridge_device': self.bridge,
-                                    'bridge_vlan': None}}}
+        self.nb_bgp_driver._exposed_ips.add(
+            'provider-ls', self.ipv4,
+            {'bridge_device': self.bridge, 'bridge_vlan': None})
         lb = utils.create_row(
             external_ids={
                 constants.OVN_LB_LR_REF_EXT_ID_KEY: 'neutron-router1',
                 constants.OVN_LB_VIP_PORT_EXT_ID_KEY: 'vip_port',
-                constants.OVN_LB_VIP_IP_EXT_ID_KEY: 'vip'},
-            vips={'vip': 'member', 'fip': 'member'})
+                constants.OVN_LB_VIP_IP_EXT_ID_KEY: self.ipv4},
+            vips={self.ipv4: 'member', 'fip': 'member'})
         mock_withdraw_remote_ip = mock.patch.object(
             self.nb_bgp_driver, '_withdraw_remote_ip').start()
         mock_withdraw_provider_port = mock.patch.object(
@@ -1582,7 +1966,7 @@ class TestNBOVNBGPDriver(test_base.TestCase):
         self.nb_bgp_driver.withdraw_ovn_lb_vip(lb)
 
         mock_withdraw_provider_port.assert_called_once_with(
-            ['vip'],
+            [self.ipv4],
             self.router1_info['provider_switch'],
             self.router1_info['bridge_device'],
             self.router1_info['bridge_vlan'])
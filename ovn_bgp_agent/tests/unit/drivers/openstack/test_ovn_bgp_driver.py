@@ -25,10 +25,12 @@ from ovn_bgp_agent.drivers.openstack.utils import frr
 from ovn_bgp_agent.drivers.openstack.utils import ovn
 from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent.drivers.openstack.utils import wire as wire_utils
+from ovn_bgp_agent.drivers.openstack.watchers import base_watcher
 from ovn_bgp_agent import exceptions as agent_exc
 from ovn_bgp_agent.tests import base as test_base
 from ovn_bgp_agent.tests.unit import fakes
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import route_ledger
 
 CONF = cfg.CONF
 
@@ -46,6 +48,7 @@ class TestOVNBGPDriver(test_base.TestCase):
         self.bgp_driver.chassis = 'fake-chassis'
         self.bgp_driver.ovn_routing_tables = {self.bridge: 'fake-table'}
         self.bgp_driver.ovn_bridge_mappings = {'fake-network': self.bridge}
+        self.addCleanup(wire_utils._ndp_proxies.clear)
 
         self.mock_sbdb = mock.patch.object(ovn, 'OvnSbIdl').start()
         self.mock_ovs_idl = mock.patch.object(ovs, 'OvsIdl').start()
@@ -73,25 +76,107 @@ class TestOVNBGPDriver(test_base.TestCase):
             self.loadbalancer_vip_port: {'ips': [self.ipv4, self.ipv6],
                                          'gateway_port': self.cr_lrp0}}
 
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
     @mock.patch.object(linux_net, 'ensure_ovn_device')
     @mock.patch.object(linux_net, 'ensure_vrf')
     @mock.patch.object(frr, 'vrf_leak')
-    def test_start(self, mock_vrf, *args):
+    def test_start(self, mock_vrf, mock_ensure_vrf, mock_ensure_ovn_dev,
+                   mock_migrate):
         self.bgp_driver.start()
 
         mock_vrf.assert_called_once_with(
             CONF.bgp_vrf, CONF.bgp_AS, CONF.bgp_router_id,
             template=frr.LEAK_VRF_TEMPLATE)
+        mock_migrate.assert_called_once_with(CONF.bgp_vrf_table_id,
+                                             CONF.bgp_nic)
         # Assert connections were started
         self.mock_ovs_idl().start.assert_called_once_with(
-            CONF.ovsdb_connection)
+            CONF.ovsdb_connection, events=[])
         self.mock_sbdb().start.assert_called_once_with()
 
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
+    @mock.patch.object(linux_net, 'delete_routes_from_table')
+    @mock.patch.object(linux_net, 'ensure_ovn_device')
+    @mock.patch.object(linux_net, 'ensure_vrf')
+    @mock.patch.object(frr, 'vrf_leak')
+    def test_start_warm_restart(self, mock_vrf, mock_ensure_vrf,
+                                mock_ensure_ovn_dev, mock_delete_routes,
+                                mock_migrate):
+        CONF.set_override('clear_vrf_routes_on_startup', True)
+        self.addCleanup(CONF.clear_override, 'clear_vrf_routes_on_startup')
+        CONF.set_override('warm_restart', True)
+        self.addCleanup(CONF.clear_override, 'warm_restart')
+
+        with mock.patch.object(self.bgp_driver._warm_restart,
+                               'start') as mock_warm_restart:
+            self.bgp_driver.start()
+
+        # The routes left by the previous run are adopted
+        mock_delete_routes.assert_not_called()
+        mock_warm_restart.assert_called_once_with(
+            [self.mock_sbdb().start().idl, self.mock_ovs_idl().idl_ovs.idl])
+
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
+    @mock.patch.object(linux_net, 'ensure_ovn_device')
+    @mock.patch.object(linux_net, 'ensure_vrf')
+    @mock.patch.object(frr, 'vrf_leak')
+    def test_start_incremental_reconcile(self, *args):
+        CONF.set_override('full_sync_interval', 3600)
+        self.addCleanup(CONF.clear_override, 'full_sync_interval')
+
+        with mock.patch.object(self.bgp_driver._netlink_monitor,
+                               'start') as mock_monitor_start:
+            self.bgp_driver.start()
+
+        # The kernel and OVS changes are monitored for drift
+        mock_monitor_start.assert_called_once_with()
+        events = self.mock_ovs_idl().start.call_args[1]['events']
+        self.assertEqual(1, len(events))
+        self.assertIsInstance(events[0], base_watcher.BridgePortsUpdateEvent)
+
+    def test_sync_failed(self):
+        with mock.patch.object(self.bgp_driver._reconciler,
+                               'run') as mock_run:
+            mock_run.side_effect = agent_exc.ConfOptionRequired(
+                option='fake')
+            self.bgp_driver._dirty.full_sync_started()
+            self.assertRaises(agent_exc.ConfOptionRequired,
+                              self.bgp_driver.sync, wait=False)
+
+        # The events are no longer recorded
+        self.bgp_driver._dirty.mark_changed(constants.DIRTY_PORT, 'vm-port')
+        self.assertEqual(0, len(self.bgp_driver._dirty))
+
+    def test_sync_warm_restart(self):
+        with mock.patch.object(self.bgp_driver._warm_restart,
+                               'wait') as mock_wait, \
+                mock.patch.object(self.bgp_driver._reconciler,
+                                  'run') as mock_run:
+            self.bgp_driver.sync()
+
+        mock_wait.assert_called_once_with()
+        mock_run.assert_called_once_with(
+            self.bgp_driver._sync, mock.ANY,
+            measure=bgp_utils.get_exposed_ips)
+
+    def test_sync_no_wait(self):
+        with mock.patch.object(self.bgp_driver._warm_restart,
+                               'wait') as mock_wait, \
+                mock.patch.object(self.bgp_driver._reconciler,
+                                  'run') as mock_run:
+            self.bgp_driver.sync(wait=False)
+
+        mock_wait.assert_not_called()
+        mock_run.assert_called_once_with(
+            self.bgp_driver._sync, mock.ANY,
+            measure=bgp_utils.get_exposed_ips)
+
+    @mock.patch.object(linux_net, 'migrate_routes_protocol')
     @mock.patch.object(linux_net, 'ensure_ovn_device')
     @mock.patch.object(frr, 'vrf_leak')
     @mock.patch.object(linux_net, 'ensure_vrf')
     def test_frr_sync(self, mock_ensure_vrf, mock_vrf_leak,
-                      mock_ensure_ovn_dev):
+                      mock_ensure_ovn_dev, mock_migrate):
         self.bgp_driver.frr_sync()
 
         mock_ensure_vrf.assert_called_once_with(
@@ -101,7 +186,10 @@ class TestOVNBGPDriver(test_base.TestCase):
             template=frr.LEAK_VRF_TEMPLATE)
         mock_ensure_ovn_dev.assert_called_once_with(
             CONF.bgp_nic, CONF.bgp_vrf)
+        # The routes are only re-tagged at startup
+        mock_migrate.assert_not_called()
 
+    @mock.patch.object(wire_utils, 'sync_ndp_proxies')
     @mock.patch.object(wire_utils, 'delete_vlan_devices_leftovers')
     @mock.patch.object(linux_net, 'delete_bridge_ip_routes')
     @mock.patch.object(linux_net, 'delete_ip_rules')
@@ -120,12 +208,12 @@ class TestOVNBGPDriver(test_base.TestCase):
             mock_ensure_vlan_network, mock_nic_address, mock_exposed_ips,
             mock_get_ip_rules, mock_get_patch_ports, mock_ensure_mac,
             mock_remove_flows, mock_del_exposed_ips, mock_del_ip_rules,
-            mock_del_ip_routes, mock_vlan_leftovers):
+            mock_del_ip_routes, mock_vlan_leftovers, mock_sync_ndp_proxies):
         self.mock_ovs_idl.get_ovn_bridge_mappings.return_value = [
             'net0:bridge0', 'net1:bridge1']
         self.sb_idl.get_network_vlan_tag_by_network_name.side_effect = (
             [10], [11])
-        fake_ip_rules = 'fake-ip-rules'
+        fake_ip_rules = {'10.0.0.6/32': 'fake-rule'}
         mock_get_ip_rules.return_value = fake_ip_rules
         ips = [self.ipv4, self.ipv6]
         mock_exposed_ips.return_value = ips
@@ -141,9 +229,13 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_routing_bridge.return_value = ['fake-route']
         mock_nic_address.return_value = self.mac
         mock_get_patch_ports.return_value = [1, 2]
+        mock_delete_stale_tables = mock.patch.object(
+            linux_net, 'delete_stale_routing_tables').start()
 
         self.bgp_driver.sync()
 
+        mock_delete_stale_tables.assert_called_once_with({})
+
         expected_calls = [mock.call('bridge0', 1, [10]),
                           mock.call('bridge1', 2, [11])]
         mock_ensure_arp.assert_has_calls(expected_calls)
@@ -183,10 +275,347 @@ class TestOVNBGPDriver(test_base.TestCase):
             {}, mock.ANY,
             {'bridge0': ['fake-route'], 'bridge1': ['fake-route']})
 
-        mock_get_ip_rules.assert_called_once_with(mock.ANY)
+        # The leftover ip rules are checked again before being removed
+        self.assertEqual(2, mock_get_ip_rules.call_count)
+        mock_sync_ndp_proxies.assert_called_once_with({'bridge0', 'bridge1'})
         mock_vlan_leftovers.assert_called_once_with(
             self.sb_idl, self.bgp_driver.ovn_bridge_mappings)
 
+    @mock.patch.object(wire_utils, 'delete_vlan_devices_leftovers')
+    @mock.patch.object(linux_net, 'delete_bridge_ip_routes')
+    @mock.patch.object(linux_net, 'delete_ip_rules')
+    @mock.patch.object(linux_net, 'delete_exposed_ips')
+    @mock.patch.object(ovs, 'remove_extra_ovs_flows')
+    @mock.patch.object(ovs, 'ensure_mac_tweak_flows')
+    @mock.patch.object(ovs, 'get_ovs_patch_ports_info')
+    @mock.patch.object(linux_net, 'get_ovn_ip_rules')
+    @mock.patch.object(linux_net, 'get_exposed_ips')
+    @mock.patch.object(linux_net, 'get_interface_address')
+    @mock.patch.object(linux_net, 'ensure_vlan_device_for_network')
+    @mock.patch.object(linux_net, 'ensure_routing_table_for_bridge')
+    @mock.patch.object(linux_net, 'ensure_arp_ndp_enabled_for_bridge')
+    def test_sync_workers(
+            self, mock_ensure_arp, mock_routing_bridge,
+            mock_ensure_vlan_network, mock_nic_address, mock_exposed_ips,
+            mock_get_ip_rules, mock_get_patch_ports, mock_ensure_mac,
+            mock_remove_flows, mock_del_exposed_ips, mock_del_ip_rules,
+            mock_del_ip_routes, mock_vlan_leftovers):
+        CONF.set_override('sync_workers', 2)
+        self.addCleanup(CONF.clear_override, 'sync_workers')
+        self.mock_ovs_idl.get_ovn_bridge_mappings.return_value = [
+            'net0:bridge0', 'net1:bridge0', 'net2:bridge1']
+        vlan_tags = {'net0': [10], 'net1': [11], 'net2': []}
+        self.sb_idl.get_network_vlan_tag_by_network_name.side_effect = (
+            vlan_tags.get)
+        ip_rules = {'10.0.0.5/32': 'fake-rule'}
+        mock_get_ip_rules.return_value = ip_rules
+        # A leftover IP, not exposed anymore after the sync
+        mock_exposed_ips.side_effect = (['10.0.0.5'], ['10.0.0.5'], [])
+        self.sb_idl.get_ports_on_chassis.return_value = []
+        self.sb_idl.get_cr_lrp_ports_on_chassis.return_value = [
+            self.cr_lrp0, self.cr_lrp1]
+        cr_lrps_info = {self.cr_lrp0: {'router_datapath': 'router0'},
+                        self.cr_lrp1: {'router_datapath': 'router1'}}
+
+        def _ensure_cr_port_exposed(cr_lrp_port, exposed_ips, ovn_ip_rules):
+            self.bgp_driver.ovn_local_cr_lrps[cr_lrp_port] = (
+                cr_lrps_info[cr_lrp_port])
+
+        mock.patch.object(self.bgp_driver,
+                          '_ensure_cr_lrp_associated_ports_exposed',
+                          side_effect=_ensure_cr_port_exposed).start()
+        mock_ensure_cr_lrp_networks = mock.patch.object(
+            self.bgp_driver, '_ensure_cr_lrp_networks_exposed').start()
+        mock_routing_bridge.return_value = ['fake-route']
+        mock_nic_address.return_value = self.mac
+        mock_get_patch_ports.return_value = [1, 2]
+        mock.patch.object(linux_net, 'delete_stale_routing_tables').start()
+
+        # The leftover IP and its ip rule were repaired
+        self.assertEqual(2, self.bgp_driver.sync())
+
+        # The routing table is only ensured once per bridge
+        expected_calls = [mock.call({}, 'bridge0', CONF.bgp_vrf_table_id),
+                          mock.call({}, 'bridge1', CONF.bgp_vrf_table_id)]
+        self.assertEqual(expected_calls, mock_routing_bridge.call_args_list)
+        mock_ensure_vlan_network.assert_has_calls(
+            [mock.call('bridge0', 10), mock.call('bridge0', 11)],
+            any_order=True)
+        mock_ensure_arp.assert_has_calls(
+            [mock.call('bridge0', 1, [10]), mock.call('bridge0', 2, [11]),
+             mock.call('bridge1', 3, [])], any_order=True)
+        self.assertEqual(2, mock_ensure_mac.call_count)
+        self.assertEqual(
+            {'bridge0': {'mac': self.mac, 'in_port': [1, 2]},
+             'bridge1': {'mac': self.mac, 'in_port': [1, 2]}},
+            self.bgp_driver.ovs_flows)
+        mock_remove_flows.assert_has_calls(
+            [mock.call(mock.ANY, 'bridge0', constants.OVS_RULE_COOKIE),
+             mock.call(mock.ANY, 'bridge1', constants.OVS_RULE_COOKIE)],
+            any_order=True)
+        mock_ensure_cr_lrp_networks.assert_has_calls(
+            [mock.call(self.cr_lrp0, cr_lrps_info[self.cr_lrp0],
+                       ['10.0.0.5'], ip_rules),
+             mock.call(self.cr_lrp1, cr_lrps_info[self.cr_lrp1],
+                       ['10.0.0.5'], ip_rules)],
+            any_order=True)
+        self.assertEqual(2, mock_ensure_cr_lrp_networks.call_count)
+        mock_del_exposed_ips.assert_called_once_with(['10.0.0.5'],
+                                                     CONF.bgp_nic)
+        mock_del_ip_rules.assert_called_once_with(ip_rules)
+        mock_del_ip_routes.assert_called_once_with(
+            {}, mock.ANY,
+            {'bridge0': ['fake-route'], 'bridge1': ['fake-route']})
+
+    def test_reconcile(self):
+        mock_sync = mock.patch.object(self.bgp_driver, 'sync').start()
+        mock_sync_dirty = mock.patch.object(
+            self.bgp_driver, '_sync_dirty').start()
+
+        self.bgp_driver.reconcile()
+
+        mock_sync.assert_called_once_with()
+        mock_sync_dirty.assert_not_called()
+
+    def test_reconcile_full_sync_not_due(self):
+        mock_sync = mock.patch.object(self.bgp_driver, 'sync').start()
+        mock_sync_dirty = mock.patch.object(
+            self.bgp_driver, '_sync_dirty', return_value=1).start()
+        self.bgp_driver._dirty.full_sync_interval = 3600
+        self.bgp_driver._dirty.full_sync_started()
+
+        # The repairs of the incremental reconcile are reported too
+        self.assertEqual(1, self.bgp_driver.reconcile())
+
+        mock_sync.assert_not_called()
+        mock_sync_dirty.assert_called_once_with()
+
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty(self, mock_exposed_ips):
+        # The IP of the VM port is exposed again
+        mock_exposed_ips.side_effect = ([], ['10.0.0.5'])
+        local_chassis = fakes.create_object({'name': 'fake-chassis'})
+        other_chassis = fakes.create_object({'name': 'other-chassis'})
+        vm_port = fakes.create_object({
+            'logical_port': 'vm-port',
+            'type': constants.OVN_VM_VIF_PORT_TYPE,
+            'chassis': [local_chassis]})
+        cr_lrp_port = fakes.create_object({
+            'logical_port': self.cr_lrp0,
+            'type': constants.OVN_CHASSISREDIRECT_VIF_PORT_TYPE,
+            'chassis': [local_chassis]})
+        remote_port = fakes.create_object({
+            'logical_port': 'remote-port',
+            'type': constants.OVN_VM_VIF_PORT_TYPE,
+            'chassis': [other_chassis]})
+        subnet_port = fakes.create_object({
+            'logical_port': self.lrp0,
+            'type': constants.OVN_PATCH_VIF_PORT_TYPE,
+            'mac': ['{} 10.0.0.1/24'.format(self.mac)]})
+        ports = {port.logical_port: port
+                 for port in (vm_port, cr_lrp_port, remote_port, subnet_port)}
+        self.sb_idl.get_port_by_name.side_effect = (
+            lambda name: ports.get(name, []))
+        mock_ensure_port_exposed = mock.patch.object(
+            self.bgp_driver, '_ensure_port_exposed').start()
+        mock_ensure_cr_port_exposed = mock.patch.object(
+            self.bgp_driver, '_ensure_cr_lrp_associated_ports_exposed').start()
+        mock_ensure_cr_lrp_networks = mock.patch.object(
+            self.bgp_driver, '_ensure_cr_lrp_networks_exposed').start()
+        mock_expose_subnet = mock.patch.object(
+            self.bgp_driver, '_expose_subnet').start()
+        for port in ('vm-port', self.cr_lrp0, 'remote-port', 'deleted-port'):
+            self.bgp_driver._dirty.mark(constants.DIRTY_PORT, port)
+        self.bgp_driver._dirty.mark(constants.DIRTY_SUBNET, self.lrp0)
+
+        self.assertEqual(1, self.bgp_driver._sync_dirty())
+
+        mock_ensure_port_exposed.assert_has_calls(
+            [mock.call(vm_port, None, None),
+             mock.call(cr_lrp_port, None, None)], any_order=True)
+        self.assertEqual(2, mock_ensure_port_exposed.call_count)
+        mock_ensure_cr_port_exposed.assert_called_once_with(
+            self.cr_lrp0, None, None)
+        mock_ensure_cr_lrp_networks.assert_called_once_with(
+            self.cr_lrp0, self.bgp_driver.ovn_local_cr_lrps[self.cr_lrp0],
+            None, None)
+        mock_expose_subnet.assert_called_once_with('10.0.0.1/24',
+                                                   subnet_port, None, None)
+        self.assertEqual(0, len(self.bgp_driver._dirty))
+
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty_failure(self, mock_exposed_ips):
+        self.sb_idl.get_port_by_name.side_effect = Exception('boom')
+        self.bgp_driver._dirty.mark(constants.DIRTY_SUBNET, self.lrp0)
+
+        self.bgp_driver._sync_dirty()
+
+        # It is retried on the next reconcile
+        self.assertEqual({constants.DIRTY_SUBNET: {self.lrp0}},
+                         self.bgp_driver._dirty.pop())
+
+    def test__process_dirty_keep_ips(self):
+        local_chassis = fakes.create_object({'name': 'fake-chassis'})
+        vm_port = fakes.create_object({
+            'logical_port': 'vm-port',
+            'type': constants.OVN_VM_VIF_PORT_TYPE,
+            'chassis': [local_chassis]})
+        self.sb_idl.get_port_by_name.return_value = vm_port
+        mock_ensure_port_exposed = mock.patch.object(
+            self.bgp_driver, '_ensure_port_exposed').start()
+        self.bgp_driver._dirty.mark(constants.DIRTY_PORT, 'vm-port')
+
+        self.bgp_driver._process_dirty('fake-ips', 'fake-rules')
+
+        mock_ensure_port_exposed.assert_called_once_with(
+            vm_port, 'fake-ips', 'fake-rules')
+        self.assertEqual(0, len(self.bgp_driver._dirty))
+
+    def test__process_dirty_replay_withdrawn(self):
+        row = fakes.create_object({
+            'logical_port': 'vm-port',
+            'type': constants.OVN_VM_VIF_PORT_TYPE})
+        self.sb_idl.get_port_by_name.return_value = None
+        mock_withdraw_ip = mock.patch.object(
+            self.bgp_driver, '_withdraw_ip').start()
+        # A withdrawal while a full sync is running
+        self.bgp_driver._dirty.full_sync_started()
+        self.bgp_driver.withdraw_ip(['10.0.0.5'], row)
+        mock_withdraw_ip.reset_mock()
+
+        self.bgp_driver._process_dirty('fake-ips', 'fake-rules')
+
+        # The withdrawal is replayed on the state rebuilt by the sync
+        mock_withdraw_ip.assert_called_once_with(['10.0.0.5'], row, None)
+        self.sb_idl.get_port_by_name.assert_called_once_with('vm-port')
+        self.assertEqual([], self.bgp_driver._dirty.pop_withdrawn())
+
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty_withdrawn_not_replayed(self, mock_exposed_ips):
+        row = fakes.create_object({
+            'logical_port': 'vm-port',
+            'type': constants.OVN_VM_VIF_PORT_TYPE})
+        self.sb_idl.get_port_by_name.return_value = None
+        mock_withdraw_ip = mock.patch.object(
+            self.bgp_driver, '_withdraw_ip').start()
+        # A withdrawal recorded by a full sync that failed
+        self.bgp_driver._dirty.full_sync_started()
+        self.bgp_driver.withdraw_ip(['10.0.0.5'], row)
+        self.bgp_driver._dirty.full_sync_finished()
+        mock_withdraw_ip.reset_mock()
+
+        self.bgp_driver._sync_dirty()
+
+        mock_withdraw_ip.assert_not_called()
+        self.sb_idl.get_port_by_name.assert_called_once_with('vm-port')
+
+    @mock.patch.object(wire_utils, 'sync_bridge_flows')
+    @mock.patch.object(bgp_utils, 'get_exposed_ips')
+    def test__sync_dirty_bridge(self, mock_exposed_ips, mock_sync_flows):
+        self.bgp_driver.mark_bridge_dirty(self.bridge)
+
+        self.bgp_driver._sync_dirty()
+
+        mock_sync_flows.assert_called_once_with(self.bgp_driver.ovs_flows,
+                                                self.bridge)
+        self.assertEqual(0, len(self.bgp_driver._dirty))
+
+    def test__process_dirty_kernel_drift(self):
+        self.bgp_driver.ovn_routing_tables_routes = route_ledger.RouteLedger()
+        for dst, owner in (('10.0.0.0', self.cr_lrp0),
+                           ('10.1.0.0', 'fake-provider-dp')):
+            self.bgp_driver.ovn_routing_tables_routes.add(route_ledger.Route(
+                dev=self.bridge, vlan=None, table=100, dst=dst, dst_len=24,
+                oif=5, gateway=self.fip, family=constants.AF_INET),
+                owner=owner)
+        local_chassis = fakes.create_object({'name': 'fake-chassis'})
+        vm_port = fakes.create_object({
+            'logical_port': 'vm-port', 'mac': ['mac 10.2.0.5 fd00::5']})
+        cr_lrp_port = fakes.create_object({
+            'logical_port': self.cr_lrp1, 'mac': ['mac 172.24.4.10/24']})
+        other_port = fakes.create_object({
+            'logical_port': 'other-port', 'mac': ['mac 10.2.0.6']})
+        self.sb_idl.get_ports_on_chassis.return_value = [
+            vm_port, cr_lrp_port, other_port]
+        self.sb_idl.get_port_by_name.return_value = fakes.create_object({
+            'type': constants.OVN_VM_VIF_PORT_TYPE,
+            'chassis': [local_chassis]})
+        mock_ensure_port_exposed = mock.patch.object(
+            self.bgp_driver, '_ensure_port_exposed').start()
+        dirty = self.bgp_driver._dirty
+        dirty.mark(constants.DIRTY_ROUTE, (100, '10.0.0.0', 24))
+        dirty.mark(constants.DIRTY_ROUTE, (100, '10.1.0.0', 24))
+        dirty.mark(constants.DIRTY_RULE, (100, '10.2.0.5', 32))
+        dirty.mark(constants.DIRTY_ADDRESS, '172.24.4.10')
+        dirty.mark(constants.DIRTY_ADDRESS, self.ipv6)
+
+        self.bgp_driver._process_dirty()
+
+        self.sb_idl.get_ports_on_chassis.assert_called_once_with(
+            'fake-chassis')
+        # The owning cr-lrp, the ports and the load balancer cr-lrp
+        self.assertCountEqual(
+            [mock.call(self.cr_lrp0), mock.call(self.cr_lrp1),
+             mock.call('vm-port')],
+            self.sb_idl.get_port_by_name.call_args_list)
+        self.assertEqual(3, mock_ensure_port_exposed.call_count)
+        self.assertEqual(0, len(self.bgp_driver._dirty))
+
+    def test__process_dirty_kernel_drift_not_exposed(self):
+        self.bgp_driver.ovn_routing_tables_routes = route_ledger.RouteLedger()
+        self.sb_idl.get_ports_on_chassis.return_value = []
+        self.bgp_driver.provider_ovn_lbs = {}
+        # Removed by the agent itself, as no longer exposed
+        self.bgp_driver._dirty.mark(constants.DIRTY_ADDRESS, '10.2.0.5')
+        self.bgp_driver._dirty.mark(constants.DIRTY_ROUTE,
+                                    (100, '10.0.0.0', 24))
+
+        self.bgp_driver._process_dirty()
+
+        self.sb_idl.get_port_by_name.assert_not_called()
+
+    def test__ensure_cr_lrp_networks_exposed(self):
+        mock_process_lrp_port = mock.patch.object(
+            self.bgp_driver, '_process_lrp_port').start()
+        mock_expose_ovn_lb = mock.patch.object(
+            self.bgp_driver, '_expose_ovn_lb_on_provider').start()
+        self.sb_idl.get_lrp_ports_for_router.return_value = ['fake-lrp']
+        self.sb_idl.get_provider_ovn_lbs_on_cr_lrp.return_value = {
+            'fake-lb': self.ipv4}
+        cr_lrp_info = self.bgp_driver.ovn_local_cr_lrps[self.cr_lrp0]
+
+        self.bgp_driver._ensure_cr_lrp_networks_exposed(
+            self.cr_lrp0, cr_lrp_info, 'fake-ips', 'fake-rules')
+
+        self.sb_idl.get_lrp_ports_for_router.assert_called_once_with(
+            'fake-router-dp')
+        mock_process_lrp_port.assert_called_once_with(
+            'fake-lrp', self.cr_lrp0, 'fake-ips', 'fake-rules')
+        self.sb_idl.get_provider_ovn_lbs_on_cr_lrp.assert_called_once_with(
+            'fake-provider-dp', 'fake-router-dp')
+        mock_expose_ovn_lb.assert_called_once_with(
+            self.ipv4, 'fake-lb', self.cr_lrp0, 'fake-ips', 'fake-rules')
+
+    def test__keep_exposed_ip(self):
+        exposed_ips = [self.ipv4, self.ipv6, '192.168.1.20']
+        ip_rules = {'{}/32'.format(self.ipv4): 'fake-rule',
+                    '{}/128'.format(self.ipv6): 'fake-rule',
+                    '10.0.0.0/24': 'fake-rule'}
+
+        self.bgp_driver._keep_exposed_ip(self.ipv4, exposed_ips, ip_rules)
+        self.bgp_driver._keep_exposed_ip(self.ipv6, exposed_ips, ip_rules)
+        self.bgp_driver._keep_exposed_ip('10.0.0.5', exposed_ips, ip_rules,
+                                         ip_dst='10.0.0.0/24')
+
+        self.assertEqual(['192.168.1.20'], exposed_ips)
+        self.assertEqual({}, ip_rules)
+
+    @mock.patch.object(linux_net, 'get_ip_version')
+    def test__keep_exposed_ip_nothing_found(self, mock_ip_version):
+        self.bgp_driver._keep_exposed_ip(self.ipv4, [], {})
+
+        mock_ip_version.assert_not_called()
+
     @mock.patch.object(linux_net, 'get_ip_version')
     def test__ensure_cr_lrp_associated_ports_exposed(self, mock_ip_version):
         mock_expose_ip = mock.patch.object(
@@ -300,7 +729,8 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_add_rule.assert_called_once_with(
             self.ipv4, 'fake-table', dev='fake-bridge')
         mock_add_route.assert_called_once_with(
-            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10)
+            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10,
+            owner='fake-provider-dp')
 
     @mock.patch.object(linux_net, 'add_ips_to_dev')
     @mock.patch.object(linux_net, 'add_ip_route')
@@ -366,7 +796,8 @@ class TestOVNBGPDriver(test_base.TestCase):
             self.ipv4, 'fake-table', dev='{}.{}'.format(self.bridge, 10),
             lladdr='fake-mac')
         mock_add_route.assert_called_once_with(
-            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10)
+            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10,
+            owner='fake-provider-dp')
 
     @mock.patch.object(linux_net, 'add_ips_to_dev')
     @mock.patch.object(linux_net, 'get_ip_version')
@@ -520,7 +951,8 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_del_rule.assert_called_once_with(
             self.ipv4, 'fake-table', dev='fake-bridge')
         mock_del_route.assert_called_once_with(
-            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10)
+            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10,
+            owner='fake-provider-dp')
 
     @mock.patch.object(linux_net, 'del_ips_from_dev')
     @mock.patch.object(linux_net, 'del_ip_route')
@@ -565,7 +997,8 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/32'.format(self.ipv4), 'fake-table', dev=dev,
             lladdr='fake-mac')
         mock_del_route.assert_called_once_with(
-            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10)
+            mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=10,
+            owner='fake-provider-dp')
 
     @mock.patch.object(linux_net, 'get_ip_version')
     @mock.patch.object(linux_net, 'del_ips_from_dev')
@@ -590,7 +1023,8 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/128'.format(self.ipv6), 'fake-table', dev=dev,
             lladdr='fake-mac')
         mock_del_route.assert_called_once_with(
-            mock.ANY, self.ipv6, 'fake-table', self.bridge, vlan=10)
+            mock.ANY, self.ipv6, 'fake-table', self.bridge, vlan=10,
+            owner='fake-provider-dp')
 
     @mock.patch.object(linux_net, 'add_ips_to_dev')
     @mock.patch.object(linux_net, 'add_ip_route')
@@ -663,7 +1097,8 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/32'.format(self.ipv4), 'fake-table')
         mock_add_route.assert_called_once_with(
             mock.ANY, self.ipv4, 'fake-table', self.bridge,
-            vlan=10, mask='32', via=self.fip)
+            vlan=10, mask='32', via=self.fip, owner='gateway_port',
+            gateway_owner='gateway_port')
         expected_calls = [mock.call(CONF.bgp_nic, ['192.168.1.10']),
                           mock.call(CONF.bgp_nic, ['192.168.1.11']),
                           mock.call(CONF.bgp_nic, ['192.168.1.13'])]
@@ -750,7 +1185,8 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/128'.format(self.ipv6), 'fake-table')
         mock_add_route.assert_called_once_with(
             mock.ANY, self.ipv6, 'fake-table', self.bridge,
-            vlan=10, mask='128', via=self.fip)
+            vlan=10, mask='128', via=self.fip, owner='gateway_port',
+            gateway_owner='gateway_port')
         expected_calls = [mock.call(CONF.bgp_nic,
                                     ['2002::1234:abcd:ffff:c0a8:111']),
                           mock.call(CONF.bgp_nic,
@@ -1016,9 +1452,11 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_del_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=None),
+                                    self.bridge, vlan=None,
+                                    owner='fake-provider-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=None)]
+                                    self.bridge, vlan=None,
+                                    owner='fake-provider-dp')]
         mock_del_route.assert_has_calls(expected_calls)
 
     @mock.patch.object(linux_net, 'del_ip_route')
@@ -1075,9 +1513,9 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_add_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=10),
+                                    self.bridge, vlan=10, owner='fake-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=10)]
+                                    self.bridge, vlan=10, owner='fake-dp')]
         mock_add_route.assert_has_calls(expected_calls)
 
     @mock.patch.object(linux_net, 'add_ip_route')
@@ -1124,7 +1562,7 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_bgp_announce.assert_not_called()
 
     @mock.patch.object(wire_utils, '_ensure_updated_mac_tweak_flows')
-    @mock.patch.object(linux_net, 'add_ndp_proxy')
+    @mock.patch.object(linux_net, 'add_ndp_proxies')
     @mock.patch.object(linux_net, 'get_ip_version')
     @mock.patch.object(linux_net, 'add_ip_route')
     @mock.patch.object(linux_net, 'add_ip_rule')
@@ -1160,14 +1598,14 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_add_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=10),
+                                    self.bridge, vlan=10, owner='fake-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=10)]
+                                    self.bridge, vlan=10, owner='fake-dp')]
         mock_add_route.assert_has_calls(expected_calls)
         mock_add_ndp_proxy.assert_called_once_with(
-            '{}/128'.format(self.ipv6), self.bridge, 10)
+            [self.ipv6], self.bridge, 10)
 
-    @mock.patch.object(linux_net, 'add_ndp_proxy')
+    @mock.patch.object(linux_net, 'add_ndp_proxies')
     @mock.patch.object(linux_net, 'get_ip_version')
     @mock.patch.object(linux_net, 'add_ip_route')
     @mock.patch.object(linux_net, 'add_ip_rule')
@@ -1226,7 +1664,8 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_add_rule.assert_called_once_with(
             self.fip, 'fake-table', dev='fake-bridge')
         mock_add_route.assert_called_once_with(
-            mock.ANY, self.fip, 'fake-table', self.bridge, vlan=10)
+            mock.ANY, self.fip, 'fake-table', self.bridge, vlan=10,
+            owner='fake-dp')
 
     @mock.patch.object(linux_net, 'add_ip_route')
     @mock.patch.object(linux_net, 'add_ip_rule')
@@ -1309,13 +1748,13 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_add_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=10),
+                                    self.bridge, vlan=10, owner='fake-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=10)]
+                                    self.bridge, vlan=10, owner='fake-dp')]
         mock_add_route.assert_has_calls(expected_calls)
 
     @mock.patch.object(wire_utils, '_ensure_updated_mac_tweak_flows')
-    @mock.patch.object(linux_net, 'add_ndp_proxy')
+    @mock.patch.object(linux_net, 'add_ndp_proxies')
     @mock.patch.object(linux_net, 'get_ip_version')
     @mock.patch.object(linux_net, 'add_ip_route')
     @mock.patch.object(linux_net, 'add_ip_rule')
@@ -1384,12 +1823,14 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_add_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=10),
+                                    self.bridge, vlan=10,
+                                    owner='fake-provider-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=10)]
+                                    self.bridge, vlan=10,
+                                    owner='fake-provider-dp')]
         mock_add_route.assert_has_calls(expected_calls)
 
-        mock_ndp_proxy.assert_called_once_with(self.ipv6, self.bridge, 10)
+        mock_ndp_proxy.assert_called_once_with([self.ipv6], self.bridge, 10)
 
         expected_calls = [mock.call(lrp0, self.cr_lrp0),
                           mock.call(lrp1, self.cr_lrp0),
@@ -1398,7 +1839,7 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_expose_ovn_lb.assert_called_once_with(
             ovn_lb_vip, 'fake-vip-port', self.cr_lrp0)
 
-    @mock.patch.object(linux_net, 'add_ndp_proxy')
+    @mock.patch.object(linux_net, 'add_ndp_proxies')
     @mock.patch.object(linux_net, 'add_ip_route')
     @mock.patch.object(linux_net, 'add_ip_rule')
     @mock.patch.object(linux_net, 'add_ips_to_dev')
@@ -1451,12 +1892,12 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_del_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=10),
+                                    self.bridge, vlan=10, owner='fake-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=10)]
+                                    self.bridge, vlan=10, owner='fake-dp')]
         mock_del_route.assert_has_calls(expected_calls)
 
-    @mock.patch.object(linux_net, 'del_ndp_proxy')
+    @mock.patch.object(linux_net, 'del_ndp_proxies')
     @mock.patch.object(linux_net, 'get_ip_version')
     @mock.patch.object(linux_net, 'del_ip_route')
     @mock.patch.object(linux_net, 'del_ip_rule')
@@ -1491,12 +1932,12 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_del_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=10),
+                                    self.bridge, vlan=10, owner='fake-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=10)]
+                                    self.bridge, vlan=10, owner='fake-dp')]
         mock_del_route.assert_has_calls(expected_calls)
         mock_del_ndp_proxy.assert_called_once_with(
-            '{}/128'.format(self.ipv6), self.bridge, 10)
+            [self.ipv6], self.bridge, 10)
 
     @mock.patch.object(linux_net, 'del_ip_route')
     @mock.patch.object(linux_net, 'del_ip_rule')
@@ -1523,7 +1964,8 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_del_rule.assert_called_once_with(
             self.fip, 'fake-table', dev='fake-bridge')
         mock_del_route.assert_called_once_with(
-            mock.ANY, self.fip, 'fake-table', self.bridge, vlan=10)
+            mock.ANY, self.fip, 'fake-table', self.bridge, vlan=10,
+            owner='fake-dp')
 
     @mock.patch.object(linux_net, 'del_ip_route')
     @mock.patch.object(linux_net, 'del_ip_rule')
@@ -1574,12 +2016,12 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_del_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=10),
+                                    self.bridge, vlan=10, owner='fake-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=10)]
+                                    self.bridge, vlan=10, owner='fake-dp')]
         mock_del_route.assert_has_calls(expected_calls)
 
-    @mock.patch.object(linux_net, 'del_ndp_proxy')
+    @mock.patch.object(linux_net, 'del_ndp_proxies')
     @mock.patch.object(linux_net, 'get_ip_version')
     @mock.patch.object(linux_net, 'del_ip_route')
     @mock.patch.object(linux_net, 'del_ip_rule')
@@ -1615,12 +2057,15 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_del_rule.assert_has_calls(expected_calls)
 
         expected_calls = [mock.call(mock.ANY, self.ipv4, 'fake-table',
-                                    self.bridge, vlan=None),
+                                    self.bridge, vlan=None,
+                                    owner='fake-provider-dp'),
                           mock.call(mock.ANY, self.ipv6, 'fake-table',
-                                    self.bridge, vlan=None)]
+                                    self.bridge, vlan=None,
+                                    owner='fake-provider-dp')]
         mock_del_route.assert_has_calls(expected_calls)
 
-        mock_ndp_proxy.assert_called_once_with(self.ipv6, self.bridge, None)
+        mock_ndp_proxy.assert_called_once_with([self.ipv6], self.bridge,
+                                               None)
 
         mock_withdraw_lrp_port.assert_called_once_with(
             '192.168.1.1/24', None, self.cr_lrp0)
@@ -1980,7 +2425,8 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/32'.format(self.ipv4), 'fake-table')
         mock_add_route.assert_called_once_with(
             mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=None,
-            mask='32', via=self.fip)
+            mask='32', via=self.fip, owner='cr-fake-logical-port',
+            gateway_owner='cr-fake-logical-port')
         expected_calls = [
             mock.call(dp_port0, ip_version=constants.IP_VERSION_4,
                       exposed_ips=None, ovn_ip_rules=None),
@@ -2066,7 +2512,8 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/128'.format(self.ipv6), 'fake-table')
         mock_add_route.assert_called_once_with(
             mock.ANY, self.ipv6, 'fake-table', self.bridge, vlan=None,
-            mask='128', via=self.fip)
+            mask='128', via=self.fip, owner='cr-fake-logical-port',
+            gateway_owner='cr-fake-logical-port')
         expected_calls = [
             mock.call(dp_port0, ip_version=constants.IP_VERSION_6,
                       exposed_ips=None, ovn_ip_rules=None),
@@ -2126,10 +2573,15 @@ class TestOVNBGPDriver(test_base.TestCase):
         mock_expose_lrp_port = mock.patch.object(
             self.bgp_driver, '_expose_lrp_port').start()
 
+        # The changes are only recorded while a full sync is running
+        self.bgp_driver._dirty.full_sync_started()
         self.bgp_driver.expose_subnet('fake-ip', row)
 
         mock_expose_lrp_port.assert_called_once_with(
-            'fake-ip', row.logical_port, self.cr_lrp0, 'fake-port-dp')
+            'fake-ip', row.logical_port, self.cr_lrp0, 'fake-port-dp',
+            exposed_ips=None, ovn_ip_rules=None)
+        self.assertEqual({constants.DIRTY_SUBNET: {'subnet_port'}},
+                         self.bgp_driver._dirty.pop())
 
     def test_expose_subnet_no_cr_lrp(self):
         self.sb_idl.is_router_gateway_on_chassis.return_value = None
@@ -2227,7 +2679,7 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/32'.format(self.ipv4), 'fake-table')
         mock_del_route.assert_called_once_with(
             mock.ANY, self.ipv4, 'fake-table', self.bridge, vlan=None,
-            mask='32', via=self.fip)
+            mask='32', via=self.fip, owner='cr-fake-logical-port')
         mock_del_exposed_ips.assert_called_once_with(
             [self.ipv4], CONF.bgp_nic)
 
@@ -2256,7 +2708,7 @@ class TestOVNBGPDriver(test_base.TestCase):
             '{}/128'.format(self.ipv6), 'fake-table')
         mock_del_route.assert_called_once_with(
             mock.ANY, self.ipv6, 'fake-table', self.bridge, vlan=None,
-            mask='128', via=self.fip)
+            mask='128', via=self.fip, owner='cr-fake-logical-port')
         mock_del_exposed_ips.assert_called_once_with(
             [self.ipv6], CONF.bgp_nic)
 
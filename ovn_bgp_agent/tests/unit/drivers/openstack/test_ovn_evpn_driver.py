@@ -25,6 +25,7 @@ from ovn_bgp_agent.drivers.openstack.utils import ovs
 from ovn_bgp_agent.tests import base as test_base
 from ovn_bgp_agent.tests.unit import fakes
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import route_ledger
 
 CONF = cfg.CONF
 
@@ -89,17 +90,13 @@ class TestOVNEVPNDriver(test_base.TestCase):
                 'lo': 'fake-lo1',
                 'mac': self.mac1},
         }
-        self.evpn_driver._ovn_routing_tables_routes = {
-            'fake-vlan': [{
-                'route': {
-                    'oif': 'fake-oif',
-                    'gateway': 'fake-gateway',
-                    'dst': '{}/32'.format(self.ipv4),
-                    'dst_len': 32,
-                    'table': 'fake-table'},
-                'vlan': 88,
-                }]
-            }
+        self.route = route_ledger.Route(
+            dev='fake-vlan', vlan=88, table=self.vni, dst=self.ipv4,
+            dst_len=32, oif='fake-oif', gateway='fake-gateway',
+            family=constants.AF_INET)
+        self.evpn_driver._ovn_routing_tables_routes = (
+            route_ledger.RouteLedger())
+        self.evpn_driver._ovn_routing_tables_routes.add(self.route)
 
     def test_start(self):
         self.evpn_driver.start()
@@ -605,7 +602,7 @@ class TestOVNEVPNDriver(test_base.TestCase):
     def test__connect_evpn_to_ovn_not_vlan(self):
         self._test__connect_evpn_to_ovn(use_vlan=False)
 
-    @mock.patch.object(linux_net, 'del_ndp_proxy')
+    @mock.patch.object(linux_net, 'del_ndp_proxies')
     @mock.patch.object(linux_net, 'delete_routes_from_table')
     @mock.patch.object(ovs, 'del_device_from_ovs_bridge')
     @mock.patch.object(linux_net, 'get_ip_version')
@@ -631,7 +628,7 @@ class TestOVNEVPNDriver(test_base.TestCase):
 
         mock_del_device.assert_called_once_with(device, dp_bridge)
         if clean_ndp:
-            mock_del_ndp.assert_called_once_with(self.ipv6, dp_bridge)
+            mock_del_ndp.assert_called_once_with([self.ipv6], dp_bridge)
         else:
             mock_del_ndp.assert_not_called()
 
@@ -663,6 +660,7 @@ class TestOVNEVPNDriver(test_base.TestCase):
         self.evpn_driver._remove_extra_vrfs()
 
         # Assertions
+        mock_get_ifaces.assert_called_once_with(['fake-vlan.88'])
         expected_calls = [mock.call('vrf-iface'),
                           mock.call('lo-iface'),
                           mock.call('br-iface'),
@@ -682,17 +680,20 @@ class TestOVNEVPNDriver(test_base.TestCase):
         mock_index.return_value = 'fake-oif'
         mock_table_ids = mock.patch.object(
             self.evpn_driver, '_get_table_ids').start()
-        mock_table_ids.return_value = ['fake-table-id']
+        mock_table_ids.return_value = [self.vni]
+        route_to_keep = {
+            'oif': 'fake-oif',
+            'gateway': 'fake-gateway',
+            'dst': self.ipv4,
+            'dst_len': 32,
+            'table': self.vni}
         route_to_del = {
             'oif': 'fake-oif0',
             'gateway': 'fake-gateway0',
             'dst': 'fake-dst0',
             'dst_len': 'fake-dst-len0',
             'table': 'fake-table0'}
-        mock_get_routes.return_value = [
-            self.evpn_driver._ovn_routing_tables_routes[
-                'fake-vlan'][0]['route'],
-            route_to_del]
+        mock_get_routes.return_value = [route_to_keep, route_to_del]
 
         self.evpn_driver._remove_extra_routes()
 
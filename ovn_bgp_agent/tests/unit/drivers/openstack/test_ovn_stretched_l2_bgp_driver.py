@@ -215,11 +215,16 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
             )
 
             self.assertIn(test_route, self.bgp_driver.vrf_routes)
+            self.assertEqual(
+                {test_route},
+                self.bgp_driver.vrf_routes_gateways.get(test_route.dst))
 
     @mock.patch.object(linux_net, "del_ip_route")
     def test__del_route(self, mock_del_route):
-        self.bgp_driver.vrf_routes.add(self.test_route_ipv4)
-        self.bgp_driver.vrf_routes.add(self.test_route_ipv6)
+        for test_route in [self.test_route_ipv4, self.test_route_ipv6]:
+            self.bgp_driver.vrf_routes.add(test_route)
+            self.bgp_driver.vrf_routes_gateways.add(test_route.dst,
+                                                    test_route)
         for test_route in [self.test_route_ipv4, self.test_route_ipv6]:
             self.bgp_driver._del_route(
                 test_route.network,
@@ -238,6 +243,8 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
             )
 
             self.assertNotIn(test_route, self.bgp_driver.vrf_routes)
+            self.assertNotIn(test_route.dst,
+                             self.bgp_driver.vrf_routes_gateways)
 
     def test__address_scope_allowed(self):
         test_scope2 = {
@@ -435,14 +442,12 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
 
         mock__update_network.assert_not_called()
 
-    @mock.patch.object(linux_net, "get_exposed_routes_on_network")
     @mock.patch.object(linux_net, "del_ip_route")
     @mock.patch.object(linux_net, "add_ip_route")
     def test__update_network(
         self,
         mock_add_ip_route,
         mock_del_ip_route,
-        mock_get_exposed_routes_on_network,
     ):
         gateway = {}
         gateway["ips"] = [
@@ -461,11 +466,6 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
         add_ips = ["192.168.1.1/24", "fdcc:8cf2:d40c:2::1/64"]
         delete_ips = ["192.168.0.1/24"]
 
-        mock_get_exposed_routes_on_network.side_effect = (
-            ["route-v4"],
-            ["route-v6"],
-        )
-
         self.sb_idl.get_port_by_name.return_value = self.fake_patch_port
 
         self.bgp_driver._update_network(
@@ -539,14 +539,12 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
             }
         )
 
-    @mock.patch.object(linux_net, "get_exposed_routes_on_network")
     @mock.patch.object(linux_net, "del_ip_route")
     @mock.patch.object(linux_net, "add_ip_route")
     def test__update_network_no_gateway(
         self,
         mock_add_ip_route,
         mock_del_ip_route,
-        mock_get_exposed_routes_on_network,
     ):
         self.bgp_driver.ovn_local_cr_lrps = {}
 
@@ -562,19 +560,16 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
             self.router_port, "gateway_port", add_ips, delete_ips
         )
 
-        mock_get_exposed_routes_on_network.assert_not_called()
         mock_del_ip_route.assert_not_called()
         mock_add_ip_route.assert_not_called()
         self.sb_idl.get_port_by_name.assert_not_called()
 
-    @mock.patch.object(linux_net, "get_exposed_routes_on_network")
     @mock.patch.object(linux_net, "del_ip_route")
     @mock.patch.object(linux_net, "add_ip_route")
     def test__update_network_no_mac(
         self,
         mock_add_ip_route,
         mock_del_ip_route,
-        mock_get_exposed_routes_on_network,
     ):
         gateway = {}
         gateway["ips"] = [
@@ -593,7 +588,6 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
             self.router_port, "gateway_port", add_ips, delete_ips
         )
 
-        mock_get_exposed_routes_on_network.assert_not_called()
         mock_del_ip_route.assert_not_called()
         mock_add_ip_route.assert_not_called()
         self.sb_idl.get_port_by_name.assert_not_called()
@@ -878,11 +872,9 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
             {}
         )
 
-    @mock.patch.object(linux_net, "get_exposed_routes_on_network")
+    @mock.patch.object(linux_net, "add_ip_route")
     @mock.patch.object(linux_net, "del_ip_route")
-    def test__withdraw_subnet(
-        self, mock_del_ip_route, mock_get_exposed_routes_on_network
-    ):
+    def test__withdraw_subnet(self, mock_del_ip_route, mock_add_ip_route):
         gateway = {}
         gateway["ips"] = [
             ipaddress.ip_interface(ip)
@@ -899,7 +891,9 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
             }
         }
 
-        mock_get_exposed_routes_on_network.side_effect = (["route-v4"], [])
+        # Another route still uses the IPv4 gateway network, so only the
+        # IPv6 link-local route is deleted
+        self.bgp_driver._add_route("192.168.2.0", 24, dst="10.0.0.11")
 
         self.bgp_driver._withdraw_subnet(port_info, "gateway_port")
 
@@ -934,16 +928,17 @@ class TestOVNBGPStretchedL2Driver(test_base.TestCase):
         ]
 
         mock_del_ip_route.assert_has_calls(expected_calls)
+        self.assertEqual(len(expected_calls), mock_del_ip_route.call_count)
+        self.assertTrue(self.bgp_driver._has_routes_via(
+            gateway["ips"][0].network))
+        self.assertFalse(self.bgp_driver._has_routes_via(
+            gateway["ips"][1].network))
 
-    @mock.patch.object(linux_net, "get_exposed_routes_on_network")
     @mock.patch.object(linux_net, "del_ip_route")
-    def test__withdraw_subnet_no_gateway(
-        self, mock_del_ip_route, mock_get_exposed_routes_on_network
-    ):
+    def test__withdraw_subnet_no_gateway(self, mock_del_ip_route):
         self.bgp_driver.ovn_local_cr_lrps = {}
         self.bgp_driver._withdraw_subnet(self.router_port, "gateway_port")
         mock_del_ip_route.assert_not_called()
-        mock_get_exposed_routes_on_network.assert_not_called()
 
     @mock.patch.object(linux_net, "delete_ip_routes")
     @mock.patch.object(linux_net, "get_routes_on_tables")
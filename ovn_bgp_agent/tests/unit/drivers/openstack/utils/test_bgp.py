@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import ipaddress
+
 from oslo_config import cfg
 from unittest import mock
 
@@ -31,11 +33,17 @@ class TestEVPN(test_base.TestCase):
 
         self.mock_frr = mock.patch.object(bgp_utils, 'frr').start()
         self.mock_linux_net = mock.patch.object(bgp_utils, 'linux_net').start()
+        mock.patch.object(bgp_utils, '_exposed_ips_migrated', False).start()
 
     def _set_exposing_method(self, exposing_method):
         CONF.set_override('exposing_method', exposing_method)
         self.addCleanup(CONF.clear_override, 'exposing_method')
 
+    def _set_route_backend(self):
+        CONF.set_override('advertisement_backend',
+                          constants.ADVERTISEMENT_BACKEND_ROUTE)
+        self.addCleanup(CONF.clear_override, 'advertisement_backend')
+
     def _test_announce_ips(self, exposing_method):
         ips = ['10.10.10.1', '10.20.10.1']
         self._set_exposing_method(exposing_method)
@@ -90,6 +98,25 @@ class TestEVPN(test_base.TestCase):
     def test_withdraw_ips_l2vni(self):
         self._test_withdraw_ips('l2vni')
 
+    def _test_ensure_routes_protocol(self, exposing_method):
+        self._set_exposing_method(exposing_method)
+
+        bgp_utils.ensure_routes_protocol()
+
+        self.mock_linux_net.ensure_routes_protocol.assert_called_once_with()
+        migrate = self.mock_linux_net.migrate_routes_protocol
+        if exposing_method in [constants.EXPOSE_METHOD_VRF]:
+            migrate.assert_not_called()
+        else:
+            migrate.assert_called_once_with(CONF.bgp_vrf_table_id,
+                                            CONF.bgp_nic)
+
+    def test_ensure_routes_protocol_underlay(self):
+        self._test_ensure_routes_protocol('underlay')
+
+    def test_ensure_routes_protocol_vrf(self):
+        self._test_ensure_routes_protocol('vrf')
+
     def _test_ensure_base_bgp_configuration(self, exposing_method):
         self._set_exposing_method(exposing_method)
 
@@ -105,6 +132,8 @@ class TestEVPN(test_base.TestCase):
             self.mock_frr.vrf_leak.assert_called_once()
             self.mock_linux_net.ensure_vrf.assert_called_once()
             self.mock_linux_net.ensure_ovn_device.assert_called_once()
+        # The routes are only re-tagged at startup
+        self.mock_linux_net.migrate_routes_protocol.assert_not_called()
 
     def test_ensure_base_bgp_configuration_underlay(self):
         self._test_ensure_base_bgp_configuration('underlay')
@@ -120,3 +149,116 @@ class TestEVPN(test_base.TestCase):
 
     def test_ensure_base_bgp_configuration_l2vni(self):
         self._test_ensure_base_bgp_configuration('l2vni')
+
+    def test_ensure_base_bgp_configuration_migrates_once(self):
+        self._set_exposing_method('underlay')
+        self.mock_linux_net.get_exposed_routes.return_value = []
+
+        bgp_utils.ensure_base_bgp_configuration()
+        bgp_utils.ensure_base_bgp_configuration()
+
+        self.mock_linux_net.get_exposed_routes.assert_called_once_with(
+            CONF.bgp_nic, CONF.bgp_vrf_table_id)
+
+    def test_ensure_base_bgp_configuration_route_backend(self):
+        self._set_exposing_method('underlay')
+        self._set_route_backend()
+
+        bgp_utils.ensure_base_bgp_configuration()
+
+        self.mock_frr.set_default_redistribute.assert_called_once_with(
+            ['connected', 'kernel'])
+
+    def test_announce_ips_route_backend(self):
+        self._set_exposing_method('underlay')
+        self._set_route_backend()
+        ips = ['10.10.10.1', 'fd00::1']
+
+        bgp_utils.announce_ips(ips)
+
+        self.mock_linux_net.add_exposed_routes.assert_called_once_with(
+            ips, CONF.bgp_nic, CONF.bgp_vrf_table_id)
+        self.mock_linux_net.add_ips_to_dev.assert_not_called()
+
+    def test_withdraw_ips_route_backend(self):
+        self._set_exposing_method('underlay')
+        self._set_route_backend()
+        ips = ['10.10.10.1', 'fd00::1']
+
+        bgp_utils.withdraw_ips(ips)
+
+        self.mock_linux_net.delete_exposed_routes.assert_called_once_with(
+            ips, CONF.bgp_nic, CONF.bgp_vrf_table_id)
+        self.mock_linux_net.del_ips_from_dev.assert_not_called()
+
+    def test_get_exposed_ips(self):
+        ret = bgp_utils.get_exposed_ips()
+        self.assertEqual(self.mock_linux_net.get_exposed_ips.return_value,
+                         ret)
+        self.mock_linux_net.get_exposed_ips.assert_called_once_with(
+            CONF.bgp_nic)
+
+    def test_get_exposed_ips_route_backend(self):
+        self._set_route_backend()
+        ret = bgp_utils.get_exposed_ips()
+        self.assertEqual(self.mock_linux_net.get_exposed_routes.return_value,
+                         ret)
+        self.mock_linux_net.get_exposed_routes.assert_called_once_with(
+            CONF.bgp_nic, CONF.bgp_vrf_table_id)
+
+    def test_count_exposed_ips_changes(self):
+        self.mock_linux_net.get_exposed_ips.return_value = [
+            '10.10.10.1', '10.10.10.3']
+
+        self.assertEqual(2, bgp_utils.count_exposed_ips_changes(
+            ['10.10.10.1', '10.10.10.2']))
+
+    def test_get_exposed_ips_on_network_route_backend(self):
+        self._set_route_backend()
+        self.mock_linux_net.get_exposed_routes.return_value = [
+            '10.10.10.1', '10.20.10.1', 'fd00::1']
+        ret = bgp_utils.get_exposed_ips_on_network(
+            ipaddress.ip_network('10.10.10.0/24'))
+        self.assertEqual(['10.10.10.1'], ret)
+
+    def test_delete_exposed_ips(self):
+        bgp_utils.delete_exposed_ips(['10.10.10.1'])
+        self.mock_linux_net.delete_exposed_ips.assert_called_once_with(
+            ['10.10.10.1'], CONF.bgp_nic)
+
+    def test_delete_exposed_ips_route_backend(self):
+        self._set_route_backend()
+        bgp_utils.delete_exposed_ips(['10.10.10.1'])
+        self.mock_linux_net.delete_exposed_routes.assert_called_once_with(
+            ['10.10.10.1'], CONF.bgp_nic, CONF.bgp_vrf_table_id)
+
+    def test_migrate_exposed_ips_to_routes(self):
+        self._set_route_backend()
+        ips = ['10.10.10.1', 'fd00::1']
+        self.mock_linux_net.get_exposed_ips.return_value = ips
+
+        bgp_utils.migrate_exposed_ips()
+
+        self.mock_linux_net.assert_has_calls([
+            mock.call.get_exposed_ips(CONF.bgp_nic),
+            mock.call.add_exposed_routes(ips, CONF.bgp_nic,
+                                         CONF.bgp_vrf_table_id),
+            mock.call.delete_exposed_ips(ips, CONF.bgp_nic)])
+
+    def test_migrate_exposed_ips_to_addresses(self):
+        ips = ['10.10.10.1', 'fd00::1']
+        self.mock_linux_net.get_exposed_routes.return_value = ips
+
+        bgp_utils.migrate_exposed_ips()
+
+        self.mock_linux_net.assert_has_calls([
+            mock.call.get_exposed_routes(CONF.bgp_nic, CONF.bgp_vrf_table_id),
+            mock.call.add_ips_to_dev(CONF.bgp_nic, ips),
+            mock.call.delete_exposed_routes(ips, CONF.bgp_nic,
+                                            CONF.bgp_vrf_table_id)])
+
+    def test_migrate_exposed_ips_nothing_to_migrate(self):
+        self.mock_linux_net.get_exposed_routes.return_value = []
+        bgp_utils.migrate_exposed_ips()
+        self.mock_linux_net.add_ips_to_dev.assert_not_called()
+        self.mock_linux_net.delete_exposed_routes.assert_not_called()
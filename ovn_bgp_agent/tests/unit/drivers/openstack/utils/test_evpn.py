@@ -21,6 +21,7 @@ from ovn_bgp_agent.drivers.openstack.utils import evpn
 from ovn_bgp_agent import exceptions
 from ovn_bgp_agent.tests import base as test_base
 from ovn_bgp_agent.tests import utils
+from ovn_bgp_agent.utils import route_ledger
 
 
 CONF = cfg.CONF
@@ -58,6 +59,7 @@ class TestEVPN(test_base.TestCase):
         # evpn.local_bridges = {}
     def _reset_evpn_local_bridges(self):
         evpn.local_bridges = {}
+        evpn.local_bridge_vlans = {}
 
     def _create_bridge(self, **override_args) -> evpn.EvpnBridge:
         self.addCleanup(self._reset_evpn_local_bridges)
@@ -134,6 +136,25 @@ class TestEVPN(test_base.TestCase):
         self.assertRaises(KeyError, evpn.lookup,
                           self._bridge_args['ovs_bridge'], '4094')
 
+    def test_lookup_vlan_teardown(self):
+        _, evpn_bridge, vlan_dev = self._create_bridge_and_vlan()
+        self.assertIs(evpn_bridge, evpn.lookup('br-ex', '4094'))
+
+        mock.patch.object(vlan_dev, 'disconnect').start()
+        vlan_dev.teardown()
+
+        self.assertRaises(KeyError, evpn.lookup, 'br-ex', '4094')
+
+    def test_lookup_vlan_teardown_other_bridge(self):
+        _, evpn_bridge, vlan_dev = self._create_bridge_and_vlan()
+        _, other_bridge, _ = self._create_bridge_and_vlan(vni=123)
+        self.assertIs(evpn_bridge, evpn.lookup('br-ex', '4094'))
+
+        mock.patch.object(vlan_dev, 'disconnect').start()
+        vlan_dev.teardown()
+
+        self.assertIs(other_bridge, evpn.lookup('br-ex', '4094'))
+
     def test_evpnbridge_setup_l3(self):
         bridge = self._create_bridge()
         bridge.setup()
@@ -335,11 +356,12 @@ class TestEVPN(test_base.TestCase):
 
         vlan_dev._setup_done = True
 
-        vlan_dev._agent_routing_tables_routes = ['entry']
+        route = self._get_route('10.10.10.10')
+        vlan_dev._agent_routing_tables_routes.add(route)
         vlan_dev._eval_disconnect()
         vlan_dev_disconnect.assert_not_called()
 
-        vlan_dev._agent_routing_tables_routes = []
+        vlan_dev._agent_routing_tables_routes.remove(route)
         vlan_dev._eval_disconnect()
         vlan_dev_disconnect.assert_called_once()
 
@@ -348,7 +370,6 @@ class TestEVPN(test_base.TestCase):
 
         vlan_dev_disconnect = mock.patch.object(vlan_dev, 'disconnect').start()
 
-        vlan_dev._agent_routing_tables_routes = []
         vlan_dev._eval_disconnect()
 
         vlan_dev_disconnect.assert_not_called()
@@ -419,11 +440,22 @@ class TestEVPN(test_base.TestCase):
         ]
         self.mock_linux_net.add_ips_to_dev.assert_has_calls(calls)
 
+    def _get_route(self, dst, dst_len=32, via=None):
+        return route_ledger.Route(
+            dev=self.veth_vrf, vlan=None, table=100, dst=dst,
+            dst_len=dst_len, oif=1337, gateway=via, family=constants.AF_INET)
+
+    def _get_routing_tables_routes(self, *routes):
+        routing_tables_routes = route_ledger.RouteLedger()
+        for route in routes:
+            routing_tables_routes.add(route)
+        return routing_tables_routes
+
     def test_evpnbridge_vlan_add_route(self, ip='10.10.10.10'):
         _, _, vlan_dev = self._create_bridge_and_vlan()
         vlan_dev._setup_done = True
 
-        routing_tables_routes = {self.veth_vrf: []}
+        routing_tables_routes = route_ledger.RouteLedger()
         addr = ip.split('/')[0]
         mask = None if '/' not in ip else ip.split('/')[1]
         mac = 'fe:12:34:56:89:12'
@@ -431,15 +463,13 @@ class TestEVPN(test_base.TestCase):
 
         vlan_dev.add_route(routing_tables_routes, ip, mac, via)
 
-        self.assertDictEqual(routing_tables_routes, {self.veth_vrf: [{
-            'ip': '10.10.10.10',
-            'mask': mask,
-            'mac': 'fe:12:34:56:89:12',
-            'via': None,
-        }]})
+        self.assertIs(routing_tables_routes,
+                      vlan_dev._agent_routing_tables_routes)
+        self.assertEqual({(addr, 32): mac}, vlan_dev._route_macs)
 
         self.mock_linux_net.add_ip_route.assert_called_once_with(
-            mock.ANY, addr, 100, self.veth_vrf, mask=mask, via=None)
+            routing_tables_routes, addr, 100, self.veth_vrf, mask=mask,
+            via=None, owner=None, gateway_owner=None)
 
         self.mock_linux_net.add_ip_nei.assert_called_once_with(
             addr, 'fe:12:34:56:89:12', self.veth_vrf)
@@ -451,7 +481,7 @@ class TestEVPN(test_base.TestCase):
         _, _, vlan_dev = self._create_bridge_and_vlan(mode='l2')
         vlan_dev._setup_done = True
 
-        routing_tables_routes = {self.veth_vrf: []}
+        routing_tables_routes = route_ledger.RouteLedger()
         ip = '10.10.10.10/32'
         mac = 'fe:12:34:56:89:12'
         via = None
@@ -465,32 +495,21 @@ class TestEVPN(test_base.TestCase):
         vlan_dev._setup_done = True
 
         addr = ip.split('/')[0]
-        routing_tables_routes = {self.veth_vrf: [{
-            'ip': addr,
-            'mask': '32',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '10.10.20.10',
-        }, {
-            'ip': '10.10.10.11',
-            'mask': '32',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '10.10.20.10',
-        }]}
+        routing_tables_routes = self._get_routing_tables_routes(
+            self._get_route(addr, via='10.10.20.10'),
+            self._get_route('10.10.10.11', via='10.10.20.10'))
         mac = 'fe:12:34:56:89:12'
+        vlan_dev._route_macs = {(addr, 32): mac, ('10.10.10.11', 32): mac}
         vlan_dev__eval_disconnect = mock.patch.object(
             vlan_dev, '_eval_disconnect').start()
 
-        vlan_dev.del_route(routing_tables_routes, ip, mac)
+        vlan_dev.del_route(routing_tables_routes, ip)
 
-        self.assertDictEqual(routing_tables_routes, {self.veth_vrf: [{
-            'ip': '10.10.10.11',
-            'mask': '32',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '10.10.20.10',
-        }]})
+        self.assertEqual({('10.10.10.11', 32): mac}, vlan_dev._route_macs)
 
         self.mock_linux_net.del_ip_route.assert_called_once_with(
-            mock.ANY, addr, 100, self.veth_vrf, mask='32', via='10.10.20.10')
+            routing_tables_routes, addr, 100, self.veth_vrf, mask=32,
+            via='10.10.20.10', owner=None)
 
         self.mock_linux_net.del_ip_nei.assert_called_once_with(
             addr, 'fe:12:34:56:89:12', self.veth_vrf)
@@ -500,34 +519,61 @@ class TestEVPN(test_base.TestCase):
     def test_evpnbridge_vlan_del_route_with_prefix(self):
         self.test_evpnbridge_vlan_del_route('10.10.10.10/32')
 
+    def test_evpnbridge_vlan_del_route_shared(self):
+        _, _, vlan_dev = self._create_bridge_and_vlan()
+        vlan_dev._setup_done = True
+
+        addr = '10.10.10.10'
+        routing_tables_routes = self._get_routing_tables_routes(
+            self._get_route(addr, via='10.10.20.10'))
+        mac = 'fe:12:34:56:89:12'
+        vlan_dev._route_macs = {(addr, 32): mac}
+        vlan_dev__eval_disconnect = mock.patch.object(
+            vlan_dev, '_eval_disconnect').start()
+        # Another owner still uses the route
+        self.mock_linux_net.del_ip_route.return_value = False
+
+        vlan_dev.del_route(routing_tables_routes, addr, owner='port1')
+
+        self.mock_linux_net.del_ip_route.assert_called_once_with(
+            routing_tables_routes, addr, 100, self.veth_vrf, mask=32,
+            via='10.10.20.10', owner='port1')
+        self.assertEqual({(addr, 32): mac}, vlan_dev._route_macs)
+        self.mock_linux_net.del_ip_nei.assert_not_called()
+        vlan_dev__eval_disconnect.assert_not_called()
+
+    def test_evpnbridge_vlan_del_route_subnet(self):
+        _, _, vlan_dev = self._create_bridge_and_vlan()
+        vlan_dev._setup_done = True
+
+        # routes are kept with the network address of the subnet
+        routing_tables_routes = self._get_routing_tables_routes(
+            self._get_route('10.10.10.0', dst_len=24, via='10.10.20.10'))
+        mock.patch.object(vlan_dev, '_eval_disconnect').start()
+
+        vlan_dev.del_route(routing_tables_routes, '10.10.10.1/24')
+
+        self.mock_linux_net.del_ip_route.assert_called_once_with(
+            routing_tables_routes, '10.10.10.1', 100, self.veth_vrf,
+            mask=24, via='10.10.20.10', owner=None)
+        self.mock_linux_net.del_ip_nei.assert_not_called()
+
     def test_evpnbridge_vlan_del_route_no_route_table(self):
         _, _, vlan_dev = self._create_bridge_and_vlan()
         vlan_dev._setup_done = True
 
         addr = '10.10.10.10'
-        routing_tables_routes = {
-            self.veth_vrf: [{
-                'ip': '10.10.10.11',
-                'mask': '32',
-                'mac': 'fe:12:34:56:89:12',
-                'via': '10.10.20.10',
-            }]
-        }
+        routing_tables_routes = self._get_routing_tables_routes(
+            self._get_route('10.10.10.11', via='10.10.20.10'))
         mac = 'fe:12:34:56:89:12'
         vlan_dev__eval_disconnect = mock.patch.object(
             vlan_dev, '_eval_disconnect').start()
 
         vlan_dev.del_route(routing_tables_routes, addr, mac)
 
-        self.assertDictEqual(routing_tables_routes, {self.veth_vrf: [{
-            'ip': '10.10.10.11',
-            'mask': '32',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '10.10.20.10',
-        }]})
-
         self.mock_linux_net.del_ip_route.assert_called_once_with(
-            mock.ANY, addr, 100, self.veth_vrf, mask=None, via=None)
+            routing_tables_routes, addr, 100, self.veth_vrf, mask=None,
+            via=None, owner=None)
 
         self.mock_linux_net.del_ip_nei.assert_called_once_with(
             addr, 'fe:12:34:56:89:12', self.veth_vrf)
@@ -538,24 +584,14 @@ class TestEVPN(test_base.TestCase):
         _, _, vlan_dev = self._create_bridge_and_vlan(mode='l2')
         vlan_dev._setup_done = True
 
-        routing_tables_routes = {self.veth_vrf: [{
-            'ip': '10.10.10.10',
-            'mask': '32',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '10.10.20.10',
-        }]}
+        routing_tables_routes = self._get_routing_tables_routes(
+            self._get_route('10.10.10.10', via='10.10.20.10'))
         ip = '10.10.10.10'
         mac = 'fe:12:34:56:89:12'
 
         vlan_dev.del_route(routing_tables_routes, ip, mac)
 
-        self.assertDictEqual(routing_tables_routes, {self.veth_vrf: [{
-            'ip': '10.10.10.10',
-            'mask': '32',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '10.10.20.10',
-        }]})
-
+        self.assertEqual(1, len(routing_tables_routes))
         self.mock_linux_net.del_ip_route.assert_not_called()
 
     def test_evpnbridge_vlan_cleanup_excessive_routes(self):
@@ -566,13 +602,14 @@ class TestEVPN(test_base.TestCase):
         self.mock_linux_net.get_interface_index.return_value = intf_idx
 
         routes = utils.create_linux_routes([{
-            '_attrs': [
+            'attrs': [
                 ('RTA_DST', '198.51.100.0'), ('RTA_OIF', intf_idx),
                 ('RTA_GATEWAY', '100.64.0.102')
             ],
             'dst_len': 28, 'type': 1,
         }, {
-            'attrs': [('RTA_DST', '198.51.100.136'), ('RTA_OIF', intf_idx)],
+            'attrs': [('RTA_DST', '198.51.100.136'), ('RTA_OIF', intf_idx),
+                      ('RTA_GATEWAY', '100.64.0.102')],
             'dst_len': 32, 'type': 1,
         }, {
             'attrs': [('RTA_DST', '198.51.100.158'), ('RTA_OIF', intf_idx)],
@@ -580,21 +617,23 @@ class TestEVPN(test_base.TestCase):
         }])
         self.mock_linux_net._get_table_routes.return_value = routes
 
-        routing_tables_routes = {self.veth_vrf: [{
-            'ip': '198.51.100.0',
-            'mask': '28',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '100.64.0.102',
-        }]}
-        del_route = mock.patch.object(vlan_dev, 'del_route').start()
+        routing_tables_routes = self._get_routing_tables_routes(
+            self._get_route('198.51.100.0', dst_len=28, via='100.64.0.102'))
+        eval_disconnect = mock.patch.object(
+            vlan_dev, '_eval_disconnect').start()
 
         vlan_dev.cleanup_excessive_routes(routing_tables_routes)
 
         calls = [
-            mock.call(mock.ANY, '198.51.100.136'),
-            mock.call(mock.ANY, '198.51.100.158'),
+            mock.call(routing_tables_routes, '198.51.100.136', 100,
+                      self.veth_vrf, mask=32, via='100.64.0.102'),
+            mock.call(routing_tables_routes, '198.51.100.158', 100,
+                      self.veth_vrf, mask=32, via=None),
         ]
-        del_route.assert_has_calls(calls, any_order=True)
+        self.mock_linux_net.del_ip_route.assert_has_calls(
+            calls, any_order=True)
+        self.assertEqual(2, self.mock_linux_net.del_ip_route.call_count)
+        eval_disconnect.assert_called()
 
     def test_evpnbridge_vlan_cleanup_excessive_routes_in_sync(self):
         _, _, vlan_dev = self._create_bridge_and_vlan()
@@ -604,7 +643,7 @@ class TestEVPN(test_base.TestCase):
         self.mock_linux_net.get_interface_index.return_value = intf_idx
 
         routes = utils.create_linux_routes([{
-            '_attrs': [
+            'attrs': [
                 ('RTA_DST', '198.51.100.0'), ('RTA_OIF', intf_idx),
                 ('RTA_GATEWAY', '100.64.0.102')
             ],
@@ -612,36 +651,38 @@ class TestEVPN(test_base.TestCase):
         }])
         self.mock_linux_net._get_table_routes.return_value = routes
 
-        routing_tables_routes = {self.veth_vrf: [{
-            'ip': '198.51.100.0',
-            'mask': '28',
-            'mac': 'fe:12:34:56:89:12',
-            'via': '100.64.0.102',
-        }]}
-        del_route = mock.patch.object(vlan_dev, 'del_route').start()
+        routing_tables_routes = self._get_routing_tables_routes(
+            self._get_route('198.51.100.0', dst_len=28, via='100.64.0.102'))
 
         vlan_dev.cleanup_excessive_routes(routing_tables_routes)
-        del_route.assert_not_called()
+        self.mock_linux_net.del_ip_route.assert_not_called()
 
     def test_evpnbridge_vlan_cleanup_excessive_routes_not_setup_yet(self):
         _, _, vlan_dev = self._create_bridge_and_vlan()
-        vlan_dev.cleanup_excessive_routes({})
+        vlan_dev.cleanup_excessive_routes(route_ledger.RouteLedger())
         self.mock_linux_net._get_table_routes.assert_not_called()
 
-    def test_evpn__find_route_info(self):
-        result = evpn._find_route_info([
-            {'ip': '198.51.100.136', 'mask': '32', 'mac': None, 'via': None},
-            {'ip': '198.51.100.158', 'mask': '24', 'mac': None, 'via': None},
-            {'ip': '127.0.0.1', 'mask': '8', 'mac': None, 'via': None},
-            {'ip': '198.51.100.0', 'mask': '28', 'mac': None, 'via': None},
-        ], '127.0.0.1')
-        self.assertDictEqual(result, {'ip': '127.0.0.1', 'mask': '8',
-                                      'mac': None, 'via': None})
-
-    def test_evpn__find_route_info_not_found(self):
-        result = evpn._find_route_info([], '127.0.0.1')
-        self.assertDictEqual(result, {'ip': '127.0.0.1', 'mask': None,
-                                      'mac': None, 'via': None})
+    def test_evpnbridge_vlan__find_route(self):
+        _, _, vlan_dev = self._create_bridge_and_vlan()
+        routes = [self._get_route('198.51.100.136'),
+                  self._get_route('198.51.100.0', dst_len=24),
+                  self._get_route('127.0.0.0', dst_len=8)]
+        vlan_dev._set_agent_cache(self._get_routing_tables_routes(*routes))
+
+        self.assertEqual((('127.0.0.0', 8), routes[2]),
+                         vlan_dev._find_route('127.0.0.0'))
+        self.assertEqual((('198.51.100.0', 24), routes[1]),
+                         vlan_dev._find_route('198.51.100.1', '24'))
+
+    def test_evpnbridge_vlan__find_route_not_found(self):
+        _, _, vlan_dev = self._create_bridge_and_vlan()
+        vlan_dev._set_agent_cache(self._get_routing_tables_routes(
+            self._get_route('127.0.0.1')))
+
+        self.assertEqual((('127.0.0.2', 32), None),
+                         vlan_dev._find_route('127.0.0.2'))
+        self.assertEqual((('127.0.0.0', 8), None),
+                         vlan_dev._find_route('127.0.0.1', '8'))
 
     def test_evpn__ensure_list(self):
         self.assertListEqual(evpn._ensure_list(None), [])
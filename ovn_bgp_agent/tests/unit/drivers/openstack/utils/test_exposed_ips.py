@@ -0,0 +1,160 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from ovn_bgp_agent.drivers.openstack.utils import exposed_ips
+from ovn_bgp_agent.tests import base as test_base
+
+
+class TestEncodeIP(test_base.TestCase):
+
+    def test_encode_decode(self):
+        for ip in ('10.0.0.1', '10.0.0.0/24', '0.0.0.0', '0.0.0.0/0',
+                   'fd00::1', 'fd00::/64', '::'):
+            self.assertEqual(ip, exposed_ips.decode_ip(
+                exposed_ips.encode_ip(ip)))
+
+    def test_encode_no_collisions(self):
+        ips = ('0.0.0.1', '::1', '0.0.0.1/32', '::1/32', '10.0.0.0/8',
+               '10.0.0.0/16')
+        self.assertEqual(len(ips),
+                         len({exposed_ips.encode_ip(ip) for ip in ips}))
+
+    def test_encode_invalid(self):
+        self.assertRaises(ValueError, exposed_ips.encode_ip, 'fake-ip')
+        self.assertRaises(ValueError, exposed_ips.encode_ip, '10.0.0.0/33')
+
+    def test_encode_netmask(self):
+        self.assertEqual(exposed_ips.encode_ip('10.0.0.0/24'),
+                         exposed_ips.encode_ip('10.0.0.0/255.255.255.0'))
+
+
+class TestExposedIPs(test_base.TestCase):
+
+    def setUp(self):
+        super(TestExposedIPs, self).setUp()
+        self.exposed_ips = exposed_ips.ExposedIPs()
+        self.info = {'bridge_device': 'br-ex', 'bridge_vlan': 10}
+
+    def test_add(self):
+        self.exposed_ips.add('ls1', '10.0.0.1', self.info)
+        self.exposed_ips.add('ls1', 'fd00::1')
+
+        self.assertEqual(2, len(self.exposed_ips))
+        self.assertEqual(self.info, self.exposed_ips.get('ls1', '10.0.0.1'))
+        self.assertEqual({}, self.exposed_ips.get('ls1', 'fd00::1'))
+        self.assertIsNone(self.exposed_ips.get('ls1', '10.0.0.2'))
+        self.assertIsNone(self.exposed_ips.get('ls2', '10.0.0.1'))
+        self.assertIsNone(self.exposed_ips.get('ls1', 'fake-ip'))
+        self.assertTrue(self.exposed_ips.contains('ls1', '10.0.0.1'))
+        self.assertFalse(self.exposed_ips.contains('ls2', '10.0.0.1'))
+        self.assertIn('fd00::1', self.exposed_ips)
+        self.assertNotIn('fake-ip', self.exposed_ips)
+
+    def test_add_via(self):
+        info = dict(self.info, via=['172.24.4.10/24', '2001:db8::10/64'])
+        self.exposed_ips.add('ls1', '10.0.0.0/24', info)
+
+        ret = self.exposed_ips.get('ls1', '10.0.0.0/24')
+        self.assertEqual(info, ret)
+        ret['via'].append('fake-ip')
+        self.assertEqual(info, self.exposed_ips.get('ls1', '10.0.0.0/24'))
+
+    def test_add_replace(self):
+        self.exposed_ips.add('ls1', '10.0.0.1')
+        self.exposed_ips.add('ls1', '10.0.0.1', self.info, replace=False)
+        self.assertEqual({}, self.exposed_ips.get('ls1', '10.0.0.1'))
+
+        self.exposed_ips.add('ls1', '10.0.0.1', self.info)
+        self.assertEqual(self.info, self.exposed_ips.get('ls1', '10.0.0.1'))
+        self.assertEqual(1, len(self.exposed_ips))
+        # The replaced info is released
+        self.assertEqual([exposed_ips._freeze_info(self.info)],
+                         list(self.exposed_ips._infos))
+        self.assertEqual(['10.0.0.1'], self.exposed_ips.get_ips())
+
+    def test_add_invalid(self):
+        self.assertRaises(ValueError, self.exposed_ips.add, 'ls1', 'fake-ip')
+        self.assertEqual(0, len(self.exposed_ips))
+
+    def test_add_interned_info(self):
+        self.exposed_ips.add('ls1', '10.0.0.1', dict(self.info))
+        self.exposed_ips.add('ls1', '10.0.0.2', dict(self.info))
+
+        ips = self.exposed_ips._switches['ls1']
+        self.assertIs(ips[exposed_ips.encode_ip('10.0.0.1')],
+                      ips[exposed_ips.encode_ip('10.0.0.2')])
+        self.assertEqual(1, len(self.exposed_ips._infos))
+
+    def test_remove(self):
+        self.exposed_ips.add('ls1', '10.0.0.1', self.info)
+        self.exposed_ips.add('ls2', '10.0.0.1', self.info)
+
+        self.assertEqual(self.info,
+                         self.exposed_ips.remove('ls1', '10.0.0.1'))
+        self.assertIsNone(self.exposed_ips.remove('ls1', '10.0.0.1'))
+        self.assertIn('10.0.0.1', self.exposed_ips)
+        self.assertEqual(['10.0.0.1'], self.exposed_ips.get_ips())
+        self.assertEqual(['ls2'], list(self.exposed_ips._switches))
+
+        self.exposed_ips.remove('ls2', '10.0.0.1')
+        self.assertNotIn('10.0.0.1', self.exposed_ips)
+        self.assertEqual([], self.exposed_ips.get_ips())
+        self.assertEqual({}, self.exposed_ips._switches)
+        self.assertEqual({}, self.exposed_ips._infos)
+        self.assertEqual({}, self.exposed_ips._info_refs)
+
+    def test_remove_invalid(self):
+        self.assertIsNone(self.exposed_ips.remove('ls1', 'fake-ip'))
+
+    def test_find(self):
+        self.exposed_ips.add('ls1', '10.0.0.1')
+        self.exposed_ips.add('ls2', '10.0.0.2', self.info)
+
+        self.assertEqual(('ls2', self.info),
+                         self.exposed_ips.find('10.0.0.2'))
+        self.assertIsNone(self.exposed_ips.find('10.0.0.3'))
+        self.assertIsNone(self.exposed_ips.find('fake-ip'))
+
+    def test_find_shared(self):
+        self.exposed_ips.add('ls1', '10.0.0.1')
+        self.exposed_ips.add('ls2', '10.0.0.1', self.info)
+
+        self.assertEqual(('ls1', {}), self.exposed_ips.find('10.0.0.1'))
+        self.exposed_ips.remove('ls1', '10.0.0.1')
+        self.assertEqual(('ls2', self.info),
+                         self.exposed_ips.find('10.0.0.1'))
+        self.exposed_ips.remove('ls2', '10.0.0.1')
+        self.assertIsNone(self.exposed_ips.find('10.0.0.1'))
+        self.assertEqual({}, self.exposed_ips._codes)
+
+    def test_get_ips(self):
+        self.exposed_ips.add('ls1', '10.0.0.1', self.info)
+        self.exposed_ips.add('ls1', 'fd00::/64')
+        self.exposed_ips.add('ls2', '10.0.0.2', self.info)
+
+        self.assertCountEqual(['10.0.0.1', 'fd00::/64', '10.0.0.2'],
+                              self.exposed_ips.get_ips())
+        self.assertCountEqual(['10.0.0.1', 'fd00::/64'],
+                              self.exposed_ips.get_ips('ls1'))
+        self.assertEqual(['10.0.0.2'], self.exposed_ips.get_ips('ls2'))
+        self.assertEqual([], self.exposed_ips.get_ips('ls3'))
+
+    def test_get_not_exposed(self):
+        self.exposed_ips.add('ls1', '10.0.0.1')
+        self.exposed_ips.add('ls1', 'fd00::/64')
+
+        self.assertEqual(
+            ['10.0.0.2', 'fd00::1', 'fake-ip'],
+            self.exposed_ips.get_not_exposed(
+                ['10.0.0.1', '10.0.0.2', 'fd00::/64', 'fd00::1', 'fake-ip']))
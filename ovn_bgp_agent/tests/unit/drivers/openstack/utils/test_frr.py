@@ -16,16 +16,24 @@
 import tempfile
 from unittest import mock
 
+from oslo_config import cfg
+
 from ovn_bgp_agent import constants
 from ovn_bgp_agent.drivers.openstack.utils import frr as frr_utils
+from ovn_bgp_agent import exceptions as agent_exc
 from ovn_bgp_agent.tests import base as test_base
 
 
+CONF = cfg.CONF
+
+
 class TestFrr(test_base.TestCase):
 
     def setUp(self):
         super(TestFrr, self).setUp()
         self.mock_vtysh = mock.patch('ovn_bgp_agent.privileged.vtysh').start()
+        self.addCleanup(frr_utils._router_id_cache.update, router_id=None,
+                        identity=None, checked_at=0)
 
     def test__get_router_id(self):
         router_id = 'fake-router'
@@ -39,6 +47,89 @@ class TestFrr(test_base.TestCase):
         ret = frr_utils._get_router_id()
         self.assertIsNone(ret)
 
+    @mock.patch.object(frr_utils, '_get_frr_identity')
+    @mock.patch.object(frr_utils, '_get_router_id')
+    def test_get_router_id(self, mock_gri, mock_identity):
+        mock_identity.return_value = 'fake-identity'
+        mock_gri.return_value = 'fake-router'
+        self.assertEqual('fake-router', frr_utils.get_router_id())
+        self.assertEqual('fake-router', frr_utils.get_router_id())
+        mock_gri.assert_called_once_with()
+
+        # FRR restarted
+        mock_identity.return_value = 'new-fake-identity'
+        mock_gri.return_value = 'new-fake-router'
+        changes = frr_utils._router_id_cache['changes']
+        self.assertEqual('new-fake-router', frr_utils.get_router_id())
+        self.assertEqual(2, mock_gri.call_count)
+        # The change is counted in the warning logged
+        self.assertEqual(changes + 1, frr_utils._router_id_cache['changes'])
+
+    @mock.patch.object(frr_utils, '_get_frr_identity')
+    @mock.patch.object(frr_utils, '_get_router_id')
+    def test_get_router_id_check_interval(self, mock_gri, mock_identity):
+        CONF.set_override('frr_router_id_check_interval', 0)
+        self.addCleanup(CONF.clear_override, 'frr_router_id_check_interval')
+        mock_gri.return_value = 'fake-router'
+        frr_utils.get_router_id()
+        frr_utils.get_router_id()
+        self.assertEqual(2, mock_gri.call_count)
+
+    @mock.patch.object(frr_utils, '_get_frr_identity')
+    @mock.patch.object(frr_utils, '_get_router_id')
+    def test_get_router_id_invalidated(self, mock_gri, mock_identity):
+        mock_identity.return_value = 'fake-identity'
+        mock_gri.return_value = 'fake-router'
+        frr_utils.get_router_id()
+
+        # Setting the router-id of the default instance invalidates it
+        mock_gri.return_value = 'new-fake-router'
+        frr_utils._run_vtysh_config('router bgp 64999 vrf fake-vrf\n'
+                                    '  bgp router-id 1.1.1.1\n')
+        self.assertEqual('fake-router', frr_utils.get_router_id())
+        frr_utils._run_vtysh_config('router bgp 64999\n'
+                                    '  bgp router-id 2.2.2.2\n')
+        changes = frr_utils._router_id_cache['changes']
+        self.assertEqual('new-fake-router', frr_utils.get_router_id())
+        self.assertEqual(2, mock_gri.call_count)
+        self.assertEqual(changes + 1, frr_utils._router_id_cache['changes'])
+
+    @mock.patch.object(frr_utils, '_get_router_id')
+    def test_get_router_id_unknown(self, mock_gri):
+        mock_gri.return_value = None
+        self.assertIsNone(frr_utils.get_router_id())
+        self.assertIsNone(frr_utils.get_router_id())
+        self.assertEqual(2, mock_gri.call_count)
+
+    def test__get_router_id_vty_session(self):
+        CONF.set_override('frr_vty_session', True)
+        self.addCleanup(CONF.clear_override, 'frr_vty_session')
+        self.mock_vtysh.run_vty_session_command.return_value = (
+            '{"ipv4Unicast": {"routerId": "fake-router"}}')
+        ret = frr_utils._get_router_id()
+        self.assertEqual('fake-router', ret)
+        self.assertFalse(self.mock_vtysh.run_vtysh_command.called)
+
+    @mock.patch.object(tempfile, 'NamedTemporaryFile')
+    def test__run_vtysh_config_vty_session(self, mock_tf):
+        CONF.set_override('frr_vty_session', True)
+        self.addCleanup(CONF.clear_override, 'frr_vty_session')
+        frr_utils._run_vtysh_config('fake-config')
+        self.mock_vtysh.run_vty_session_config.assert_called_once_with(
+            'fake-config', idle_timeout=CONF.frr_vty_session_idle_timeout)
+        self.assertFalse(mock_tf.called)
+
+    @mock.patch.object(tempfile, 'NamedTemporaryFile')
+    def test__run_vtysh_config_vty_session_fallback(self, mock_tf):
+        CONF.set_override('frr_vty_session', True)
+        self.addCleanup(CONF.clear_override, 'frr_vty_session')
+        self.mock_vtysh.run_vty_session_config.side_effect = (
+            agent_exc.FrrVtySessionError(daemon='bgpd', reason='fake'))
+        frr_utils._run_vtysh_config('fake-config')
+        mock_tf.return_value.write.assert_called_once_with('fake-config')
+        self.mock_vtysh.run_vtysh_config.assert_called_once_with(
+            mock_tf.return_value.name)
+
     @mock.patch.object(frr_utils, '_get_router_id')
     @mock.patch.object(tempfile, 'NamedTemporaryFile')
     def test_vrf_leak(self, mock_tf, mock_gri):
@@ -55,6 +146,19 @@ class TestFrr(test_base.TestCase):
         # Assert the file was closed
         mock_tf.return_value.close.assert_called_once_with()
 
+    @mock.patch.object(frr_utils, '_run_vtysh_config_cached')
+    def test_vrf_leak_graceful_restart(self, mock_run_config):
+        frr_utils.vrf_leak('fake-vrf', 'fake-bgp-as', 'fake-router-id')
+        # Turning the option off removes it
+        self.assertIn('  no bgp graceful-restart\n',
+                      mock_run_config.call_args[0][0])
+
+        CONF.set_override('bgp_graceful_restart', True)
+        self.addCleanup(CONF.clear_override, 'bgp_graceful_restart')
+        frr_utils.vrf_leak('fake-vrf', 'fake-bgp-as', 'fake-router-id')
+        self.assertIn('  bgp graceful-restart\n',
+                      mock_run_config.call_args[0][0])
+
     @mock.patch.object(frr_utils, '_get_router_id')
     @mock.patch.object(tempfile, 'NamedTemporaryFile')
     def test_vrf_leak_no_router_id(self, mock_tf, mock_gri):
@@ -63,6 +167,134 @@ class TestFrr(test_base.TestCase):
         # Assert no file was created
         self.assertFalse(mock_tf.called)
 
+    @mock.patch.object(frr_utils, '_run_vtysh_config')
+    @mock.patch.object(frr_utils, '_get_frr_identity')
+    def test_vrf_leak_config_cache(self, mock_identity, mock_run_config):
+        self.addCleanup(frr_utils.invalidate_config_cache)
+        mock_identity.return_value = (('zebra', 1), ('bgpd', 1))
+        self.mock_vtysh.run_vtysh_command.return_value = (
+            'router bgp fake-bgp-as\n'
+            ' address-family ipv4 unicast\n'
+            '  import vrf fake-vrf\n'
+            ' exit-address-family\n'
+            ' address-family ipv6 unicast\n'
+            '  import vrf fake-vrf\n'
+            ' exit-address-family\n'
+            'exit\n')
+
+        frr_utils.vrf_leak('fake-vrf', 'fake-bgp-as', 'fake-router-id')
+
+        # Only the stanza missing in the running configuration is pushed
+        pushed = mock_run_config.call_args[0][0]
+        self.assertTrue(pushed.startswith(
+            'router bgp fake-bgp-as vrf fake-vrf\n'))
+        self.assertNotIn('import vrf', pushed)
+
+        # Nothing changed, FRR is not contacted again
+        mock_run_config.reset_mock()
+        self.mock_vtysh.run_vtysh_command.reset_mock()
+        frr_utils.vrf_leak('fake-vrf', 'fake-bgp-as', 'fake-router-id')
+        self.assertFalse(mock_run_config.called)
+        self.assertFalse(self.mock_vtysh.run_vtysh_command.called)
+
+        # FRR restarted, the configuration is verified again
+        mock_identity.return_value = (('zebra', 2), ('bgpd', 2))
+        frr_utils.vrf_leak('fake-vrf', 'fake-bgp-as', 'fake-router-id')
+        self.mock_vtysh.run_vtysh_command.assert_called_once_with(
+            command='show running-config')
+        self.assertTrue(mock_run_config.called)
+        # and the router-id read again
+        self.assertEqual(0, frr_utils._router_id_cache['checked_at'])
+
+    @mock.patch.object(frr_utils, '_run_vtysh_config')
+    @mock.patch.object(frr_utils, '_get_frr_identity')
+    def test_vrf_leak_config_cache_disabled(self, mock_identity,
+                                            mock_run_config):
+        CONF.set_override('frr_config_cache', False)
+        self.addCleanup(CONF.clear_override, 'frr_config_cache')
+        frr_utils.vrf_leak('fake-vrf', 'fake-bgp-as', 'fake-router-id')
+        frr_utils.vrf_leak('fake-vrf', 'fake-bgp-as', 'fake-router-id')
+        self.assertEqual(2, mock_run_config.call_count)
+        self.assertFalse(mock_identity.called)
+
+    def test__split_config_stanzas(self):
+        config = ('no vrf vrf-1001\n'
+                  'no router bgp 64999 vrf vrf-1001\n'
+                  '\n'
+                  'interface eth0\n'
+                  ' ipv6 nd prefix fd00::/64\n'
+                  ' no ipv6 nd suppress-ra\n'
+                  'exit\n')
+        ret = frr_utils._split_config_stanzas(config)
+        self.assertEqual(
+            {'no vrf vrf-1001': ['no vrf vrf-1001'],
+             'no router bgp 64999 vrf vrf-1001': [
+                 'no router bgp 64999 vrf vrf-1001'],
+             'interface eth0': ['interface eth0',
+                                ' ipv6 nd prefix fd00::/64',
+                                ' no ipv6 nd suppress-ra']}, ret)
+
+    def test__stanza_lines_missing(self):
+        lines = ['router bgp 64999', '  no bgp graceful-restart']
+        self.assertFalse(frr_utils._stanza_lines_missing(
+            lines, ['router bgp 64999', ' bgp router-id 1.1.1.1']))
+        self.assertTrue(frr_utils._stanza_lines_missing(
+            lines, ['router bgp 64999', ' bgp graceful-restart']))
+        self.assertTrue(frr_utils._stanza_lines_missing(
+            ['router bgp 64999', '  bgp graceful-restart'],
+            ['router bgp 64999']))
+
+    @mock.patch.object(frr_utils, 'Template')
+    def test_render_template(self, mock_template):
+        self.addCleanup(frr_utils._render_normalized.cache_clear)
+        self.addCleanup(frr_utils._compiled_templates.clear)
+        template = 'fake {{ vrf_name }} {{ redistribute }}'
+        mock_template.return_value.render.return_value = 'fake-config'
+
+        for redistribute in ({'kernel', 'connected'}, ['connected', 'kernel'],
+                             {'connected', 'kernel'}):
+            ret = frr_utils.render_template(template, vrf_name='fake-vrf',
+                                            redistribute=redistribute)
+            self.assertEqual('fake-config', ret)
+
+        # Compiled and rendered only once
+        mock_template.assert_called_once_with(template)
+        mock_template.return_value.render.assert_called_once_with(
+            vrf_name='fake-vrf', redistribute=('connected', 'kernel'))
+
+    @mock.patch.object(frr_utils, '_run_vtysh_config')
+    def test_config_change_set(self, mock_run_config):
+        with frr_utils.config_change_set():
+            frr_utils.vrf_reconfigure({'vni': 1001}, 'add-vrf')
+            with frr_utils.config_change_set():
+                frr_utils.vrf_reconfigure({'vni': 1002}, 'add-vrf')
+            frr_utils.nd_reconfigure('veth-vrf-1001', 'fd00::/64', {})
+            self.assertFalse(mock_run_config.called)
+
+        mock_run_config.assert_called_once_with(mock.ANY)
+        config = mock_run_config.call_args[0][0]
+        self.assertIn('vrf vrf-1001\n', config)
+        self.assertIn('vrf vrf-1002\n', config)
+        self.assertIn('interface veth-vrf-1001\n', config)
+
+        # The change set is closed, changes are pushed straight away
+        frr_utils.vrf_reconfigure({'vni': 1001}, 'del-vrf')
+        self.assertEqual(2, mock_run_config.call_count)
+
+    @mock.patch.object(frr_utils, '_run_vtysh_config')
+    def test_config_change_set_fallback(self, mock_run_config):
+        mock_run_config.side_effect = [Exception, None, Exception]
+        with frr_utils.config_change_set():
+            frr_utils.vrf_reconfigure({'vni': 1001}, 'add-vrf')
+            frr_utils.vrf_reconfigure({'vni': 1002}, 'add-vrf')
+
+        # One attempt with everything, then one per reconfiguration
+        self.assertEqual(3, mock_run_config.call_count)
+        calls = mock_run_config.call_args_list
+        self.assertIn('vrf vrf-1001\n', calls[1][0][0])
+        self.assertNotIn('vrf vrf-1002\n', calls[1][0][0])
+        self.assertIn('vrf vrf-1002\n', calls[2][0][0])
+
     @mock.patch.object(tempfile, 'NamedTemporaryFile')
     def _test_vrf_reconfigure(self, mock_tf, add_vrf=True):
         action = 'add-vrf' if add_vrf else 'del-vrf'
@@ -84,6 +84,22 @@ class TestOVS(test_base.TestCase):
         self.mock_ovs_vsctl.ovs_cmd.assert_called_once_with(
             'ovs-vsctl', ['list-ports', bridge])
 
+    def test_get_ovs_patch_ports_info(self):
+        bridge = 'fake-bridge'
+        self.mock_ovs_vsctl.ovs_cmd.side_effect = [
+            ['patch-provnet-1\nother-port\npatch-provnet-2\n'],
+            ['3\n'], ['4\n']]
+
+        ret = ovs_utils.get_ovs_patch_ports_info(bridge)
+
+        self.assertEqual(['3', '4'], ret)
+        self.mock_ovs_vsctl.ovs_cmd.assert_has_calls([
+            mock.call('ovs-vsctl', ['list-ports', bridge]),
+            mock.call('ovs-vsctl', ['get', 'Interface', 'patch-provnet-1',
+                                    'ofport']),
+            mock.call('ovs-vsctl', ['get', 'Interface', 'patch-provnet-2',
+                                    'ofport'])])
+
     def test_get_ovs_patch_port_ofport(self):
         patch = 'fake-patch'
         ofport = ['1']
@@ -435,6 +451,19 @@ class TestOvsIdl(test_base.TestCase):
         # Assert the OvsdbIdl instance was created
         self.assertIsInstance(self.ovs_idl.idl_ovs, idl_ovs.OvsdbIdl)
 
+    @mock.patch('ovsdbapp.event.RowEventHandler')
+    @mock.patch('ovsdbapp.backend.ovs_idl.connection.Connection')
+    @mock.patch('ovs.db.idl.Idl')
+    @mock.patch('ovsdbapp.backend.ovs_idl.idlutils.get_schema_helper')
+    def test_start_events(self, mock_schema_helper, mock_idl, mock_conn,
+                          mock_handler):
+        events = [mock.Mock()]
+        self.ovs_idl.start('fake-connection', events=events)
+
+        handler = mock_handler.return_value
+        handler.watch_events.assert_called_once_with(events)
+        self.assertEqual(handler.notify, mock_idl.return_value.notify)
+
     def _test_ovs_ext_ids_getters(self, method, row, expected_return):
         self.execute_ref.return_value = row
         ret = method()
@@ -19,6 +19,7 @@ from oslo_config import cfg
 
 from ovn_bgp_agent import constants
 from ovn_bgp_agent.drivers.openstack.utils import evpn as evpn_utils
+from ovn_bgp_agent.drivers.openstack.utils import frr as frr_utils
 from ovn_bgp_agent.drivers.openstack.utils import ovn as ovn_utils
 from ovn_bgp_agent.drivers.openstack.utils import ovs as ovs_utils
 from ovn_bgp_agent.drivers.openstack.utils import wire
@@ -26,6 +27,7 @@ from ovn_bgp_agent import exceptions as agent_exc
 from ovn_bgp_agent.tests import base as test_base
 from ovn_bgp_agent.tests import utils as test_utils
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import route_ledger
 
 CONF = cfg.CONF
 
@@ -53,6 +55,47 @@ class TestWire(test_base.TestCase):
         self.nb_idl.lr_route_add = mock.Mock()
         self.nb_idl.lr_policy_add = mock.Mock()
 
+    @mock.patch.object(linux_net, 'del_ndp_proxies')
+    @mock.patch.object(linux_net, 'add_ndp_proxies')
+    def test__add_del_ndp_proxies_shared(self, m_add, m_del):
+        self.addCleanup(wire._ndp_proxies.clear)
+        cidrs = ['fd00::/64', '10.0.0.0/24']
+
+        wire._add_ndp_proxies(['fd00::10'], cidrs, 'br-ex', 10)
+        m_add.assert_called_once_with(['fd00::'], 'br-ex', 10)
+        # Already wired for another port
+        m_add.reset_mock()
+        wire._add_ndp_proxies(['fd00::20'], cidrs, 'br-ex', 10)
+        m_add.assert_not_called()
+
+        # Still needed by the other port
+        wire._del_ndp_proxies(['fd00::10'], cidrs, 'br-ex', 10)
+        m_del.assert_not_called()
+        wire._del_ndp_proxies(['fd00::20'], cidrs, 'br-ex', 10)
+        m_del.assert_called_once_with(['fd00::'], 'br-ex', 10)
+
+    @mock.patch.object(linux_net, 'add_ndp_proxies')
+    def test__add_ndp_proxies_ipv4(self, m_add):
+        wire._add_ndp_proxies(['10.0.0.10'], ['10.0.0.0/24'], 'br-ex', None)
+        m_add.assert_not_called()
+        self.assertEqual({}, wire._ndp_proxies)
+
+    @mock.patch.object(linux_net, 'sync_ndp_proxies')
+    @mock.patch.object(linux_net, 'add_ndp_proxies')
+    def test_sync_ndp_proxies(self, m_add, m_sync):
+        self.addCleanup(wire._ndp_proxies.clear)
+        wire._add_ndp_proxies(['fd00::10'], ['fd00::/64'], 'br-ex', 10)
+        wire._add_ndp_proxies(['fd01::10'], ['fd01::/64'], 'br-vlan', 20)
+        m_sync.side_effect = (None, Exception('boom'))
+
+        wire.sync_ndp_proxies({'br-ex'})
+
+        # The bridge itself has no proxies, so its leftovers are removed
+        m_sync.assert_has_calls([mock.call([], 'br-ex', None),
+                                 mock.call(['fd00::'], 'br-ex', 10)],
+                                any_order=True)
+        self.assertEqual(2, m_sync.call_count)
+
     @mock.patch.object(wire, '_ensure_base_wiring_config_underlay')
     def test_ensure_base_wiring_config(self, mock_underlay):
         wire.ensure_base_wiring_config(self.sb_idl, self.ovs_idl,
@@ -130,8 +173,15 @@ class TestWire(test_base.TestCase):
         evpn_setup = mock.patch.object(evpn_utils, 'setup').start()
         evpn_setup.return_value = evpn_bridge
 
+        mock_change_set = mock.patch.object(frr_utils,
+                                            'config_change_set').start()
+
         wire._ensure_base_wiring_config_evpn(self.nb_idl, self.ovs_idl)
 
+        mock_change_set.assert_called_once_with()
+        mock_change_set.return_value.__exit__.assert_called_once_with(
+            None, None, None)
+
         evpn_setup.assert_called_with(ovs_bridge='br-ex',
                                       vni=100,
                                       evpn_opts={'route_targets': [],
@@ -377,6 +427,39 @@ class TestWire(test_base.TestCase):
 
         mock_underlay.assert_not_called()
 
+    @mock.patch.object(wire, '_del_ip_rule')
+    @mock.patch.object(wire, '_add_ip_rule')
+    @mock.patch.object(wire, '_ensure_updated_mac_tweak_flows')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    @mock.patch.object(linux_net, 'get_interface_index', return_value=5)
+    @mock.patch.object(linux_net.pyroute2, 'IPRoute')
+    def test_wire_provider_port_underlay_shared_route(
+            self, mock_ipr, m_index, m_route_create, m_route_delete, *args):
+        mock_ipr().__enter__().route.return_value = []
+        routing_tables_routes = route_ledger.RouteLedger()
+        port_ips = ['172.24.4.10']
+        routing_table = {'fake-bridge': 5}
+
+        # Two provider networks on the same bridge exposing the same IP
+        for owner in ('fake-dp1', 'fake-dp2'):
+            wire.wire_provider_port(routing_tables_routes, {}, port_ips,
+                                    'fake-bridge', None, 'fake-localnet',
+                                    routing_table, [], owner=owner)
+        self.assertEqual(1, len(routing_tables_routes))
+
+        wire.unwire_provider_port(routing_tables_routes, port_ips,
+                                  'fake-bridge', None, routing_table, [],
+                                  owner='fake-dp1')
+        m_route_delete.assert_not_called()
+        self.assertEqual(1, len(routing_tables_routes))
+
+        wire.unwire_provider_port(routing_tables_routes, port_ips,
+                                  'fake-bridge', None, routing_table, [],
+                                  owner='fake-dp2')
+        m_route_delete.assert_called_once()
+        self.assertEqual(0, len(routing_tables_routes))
+
     @mock.patch.object(wire, '_wire_provider_port_underlay')
     def test_wire_provider_port_underlay(self, mock_underlay):
         routing_tables_routes = {}
@@ -390,10 +473,11 @@ class TestWire(test_base.TestCase):
 
         wire.wire_provider_port(routing_tables_routes, ovs_flows, port_ips,
                                 bridge_device, bridge_vlan, localnet,
-                                routing_table, proxy_cidrs)
+                                routing_table, proxy_cidrs, owner='fake-owner')
         mock_underlay.assert_called_once_with(
             routing_tables_routes, ovs_flows, port_ips, bridge_device,
-            bridge_vlan, localnet, routing_table, proxy_cidrs, lladdr=None)
+            bridge_vlan, localnet, routing_table, proxy_cidrs, lladdr=None,
+            owner='fake-owner')
 
     @mock.patch.object(wire, '_wire_provider_port_ovn')
     def test_wire_provider_port_ovn(self, mock_ovn):
@@ -441,13 +525,15 @@ class TestWire(test_base.TestCase):
         ret = wire.wire_provider_port(routing_tables_routes, ovs_flows,
                                       port_ips, bridge_device, bridge_vlan,
                                       localnet, routing_table, proxy_cidrs,
-                                      mac=mac, ovn_idl=self.nb_idl)
+                                      mac=mac, ovn_idl=self.nb_idl,
+                                      owner='fake-owner')
         self.assertTrue(ret)
 
         evpn_lookup.assert_called_once_with(bridge_device, bridge_vlan)
         evpn_bridge.get_vlan.assert_called_once_with(bridge_vlan)
         vlan_dev.add_route.assert_called_with(routing_tables_routes,
-                                              port_ips[0], mac, via=None)
+                                              port_ips[0], mac, via=None,
+                                              owner='fake-owner')
 
     def test_wire_provider_port_evpn_unconfigured(self):
         CONF.set_override('exposing_method', 'vrf')
@@ -538,10 +624,10 @@ class TestWire(test_base.TestCase):
 
         wire.unwire_provider_port(routing_tables_routes, port_ips,
                                   bridge_device, bridge_vlan, routing_table,
-                                  proxy_cidrs)
+                                  proxy_cidrs, owner='fake-owner')
         mock_underlay.assert_called_once_with(
             routing_tables_routes, port_ips, bridge_device, bridge_vlan,
-            routing_table, proxy_cidrs, lladdr=None)
+            routing_table, proxy_cidrs, lladdr=None, owner='fake-owner')
 
     @mock.patch.object(wire, '_unwire_provider_port_ovn')
     def test_unwire_provider_port_ovn(self, mock_ovn):
@@ -574,9 +660,10 @@ class TestWire(test_base.TestCase):
 
         wire.unwire_provider_port(routing_tables_routes, port_ips,
                                   bridge_device, bridge_vlan, routing_table,
-                                  proxy_cidrs, mac='boo')
+                                  proxy_cidrs, mac='boo', owner='fake-owner')
         mock_evpn.assert_called_once_with(routing_tables_routes, port_ips,
-                                          bridge_device, bridge_vlan, 'boo')
+                                          bridge_device, bridge_vlan, 'boo',
+                                          owner='fake-owner')
 
     @mock.patch.object(wire, '_unwire_provider_port_underlay')
     @mock.patch.object(wire, '_unwire_provider_port_ovn')
@@ -617,11 +704,12 @@ class TestWire(test_base.TestCase):
 
         ret = wire._unwire_provider_port_evpn(routing_tables_routes, port_ips,
                                               bridge_device, bridge_vlan,
-                                              lladdr)
+                                              lladdr, owner='fake-owner')
         self.assertTrue(ret)
 
         vlan_dev.del_route.assert_called_with(routing_tables_routes,
-                                              port_ips[0], lladdr)
+                                              port_ips[0], lladdr,
+                                              owner='fake-owner')
 
     def test__unwire_provider_port_evpn_unconfigured(self):
         routing_tables_routes = {}
@@ -673,10 +761,12 @@ class TestWire(test_base.TestCase):
         cr_lrp_ips = ['fake-crlrp-ip']
 
         wire.wire_lrp_port(routing_tables_routes, ip, bridge_device,
-                           bridge_vlan, routing_tables, cr_lrp_ips)
+                           bridge_vlan, routing_tables, cr_lrp_ips,
+                           owner='fake-owner', gateway_owner='fake-cr-lrp')
         mock_underlay.assert_called_once_with(
             routing_tables_routes, ip, bridge_device, bridge_vlan,
-            routing_tables, cr_lrp_ips)
+            routing_tables, cr_lrp_ips, owner='fake-owner',
+            gateway_owner='fake-cr-lrp')
 
     @mock.patch.object(wire, '_unwire_lrp_port_underlay')
     def test_unwire_lrp_port_underlay(self, mock_underlay):
@@ -688,10 +778,181 @@ class TestWire(test_base.TestCase):
         cr_lrp_ips = ['fake-crlrp-ip']
 
         wire.unwire_lrp_port(routing_tables_routes, ip, bridge_device,
-                             bridge_vlan, routing_tables, cr_lrp_ips)
+                             bridge_vlan, routing_tables, cr_lrp_ips,
+                             owner='fake-owner')
         mock_underlay.assert_called_once_with(
             routing_tables_routes, ip, bridge_device, bridge_vlan,
-            routing_tables, cr_lrp_ips)
+            routing_tables, cr_lrp_ips, owner='fake-owner')
+
+    @mock.patch.object(linux_net, 'update_nexthop_gateway')
+    def test_update_lrp_port_gateway_underlay(self, mock_update):
+        mock_update.side_effect = [True, False]
+        ret = wire.update_lrp_port_gateway(
+            'fake-routes', 'fake-cr-lrp', 'fake-bridge', '101',
+            ['172.24.4.10', '2001::10'])
+        self.assertTrue(ret)
+        mock_update.assert_has_calls([
+            mock.call('fake-routes', 'fake-cr-lrp', 'fake-bridge',
+                      '172.24.4.10', vlan='101'),
+            mock.call('fake-routes', 'fake-cr-lrp', 'fake-bridge',
+                      '2001::10', vlan='101')])
+
+    @mock.patch.object(linux_net, 'update_nexthop_gateway')
+    def test_update_lrp_port_gateway_underlay_advertisement_subnet(
+            self, mock_update):
+        CONF.set_override('advertisement_method_tenant_networks',
+                          constants.ADVERTISEMENT_METHOD_SUBNET)
+        self.addCleanup(CONF.clear_override,
+                        'advertisement_method_tenant_networks')
+        mock_update.return_value = False
+        ret = wire.update_lrp_port_gateway(
+            'fake-routes', 'fake-cr-lrp', 'fake-bridge', None,
+            ['172.24.4.10'])
+        self.assertFalse(ret)
+        mock_update.assert_has_calls([
+            mock.call('fake-routes', 'fake-cr-lrp', 'fake-bridge',
+                      '172.24.4.10', vlan=None),
+            mock.call('fake-routes', 'fake-cr-lrp', CONF.bgp_nic,
+                      '172.24.4.10', vlan=None)])
+
+    @mock.patch.object(linux_net, 'update_nexthop_gateway')
+    @mock.patch.object(evpn_utils, 'lookup_vlan')
+    def test_update_lrp_port_gateway_evpn(self, mock_lookup_vlan,
+                                          mock_update):
+        CONF.set_override('exposing_method', 'vrf')
+        self.addCleanup(CONF.clear_override, 'exposing_method')
+        mock_lookup_vlan.return_value = mock.Mock(veth_vrf='veth-vrf')
+        mock_update.return_value = True
+        ret = wire.update_lrp_port_gateway(
+            'fake-routes', 'fake-cr-lrp', 'fake-bridge', '101',
+            ['172.24.4.10'])
+        self.assertTrue(ret)
+        mock_lookup_vlan.assert_called_once_with('fake-bridge', '101')
+        mock_update.assert_called_once_with(
+            'fake-routes', 'fake-cr-lrp', 'veth-vrf', '172.24.4.10',
+            vlan=None)
+
+    @mock.patch.object(linux_net, 'update_nexthop_gateway')
+    @mock.patch.object(evpn_utils, 'lookup_vlan')
+    def test_update_lrp_port_gateway_evpn_not_setup(self, mock_lookup_vlan,
+                                                    mock_update):
+        CONF.set_override('exposing_method', 'vrf')
+        self.addCleanup(CONF.clear_override, 'exposing_method')
+        mock_lookup_vlan.side_effect = KeyError
+        self.assertFalse(wire.update_lrp_port_gateway(
+            'fake-routes', 'fake-cr-lrp', 'fake-bridge', '101',
+            ['172.24.4.10']))
+        mock_update.assert_not_called()
+
+    @mock.patch.object(ovs_utils, 'remove_extra_ovs_flows')
+    @mock.patch.object(ovs_utils, 'ensure_mac_tweak_flows')
+    @mock.patch.object(ovs_utils, 'get_ovs_patch_ports_info')
+    def test_sync_bridge_flows(self, mock_ports_info, mock_ensure_flows,
+                               mock_remove_flows):
+        mock_ports_info.return_value = ['5']
+        ovs_flows = {'br-ex': {'mac': 'fake-mac', 'in_port': ['4']}}
+
+        self.assertTrue(wire.sync_bridge_flows(ovs_flows, 'br-ex'))
+
+        self.assertEqual({'br-ex': {'mac': 'fake-mac', 'in_port': ['5']}},
+                         ovs_flows)
+        mock_ensure_flows.assert_called_once_with(
+            'br-ex', 'fake-mac', ['5'], constants.OVS_RULE_COOKIE)
+        mock_remove_flows.assert_called_once_with(
+            ovs_flows, 'br-ex', constants.OVS_RULE_COOKIE)
+
+    @mock.patch.object(ovs_utils, 'ensure_mac_tweak_flows')
+    @mock.patch.object(ovs_utils, 'get_ovs_patch_ports_info')
+    def test_sync_bridge_flows_unknown_bridge(self, mock_ports_info,
+                                              mock_ensure_flows):
+        self.assertFalse(wire.sync_bridge_flows({}, 'br-ex'))
+
+        mock_ports_info.assert_not_called()
+        mock_ensure_flows.assert_not_called()
+
+    @mock.patch.object(ovs_utils, 'ensure_mac_tweak_flows')
+    @mock.patch.object(ovs_utils, 'get_ovs_patch_ports_info')
+    def test_sync_bridge_flows_evpn(self, mock_ports_info,
+                                    mock_ensure_flows):
+        CONF.set_override('exposing_method', 'vrf')
+        self.addCleanup(CONF.clear_override, 'exposing_method')
+        ovs_flows = {'br-ex': {'mac': 'fake-mac', 'in_port': ['4'],
+                               'evpn': {}}}
+
+        self.assertFalse(wire.sync_bridge_flows(ovs_flows, 'br-ex'))
+
+        mock_ports_info.assert_not_called()
+        mock_ensure_flows.assert_not_called()
+
+    def _set_aggregated_forwarding(self):
+        CONF.set_override('exposed_ips_forwarding',
+                          constants.EXPOSED_IPS_FORWARDING_AGGREGATED)
+        self.addCleanup(CONF.clear_override, 'exposed_ips_forwarding')
+        mock.patch.object(wire, '_aggregated_ip_rules', set()).start()
+
+    @mock.patch.object(linux_net, 'delete_ip_rules')
+    @mock.patch.object(linux_net, 'get_ovn_ip_rules')
+    def test_get_ovn_ip_rules(self, m_get_rules, m_del_rules):
+        rules = {'10.0.0.1/32': {'table': 5, 'family': constants.AF_INET}}
+        m_get_rules.return_value = rules
+
+        ret = wire.get_ovn_ip_rules({'br-ex': 5})
+
+        self.assertEqual(rules, ret)
+        m_get_rules.assert_called_once_with(mock.ANY)
+        m_del_rules.assert_not_called()
+
+    @mock.patch.object(linux_net, 'add_aggregated_ip_rule')
+    @mock.patch.object(linux_net, 'delete_ip_rules')
+    @mock.patch.object(linux_net, 'get_ovn_ip_rules')
+    def test_get_ovn_ip_rules_aggregated(self, m_get_rules, m_del_rules,
+                                         m_add_aggregated):
+        self._set_aggregated_forwarding()
+        per_ip_rule = {'table': 5, 'family': constants.AF_INET}
+        m_get_rules.return_value = {
+            '10.0.0.1/32': per_ip_rule,
+            'lookup-5-2': {'table': 5, 'family': constants.AF_INET,
+                           'suppress_prefixlength': 0}}
+
+        ret = wire.get_ovn_ip_rules({'br-ex': 5})
+
+        self.assertEqual({}, ret)
+        m_add_aggregated.assert_called_once_with(5, constants.AF_INET6)
+        m_del_rules.assert_called_once_with({'10.0.0.1/32': per_ip_rule})
+        self.assertEqual({(5, constants.AF_INET), (5, constants.AF_INET6)},
+                         wire._aggregated_ip_rules)
+
+    @mock.patch.object(linux_net, 'add_ip_nei')
+    @mock.patch.object(linux_net, 'add_aggregated_ip_rule')
+    @mock.patch.object(linux_net, 'add_ip_rule')
+    def test__add_ip_rule_aggregated(self, m_ip_rule, m_add_aggregated,
+                                     m_ip_nei):
+        self._set_aggregated_forwarding()
+
+        wire._add_ip_rule('10.0.0.1', 5, dev='br-ex', lladdr='fake-mac')
+        wire._add_ip_rule('10.0.0.2', 5, dev='br-ex')
+
+        m_ip_rule.assert_not_called()
+        m_add_aggregated.assert_called_once_with(5, constants.AF_INET)
+        m_ip_nei.assert_called_once_with('10.0.0.1', 'fake-mac', 'br-ex')
+
+    @mock.patch.object(linux_net, 'add_aggregated_ip_rule')
+    def test__add_ip_rule_aggregated_invalid_ip(self, m_add_aggregated):
+        self._set_aggregated_forwarding()
+
+        self.assertRaises(agent_exc.InvalidPortIP, wire._add_ip_rule,
+                          'fake-ip', 5)
+        m_add_aggregated.assert_not_called()
+
+    @mock.patch.object(linux_net, 'del_ip_nei')
+    @mock.patch.object(linux_net, 'del_ip_rule')
+    def test__del_ip_rule_aggregated(self, m_ip_rule, m_ip_nei):
+        self._set_aggregated_forwarding()
+
+        wire._del_ip_rule('10.0.0.1/32', 5, dev='br-ex', lladdr='fake-mac')
+
+        m_ip_rule.assert_not_called()
+        m_ip_nei.assert_called_once_with('10.0.0.1/32', 'fake-mac', 'br-ex')
 
     @mock.patch.object(linux_net, 'add_ip_route')
     @mock.patch.object(linux_net, 'get_ip_version')
@@ -707,12 +968,15 @@ class TestWire(test_base.TestCase):
 
         ret = wire._wire_lrp_port_underlay(routing_tables_routes, ip,
                                            bridge_device, bridge_vlan,
-                                           routing_tables, cr_lrp_ips)
+                                           routing_tables, cr_lrp_ips,
+                                           owner='fake-owner',
+                                           gateway_owner='fake-cr-lrp')
         self.assertTrue(ret)
         m_ip_rule.assert_called_once_with(ip, 5)
         m_ip_route.assert_called_once_with(
             routing_tables_routes, '10.0.0.1', 5, 'fake-bridge',
-            vlan='101', mask='24', via='fake-crlrp-ip')
+            vlan='101', mask='24', via='fake-crlrp-ip', owner='fake-owner',
+            gateway_owner='fake-cr-lrp')
 
     @mock.patch.object(linux_net, 'add_ip_rule')
     def test__wire_lrp_port_underlay_no_bridge(self, m_ip_rule):
@@ -775,11 +1039,13 @@ class TestWire(test_base.TestCase):
             mock.call(
                 routing_tables_routes, ip.split('/')[0],
                 routing_tables[bridge_device], bridge_device,
-                vlan=bridge_vlan, mask=ip.split('/')[1], via=cr_lrp_ips[0]),
+                vlan=bridge_vlan, mask=ip.split('/')[1], via=cr_lrp_ips[0],
+                owner=None, gateway_owner=None),
             mock.call(
                 routing_tables_routes, ip.split('/')[0],
                 CONF.bgp_vrf_table_id, CONF.bgp_nic,
-                mask=ip.split('/')[1], via=cr_lrp_ips[0])]
+                mask=ip.split('/')[1], via=cr_lrp_ips[0], owner=None,
+                gateway_owner=None)]
         m_ip_route.assert_has_calls(expected_ip_route_calls)
 
     @mock.patch.object(linux_net, 'del_ip_route')
@@ -796,12 +1062,13 @@ class TestWire(test_base.TestCase):
 
         ret = wire._unwire_lrp_port_underlay(routing_tables_routes, ip,
                                              bridge_device, bridge_vlan,
-                                             routing_tables, cr_lrp_ips)
+                                             routing_tables, cr_lrp_ips,
+                                             owner='fake-owner')
         self.assertTrue(ret)
         m_ip_rule.assert_called_once_with(ip, 5)
         m_ip_route.assert_called_once_with(
             routing_tables_routes, '10.0.0.1', 5, 'fake-bridge',
-            vlan='101', mask='24', via='fake-crlrp-ip')
+            vlan='101', mask='24', via='fake-crlrp-ip', owner='fake-owner')
 
     @mock.patch.object(linux_net, 'del_ip_rule')
     def test__unwire_lrp_port_underlay_no_bridge(self, m_ip_rule):
@@ -865,9 +1132,10 @@ class TestWire(test_base.TestCase):
             mock.call(
                 routing_tables_routes, ip.split('/')[0],
                 routing_tables[bridge_device], bridge_device,
-                vlan=bridge_vlan, mask=ip.split('/')[1], via=cr_lrp_ips[0]),
+                vlan=bridge_vlan, mask=ip.split('/')[1], via=cr_lrp_ips[0],
+                owner=None),
             mock.call(
                 routing_tables_routes, ip.split('/')[0],
                 CONF.bgp_vrf_table_id, CONF.bgp_nic,
-                mask=ip.split('/')[1], via=cr_lrp_ips[0])]
+                mask=ip.split('/')[1], via=cr_lrp_ips[0], owner=None)]
         m_ip_route.assert_has_calls(expected_ip_route_calls)
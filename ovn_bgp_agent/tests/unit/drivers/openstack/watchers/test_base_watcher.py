@@ -170,3 +170,31 @@ class TestLRPChassisEvent(test_base.TestCase):
         self.assertEqual('test-net', self.lrp_event._get_network(row))
         row = utils.create_row(external_ids={})
         self.assertEqual(None, self.lrp_event._get_network(row))
+
+
+class TestBridgePortsUpdateEvent(test_base.TestCase):
+
+    def setUp(self):
+        super(TestBridgePortsUpdateEvent, self).setUp()
+        self.agent = mock.Mock(ovn_bridge_mappings={'public': 'br-ex'})
+        self.event = base_watcher.BridgePortsUpdateEvent(self.agent)
+
+    def test_match_fn(self):
+        row = utils.create_row(name='br-ex', ports=['port-0', 'port-1'])
+        old = utils.create_row(ports=['port-0'])
+        self.assertTrue(self.event.match_fn(mock.Mock(), row, old))
+
+    def test_match_fn_not_provider_bridge(self):
+        row = utils.create_row(name='br-int', ports=['port-0', 'port-1'])
+        old = utils.create_row(ports=['port-0'])
+        self.assertFalse(self.event.match_fn(mock.Mock(), row, old))
+
+    def test_match_fn_ports_not_changed(self):
+        row = utils.create_row(name='br-ex', ports=['port-0'])
+        old = utils.create_row(external_ids={})
+        self.assertFalse(self.event.match_fn(mock.Mock(), row, old))
+
+    def test_run(self):
+        row = utils.create_row(name='br-ex', ports=['port-0'])
+        self.event.run(mock.Mock(), row, mock.Mock())
+        self.agent.mark_bridge_dirty.assert_called_once_with('br-ex')
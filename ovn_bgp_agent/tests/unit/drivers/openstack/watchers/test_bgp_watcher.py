@@ -1059,7 +1059,7 @@ class TestLocalnetCreateDeleteEvent(test_base.TestCase):
 
     def test_run(self):
         self.event.run(mock.Mock(), mock.Mock(), mock.Mock())
-        self.agent.sync.assert_called_once()
+        self.agent.sync.assert_called_once_with(wait=False)
 
 
 class TestChassisCreateEvent(test_base.TestCase):
@@ -1077,11 +1077,13 @@ class TestChassisCreateEvent(test_base.TestCase):
 
         self.assertFalse(self.event.first_time)
         self.agent.sync.assert_not_called()
+        self.agent.notify_reconnected.assert_not_called()
 
     def test_run_not_first_time(self):
         self.event.first_time = False
         self.event.run(mock.Mock(), mock.Mock(), mock.Mock())
-        self.agent.sync.assert_called_once_with()
+        self.agent.notify_reconnected.assert_called_once_with()
+        self.agent.sync.assert_called_once_with(wait=False)
 
 
 class TestChassisPrivateCreateEvent(TestChassisCreateEvent):
@@ -518,10 +518,12 @@ class TestChassisCreateEvent(test_base.TestCase):
 
         self.assertFalse(self.event.first_time)
         self.agent.sync.assert_not_called()
+        self.agent.notify_reconnected.assert_not_called()
 
     def test_run_not_first_time(self):
         self.event.first_time = False
         self.event.run(mock.Mock(), mock.Mock(), mock.Mock())
+        self.agent.notify_reconnected.assert_called_once_with()
         self.agent.sync.assert_called_once_with()
 
 
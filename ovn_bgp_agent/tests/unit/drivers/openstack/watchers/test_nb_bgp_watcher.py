@@ -630,7 +630,7 @@ class TestLogicalSwitchUpdateEvent(test_base.TestCase):
 
     def test_run(self):
         self.event.run(None, None, None)
-        self.agent.sync.assert_called_once()
+        self.agent.sync.assert_called_once_with(wait=False)
 
 
 class TestLocalnetCreateDeleteEvent(test_base.TestCase):
@@ -651,7 +651,7 @@ class TestLocalnetCreateDeleteEvent(test_base.TestCase):
     def test_run(self):
         row = utils.create_row(type=constants.OVN_LOCALNET_VIF_PORT_TYPE)
         self.event.run(None, row, None)
-        self.agent.sync.assert_called_once()
+        self.agent.sync.assert_called_once_with(wait=False)
 
 
 class TestChassisRedirectCreateEvent(test_base.TestCase):
@@ -685,6 +685,20 @@ class TestChassisRedirectCreateEvent(test_base.TestCase):
         old = utils.create_row()
         self.assertFalse(self.event.match_fn(mock.Mock(), row, old))
 
+    def test_match_fn_networks_change(self):
+        row = utils.create_row(mac='fake-mac',
+                               networks=['192.168.0.3/24'],
+                               status={'hosting-chassis': self.chassis_id})
+        old = utils.create_row(networks=['192.168.0.2/24'])
+        self.assertTrue(self.event.match_fn(mock.Mock(), row, old))
+
+    def test_match_fn_networks_no_change(self):
+        row = utils.create_row(mac='fake-mac',
+                               networks=['192.168.0.2/24', '2001::2/64'],
+                               status={'hosting-chassis': self.chassis_id})
+        old = utils.create_row(networks=['2001::2/64', '192.168.0.2/24'])
+        self.assertFalse(self.event.match_fn(mock.Mock(), row, old))
+
     def test_match_fn_different_chassis(self):
         row = utils.create_row(mac='fake-mac',
                                networks=['192.168.0.2/24'],
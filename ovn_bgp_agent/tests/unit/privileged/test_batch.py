@@ -0,0 +1,121 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from ovn_bgp_agent import exceptions as agent_exc
+from ovn_bgp_agent import privileged
+from ovn_bgp_agent.privileged import batch
+from ovn_bgp_agent.privileged import linux_net as priv_linux_net
+from ovn_bgp_agent.tests import base as test_base
+
+
+class TestBatch(test_base.TestCase):
+
+    def _set_client_mode(self):
+        # Run the batch entrypoint in-process, as the daemon would do
+        def run_batch(calls):
+            privileged.default.client_mode = False
+            try:
+                return batch._run_calls(privileged.default, calls)
+            finally:
+                privileged.default.client_mode = True
+
+        privileged.default.client_mode = True
+        mock.patch.dict(batch._BATCH_ENTRYPOINTS,
+                        {privileged.default: run_batch}).start()
+
+    def test_execute(self):
+        func = mock.Mock(side_effect=[1, agent_exc.InvalidArgument(
+            device='fake-dev'), 3])
+        b = batch.Batch()
+        b.add(func, 'a')
+        b.add(func, 'b', key='c')
+        b.add(func)
+
+        ret = b.execute()
+
+        self.assertEqual(1, ret[0])
+        self.assertIsInstance(ret[1], agent_exc.InvalidArgument)
+        self.assertEqual(3, ret[2])
+        func.assert_has_calls([mock.call('a'), mock.call('b', key='c'),
+                               mock.call()])
+        self.assertEqual(0, len(b))
+
+    def test_execute_empty(self):
+        self.assertEqual([], batch.Batch().execute())
+
+    @mock.patch.object(priv_linux_net, '_get_link_id')
+    def test_execute_client_mode(self, mock_get_link_id):
+        mock_get_link_id.side_effect = [
+            7, agent_exc.NetworkInterfaceNotFound(device='fake-dev')]
+        self._set_client_mode()
+        b = batch.Batch()
+        b.add(priv_linux_net.get_link_id, 'fake-bridge')
+        b.add(priv_linux_net.get_link_id, 'fake-dev')
+
+        ret = b.execute()
+
+        self.assertEqual(7, ret[0])
+        self.assertIsInstance(ret[1], agent_exc.NetworkInterfaceNotFound)
+        self.assertEqual('Network interface fake-dev not found', str(ret[1]))
+        mock_get_link_id.assert_has_calls([
+            mock.call('fake-bridge', raise_exception=False),
+            mock.call('fake-dev', raise_exception=False)])
+
+    def test_execute_client_mode_not_entrypoint(self):
+        self._set_client_mode()
+        b = batch.Batch()
+        b.add(priv_linux_net.get_attr, {}, 'fake-attr')
+        self.assertRaises(TypeError, b.execute)
+
+    def test_execute_client_mode_other_context(self):
+        self._set_client_mode()
+        b = batch.Batch(privileged.default)
+        b.add(batch.run_vtysh_batch, [])
+        self.assertRaises(TypeError, b.execute)
+
+    def test__run_calls_not_entrypoint(self):
+        ret = batch._run_calls(
+            privileged.default,
+            [('ovn_bgp_agent.privileged.linux_net.get_attr', ({}, 'a'), {}),
+             ('ovn_bgp_agent.privileged.vtysh.run_vtysh_command', ('a',),
+              {})])
+        self.assertEqual([batch.BATCH_ERR, 'builtins.NameError'],
+                         list(ret[0][:2]))
+        self.assertEqual([batch.BATCH_ERR, 'builtins.NameError'],
+                         list(ret[1][:2]))
+
+    def test_context_manager(self):
+        func = mock.Mock(return_value='fake-result')
+        with batch.Batch() as b:
+            b.add(func, 'a')
+            func.assert_not_called()
+        self.assertEqual(['fake-result'], b.results)
+
+    def test_context_manager_exception(self):
+        func = mock.Mock()
+        try:
+            with batch.Batch() as b:
+                b.add(func, 'a')
+                raise ValueError()
+        except ValueError:
+            pass
+        func.assert_not_called()
+        self.assertIsNone(b.results)
+
+    def test_raise_on_error(self):
+        self.assertEqual([1, None], batch.raise_on_error([1, None]))
+        self.assertRaises(agent_exc.InvalidArgument, batch.raise_on_error,
+                          [1, agent_exc.InvalidArgument(device='fake-dev')])
@@ -13,10 +13,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import errno
+import os
+import socket
+import tempfile
 from unittest import mock
 
 from oslo_concurrency import processutils
+from pyroute2 import netlink as pyroute_netlink
+from pyroute2.netlink import exceptions as netlink_exceptions
+from pyroute2.netlink import rtnl
+from pyroute2.netlink.rtnl import ndmsg
 
+from ovn_bgp_agent import constants
 from ovn_bgp_agent.privileged import linux_net as priv_linux_net
 from ovn_bgp_agent.tests import base as test_base
 from ovn_bgp_agent.utils import linux_net
@@ -46,60 +55,401 @@ class TestPrivilegedLinuxNet(test_base.TestCase):
         self.dev = 'ethfake'
         self.mac = 'aa:bb:cc:dd:ee:ff'
 
-    def test_set_kernel_flag(self):
-        priv_linux_net.set_kernel_flag('net.ipv6.conf.fake', 1)
+    def test_add_exposed_routes(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.add_exposed_routes([self.ip, self.ipv6], self.dev, 10,
+                                          4)
+        ip.route.assert_has_calls([
+            mock.call('replace', dst=self.ip, dst_len=32,
+                      family=socket.AF_INET, oif=7, table=10, proto=4,
+                      scope=253),
+            mock.call('replace', dst=self.ipv6, dst_len=128,
+                      family=socket.AF_INET6, oif=7, table=10, proto=4)])
+
+    def test_delete_exposed_routes(self):
+        ip = self._mock_iproute_link()
+        ip.route.side_effect = netlink_exceptions.NetlinkError(errno.ESRCH)
+        priv_linux_net.delete_exposed_routes([self.ip], self.dev, 10, 4)
+        ip.route.assert_called_once_with(
+            'del', dst=self.ip, dst_len=32, family=socket.AF_INET, oif=7,
+            table=10, proto=4, scope=253)
+
+    def test_delete_exposed_routes_no_device(self):
+        ip = self._mock_iproute_link(ifindex=None)
+        priv_linux_net.delete_exposed_routes([self.ip], self.dev, 10, 4)
+        ip.route.assert_not_called()
+
+    def test_get_exposed_routes(self):
+        ip = self._mock_iproute_link()
+        ip.route.side_effect = [
+            [{'dst_len': 32, 'attrs': [('RTA_DST', self.ip)]},
+             {'dst_len': 24, 'attrs': [('RTA_DST', '10.10.1.0')]}],
+            [{'dst_len': 128, 'attrs': [('RTA_DST', self.ipv6)]}]]
+        ret = priv_linux_net.get_exposed_routes(self.dev, 10, 4)
+        self.assertEqual([self.ip, self.ipv6], ret)
+        ip.route.assert_has_calls([
+            mock.call('dump', family=socket.AF_INET, table=10, oif=7,
+                      proto=4, dump_filter={}),
+            mock.call('dump', family=socket.AF_INET6, table=10, oif=7,
+                      proto=4, dump_filter={})])
+
+    def test_delete_ip_rules(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.delete_ip_rules({
+            '{}/32'.format(self.ip): {'table': 7,
+                                      'family': socket.AF_INET},
+            'lookup-7-10': {'table': 7, 'family': socket.AF_INET6,
+                            'suppress_prefixlength': 0}})
+        ip.rule.assert_has_calls([
+            mock.call('del', dst=self.ip, table=7, dst_len=32,
+                      family=socket.AF_INET),
+            mock.call('del', table=7, family=socket.AF_INET6,
+                      suppress_prefixlength=0)])
+
+    def _get_nexthop_route_msg(self, ip):
+        ip.nlm_request_batch.assert_called_once_with(mock.ANY)
+        msg = ip.nlm_request_batch.call_args[0][0][0]
+        self.assertEqual(rtnl.RTM_NEWROUTE, msg['header']['type'])
+        self.assertTrue(msg['header']['flags'] & pyroute_netlink.NLM_F_REPLACE)
+        return msg
+
+    def test_route_create_nexthop(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.route_create(
+            {'dst': '10.0.0.0', 'dst_len': 24, 'oif': 7, 'table': 10,
+             'gateway': self.ip, 'proto': 3, 'scope': 0, 'nh_id': 5})
+        msg = self._get_nexthop_route_msg(ip)
+        self.assertEqual((socket.AF_INET, 24, 10, 3),
+                         (msg['family'], msg['dst_len'], msg['table'],
+                          msg['proto']))
+        self.assertEqual([('RTA_DST', '10.0.0.0'), ('RTA_TABLE', 10),
+                          ('RTA_NH_ID', 5)], msg['attrs'])
+        self.mock_exc.assert_not_called()
+        ip.route.assert_not_called()
+
+    def test_route_create_nexthop_ipv6(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.route_create(
+            {'dst': '2002::', 'dst_len': 64, 'table': 300, 'nh_id': 5,
+             'family': socket.AF_INET6})
+        msg = self._get_nexthop_route_msg(ip)
+        self.assertEqual((socket.AF_INET6, 64, 252),
+                         (msg['family'], msg['dst_len'], msg['table']))
+        self.assertEqual([('RTA_DST', '2002::'), ('RTA_TABLE', 300),
+                          ('RTA_NH_ID', 5)], msg['attrs'])
+        # The message is encoded as the kernel expects it
+        msg.encode()
+        decoded = priv_linux_net._NexthopRouteMsg(msg.data)
+        decoded.decode()
+        self.assertEqual(5, decoded.get_attr('RTA_NH_ID'))
+
+    def test_route_create_nexthop_exists(self):
+        ip = self._mock_iproute_link()
+        ip.nlm_request_batch.side_effect = netlink_exceptions.NetlinkError(
+            errno.EEXIST)
+        priv_linux_net.route_create(
+            {'dst': '10.0.0.0', 'dst_len': 24, 'table': 10, 'nh_id': 5})
+        ip.nlm_request_batch.assert_called_once_with(mock.ANY)
+
+    def test_route_delete_nexthop(self):
+        with mock.patch.object(priv_linux_net,
+                               '_run_iproute_route') as m_route:
+            priv_linux_net.route_delete(
+                {'dst': '10.0.0.0', 'dst_len': 24, 'oif': 7, 'table': 10,
+                 'gateway': self.ip, 'proto': 3, 'scope': 0, 'nh_id': 0})
+        m_route.assert_called_once_with(
+            'del', dst='10.0.0.0', dst_len=24, table=10, proto=3,
+            scope='universe', family=socket.AF_INET)
+
+    def test_delete_routes(self):
+        ip = self._mock_iproute_link()
+        ip.route.side_effect = [
+            None, netlink_exceptions.NetlinkError(errno.ESRCH)]
+        priv_linux_net.delete_routes([
+            {'dst': self.ip, 'dst_len': 32, 'oif': 7, 'table': 10},
+            {'dst': self.ipv6, 'dst_len': 128, 'table': 10,
+             'family': socket.AF_INET6, 'nh_id': 5, 'gateway': 'fe80::1'}])
+        ip.route.assert_has_calls([
+            mock.call('del', dst=self.ip, dst_len=32, oif=7, table=10,
+                      scope=253, family=socket.AF_INET),
+            mock.call('del', dst=self.ipv6, dst_len=128, table=10,
+                      scope=253, family=socket.AF_INET6)])
+
+    def test_flush_routes(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.flush_routes(10, 200)
+        ip.flush_routes.assert_has_calls([
+            mock.call(table=10, proto=200, family=socket.AF_INET),
+            mock.call(table=10, proto=200, family=socket.AF_INET6)])
+
+    def test_register_routes_protocol(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rt_protos_dir = os.path.join(tmp_dir, 'rt_protos.d')
+            path = os.path.join(rt_protos_dir, 'fake-name.conf')
+            with mock.patch.object(priv_linux_net.constants,
+                                   'ROUTING_PROTOS_DIR', rt_protos_dir):
+                priv_linux_net.register_routes_protocol(200, 'fake-name')
+                with open(path) as f:
+                    self.assertEqual('200 fake-name\n', f.read())
+                mtime = os.stat(path).st_mtime_ns
+
+                # Already registered, not written again
+                with mock.patch('builtins.open',
+                                side_effect=[open(path)]) as m_open:
+                    priv_linux_net.register_routes_protocol(200,
+                                                            'fake-name')
+                m_open.assert_called_once_with(path, 'r')
+                self.assertEqual(mtime, os.stat(path).st_mtime_ns)
+
+    def _get_nexthop_msg(self, ip, msg_type):
+        ip.nlm_request_batch.assert_called_once_with(mock.ANY)
+        msg = ip.nlm_request_batch.call_args[0][0][0]
+        self.assertEqual(msg_type, msg['header']['type'])
+        # The message is encoded as the kernel expects it
+        msg.encode()
+        decoded = priv_linux_net._NexthopMsg(msg.data)
+        decoded.decode()
+        return decoded
+
+    def test_nexthop_replace(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.nexthop_replace(5, self.ip, 7, 3)
+        msg = self._get_nexthop_msg(ip, constants.RTM_NEWNEXTHOP)
+        self.assertTrue(msg['header']['flags'] & pyroute_netlink.NLM_F_REPLACE)
+        self.assertTrue(msg['header']['flags'] & pyroute_netlink.NLM_F_CREATE)
+        self.assertEqual((socket.AF_INET, 3), (msg['family'], msg['protocol']))
+        self.assertEqual((5, 7, self.ip),
+                         (msg.get_attr('NHA_ID'), msg.get_attr('NHA_OIF'),
+                          msg.get_attr('NHA_GATEWAY')))
+        self.mock_exc.assert_not_called()
+
+    def test_nexthop_replace_ipv6(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.nexthop_replace(5, self.ipv6, 7, 3)
+        msg = self._get_nexthop_msg(ip, constants.RTM_NEWNEXTHOP)
+        self.assertEqual(socket.AF_INET6, msg['family'])
+        self.assertEqual(self.ipv6, msg.get_attr('NHA_GATEWAY'))
+
+    def test_nexthop_delete(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.nexthop_delete(5)
+        msg = self._get_nexthop_msg(ip, constants.RTM_DELNEXTHOP)
+        self.assertEqual(5, msg.get_attr('NHA_ID'))
+        self.mock_exc.assert_not_called()
+
+    def test_nexthop_delete_not_found(self):
+        ip = self._mock_iproute_link()
+        ip.nlm_request_batch.side_effect = netlink_exceptions.NetlinkError(
+            errno.ENOENT)
+        priv_linux_net.nexthop_delete(5)
+        ip.nlm_request_batch.assert_called_once_with(mock.ANY)
+
+    def test_nexthop_delete_error(self):
+        ip = self._mock_iproute_link()
+        ip.nlm_request_batch.side_effect = netlink_exceptions.NetlinkError(
+            errno.EPERM)
+        self.assertRaises(netlink_exceptions.NetlinkError,
+                          priv_linux_net.nexthop_delete, 5)
+
+    def test_get_nexthops(self):
+        self.mock_exc.return_value = (
+            '[{"id":5,"gateway":"%s","dev":"%s","protocol":"boot"}]' % (
+                self.ip, self.dev), '')
+        ret = priv_linux_net.get_nexthops(3)
+        self.assertEqual(
+            [{'id': 5, 'gateway': self.ip, 'dev': self.dev,
+              'protocol': 'boot'}], ret)
         self.mock_exc.assert_called_once_with(
-            'sysctl', '-w', 'net.ipv6.conf.fake=1')
+            'ip', '-j', 'nexthop', 'show', 'protocol', '3',
+            env_variables=mock.ANY)
+
+    def _create_sysctl_files(self, flags):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        sysctl_dir = tmp_dir.name
+        mock.patch.object(priv_linux_net, 'SYSCTL_DIR', sysctl_dir).start()
+        mock.patch.dict(priv_linux_net._kernel_flags_cache, clear=True).start()
+        for flag, value in flags.items():
+            path = priv_linux_net._get_sysctl_path(flag)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('%s\n' % value)
+
+    def _read_sysctl_file(self, flag):
+        with open(priv_linux_net._get_sysctl_path(flag)) as f:
+            return f.read()
+
+    def test__get_sysctl_path(self):
+        ret = priv_linux_net._get_sysctl_path(
+            'net.ipv4.conf.br-ex/10.proxy_arp')
+        self.assertEqual('/proc/sys/net/ipv4/conf/br-ex.10/proxy_arp', ret)
+
+    @mock.patch.object(priv_linux_net.socket, 'if_nametoindex')
+    def test__get_sysctl_device_index(self, mock_nametoindex):
+        self.assertEqual(
+            mock_nametoindex.return_value,
+            priv_linux_net._get_sysctl_device_index(
+                'net.ipv4.conf.br-ex/10.proxy_arp'))
+        mock_nametoindex.assert_called_once_with('br-ex.10')
+        self.assertIsNone(priv_linux_net._get_sysctl_device_index(
+            'net.ipv4.conf.all.forwarding'))
+        self.assertIsNone(priv_linux_net._get_sysctl_device_index(
+            'net.ipv4.ip_forward'))
+
+    def test_set_kernel_flag(self):
+        self._create_sysctl_files({'net.ipv6.conf.fake.forwarding': 0})
+        priv_linux_net.set_kernel_flag('net.ipv6.conf.fake.forwarding', 1)
+        self.assertEqual(
+            '1', self._read_sysctl_file('net.ipv6.conf.fake.forwarding'))
+        self.mock_exc.assert_not_called()
+
+    @mock.patch('builtins.open', new_callable=mock.mock_open,
+                read_data='1\n')
+    def test_set_kernel_flag_same_value(self, mock_o):
+        mock.patch.dict(priv_linux_net._kernel_flags_cache, clear=True).start()
+        priv_linux_net.set_kernel_flag('net.ipv4.ip_forward', 1)
+        # Cached, the file is not even read again
+        priv_linux_net.set_kernel_flag('net.ipv4.ip_forward', 1)
+
+        mock_o.assert_called_once_with('/proc/sys/net/ipv4/ip_forward')
+        mock_o.return_value.write.assert_not_called()
+
+    @mock.patch.object(priv_linux_net.socket, 'if_nametoindex')
+    def test_set_kernel_flag_device_recreated(self, mock_nametoindex):
+        flag = 'net.ipv4.conf.fake.proxy_arp'
+        self._create_sysctl_files({flag: 0})
+        mock_nametoindex.return_value = 5
+        priv_linux_net.set_kernel_flag(flag, 1)
+
+        # Device re-created, the value is checked again
+        self._create_sysctl_files({flag: 0})
+        mock_nametoindex.return_value = 6
+        priv_linux_net.set_kernel_flag(flag, 1)
+        self.assertEqual('1', self._read_sysctl_file(flag))
 
     def test_set_kernel_flag_exception(self):
-        self.mock_exc.side_effect = FakeException()
+        self._create_sysctl_files({})
         self.assertRaises(
-            FakeException,
-            priv_linux_net.set_kernel_flag, 'net.ipv6.conf.fake', 1)
+            IOError,
+            priv_linux_net.set_kernel_flag, 'net.ipv6.conf.fake.forwarding',
+            1)
+        self.assertEqual({}, priv_linux_net._kernel_flags_cache)
+
+    def test_set_kernel_flags(self):
+        self._create_sysctl_files({'net.ipv4.ip_forward': 1,
+                                   'net.ipv6.conf.all.forwarding': 0})
+        priv_linux_net.set_kernel_flags([('net.ipv4.ip_forward', 1),
+                                         ('net.ipv6.conf.all.forwarding', 1)])
+        self.assertEqual('1\n', self._read_sysctl_file('net.ipv4.ip_forward'))
+        self.assertEqual(
+            '1', self._read_sysctl_file('net.ipv6.conf.all.forwarding'))
+
+    def _mock_iproute_link(self, ifindex=7):
+        mock_iproute = mock.patch.object(priv_linux_net.iproute,
+                                         'IPRoute').start()
+        mock.patch.object(priv_linux_net, '_get_link_id',
+                          return_value=ifindex).start()
+        return mock_iproute.return_value.__enter__.return_value
+
+    def _ndp_call(self, command, dst, ifindex=7):
+        return mock.call(command, dst=dst, ifindex=ifindex,
+                         family=socket.AF_INET6, flags=ndmsg.NTF_PROXY)
 
     def test_add_ndp_proxy(self):
-        priv_linux_net.add_ndp_proxy(self.ipv6, self.dev)
-        self.mock_exc.assert_called_once_with(
-            'ip', '-6', 'nei', 'add', 'proxy', self.ipv6, 'dev', self.dev)
+        ip = self._mock_iproute_link()
+        priv_linux_net.add_ndp_proxy('%s/64' % self.ipv6, self.dev)
+        priv_linux_net._get_link_id.assert_called_once_with(
+            self.dev, raise_exception=True)
+        self.assertEqual([self._ndp_call('replace', '2002:0:0:1234::')],
+                         ip.neigh.call_args_list)
+        self.mock_exc.assert_not_called()
 
     def test_add_ndp_proxy_vlan(self):
+        self._mock_iproute_link()
         priv_linux_net.add_ndp_proxy(self.ipv6, self.dev, vlan=10)
-        self.mock_exc.assert_called_once_with(
-            'ip', '-6', 'nei', 'add', 'proxy', self.ipv6,
-            'dev', '%s.10' % self.dev)
+        priv_linux_net._get_link_id.assert_called_once_with(
+            '%s.10' % self.dev, raise_exception=True)
 
     def test_add_ndp_proxy_exception(self):
-        self.mock_exc.side_effect = FakeException()
+        ip = self._mock_iproute_link()
+        ip.neigh.side_effect = netlink_exceptions.NetlinkError(errno.EINVAL)
         self.assertRaises(
-            FakeException,
+            netlink_exceptions.NetlinkError,
             priv_linux_net.add_ndp_proxy, self.ipv6, self.dev)
 
+    def test_add_ndp_proxies(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.add_ndp_proxies(['fd00::1', 'fd00::2', 'fd00::1'],
+                                       self.dev)
+        self.assertEqual(2, ip.neigh.call_count)
+        ip.neigh.assert_has_calls([self._ndp_call('replace', 'fd00::1'),
+                                   self._ndp_call('replace', 'fd00::2')],
+                                  any_order=True)
+
     def test_del_ndp_proxy(self):
+        ip = self._mock_iproute_link()
         priv_linux_net.del_ndp_proxy(self.ipv6, self.dev)
-        self.mock_exc.assert_called_once_with(
-            'ip', '-6', 'nei', 'del', 'proxy', self.ipv6, 'dev',
-            self.dev, env_variables=mock.ANY)
+        ip.neigh.assert_has_calls([self._ndp_call('del', self.ipv6)])
+        priv_linux_net._get_link_id.assert_called_once_with(
+            self.dev, raise_exception=False)
 
-    def test_del_ndp_proxy_vlan(self):
+    def test_del_ndp_proxy_no_device(self):
+        ip = self._mock_iproute_link(ifindex=None)
         priv_linux_net.del_ndp_proxy(self.ipv6, self.dev, vlan=10)
-        self.mock_exc.assert_called_once_with(
-            'ip', '-6', 'nei', 'del', 'proxy', self.ipv6, 'dev',
-            '%s.10' % self.dev, env_variables=mock.ANY)
+        ip.neigh.assert_not_called()
 
     def test_del_ndp_proxy_exception(self):
-        self.mock_exc.side_effect = FakeException()
+        ip = self._mock_iproute_link()
+        ip.neigh.side_effect = netlink_exceptions.NetlinkError(errno.EINVAL)
         self.assertRaises(
-            FakeException,
+            netlink_exceptions.NetlinkError,
             priv_linux_net.del_ndp_proxy, self.ipv6, self.dev)
 
-    def test_del_ndp_proxy_exception_no_such_file(self):
-        exp = FakeException()
-        exp.stderr = 'No such file or directory'
-        self.mock_exc.side_effect = exp
+    def test_del_ndp_proxy_already_deleted(self):
+        ip = self._mock_iproute_link()
+        ip.neigh.side_effect = netlink_exceptions.NetlinkError(errno.ENOENT)
         self.assertIsNone(priv_linux_net.del_ndp_proxy(self.ipv6, self.dev))
 
-    @mock.patch('builtins.open', new_callable=mock.mock_open())
-    def test_create_routing_table_for_bridge(self, mock_o):
-        priv_linux_net.create_routing_table_for_bridge(17, 'fake-bridge')
-        mock_o.assert_called_once_with('/etc/iproute2/rt_tables', 'a')
-        mock_o().__enter__().write.assert_called_once_with('17 fake-bridge\n')
+    def test_del_ndp_proxies(self):
+        ip = self._mock_iproute_link()
+        priv_linux_net.del_ndp_proxies(['fd00::1', 'fd00::2'], self.dev)
+        ip.neigh.assert_has_calls([self._ndp_call('del', 'fd00::1'),
+                                   self._ndp_call('del', 'fd00::2')],
+                                  any_order=True)
+
+    def test_get_ndp_proxies(self):
+        ip = self._mock_iproute_link()
+        ip.neigh.return_value = [{'attrs': [('NDA_DST', 'fd00::1')]}]
+        ret = priv_linux_net.get_ndp_proxies(self.dev, vlan=10)
+        self.assertEqual(['fd00::1'], ret)
+        self.assertEqual('dump', ip.neigh.call_args[0][0])
+
+    def test_get_ndp_proxies_no_device(self):
+        ip = self._mock_iproute_link(ifindex=None)
+        self.assertEqual([], priv_linux_net.get_ndp_proxies(self.dev))
+        ip.neigh.assert_not_called()
+
+    def test_sync_ndp_proxies(self):
+        ip = self._mock_iproute_link()
+        ip.neigh.side_effect = [
+            [{'attrs': [('NDA_DST', 'fd00::1')]},
+             {'attrs': [('NDA_DST', 'fd00::3')]}],
+            None, None]
+        priv_linux_net.sync_ndp_proxies(['fd00::1', 'fd00::2'], self.dev)
+        self.assertEqual(3, ip.neigh.call_count)
+        ip.neigh.assert_has_calls([self._ndp_call('replace', 'fd00::2'),
+                                   self._ndp_call('del', 'fd00::3')])
+
+    def test_set_routing_tables(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rt_tables_dir = os.path.join(tmp_dir, 'rt_tables.d')
+            path = os.path.join(rt_tables_dir, 'fake-name.conf')
+            with mock.patch.object(priv_linux_net.constants,
+                                   'ROUTING_TABLES_DIR', rt_tables_dir):
+                priv_linux_net.set_routing_tables(
+                    {'br-ex2': 17, 'br-ex': 5}, 'fake-name')
+                with open(path) as f:
+                    self.assertEqual('5 br-ex\n17 br-ex2\n', f.read())
+
+                priv_linux_net.set_routing_tables({}, 'fake-name')
+                self.assertFalse(os.path.exists(path))
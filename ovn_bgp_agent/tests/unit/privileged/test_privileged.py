@@ -0,0 +1,43 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from oslo_privsep import capabilities
+
+from ovn_bgp_agent import privileged
+from ovn_bgp_agent.tests import base as test_base
+
+
+@mock.patch.object(capabilities, 'get_caps')
+class TestRunInProcess(test_base.TestCase):
+
+    def setUp(self):
+        super(TestRunInProcess, self).setUp()
+        privileged.default.client_mode = True
+
+    def test_run_in_process(self, mock_get_caps):
+        mock_get_caps.return_value = (
+            privileged.default.conf.capabilities + [capabilities.CAP_CHOWN],
+            [], [])
+
+        self.assertTrue(privileged.run_in_process(privileged.default))
+        self.assertFalse(privileged.default.client_mode)
+
+    def test_run_in_process_missing_caps(self, mock_get_caps):
+        mock_get_caps.return_value = (
+            [capabilities.CAP_NET_ADMIN], [], [])
+
+        self.assertFalse(privileged.run_in_process(privileged.default))
+        self.assertTrue(privileged.default.client_mode)
@@ -14,11 +14,13 @@
 #    under the License.
 
 import importlib
+import socket
 from unittest import mock
 
 from oslo_concurrency import processutils
 
 from ovn_bgp_agent import constants
+from ovn_bgp_agent import exceptions as agent_exc
 from ovn_bgp_agent.privileged import vtysh
 from ovn_bgp_agent.tests import base as test_base
 
@@ -63,3 +65,125 @@ class TestPrivilegedVtysh(test_base.TestCase):
         self.assertRaises(
             FakeException,
             vtysh.run_vtysh_command, 'show ip bgp summary json')
+
+
+class TestVtySession(test_base.TestCase):
+
+    def setUp(self):
+        super(TestVtySession, self).setUp()
+        self.mock_socket = mock.patch.object(socket, 'socket').start()
+        self.sock = self.mock_socket.return_value
+        self.sock.recv.return_value = b'\0\0\0\0'
+        self.mock_timer = mock.patch('threading.Timer').start()
+        self.session = vtysh.VtySession(idle_timeout=300)
+
+    def test_split_config_per_daemon(self):
+        config = """
+vrf vrf-1001
+  vni 1001
+exit-vrf
+
+router bgp 64999 vrf vrf-1001
+  address-family ipv4 unicast
+    redistribute connected
+  exit-address-family
+
+no interface veth-vrf-1001
+"""
+        ret = vtysh.split_config_per_daemon(config)
+        self.assertEqual(
+            {vtysh.VTY_ZEBRA: ['vrf vrf-1001', 'vni 1001', 'exit-vrf',
+                               'no interface veth-vrf-1001'],
+             vtysh.VTY_BGPD: ['router bgp 64999 vrf vrf-1001',
+                              'address-family ipv4 unicast',
+                              'redistribute connected',
+                              'exit-address-family']},
+            ret)
+
+    def test_run_config(self):
+        self.session.run_config('router bgp 64999\n  bgp router-id 1.1.1.1')
+
+        self.sock.connect.assert_called_once_with('/run/frr/bgpd.vty')
+        expected_calls = [mock.call(b'enable\0'),
+                          mock.call(b'configure terminal\0'),
+                          mock.call(b'router bgp 64999\0'),
+                          mock.call(b'bgp router-id 1.1.1.1\0'),
+                          mock.call(b'end\0')]
+        self.sock.sendall.assert_has_calls(expected_calls)
+        stats = self.session.stats()[vtysh.VTY_BGPD]
+        self.assertEqual(5, stats['commands'])
+        self.assertEqual(0, stats['errors'])
+
+    def test_run_config_reuses_connection(self):
+        self.session.run_config('router bgp 64999')
+        self.session.run_config('router bgp 64999')
+        self.sock.connect.assert_called_once_with('/run/frr/bgpd.vty')
+
+    def test_run_config_reconnects(self):
+        # First reply after the initial enable signals FRR went away
+        self.sock.recv.side_effect = [b'\0\0\0\0', b''] + [
+            b'\0\0\0\0'] * 4
+        self.session.run_config('router bgp 64999')
+
+        self.assertEqual(2, self.sock.connect.call_count)
+        self.assertEqual(
+            2, self.session.stats()[vtysh.VTY_BGPD]['connects'])
+
+    def test_run_config_connect_failure(self):
+        self.sock.connect.side_effect = FileNotFoundError()
+        self.assertRaises(agent_exc.FrrVtySessionError,
+                          self.session.run_config, 'router bgp 64999')
+        self.sock.close.assert_called()
+
+    def test_run_config_error_status(self):
+        # enable, configure terminal, the failing line and end
+        self.sock.recv.side_effect = [b'\0\0\0\0', b'\0\0\0\0',
+                                      b'% Unknown command\0\0\0\2',
+                                      b'\0\0\0\0']
+        self.assertRaises(agent_exc.FrrVtySessionError,
+                          self.session.run_config, 'router bgp 64999')
+        # The configuration mode is left anyway
+        self.sock.sendall.assert_called_with(b'end\0')
+
+    def test_run_config_idle_timeout(self):
+        timer = self.mock_timer.return_value
+        self.session.run_config('router bgp 64999')
+        self.mock_timer.assert_called_once_with(300,
+                                                self.session._on_idle_timer)
+        timer.start.assert_called_once_with()
+
+        # Using the session again re-arms the timer
+        self.session.run_config('router bgp 64999')
+        timer.cancel.assert_called_once_with()
+        self.assertEqual(2, self.mock_timer.call_count)
+
+        with mock.patch('threading.current_thread', return_value=timer):
+            self.session._on_idle_timer()
+        self.assertFalse(
+            self.session.connections[vtysh.VTY_BGPD].connected)
+        self.session.run_config('router bgp 64999')
+        self.assertEqual(2, self.sock.connect.call_count)
+
+    def test_run_config_idle_timeout_outdated(self):
+        self.session.run_config('router bgp 64999')
+        # A timer armed before the last use does not close the connection
+        self.session._on_idle_timer()
+        self.assertTrue(self.session.connections[vtysh.VTY_BGPD].connected)
+
+    def test_run_config_no_idle_timeout(self):
+        self.session.idle_timeout = 0
+        self.session.run_config('router bgp 64999')
+        self.mock_timer.assert_not_called()
+
+    def test_run_command(self):
+        self.sock.recv.side_effect = [b'\0\0\0\0', b'{"ipv4Unicast": {}}',
+                                      b'\0\0\0\0']
+        ret = self.session.run_command('show ip bgp summary json')
+        self.assertEqual('{"ipv4Unicast": {}}', ret)
+
+    def test_run_command_error_status(self):
+        self.sock.recv.side_effect = [b'\0\0\0\0',
+                                      b'% Unknown command\0\0\0\2']
+        self.assertRaises(agent_exc.FrrVtySessionError,
+                          self.session.run_command, 'show unknown')
+        self.assertEqual(1, self.session.stats()[vtysh.VTY_BGPD]['errors'])
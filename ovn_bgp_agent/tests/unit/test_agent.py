@@ -38,3 +38,57 @@ class TestAgent(test_base.TestCase):
         m_agent.assert_called()
         m_oslo_launch.assert_called()
         m_launcher.wait.assert_called()
+
+    @mock.patch('ovn_bgp_agent.drivers.driver_api.AgentDriverBase.'
+                'get_instance')
+    def test_sync(self, m_get_instance):
+        m_driver = m_get_instance.return_value
+        m_driver.pop_reconnected.return_value = False
+        bgp_agent = agent.BGPAgent()
+        bgp_agent.sync_interval.jitter = 0
+        bgp_agent.sync_interval.max_interval = 1000
+
+        # No drift, the next run is delayed
+        m_driver.reconcile.return_value = 0
+        self.assertEqual(600, bgp_agent.sync())
+        # Drift, back to the base interval
+        m_driver.reconcile.return_value = 2
+        self.assertEqual(300, bgp_agent.sync())
+
+        self.assertEqual(2, m_driver.reconcile.call_count)
+
+    @mock.patch('ovn_bgp_agent.drivers.driver_api.AgentDriverBase.'
+                'get_instance')
+    def test_sync_reconnected(self, m_get_instance):
+        m_driver = m_get_instance.return_value
+        m_driver.reconcile.return_value = 0
+        bgp_agent = agent.BGPAgent()
+        bgp_agent.sync_interval.jitter = 0
+        bgp_agent.sync_interval.max_interval = 1000
+        bgp_agent.sync_interval.interval = 1000
+
+        m_driver.pop_reconnected.return_value = True
+        self.assertEqual(600, bgp_agent.sync())
+
+    @mock.patch('ovn_bgp_agent.drivers.driver_api.AgentDriverBase.'
+                'get_instance')
+    def test_sync_exception(self, m_get_instance):
+        m_get_instance.return_value.reconcile.side_effect = Exception('boom')
+        bgp_agent = agent.BGPAgent()
+
+        bgp_agent.sync_interval.jitter = 0
+
+        # The exception does not stop the reconciliation loop
+        self.assertEqual(300, bgp_agent.sync())
+
+        m_get_instance.return_value.reconcile.assert_called_once_with()
+
+    @mock.patch('ovn_bgp_agent.drivers.driver_api.AgentDriverBase.'
+                'get_instance')
+    def test_frr_sync(self, m_get_instance):
+        bgp_agent = agent.BGPAgent()
+        bgp_agent.frr_sync_interval.jitter = 0
+
+        self.assertEqual(15, bgp_agent.frr_sync())
+
+        m_get_instance.return_value.frr_sync.assert_called_once_with()
@@ -0,0 +1,70 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import adaptive_interval
+
+
+class TestAdaptiveInterval(test_base.TestCase):
+
+    def setUp(self):
+        super(TestAdaptiveInterval, self).setUp()
+        self.interval = adaptive_interval.AdaptiveInterval(100, 350)
+
+    def test_next_no_drift(self):
+        self.assertEqual(200, self.interval.next(0))
+        self.assertEqual(350, self.interval.next(0))
+        self.assertEqual(350, self.interval.next(0))
+
+    def test_next_drift(self):
+        self.interval.next(0)
+        self.interval.next(0)
+
+        self.assertEqual(100, self.interval.next(3))
+        self.assertEqual(100, self.interval.next(1))
+
+    def test_next_unknown(self):
+        self.interval.next(0)
+
+        self.assertEqual(200, self.interval.next())
+        self.assertEqual(200, self.interval.next(None))
+
+    def test_next_no_max(self):
+        interval = adaptive_interval.AdaptiveInterval(100)
+
+        self.assertEqual(100, interval.next(0))
+
+    def test_reset(self):
+        self.interval.next(0)
+        self.interval.reset()
+
+        self.assertEqual(100, self.interval.interval)
+
+    @mock.patch('random.uniform')
+    def test_next_jitter(self, mock_uniform):
+        mock_uniform.return_value = 1.05
+        self.interval.jitter = 0.1
+
+        self.assertEqual(210, self.interval.next(0))
+        mock_uniform.assert_called_once_with(0.9, 1.1)
+
+    @mock.patch('random.uniform')
+    def test_initial_delay(self, mock_uniform):
+        self.interval.jitter = 0.1
+
+        self.assertEqual(mock_uniform.return_value,
+                         self.interval.initial_delay())
+        mock_uniform.assert_called_once_with(0, 10)
@@ -0,0 +1,133 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from ovn_bgp_agent import constants
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import dirty_set
+
+
+class TestDirtySet(test_base.TestCase):
+
+    def setUp(self):
+        super(TestDirtySet, self).setUp()
+        self.dirty = dirty_set.DirtySet(full_sync_interval=60)
+
+    def test_mark(self):
+        self.dirty.mark(constants.DIRTY_PORT, 'port-0')
+        self.dirty.mark(constants.DIRTY_PORT, 'port-0')
+        self.dirty.mark(constants.DIRTY_PORT, 'port-1')
+        self.dirty.mark(constants.DIRTY_ROUTER, 'router-0')
+        self.dirty.mark(constants.DIRTY_ROUTER, None)
+
+        self.assertEqual(3, len(self.dirty))
+
+    def test_pop(self):
+        self.dirty.mark(constants.DIRTY_PORT, 'port-0')
+        self.dirty.mark(constants.DIRTY_SUBNET, 'subnet-0')
+
+        self.assertEqual({constants.DIRTY_PORT: {'port-0'},
+                          constants.DIRTY_SUBNET: {'subnet-0'}},
+                         self.dirty.pop())
+        self.assertEqual(0, len(self.dirty))
+        self.assertEqual({}, self.dirty.pop())
+
+    def test_mark_changed(self):
+        self.dirty.full_sync_started()
+        self.dirty.mark_changed(constants.DIRTY_PORT, 'port-0')
+        self.dirty.mark_changed(constants.DIRTY_PORT, None)
+
+        self.assertEqual({constants.DIRTY_PORT: {'port-0'}},
+                         self.dirty.pop())
+
+    def test_mark_changed_no_full_sync(self):
+        self.dirty.mark_changed(constants.DIRTY_PORT, 'port-0')
+        self.dirty.full_sync_started()
+        self.dirty.full_sync_finished()
+        self.dirty.mark_changed(constants.DIRTY_PORT, 'port-1')
+
+        # The events already applied the changes to the current state
+        self.assertEqual(0, len(self.dirty))
+
+    def test_mark_withdrawn(self):
+        self.dirty.full_sync_started()
+        withdraw_fn = mock.Mock()
+        self.dirty.mark_withdrawn(constants.DIRTY_PORT, 'port-0',
+                                  withdraw_fn)
+        self.dirty.mark_withdrawn(constants.DIRTY_PORT, None, withdraw_fn)
+
+        self.assertEqual({constants.DIRTY_PORT: {'port-0'}},
+                         self.dirty.pop())
+        self.assertEqual([withdraw_fn, withdraw_fn],
+                         self.dirty.pop_withdrawn())
+        self.assertEqual([], self.dirty.pop_withdrawn())
+
+    def test_mark_withdrawn_no_full_sync(self):
+        self.dirty.mark_withdrawn(constants.DIRTY_PORT, 'port-0',
+                                  mock.Mock())
+
+        self.assertEqual({}, self.dirty.pop())
+        self.assertEqual([], self.dirty.pop_withdrawn())
+
+    def test_replay(self):
+        withdrawn = [mock.Mock(side_effect=Exception('boom')), mock.Mock()]
+
+        self.dirty.replay(withdrawn)
+
+        for withdraw_fn in withdrawn:
+            withdraw_fn.assert_called_once_with()
+
+    def test_process(self):
+        process_fn = mock.Mock(side_effect=(None, Exception('boom')))
+        dirty = {constants.DIRTY_PORT: ['port-0', 'port-1'],
+                 constants.DIRTY_SUBNET: ['subnet-0']}
+
+        self.dirty.process(dirty, constants.DIRTY_PORT, process_fn)
+
+        process_fn.assert_has_calls([mock.call('port-0'),
+                                     mock.call('port-1')])
+        # The failed one is marked dirty again
+        self.assertEqual({constants.DIRTY_PORT: {'port-1'}},
+                         self.dirty.pop())
+
+    def test_process_no_kind(self):
+        process_fn = mock.Mock()
+
+        self.dirty.process({}, constants.DIRTY_PORT, process_fn)
+
+        process_fn.assert_not_called()
+
+    @mock.patch('time.monotonic')
+    def test_full_sync_due(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        # No full sync yet
+        self.assertTrue(self.dirty.full_sync_due())
+
+        self.dirty.mark(constants.DIRTY_PORT, 'port-0')
+        self.dirty.mark_withdrawn(constants.DIRTY_PORT, 'port-1', mock.Mock())
+        self.dirty.full_sync_started()
+        self.assertEqual(0, len(self.dirty))
+        self.assertEqual([], self.dirty.pop_withdrawn())
+
+        mock_monotonic.return_value = 159
+        self.assertFalse(self.dirty.full_sync_due())
+        mock_monotonic.return_value = 160
+        self.assertTrue(self.dirty.full_sync_due())
+
+    def test_full_sync_due_no_interval(self):
+        self.dirty.full_sync_interval = 0
+        self.dirty.full_sync_started()
+
+        self.assertTrue(self.dirty.full_sync_due())
@@ -0,0 +1,77 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ipaddress
+
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import ip_parser
+
+
+class TestIPParser(test_base.TestCase):
+
+    def setUp(self):
+        super(TestIPParser, self).setUp()
+        ip_parser.cache_clear()
+        self.addCleanup(ip_parser.cache_clear)
+
+    def test_parse_ip_v4(self):
+        ret = ip_parser.parse_ip('10.0.0.1')
+        self.assertEqual(ip_parser.ParsedIP(
+            version=4, address='10.0.0.1', packed=b'\x0a\x00\x00\x01',
+            prefixlen=32, network='10.0.0.1', is_gua=False), ret)
+
+    def test_parse_ip_v4_prefix(self):
+        ret = ip_parser.parse_ip('10.0.0.1/24')
+        self.assertEqual(4, ret.version)
+        self.assertEqual('10.0.0.1', ret.address)
+        self.assertEqual(24, ret.prefixlen)
+        self.assertEqual('10.0.0.0', ret.network)
+
+    def test_parse_ip_v4_netmask(self):
+        ret = ip_parser.parse_ip('10.0.0.1/255.255.0.0')
+        self.assertEqual(16, ret.prefixlen)
+        self.assertEqual('10.0.0.0', ret.network)
+
+    def test_parse_ip_v6(self):
+        ret = ip_parser.parse_ip('2001:DB8:0:0::1/64')
+        self.assertEqual(6, ret.version)
+        self.assertEqual('2001:db8::1', ret.address)
+        self.assertEqual(ipaddress.IPv6Address('2001:db8::1').packed,
+                         ret.packed)
+        self.assertEqual(64, ret.prefixlen)
+        self.assertEqual('2001:db8::', ret.network)
+        # Documentation range
+        self.assertFalse(ret.is_gua)
+
+    def test_parse_ip_v6_gua(self):
+        self.assertTrue(ip_parser.parse_ip('2a01:db8::1337').is_gua)
+        self.assertFalse(ip_parser.parse_ip('fe80::1337').is_gua)
+        self.assertFalse(ip_parser.parse_ip('fd00::1').is_gua)
+        self.assertFalse(ip_parser.parse_ip('8.8.8.8').is_gua)
+
+    def test_parse_ip_invalid(self):
+        for ip in ('fake-ip', '10.0.0.256', '10.0.0.1/33', 'fd00::1/129',
+                   ''):
+            self.assertRaises(ValueError, ip_parser.parse_ip, ip)
+
+    def test_parse_ip_not_str(self):
+        self.assertEqual(
+            ip_parser.parse_ip('10.0.0.1'),
+            ip_parser.parse_ip(ipaddress.IPv4Address('10.0.0.1')))
+
+    def test_parse_ip_cached(self):
+        ret = ip_parser.parse_ip('10.0.0.1/24')
+        self.assertIs(ret, ip_parser.parse_ip('10.0.0.1/24'))
+        ip_parser.cache_clear()
+        self.assertIsNot(ret, ip_parser.parse_ip('10.0.0.1/24'))
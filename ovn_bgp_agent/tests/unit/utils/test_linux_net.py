@@ -13,15 +13,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import copy
 import ipaddress
+import os
+import tempfile
+import time
 
 from unittest import mock
 
+from oslo_config import cfg
+from pyroute2.netlink.rtnl import rtmsg
+
 from ovn_bgp_agent import constants
 from ovn_bgp_agent import exceptions as agent_exc
+from ovn_bgp_agent.privileged import linux_net as priv_linux_net
 from ovn_bgp_agent.tests import base as test_base
 from ovn_bgp_agent.utils import linux_net
+from ovn_bgp_agent.utils import route_ledger
+from ovn_bgp_agent.utils import workers
+
+CONF = cfg.CONF
 
 
 class IPRouteDict(dict):
@@ -36,10 +46,6 @@ class TestLinuxNet(test_base.TestCase):
 
     def setUp(self):
         super(TestLinuxNet, self).setUp()
-        # Mock pyroute2.NDB context manager object
-        self.mock_ndb = mock.patch.object(linux_net.pyroute2, 'NDB').start()
-        self.fake_ndb = self.mock_ndb().__enter__()
-
         # Mock pyroute2.IPRoute context manager object
         self.mock_ipr = mock.patch.object(linux_net.pyroute2,
                                           'IPRoute').start()
@@ -102,7 +108,7 @@ class TestLinuxNet(test_base.TestCase):
         nic_addr = IPRouteDict({'prefixlen': 32,
                                 'attrs': [('IFA_ADDRESS', self.ip)]})
         self.fake_ipr.link_lookup.return_value = [device_idx]
-        self.fake_ipr.get_addr.return_value = [nic_addr]
+        self.fake_ipr.addr.return_value = [nic_addr]
         fake_link = mock.MagicMock()
         fake_link.get_attr.return_value = self.mac
         self.fake_ipr.get_links.return_value = [fake_link]
@@ -225,7 +231,7 @@ class TestLinuxNet(test_base.TestCase):
         ip3 = IPRouteDict(
             {'prefixlen': 64,
              'attrs': [('IFA_ADDRESS', '2001:0DB8:0000:000b::')]})
-        self.fake_ipr.get_addr.return_value = [ip0, ip1, ip2, ip3]
+        self.fake_ipr.addr.return_value = [ip0, ip1, ip2, ip3]
 
         ips = linux_net.get_exposed_ips(self.dev)
 
@@ -235,13 +241,26 @@ class TestLinuxNet(test_base.TestCase):
     def test_get_nic_ip(self):
         ip0 = IPRouteDict({'attrs': [('IFA_ADDRESS', '10.10.1.16')]})
         ip1 = IPRouteDict({'attrs': [('IFA_ADDRESS', '10.10.1.17')]})
-        self.fake_ipr.get_addr.return_value = [ip0, ip1]
+        self.fake_ipr.addr.return_value = [ip0, ip1]
 
         ips = linux_net.get_nic_ip(self.dev)
 
         expected_ips = ['10.10.1.16', '10.10.1.17']
         self.assertEqual(expected_ips, ips)
 
+    def test_get_nic_ip_prefixlen_filter(self):
+        ip0 = IPRouteDict({'prefixlen': 32,
+                           'attrs': [('IFA_ADDRESS', '10.10.1.16')]})
+        ip1 = IPRouteDict({'prefixlen': 24,
+                           'attrs': [('IFA_ADDRESS', '10.10.1.17')]})
+        self.fake_ipr.addr.return_value = [ip0, ip1]
+
+        ips = linux_net.get_nic_ip(self.dev, prefixlen_filter=32)
+
+        self.assertEqual(['10.10.1.16'], ips)
+        self.fake_ipr.addr.assert_called_once_with(
+            'dump', index=mock.ANY, dump_filter={})
+
     def test_get_exposed_ips_on_network(self):
         ip0 = IPRouteDict({'prefixlen': 32,
                            'attrs': [('IFA_ADDRESS', self.ip)]})
@@ -254,7 +273,7 @@ class TestLinuxNet(test_base.TestCase):
             'attrs': [('IFA_ADDRESS', '2001:db8:3333:4444:5555:6666:7777:8888')
                       ]})
 
-        self.fake_ipr.get_addr.return_value = [ip0, ip1, ip2, ip3]
+        self.fake_ipr.addr.return_value = [ip0, ip1, ip2, ip3]
 
         network_ips = [ipaddress.ip_address(self.ip),
                        ipaddress.ip_address(self.ipv6)]
@@ -262,66 +281,6 @@ class TestLinuxNet(test_base.TestCase):
 
         self.assertEqual([self.ip, self.ipv6], ret)
 
-    def test_get_exposed_routes_on_network_v4(self):
-        route0 = mock.MagicMock(
-            dst=mock.Mock(),
-            table=self.table_id,
-            scope=1,
-            proto=11,
-            gateway=self.ip,
-        )
-        route1 = mock.MagicMock(
-            dst=mock.Mock(),
-            table=self.table_id,
-            scope=1,
-            proto=11,
-            gateway=self.ipv6,
-        )
-        route2 = mock.MagicMock(
-            dst=mock.Mock(),
-            table=self.table_id,
-            scope=1,
-            proto=11,
-            gateway=None,
-        )
-
-        self.fake_ndb.routes.dump.return_value = [route0, route1, route2]
-        ret = linux_net.get_exposed_routes_on_network(
-            [self.table_id], self.network
-        )
-
-        self.assertEqual([route0], ret)
-
-    def test_get_exposed_routes_on_network_v6(self):
-        route0 = mock.MagicMock(
-            dst=mock.Mock(),
-            table=self.table_id,
-            scope=1,
-            proto=11,
-            gateway=self.ip,
-        )
-        route1 = mock.MagicMock(
-            dst=mock.Mock(),
-            table=self.table_id,
-            scope=1,
-            proto=11,
-            gateway=self.ipv6,
-        )
-        route2 = mock.MagicMock(
-            dst=mock.Mock(),
-            table=self.table_id,
-            scope=1,
-            proto=11,
-            gateway=None,
-        )
-
-        self.fake_ndb.routes.dump.return_value = [route0, route1, route2]
-        ret = linux_net.get_exposed_routes_on_network(
-            [self.table_id], self.network_v6
-        )
-
-        self.assertEqual([route1], ret)
-
     def test_get_ovn_ip_rules(self):
         rule0 = IPRouteDict({'dst_len': 128, 'family': 10,
                              'attrs': [('FRA_TABLE', 7),
@@ -343,6 +302,25 @@ class TestLinuxNet(test_base.TestCase):
                         '6/128': {'table': 10, 'family': 10}}
         self.assertEqual(expected_ret, ret)
 
+    def test_get_ovn_ip_rules_aggregated(self):
+        rule0 = IPRouteDict({'dst_len': 32, 'family': 2,
+                             'attrs': [('FRA_TABLE', 7),
+                                       ('FRA_DST', 11)]})
+        rule1 = IPRouteDict({'dst_len': 0, 'family': 2,
+                             'attrs': [('FRA_TABLE', 7),
+                                       ('FRA_SUPPRESS_PREFIXLEN', 0)]})
+        rule2 = IPRouteDict({'dst_len': 0, 'family': 10,
+                             'attrs': [('FRA_TABLE', 7),
+                                       ('FRA_SUPPRESS_PREFIXLEN',
+                                        0xffffffff)]})
+        self.fake_ipr.get_rules.side_effect = [[rule0, rule1], [rule2]]
+
+        ret = linux_net.get_ovn_ip_rules([7])
+        expected_ret = {'11/32': {'table': 7, 'family': 2},
+                        'lookup-7-2': {'table': 7, 'family': 2,
+                                       'suppress_prefixlength': 0}}
+        self.assertEqual(expected_ret, ret)
+
     @mock.patch('ovn_bgp_agent.privileged.linux_net.delete_exposed_ips')
     def test_delete_exposed_ips(self, mock_delete_exposed_ips):
         linux_net.delete_exposed_ips([self.ip], self.dev)
@@ -363,15 +341,14 @@ class TestLinuxNet(test_base.TestCase):
         vlan = 30 if is_vlan else None
         mock_get_index.return_value = oif
 
-        route = {'route': {'dst': self.ip,
-                           'dst_len': 32,
-                           'table': 20},
-                 'vlan': vlan}
-        if has_gateway:
-            route['route']['gateway'] = gateway
+        route = route_ledger.Route(
+            dev=self.bridge, vlan=vlan, table=20, dst=self.ip, dst_len=32,
+            oif=oif, gateway=gateway if has_gateway else None,
+            family=constants.AF_INET)
 
         routing_tables = {self.bridge: 20}
-        routing_tables_routes = {self.bridge: [route]}
+        routing_tables_routes = route_ledger.RouteLedger()
+        routing_tables_routes.add(route)
         # extra_route0 matches with the route
         extra_route0 = IPRouteDict({
             'dst_len': 32, 'family': constants.AF_INET, 'table': 20,
@@ -394,40 +371,41 @@ class TestLinuxNet(test_base.TestCase):
                           'family': constants.AF_INET, 'oif': oif,
                           'gateway': gateway, 'table': 20}
 
-        mock_route_delete.assert_called_once_with(expected_route)
+        mock_route_delete.assert_called_once_with([expected_route])
+        if is_vlan and not has_gateway:
+            mock_get_index.assert_called_once_with(
+                '{}.{}'.format(self.bridge, vlan))
 
-    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.delete_routes')
     def test_delete_bridge_ip_routes(self, mock_route_delete):
         self._test_delete_bridge_ip_routes(mock_route_delete)
 
-    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.delete_routes')
     def test_delete_bridge_ip_routes_vlan(self, mock_route_delete):
         self._test_delete_bridge_ip_routes(mock_route_delete, is_vlan=True)
 
-    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.delete_routes')
     def test_delete_bridge_ip_routes_gateway(self, mock_route_delete):
         self._test_delete_bridge_ip_routes(mock_route_delete, has_gateway=True)
 
-    @mock.patch('ovn_bgp_agent.utils.linux_net.delete_ip_routes')
-    def test_delete_routes_from_table(self, mock_delete_ip_routes):
-        route0 = {'scope': 1, 'proto': 11}
-        route1 = {'scope': 2, 'proto': 22}
-        route2 = {'scope': 254, 'proto': 186}
-        self.fake_ipr.get_routes.return_value = [
-            route0, route1, route2]
-
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.flush_routes')
+    def test_delete_routes_from_table(self, mock_flush_routes):
         linux_net.delete_routes_from_table('fake-table')
 
-        mock_delete_ip_routes.assert_called_once_with([route0, route1])
+        mock_flush_routes.assert_called_once_with('fake-table',
+                                                  CONF.routes_protocol)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.register_routes_protocol')
+    def test_ensure_routes_protocol(self, mock_register):
+        linux_net.ensure_routes_protocol()
+
+        mock_register.assert_called_once_with(CONF.routes_protocol,
+                                              constants.ROUTES_PROTO_NAME)
 
     def test_get_routes_on_tables(self):
         route0 = IPRouteDict({
             'proto': 10, 'table': 10,
             'attrs': [('RTA_DST', '10.10.10.10')]})
-        # Route1 has proto 186, should be ignored
-        route1 = IPRouteDict({
-            'proto': 186, 'table': 11,
-            'attrs': [('RTA_DST', '11.11.11.11')]})
         route2 = IPRouteDict({
             'proto': 12, 'table': 11,
             'attrs': [('RTA_DST', '12.12.12.12')]})
@@ -435,14 +413,135 @@ class TestLinuxNet(test_base.TestCase):
         route3 = IPRouteDict({
             'proto': 10, 'table': 22,
             'attrs': [('RTA_DST', '')]})
-        self.fake_ipr.get_routes.side_effect = [
-            [route0], [route1, route2], [route3]]
+        self.fake_ipr.route.side_effect = [
+            [route0], [route2], [route3]]
 
         ret = linux_net.get_routes_on_tables([10, 11, 22])
 
         self.assertEqual([route0, route2], ret)
+        self.mock_ipr.assert_called_with(strict_check=True)
+        self.fake_ipr.route.assert_has_calls([
+            mock.call('dump', dump_filter={}, table=10,
+                      proto=CONF.routes_protocol),
+            mock.call('dump', dump_filter={}, table=11,
+                      proto=CONF.routes_protocol),
+            mock.call('dump', dump_filter={}, table=22,
+                      proto=CONF.routes_protocol)])
 
-    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_migrate_routes_protocol(self, mock_route_create):
+        mock.patch.object(linux_net, '_routes_protocol_migrated',
+                          set()).start()
+        links = [IPRouteDict({'index': 5,
+                              'attrs': [('IFLA_IFNAME', 'br-ex')]}),
+                 IPRouteDict({'index': 6,
+                              'attrs': [('IFLA_IFNAME', 'br-ex.10')]}),
+                 IPRouteDict({'index': 7,
+                              'attrs': [('IFLA_IFNAME', 'br-vlan')]})]
+        self.fake_ipr.get_links.return_value = links
+        default = IPRouteDict({'family': constants.AF_INET, 'dst_len': 0,
+                               'scope': 253, 'type': 1,
+                               'attrs': [('RTA_OIF', 5)]})
+        route = IPRouteDict({'family': constants.AF_INET6, 'dst_len': 128,
+                             'scope': 0, 'type': 1,
+                             'attrs': [('RTA_DST', self.ipv6),
+                                       ('RTA_OIF', 6),
+                                       ('RTA_GATEWAY', 'fd00::1'),
+                                       ('RTA_PRIORITY', 1024)]})
+        unreachable = IPRouteDict({'family': constants.AF_INET,
+                                   'dst_len': 0, 'scope': 0, 'type': 7,
+                                   'attrs': []})
+        self.fake_ipr.route.side_effect = ([default, unreachable], [route],
+                                           [], [])
+
+        linux_net.migrate_routes_protocol(10, 'br-ex')
+        # Only once per table
+        linux_net.migrate_routes_protocol(10, 'br-ex')
+
+        # Only the routes through the device and its vlan devices are dumped
+        self.fake_ipr.route.assert_has_calls([
+            mock.call('dump', dump_filter={}, table=10, proto=proto, oif=oif)
+            for proto in constants.LEGACY_ROUTES_PROTOS for oif in (5, 6)])
+        self.assertEqual(4, self.fake_ipr.route.call_count)
+        mock_route_create.assert_has_calls([
+            mock.call({'dst_len': 0, 'family': constants.AF_INET,
+                       'table': 10, 'scope': 253,
+                       'proto': CONF.routes_protocol, 'oif': 5}),
+            mock.call({'dst_len': 128, 'family': constants.AF_INET6,
+                       'table': 10, 'scope': 0,
+                       'proto': CONF.routes_protocol, 'dst': self.ipv6,
+                       'oif': 6, 'gateway': 'fd00::1', 'priority': 1024})])
+        self.assertEqual(2, mock_route_create.call_count)
+
+    def _get_bridge_table_routes(self, bridge_idx):
+        self.fake_ipr.link_lookup.return_value = [bridge_idx]
+        default = IPRouteDict({'family': constants.AF_INET, 'dst_len': 0,
+                               'attrs': [('RTA_OIF', bridge_idx)]})
+        default_v6 = IPRouteDict({'family': constants.AF_INET6,
+                                  'dst_len': 0, 'attrs': [('RTA_OIF', 9)]})
+        extra = IPRouteDict({'family': constants.AF_INET, 'dst_len': 32,
+                             'attrs': [('RTA_DST', '10.10.10.10'),
+                                       ('RTA_OIF', bridge_idx)]})
+        # same destination with a higher metric
+        extra_dup = IPRouteDict({'family': constants.AF_INET, 'dst_len': 32,
+                                 'attrs': [('RTA_DST', '10.10.10.10'),
+                                           ('RTA_OIF', 9)]})
+        self.fake_ipr.route.return_value = [default, default_v6, extra,
+                                            extra_dup]
+        return [default_v6, extra]
+
+    def test_get_extra_routing_table_for_bridge(self):
+        expected = self._get_bridge_table_routes(7)
+
+        ret = linux_net.get_extra_routing_table_for_bridge({'br-ex': 5},
+                                                           'br-ex')
+
+        self.assertEqual(expected, ret)
+        self.fake_ipr.route.assert_called_once_with(
+            'dump', dump_filter={}, table=5)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test__ensure_routing_table_routes(self, mock_route_create):
+        expected = self._get_bridge_table_routes(7)
+
+        ret = linux_net._ensure_routing_table_routes({'br-ex': 5}, 'br-ex')
+
+        self.assertEqual(expected, ret)
+        mock_route_create.assert_called_once_with(
+            {'dst': 'default', 'oif': 7, 'table': 5,
+             'family': constants.AF_INET6, 'proto': CONF.routes_protocol})
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test__ensure_routing_table_routes_empty(self, mock_route_create):
+        self.fake_ipr.link_lookup.return_value = [7]
+        self.fake_ipr.route.return_value = []
+
+        ret = linux_net._ensure_routing_table_routes({'br-ex': 5}, 'br-ex')
+
+        self.assertEqual([], ret)
+        mock_route_create.assert_has_calls([
+            mock.call({'dst': 'default', 'oif': 7, 'table': 5, 'scope': 253,
+                       'proto': CONF.routes_protocol}),
+            mock.call({'dst': 'default', 'oif': 7, 'table': 5,
+                       'family': constants.AF_INET6,
+                       'proto': CONF.routes_protocol})])
+
+    def test__get_table_routes(self):
+        route0 = IPRouteDict({'scope': 0, 'proto': 3,
+                              'attrs': [('RTA_DST', '10.10.10.10')]})
+        route1 = IPRouteDict({'scope': 254, 'proto': 3,
+                              'attrs': [('RTA_DST', '10.10.10.11')]})
+        route2 = IPRouteDict({'scope': 0, 'proto': 186,
+                              'attrs': [('RTA_DST', '10.10.10.12')]})
+        self.fake_ipr.route.return_value = [route0, route1, route2]
+
+        ret = linux_net._get_table_routes(10, oif=7)
+
+        self.assertEqual([route0], ret)
+        self.fake_ipr.route.assert_called_once_with(
+            'dump', dump_filter={}, table=10, oif=7)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.delete_routes')
     def test_delete_ip_routes(self, mock_route_delete):
         route0 = dict(
             table=10, dst='10.10.10.10', proto=10, dst_len=128,
@@ -456,8 +555,7 @@ class TestLinuxNet(test_base.TestCase):
 
         route0.pop('proto')
         route1.pop('proto')
-        mock_route_delete.assert_has_calls(
-            [mock.call(route0), mock.call(route1)])
+        mock_route_delete.assert_called_once_with([route0, route1])
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.add_ndp_proxy')
     def test_add_ndp_proxy(self, mock_ndp_proxy):
@@ -469,6 +567,46 @@ class TestLinuxNet(test_base.TestCase):
         linux_net.del_ndp_proxy(self.ip, self.dev, vlan=10)
         mock_ndp_proxy.assert_called_once_with(self.ip, self.dev, 10)
 
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.add_exposed_routes')
+    def test_add_exposed_routes(self, mock_add):
+        linux_net.add_exposed_routes([self.ip], self.dev, 10)
+        mock_add.assert_called_once_with(
+            [self.ip], self.dev, 10, CONF.routes_protocol)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.delete_exposed_routes')
+    def test_delete_exposed_routes(self, mock_del):
+        linux_net.delete_exposed_routes([self.ip], self.dev, 10)
+        mock_del.assert_called_once_with(
+            [self.ip], self.dev, 10, CONF.routes_protocol)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.get_exposed_routes')
+    def test_get_exposed_routes(self, mock_get):
+        ret = linux_net.get_exposed_routes(self.dev, 10)
+        self.assertEqual(mock_get.return_value, ret)
+        mock_get.assert_called_once_with(
+            self.dev, 10, CONF.routes_protocol)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.add_ndp_proxies')
+    def test_add_ndp_proxies(self, mock_ndp_proxies):
+        linux_net.add_ndp_proxies([self.ip], self.dev, vlan=10)
+        mock_ndp_proxies.assert_called_once_with([self.ip], self.dev, 10)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.del_ndp_proxies')
+    def test_del_ndp_proxies(self, mock_ndp_proxies):
+        linux_net.del_ndp_proxies([self.ip], self.dev, vlan=10)
+        mock_ndp_proxies.assert_called_once_with([self.ip], self.dev, 10)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.get_ndp_proxies')
+    def test_get_ndp_proxies(self, mock_ndp_proxies):
+        ret = linux_net.get_ndp_proxies(self.dev)
+        self.assertEqual(mock_ndp_proxies.return_value, ret)
+        mock_ndp_proxies.assert_called_once_with(self.dev, None)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.sync_ndp_proxies')
+    def test_sync_ndp_proxies(self, mock_ndp_proxies):
+        linux_net.sync_ndp_proxies([self.ip], self.dev, vlan=10)
+        mock_ndp_proxies.assert_called_once_with([self.ip], self.dev, 10)
+
     @mock.patch.object(linux_net, 'get_interface_index')
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
     @mock.patch('ovn_bgp_agent.privileged.linux_net.add_ip_to_dev')
@@ -493,6 +631,32 @@ class TestLinuxNet(test_base.TestCase):
                  mock.call(r2)]
         mock_route_delete.assert_has_calls(calls)
 
+    @mock.patch.object(linux_net, 'get_interface_index')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.add_ip_to_dev')
+    def test_add_ips_to_dev_already_added(self, mock_add_ip_to_dev,
+                                          mock_route_delete, mock_get_index):
+        mock_add_ip_to_dev.side_effect = [
+            agent_exc.IpAddressAlreadyExists(ip=self.ip, device=self.dev),
+            None]
+        mock_get_index.return_value = 7
+        linux_net.add_ips_to_dev(
+            self.dev, [self.ip, self.ipv6], clear_local_route_at_table=123)
+
+        mock_route_delete.assert_called_once_with(
+            {'table': 123, 'proto': 2, 'scope': 254, 'dst': self.ipv6,
+             'oif': 7})
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.add_ip_to_dev')
+    def test_add_ips_to_dev_error(self, mock_add_ip_to_dev):
+        mock_add_ip_to_dev.side_effect = [
+            agent_exc.NetworkInterfaceNotFound(device=self.dev), None]
+        self.assertRaises(agent_exc.NetworkInterfaceNotFound,
+                          linux_net.add_ips_to_dev, self.dev,
+                          [self.ip, self.ipv6])
+        # The calls are run in a single batch
+        self.assertEqual(2, mock_add_ip_to_dev.call_count)
+
     @mock.patch('ovn_bgp_agent.privileged.linux_net.del_ip_from_dev')
     def test_del_ips_from_dev(self, mock_del_ip_from_dev):
         ips = [self.ip, self.ipv6]
@@ -502,6 +666,14 @@ class TestLinuxNet(test_base.TestCase):
                  mock.call(self.ipv6, self.dev)]
         mock_del_ip_from_dev.assert_has_calls(calls)
 
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.rule_create')
+    def test_add_aggregated_ip_rule(self, mock_rule_create):
+        linux_net.add_aggregated_ip_rule(7, constants.AF_INET6)
+
+        mock_rule_create.assert_called_once_with(
+            {'table': 7, 'family': constants.AF_INET6,
+             'suppress_prefixlength': 0})
+
     @mock.patch.object(linux_net, 'add_ip_nei')
     @mock.patch('ovn_bgp_agent.privileged.linux_net.rule_create')
     def test_add_ip_rule(self, mock_rule_create, mock_add_ip_nei):
@@ -574,65 +746,301 @@ class TestLinuxNet(test_base.TestCase):
         linux_net.add_unreachable_route('fake-vrf')
         mock_add_route.assert_called_once_with('fake-vrf')
 
+    def _get_route(self, dst, dst_len=32, table=7, oif=5, vlan=None,
+                   gateway=None, family=constants.AF_INET, dev=None):
+        return route_ledger.Route(
+            dev=dev or self.dev, vlan=vlan, table=table, dst=dst,
+            dst_len=dst_len, oif=oif, gateway=gateway, family=family)
+
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
     def test_add_ip_route(self, mock_route_create):
-        routes = {}
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
         linux_net.add_ip_route(routes, self.ip, 7, self.dev)
-        expected_routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': None}]}
-        self.assertEqual(expected_routes, routes)
+        self.assertEqual([self._get_route(self.ip)],
+                         routes.get_device_routes(self.dev))
+        self.fake_ipr.route.assert_called_once_with(
+            'show', dst=self.ip, dst_len=32, oif=5, table=7,
+            proto=CONF.routes_protocol, scope=253)
         mock_route_create.assert_not_called()
 
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_add_ip_route_duplicated(self, mock_route_create):
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        linux_net.add_ip_route(routes, self.ip, 7, self.dev)
+        linux_net.add_ip_route(routes, self.ip, 7, self.dev)
+        self.assertEqual(1, len(routes))
+        self.assertEqual(1, routes.get_references(self._get_route(self.ip)))
+
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
     def test_add_ip_route_ipv6(self, mock_route_create):
-        routes = {}
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
         linux_net.add_ip_route(routes, self.ipv6, 7, self.dev)
-        expected_routes = {
-            self.dev: [{'route': {'dst': self.ipv6,
-                                  'dst_len': 128,
-                                  'family': constants.AF_INET6,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'table': 7},
-                        'vlan': None}]}
-        self.assertEqual(expected_routes, routes)
+        self.assertEqual(
+            [self._get_route(self.ipv6, dst_len=128,
+                             family=constants.AF_INET6)],
+            routes.get_device_routes(self.dev))
+        self.fake_ipr.route.assert_called_once_with(
+            'show', dst=self.ipv6, dst_len=128, oif=5, table=7,
+            proto=CONF.routes_protocol, family=constants.AF_INET6)
         mock_route_create.assert_not_called()
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
     def test_add_ip_route_via(self, mock_route_create):
-        routes = {}
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
         linux_net.add_ip_route(routes, self.ip, 7, self.dev, via='1.1.1.1')
-        expected_routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'gateway': '1.1.1.1',
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 0,
-                                  'table': 7},
-                        'vlan': None}]}
-        self.assertEqual(expected_routes, routes)
+        self.assertEqual([self._get_route(self.ip, gateway='1.1.1.1')],
+                         routes.get_device_routes(self.dev))
+        self.fake_ipr.route.assert_called_once_with(
+            'show', dst=self.ip, dst_len=32, oif=5, table=7,
+            proto=CONF.routes_protocol, gateway='1.1.1.1', scope=0)
         mock_route_create.assert_not_called()
 
+    def _enable_kernel_nexthops(self, nexthops=(), routes=()):
+        CONF.set_override('kernel_nexthops', True)
+        self.addCleanup(CONF.clear_override, 'kernel_nexthops')
+        mock.patch.object(linux_net, '_nexthops', {}).start()
+        mock.patch.object(linux_net, '_nexthop_routes', {}).start()
+        mock.patch.object(linux_net, '_nexthops_loaded', False).start()
+        mock.patch.object(linux_net, '_get_protocol_routes',
+                          return_value=list(routes)).start()
+        return mock.patch('ovn_bgp_agent.privileged.linux_net.get_nexthops',
+                          return_value=list(nexthops)).start()
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_add_ip_route_via_kernel_nexthops(self, mock_route_create,
+                                              mock_nexthop_replace):
+        mock_get_nexthops = self._enable_kernel_nexthops()
+        self.fake_ipr.link_lookup.return_value = [5]
+        self.fake_ipr.route.return_value = []
+        routes = route_ledger.RouteLedger()
+        linux_net.add_ip_route(routes, '10.0.0.0', 7, self.dev, mask='24',
+                               via='1.1.1.1')
+        linux_net.add_ip_route(routes, '10.0.1.0', 7, self.dev, mask='24',
+                               via='1.1.1.1')
+
+        nh_id = constants.NEXTHOP_ID_BASE
+        mock_get_nexthops.assert_called_once_with(CONF.routes_protocol)
+        mock_nexthop_replace.assert_called_once_with(
+            nh_id, '1.1.1.1', 5, CONF.routes_protocol)
+        self.assertEqual(2, mock_route_create.call_count)
+        for call in mock_route_create.call_args_list:
+            self.assertEqual(nh_id, call[0][0]['nh_id'])
+        self.assertEqual(
+            {'id': nh_id, 'gateway': '1.1.1.1',
+             'routes': {(7, '10.0.0.0', 24), (7, '10.0.1.0', 24)}},
+            linux_net._nexthops[('1.1.1.1', self.dev, 4)])
+
+    def _add_gateway_owner_routes(self, routes, gateway):
+        for ip in ('10.0.0.0', '10.0.1.0'):
+            linux_net.add_ip_route(routes, ip, 7, self.dev, mask='24',
+                                   via=gateway, gateway_owner='cr-lrp1')
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_add_ip_route_via_kernel_nexthops_gateway_owner(
+            self, mock_route_create, mock_nexthop_replace):
+        self._enable_kernel_nexthops()
+        self.fake_ipr.link_lookup.return_value = [5]
+        self.fake_ipr.route.return_value = []
+        routes = route_ledger.RouteLedger()
+        self._add_gateway_owner_routes(routes, '1.1.1.1')
+        # Another gateway owner behind the same gateway gets its own
+        linux_net.add_ip_route(routes, '10.0.2.0', 7, self.dev, mask='24',
+                               via='1.1.1.1', gateway_owner='cr-lrp2')
+
+        nh_id = constants.NEXTHOP_ID_BASE
+        mock_nexthop_replace.assert_has_calls([
+            mock.call(nh_id, '1.1.1.1', 5, CONF.routes_protocol),
+            mock.call(nh_id + 1, '1.1.1.1', 5, CONF.routes_protocol)])
+        self.assertEqual(
+            {'id': nh_id, 'gateway': '1.1.1.1',
+             'routes': {(7, '10.0.0.0', 24), (7, '10.0.1.0', 24)}},
+            linux_net._nexthops[('cr-lrp1', self.dev, 4)])
+        self.assertEqual(
+            {'id': nh_id + 1, 'gateway': '1.1.1.1',
+             'routes': {(7, '10.0.2.0', 24)}},
+            linux_net._nexthops[('cr-lrp2', self.dev, 4)])
+        mock_nexthop_replace.reset_mock()
+        mock_route_create.reset_mock()
+
+        # The gateway owner moved to a new gateway, its nexthop follows it
+        self.fake_ipr.route.return_value = [IPRouteDict(
+            {'attrs': [('RTA_NH_ID', nh_id)]})]
+        self._add_gateway_owner_routes(routes, '2.2.2.2')
+
+        mock_nexthop_replace.assert_called_once_with(
+            nh_id, '2.2.2.2', 5, CONF.routes_protocol)
+        mock_route_create.assert_not_called()
+        self.assertEqual(
+            {self._get_route('10.0.0.0', dst_len=24, gateway='2.2.2.2'),
+             self._get_route('10.0.1.0', dst_len=24, gateway='2.2.2.2'),
+             self._get_route('10.0.2.0', dst_len=24, gateway='1.1.1.1')},
+            set(routes.get_device_routes(self.dev)))
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_update_nexthop_gateway(self, mock_route_create,
+                                    mock_route_delete, mock_nexthop_replace,
+                                    mock_nexthop_delete):
+        self._enable_kernel_nexthops()
+        self.fake_ipr.link_lookup.return_value = [5]
+        self.fake_ipr.route.return_value = []
+        routes = route_ledger.RouteLedger()
+        self._add_gateway_owner_routes(routes, '1.1.1.1')
+        mock_route_create.reset_mock()
+        mock_nexthop_replace.reset_mock()
+
+        self.assertTrue(linux_net.update_nexthop_gateway(
+            routes, 'cr-lrp1', self.dev, '2.2.2.2'))
+
+        # A single nexthop update, with no route changes
+        mock_nexthop_replace.assert_called_once_with(
+            constants.NEXTHOP_ID_BASE, '2.2.2.2', 5, CONF.routes_protocol)
+        mock_route_create.assert_not_called()
+        mock_route_delete.assert_not_called()
+        mock_nexthop_delete.assert_not_called()
+        self.assertEqual(
+            {self._get_route('10.0.0.0', dst_len=24, gateway='2.2.2.2'),
+             self._get_route('10.0.1.0', dst_len=24, gateway='2.2.2.2')},
+            set(routes.get_device_routes(self.dev)))
+
+        # The routes are then released through their new gateway
+        for ip in ('10.0.0.0', '10.0.1.0'):
+            linux_net.del_ip_route(routes, ip, 7, self.dev, mask='24',
+                                   via='2.2.2.2')
+        self.assertEqual(2, mock_route_delete.call_count)
+        mock_nexthop_delete.assert_called_once_with(
+            constants.NEXTHOP_ID_BASE)
+        self.assertEqual(0, len(routes))
+        self.assertEqual({}, linux_net._nexthops)
+        self.assertEqual({}, linux_net._nexthop_routes)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    def test_update_nexthop_gateway_same_gateway(self, mock_nexthop_replace):
+        self._enable_kernel_nexthops()
+        self.fake_ipr.link_lookup.return_value = [5]
+        self.fake_ipr.route.return_value = []
+        routes = route_ledger.RouteLedger()
+        with mock.patch('ovn_bgp_agent.privileged.linux_net.route_create'):
+            self._add_gateway_owner_routes(routes, '1.1.1.1')
+        mock_nexthop_replace.reset_mock()
+
+        self.assertTrue(linux_net.update_nexthop_gateway(
+            routes, 'cr-lrp1', self.dev, '1.1.1.1'))
+        mock_nexthop_replace.assert_not_called()
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    def test_update_nexthop_gateway_unknown(self, mock_nexthop_replace):
+        self._enable_kernel_nexthops()
+        self.assertFalse(linux_net.update_nexthop_gateway(
+            route_ledger.RouteLedger(), 'cr-lrp1', self.dev, '2.2.2.2',
+            vlan=10))
+        mock_nexthop_replace.assert_not_called()
+
+    def test_update_nexthop_gateway_disabled(self):
+        self.assertFalse(linux_net.update_nexthop_gateway(
+            route_ledger.RouteLedger(), 'cr-lrp1', self.dev, '2.2.2.2'))
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_add_ip_route_via_kernel_nexthops_parallel(
+            self, mock_route_create, mock_nexthop_replace):
+        self._enable_kernel_nexthops()
+        self.fake_ipr.link_lookup.return_value = [5]
+        self.fake_ipr.route.return_value = []
+        routes = route_ledger.RouteLedger()
+
+        def _route_create(route):
+            # The nexthop cannot be released while the route points to it
+            self.assertTrue(linux_net._nexthops_lock.locked())
+
+        mock_route_create.side_effect = _route_create
+        # Let the workers interleave between the nexthop lookup and its
+        # creation
+        mock_nexthop_replace.side_effect = lambda *args: time.sleep(0.01)
+
+        workers.run_in_parallel(
+            lambda ip: linux_net.add_ip_route(routes, ip, 7, self.dev,
+                                              via='1.1.1.1'),
+            ['10.0.0.{}'.format(i) for i in range(8)], 4)
+
+        mock_nexthop_replace.assert_called_once_with(
+            constants.NEXTHOP_ID_BASE, '1.1.1.1', 5, CONF.routes_protocol)
+        self.assertEqual(8, mock_route_create.call_count)
+        self.assertEqual(
+            8, len(linux_net._nexthops[('1.1.1.1', self.dev, 4)]['routes']))
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_add_ip_route_via_kernel_nexthops_adopted(
+            self, mock_route_create, mock_nexthop_replace):
+        self._enable_kernel_nexthops(
+            [{'id': 5, 'gateway': '1.1.1.1', 'dev': self.dev}])
+        self.fake_ipr.link_lookup.return_value = [5]
+        inline_route = IPRouteDict({'attrs': [('RTA_GATEWAY', '1.1.1.1')]})
+        nh_route = IPRouteDict({'attrs': [
+            ('UNKNOWN', {'header': {'length': 8,
+                                    'type': constants.RTA_NH_ID}}),
+            ('RTA_GATEWAY', '1.1.1.1')]})
+        self.fake_ipr.route.side_effect = [[inline_route], [nh_route]]
+        routes = route_ledger.RouteLedger()
+
+        # the route with an inline gateway is moved to the nexthop
+        linux_net.add_ip_route(routes, self.ip, 7, self.dev, via='1.1.1.1')
+        linux_net.add_ip_route(routes, self.ip, 7, self.dev, via='1.1.1.1')
+
+        mock_nexthop_replace.assert_not_called()
+        mock_route_create.assert_called_once_with(
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'gateway': '1.1.1.1', 'scope': 0,
+             'nh_id': 5})
+        self.assertEqual([self._get_route(self.ip, gateway='1.1.1.1')],
+                         routes.get_device_routes(self.dev))
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_replace')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
+    def test_add_ip_route_via_kernel_nexthops_adopted_gateway_owner(
+            self, mock_route_create, mock_nexthop_replace):
+        self._enable_kernel_nexthops(
+            [{'id': 5, 'gateway': '1.1.1.1', 'dev': self.dev}],
+            routes=[IPRouteDict({'dst_len': 24, 'attrs': [
+                ('RTA_TABLE', 7), ('RTA_DST', '10.0.1.0'),
+                ('RTA_NH_ID', 5)]})])
+        self.fake_ipr.link_lookup.return_value = [5]
+        self.fake_ipr.route.return_value = []
+        routes = route_ledger.RouteLedger()
+
+        # The nexthop adopted for the gateway is claimed by its owner
+        linux_net.add_ip_route(routes, '10.0.0.0', 7, self.dev, mask='24',
+                               via='1.1.1.1', gateway_owner='cr-lrp1')
+
+        mock_nexthop_replace.assert_not_called()
+        self.assertEqual(5, mock_route_create.call_args[0][0]['nh_id'])
+        self.assertEqual(
+            {'id': 5, 'gateway': '1.1.1.1',
+             'routes': {(7, '10.0.0.0', 24), (7, '10.0.1.0', 24)}},
+            linux_net._nexthops[('cr-lrp1', self.dev, 4)])
+        self.assertEqual(
+            {(7, '10.0.0.0', 24): ('cr-lrp1', self.dev, 4),
+             (7, '10.0.1.0', 24): ('cr-lrp1', self.dev, 4)},
+            linux_net._nexthop_routes)
+
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
     def test_add_ip_route_vlan(self, mock_route_create):
-        routes = {}
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
         linux_net.add_ip_route(routes, self.ip, 7, self.dev, vlan=10)
-        expected_routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': 10}]}
-        self.assertEqual(expected_routes, routes)
+        self.assertEqual([self._get_route(self.ip, vlan=10)],
+                         routes.get_device_routes(self.dev))
+        self.fake_ipr.link_lookup.assert_called_once_with(
+            ifname='{}.10'.format(self.dev))
         mock_route_create.assert_not_called()
 
     @mock.patch.object(linux_net, 'get_interface_index')
@@ -641,139 +1049,227 @@ class TestLinuxNet(test_base.TestCase):
     def test_add_ip_route_vlan_keyerror(self, mock_route_create,
                                         mock_ensure_vlan_device,
                                         mock_get_index):
-        routes = {}
+        routes = route_ledger.RouteLedger()
         oif = '5'
         mock_get_index.side_effect = [agent_exc.NetworkInterfaceNotFound, oif]
         linux_net.add_ip_route(routes, self.ip, 7, self.dev, vlan=10)
-        expected_routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'oif': oif,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': 10}]}
-        self.assertEqual(expected_routes, routes)
+        self.assertEqual([self._get_route(self.ip, oif=oif, vlan=10)],
+                         routes.get_device_routes(self.dev))
         mock_ensure_vlan_device.assert_called_once_with(self.dev, 10)
         mock_route_create.assert_not_called()
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
     def test_add_ip_route_mask(self, mock_route_create):
-        routes = {}
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
         linux_net.add_ip_route(routes, self.ip, 7, self.dev, mask=30)
-        expected_routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 30,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': None}]}
-        self.assertEqual(expected_routes, routes)
+        self.assertEqual([self._get_route('10.10.1.16', dst_len=30)],
+                         routes.get_device_routes(self.dev))
         mock_route_create.assert_not_called()
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_create')
     def test_add_ip_route_no_route(self, mock_route_create):
+        self.fake_ipr.link_lookup.return_value = [5]
         self.fake_ipr.route.return_value = ()
-        routes = {}
+        routes = route_ledger.RouteLedger()
         linux_net.add_ip_route(routes, self.ip, 7, self.dev)
-        expected_routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': None}]}
-        self.assertEqual(expected_routes, routes)
+        self.assertEqual([self._get_route(self.ip)],
+                         routes.get_device_routes(self.dev))
         mock_route_create.assert_called_once_with(
-            expected_routes[self.dev][0]['route'])
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'scope': 253})
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
     def test_del_ip_route(self, mock_route_delete):
-        routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': None}]}
-        route = copy.deepcopy(routes[self.dev][0]['route'])
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route(self.ip))
 
         linux_net.del_ip_route(routes, self.ip, 7, self.dev)
 
-        self.assertEqual({self.dev: []}, routes)
-        mock_route_delete.assert_called_once_with(route)
+        self.assertEqual(0, len(routes))
+        mock_route_delete.assert_called_once_with(
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'scope': 253})
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    def test_del_ip_route_not_tracked(self, mock_route_delete):
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+
+        linux_net.del_ip_route(routes, self.ip, 7, self.dev)
+
+        mock_route_delete.assert_called_once_with(
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'scope': 253})
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    def test_del_ip_route_shared(self, mock_route_delete):
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        linux_net.add_ip_route(routes, self.ip, 7, self.dev, owner='port1')
+        linux_net.add_ip_route(routes, self.ip, 7, self.dev, owner='port2')
+
+        ret = linux_net.del_ip_route(routes, self.ip, 7, self.dev,
+                                     owner='port1')
+
+        self.assertFalse(ret)
+        mock_route_delete.assert_not_called()
+        self.assertEqual(1, routes.get_references(self._get_route(self.ip)))
+
+        ret = linux_net.del_ip_route(routes, self.ip, 7, self.dev,
+                                     owner='port2')
+
+        self.assertTrue(ret)
+        mock_route_delete.assert_called_once_with(
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'scope': 253})
+        self.assertEqual(0, len(routes))
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    def test_del_ip_route_no_device(self, mock_route_delete):
+        self.fake_ipr.link_lookup.return_value = []
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route(self.ip))
+        routes.add(self._get_route('10.0.0.1', dev='other-dev'))
+
+        linux_net.del_ip_route(routes, self.ip, 7, self.dev)
+
+        self.assertEqual([], routes.get_device_routes(self.dev))
+        self.assertEqual(1, len(routes))
+        mock_route_delete.assert_not_called()
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
     def test_del_ip_route_ipv6(self, mock_route_delete):
-        routes = {
-            self.dev: [{'route': {'dst': self.ipv6,
-                                  'dst_len': 128,
-                                  'family': constants.AF_INET6,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'table': 7},
-                        'vlan': None}]}
-        route = copy.deepcopy(routes[self.dev][0]['route'])
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route(self.ipv6, dst_len=128,
+                                   family=constants.AF_INET6))
 
         linux_net.del_ip_route(routes, self.ipv6, 7, self.dev)
 
-        self.assertEqual({self.dev: []}, routes)
-        mock_route_delete.assert_called_once_with(route)
+        self.assertEqual(0, len(routes))
+        mock_route_delete.assert_called_once_with(
+            {'dst': self.ipv6, 'dst_len': 128, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'family': constants.AF_INET6})
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
     def test_del_ip_route_via(self, mock_route_delete):
-        routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'oif': mock.ANY,
-                                  'gateway': '1.1.1.1',
-                                  'proto': 3,
-                                  'scope': 0,
-                                  'table': 7},
-                        'vlan': None}]}
-        route = copy.deepcopy(routes[self.dev][0]['route'])
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route(self.ip, gateway='1.1.1.1'))
+
+        linux_net.del_ip_route(routes, self.ip, 7, self.dev, via='1.1.1.1')
+
+        self.assertEqual(0, len(routes))
+        mock_route_delete.assert_called_once_with(
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'gateway': '1.1.1.1',
+             'scope': 0})
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    def test_del_ip_route_via_kernel_nexthops(self, mock_route_delete,
+                                              mock_nexthop_delete):
+        self._enable_kernel_nexthops()
+        self.fake_ipr.link_lookup.return_value = [5]
+        linux_net._nexthops_loaded = True
+        key = ('cr-lrp1', self.dev, 4)
+        linux_net._nexthops[key] = {
+            'id': 5, 'gateway': '1.1.1.1',
+            'routes': {(7, self.ip, 32), (7, '10.0.0.0', 24)}}
+        linux_net._nexthop_routes.update({(7, self.ip, 32): key,
+                                          (7, '10.0.0.0', 24): key})
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route(self.ip, gateway='1.1.1.1'))
+
+        linux_net.del_ip_route(routes, self.ip, 7, self.dev, via='1.1.1.1')
+
+        self.assertEqual(0, len(routes))
+        mock_route_delete.assert_called_once_with(
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'gateway': '1.1.1.1',
+             'scope': 0, 'nh_id': 5})
+        mock_nexthop_delete.assert_not_called()
+
+        linux_net.del_ip_route(routes, '10.0.0.0', 7, self.dev, mask='24',
+                               via='1.1.1.1')
+        mock_nexthop_delete.assert_called_once_with(5)
+        self.assertEqual({}, linux_net._nexthops)
+        self.assertEqual({}, linux_net._nexthop_routes)
+
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.nexthop_delete')
+    @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
+    def test_del_ip_route_via_kernel_nexthops_adopted(
+            self, mock_route_delete, mock_nexthop_delete):
+        self._enable_kernel_nexthops(
+            [{'id': 5, 'gateway': '1.1.1.1', 'dev': self.dev},
+             {'id': 6, 'gateway': '2.2.2.2', 'dev': self.dev}],
+            routes=[
+                IPRouteDict({'dst_len': 32, 'attrs': [
+                    ('RTA_TABLE', 7), ('RTA_DST', self.ip),
+                    ('RTA_NH_ID', 5)]}),
+                IPRouteDict({'dst_len': 24, 'attrs': [
+                    ('RTA_TABLE', 7), ('RTA_DST', '10.0.0.0'),
+                    ('RTA_NH_ID', 5)]}),
+                IPRouteDict({'dst_len': 24, 'attrs': [
+                    ('RTA_TABLE', 7), ('RTA_DST', '10.0.1.0'),
+                    ('RTA_GATEWAY', '1.1.1.1')]})])
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route(self.ip, gateway='1.1.1.1'))
 
         linux_net.del_ip_route(routes, self.ip, 7, self.dev, via='1.1.1.1')
 
-        self.assertEqual({self.dev: []}, routes)
-        mock_route_delete.assert_called_once_with(route)
+        # The nexthop adopted after a restart is still used by other routes
+        self.assertEqual(1, mock_route_delete.call_count)
+        mock_nexthop_delete.assert_not_called()
+        self.assertEqual({'id': 5, 'gateway': '1.1.1.1',
+                          'routes': {(7, '10.0.0.0', 24)}},
+                         linux_net._nexthops[('1.1.1.1', self.dev, 4)])
+        self.assertEqual({'id': 6, 'gateway': '2.2.2.2', 'routes': set()},
+                         linux_net._nexthops[('2.2.2.2', self.dev, 4)])
+
+    def test_get_route_nexthop_id(self):
+        self.assertEqual(5, linux_net.get_route_nexthop_id(
+            {'attrs': [('RTA_NH_ID', 5)]}))
+        self.assertEqual(0, linux_net.get_route_nexthop_id(
+            {'attrs': [('UNKNOWN', {'header': {'type': 30}})]}))
+        # pyroute2 versions not knowing RTA_NH_ID decode it as UNKNOWN
+        msg = priv_linux_net._get_nexthop_route_msg(
+            {'dst': self.ip, 'dst_len': 32, 'table': 300, 'nh_id': 1234})
+        msg.encode()
+        route = rtmsg.rtmsg(msg.data)
+        route.decode()
+        self.assertEqual(1234, linux_net.get_route_nexthop_id(route))
+        self.assertIsNone(linux_net.get_route_nexthop_id(
+            {'attrs': [('RTA_GATEWAY', '1.1.1.1')]}))
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
     def test_del_ip_route_vlan(self, mock_route_delete):
-        routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 32,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': 10}]}
-        route = copy.deepcopy(routes[self.dev][0]['route'])
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route(self.ip, vlan=10))
 
         linux_net.del_ip_route(routes, self.ip, 7, self.dev, vlan=10)
 
-        self.assertEqual({self.dev: []}, routes)
-        mock_route_delete.assert_called_once_with(route)
+        self.assertEqual(0, len(routes))
+        mock_route_delete.assert_called_once_with(
+            {'dst': self.ip, 'dst_len': 32, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'scope': 253})
 
     @mock.patch('ovn_bgp_agent.privileged.linux_net.route_delete')
     def test_del_ip_route_mask(self, mock_route_delete):
-        routes = {
-            self.dev: [{'route': {'dst': self.ip,
-                                  'dst_len': 30,
-                                  'oif': mock.ANY,
-                                  'proto': 3,
-                                  'scope': 253,
-                                  'table': 7},
-                        'vlan': None}]}
-        route = copy.deepcopy(routes[self.dev][0]['route'])
+        self.fake_ipr.link_lookup.return_value = [5]
+        routes = route_ledger.RouteLedger()
+        routes.add(self._get_route('10.10.1.16', dst_len=30))
 
         linux_net.del_ip_route(routes, self.ip, 7, self.dev, mask=30)
 
-        self.assertEqual({self.dev: []}, routes)
-        mock_route_delete.assert_called_once_with(route)
+        self.assertEqual(0, len(routes))
+        mock_route_delete.assert_called_once_with(
+            {'dst': '10.10.1.16', 'dst_len': 30, 'oif': 5, 'table': 7,
+             'proto': CONF.routes_protocol, 'scope': 253})
 
 
 class TestEnsureRoutingTableForBridge(test_base.TestCase):
@@ -794,41 +1290,73 @@ class TestEnsureRoutingTableForBridge(test_base.TestCase):
 
         self.m_ensure_rt_routes = mock.patch.object(
             linux_net, '_ensure_routing_table_routes').start()
-
-        # The 'random' generator will always generate number 2 because the
-        # range is 1-4 while 1 and 3 are used in the file and 4 is the vrf
+        self.m_migrate = mock.patch.object(
+            linux_net, 'migrate_routes_protocol').start()
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.rt_tables_file = os.path.join(tmp_dir.name, 'rt_tables')
+        self.rt_tables_dir = os.path.join(tmp_dir.name, 'rt_tables.d')
+        self.agent_file = os.path.join(
+            self.rt_tables_dir, '{}.conf'.format(constants.ROUTES_PROTO_NAME))
+        mock.patch.object(constants, 'ROUTING_TABLES_FILE',
+                          self.rt_tables_file).start()
+        mock.patch.object(constants, 'ROUTING_TABLES_DIR',
+                          self.rt_tables_dir).start()
+        mock.patch.dict(linux_net._routing_tables_files, clear=True).start()
+
+        # The allocation will always pick number 2 because the range is 1-4
+        # while 1 and 3 are used in the file and 4 is the vrf
         mock.patch.object(constants, 'ROUTING_TABLE_MIN', 1).start()
         mock.patch.object(constants, 'ROUTING_TABLE_MAX', 4).start()
 
-    def _create_fake_file_content(self):
-        return "\n".join(self.testing_multiline_file_content)
+    def _write_rt_tables(self):
+        with open(self.rt_tables_file, 'w') as f:
+            f.write("\n".join(self.testing_multiline_file_content))
+
+    def _read_agent_file(self):
+        with open(self.agent_file) as f:
+            return f.read()
 
     def test_ensure_routing_table_for_bridge_table_missing(self):
         self._test_ensure_routing_table_for_bridge_table_missing()
 
     def _test_ensure_routing_table_for_bridge_table_missing(self):
-        with mock.patch(
-                'builtins.open',
-                mock.mock_open(read_data=self._create_fake_file_content())):
-            linux_net.ensure_routing_table_for_bridge(
-                self.ovn_routing_tables, self.bridge_name, self.vrf_table)
+        self._write_rt_tables()
+        linux_net.ensure_routing_table_for_bridge(
+            self.ovn_routing_tables, self.bridge_name, self.vrf_table)
 
         self.assertDictEqual(
             {self.bridge_name: self.generated_number}, self.ovn_routing_tables)
+        self.assertEqual(
+            '{} {}\n'.format(self.generated_number, self.bridge_name),
+            self._read_agent_file())
 
     def test_ensure_routing_table_for_bridge_table_present(self):
         present_bridge_value = 5
         self.testing_multiline_file_content.insert(
             2, "%d %s" % (present_bridge_value, self.bridge_name))
+        self._write_rt_tables()
 
-        with mock.patch(
-                'builtins.open',
-                mock.mock_open(read_data=self._create_fake_file_content())):
-            linux_net.ensure_routing_table_for_bridge(
-                self.ovn_routing_tables, self.bridge_name, self.vrf_table)
+        linux_net.ensure_routing_table_for_bridge(
+            self.ovn_routing_tables, self.bridge_name, self.vrf_table)
 
         self.assertDictEqual(
             {self.bridge_name: present_bridge_value}, self.ovn_routing_tables)
+        self.assertFalse(os.path.exists(self.agent_file))
+        self.m_migrate.assert_called_once_with(present_bridge_value,
+                                               self.bridge_name)
+
+    def test_ensure_routing_table_for_bridge_table_present_rt_tables_d(self):
+        self._write_rt_tables()
+        os.makedirs(self.rt_tables_dir)
+        with open(os.path.join(self.rt_tables_dir, 'other.conf'), 'w') as f:
+            f.write('7 {}\n'.format(self.bridge_name))
+
+        linux_net.ensure_routing_table_for_bridge(
+            self.ovn_routing_tables, self.bridge_name, self.vrf_table)
+
+        self.assertDictEqual({self.bridge_name: 7}, self.ovn_routing_tables)
 
     def test_ensure_routing_table_for_bridge_table_vrf_not_generated(self):
         self.vrf_table = 2
@@ -839,13 +1367,69 @@ class TestEnsureRoutingTableForBridge(test_base.TestCase):
         present_bridge_value = 2
         self.testing_multiline_file_content.insert(
             2, "%d %s" % (present_bridge_value, "foo"))
+        self._write_rt_tables()
 
-        with mock.patch(
-                'builtins.open',
-                mock.mock_open(read_data=self._create_fake_file_content())):
-            self.assertRaises(
-                SystemExit,
-                linux_net.ensure_routing_table_for_bridge,
-                self.ovn_routing_tables, self.bridge_name, self.vrf_table)
+        self.assertRaises(
+            SystemExit,
+            linux_net.ensure_routing_table_for_bridge,
+            self.ovn_routing_tables, self.bridge_name, self.vrf_table)
 
         self.assertDictEqual({}, self.ovn_routing_tables)
+
+    def test_ensure_routing_table_for_bridge_deterministic(self):
+        mock.patch.object(constants, 'ROUTING_TABLE_MAX', 252).start()
+        self.testing_multiline_file_content = []
+        self._write_rt_tables()
+        linux_net.ensure_routing_table_for_bridge(
+            self.ovn_routing_tables, self.bridge_name, self.vrf_table)
+        table = self.ovn_routing_tables[self.bridge_name]
+
+        # Same table on a different host with no tables configured
+        os.remove(self.agent_file)
+        routing_tables = {}
+        linux_net.ensure_routing_table_for_bridge(
+            routing_tables, self.bridge_name, self.vrf_table)
+        self.assertEqual(table, routing_tables[self.bridge_name])
+
+        # Next table if taken
+        self.testing_multiline_file_content = ['%d foo' % table]
+        os.remove(self.agent_file)
+        self._write_rt_tables()
+        routing_tables = {}
+        linux_net.ensure_routing_table_for_bridge(
+            routing_tables, self.bridge_name, self.vrf_table)
+        self.assertEqual(table % 252 + 1, routing_tables[self.bridge_name])
+
+    def test_get_routing_tables_cached(self):
+        self._write_rt_tables()
+        self.assertEqual({'foo': 1, 'another': 3},
+                         linux_net.get_routing_tables())
+
+        with mock.patch('builtins.open') as m_open:
+            self.assertEqual({'foo': 1, 'another': 3},
+                             linux_net.get_routing_tables())
+        m_open.assert_not_called()
+
+        self.testing_multiline_file_content.append('5 bar')
+        self._write_rt_tables()
+        os.utime(self.rt_tables_file, ns=(0, 0))
+        self.assertEqual({'foo': 1, 'another': 3, 'bar': 5},
+                         linux_net.get_routing_tables())
+
+    @mock.patch.object(linux_net, 'delete_routes_from_table')
+    def test_delete_stale_routing_tables(self, mock_delete_routes):
+        os.makedirs(self.rt_tables_dir)
+        with open(self.agent_file, 'w') as f:
+            f.write('2 br-test\n6 br-old\n')
+
+        linux_net.delete_stale_routing_tables({'br-test': 2, 'br-ex': 9})
+
+        mock_delete_routes.assert_called_once_with(6)
+        self.assertEqual('2 br-test\n', self._read_agent_file())
+
+    @mock.patch.object(linux_net, 'delete_routes_from_table')
+    def test_delete_stale_routing_tables_none(self, mock_delete_routes):
+        linux_net.delete_stale_routing_tables({'br-test': 2})
+
+        mock_delete_routes.assert_not_called()
+        self.assertFalse(os.path.exists(self.agent_file))
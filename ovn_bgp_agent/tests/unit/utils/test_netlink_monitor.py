@@ -0,0 +1,132 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+import pyroute2
+from pyroute2.netlink.rtnl import fibmsg
+from pyroute2.netlink.rtnl import ifaddrmsg
+from pyroute2.netlink.rtnl import rtmsg
+
+from ovn_bgp_agent import constants
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import dirty_set
+from ovn_bgp_agent.utils import netlink_monitor
+
+
+class TestNetlinkMonitor(test_base.TestCase):
+
+    def setUp(self):
+        super(TestNetlinkMonitor, self).setUp()
+        self.dirty = dirty_set.DirtySet(full_sync_interval=60)
+        self.monitor = netlink_monitor.NetlinkMonitor(self.dirty, 22)
+
+    def _get_msg(self, msg_class, event, attrs, **fields):
+        msg = msg_class()
+        msg['event'] = event
+        msg['attrs'] = list(attrs.items())
+        for name, value in fields.items():
+            msg[name] = value
+        return msg
+
+    def _get_route_msg(self, event='RTM_DELROUTE', proto=22, **attrs):
+        attrs.setdefault('RTA_DST', '10.0.0.1')
+        attrs.setdefault('RTA_TABLE', 200)
+        return self._get_msg(rtmsg.rtmsg, event, attrs, proto=proto,
+                             dst_len=32, table=252)
+
+    def test_handle_address(self):
+        self.monitor.handle(self._get_msg(
+            ifaddrmsg.ifaddrmsg, 'RTM_DELADDR',
+            {'IFA_ADDRESS': '10.0.0.1', 'IFA_LOCAL': '10.0.0.1'},
+            prefixlen=32))
+        self.monitor.handle(self._get_msg(
+            ifaddrmsg.ifaddrmsg, 'RTM_DELADDR', {'IFA_ADDRESS': 'fd00::1'},
+            prefixlen=128))
+
+        self.assertEqual({constants.DIRTY_ADDRESS: {'10.0.0.1', 'fd00::1'}},
+                         self.dirty.pop())
+
+    def test_handle_route(self):
+        self.monitor.handle(self._get_route_msg())
+
+        self.assertEqual({constants.DIRTY_ROUTE: {(200, '10.0.0.1', 32)}},
+                         self.dirty.pop())
+
+    def test_handle_route_other_proto(self):
+        self.monitor.handle(self._get_route_msg(proto=2))
+
+        self.assertEqual({}, self.dirty.pop())
+
+    def test_handle_route_no_dst(self):
+        self.monitor.handle(self._get_route_msg(RTA_DST=None))
+
+        self.assertEqual({}, self.dirty.pop())
+
+    def test_handle_route_added(self):
+        self.monitor.handle(self._get_route_msg(event='RTM_NEWROUTE'))
+
+        self.assertEqual({}, self.dirty.pop())
+
+    def test_handle_rule(self):
+        self.monitor.handle(self._get_msg(
+            fibmsg.fibmsg, 'RTM_DELRULE',
+            {'FRA_DST': '10.0.0.0', 'FRA_TABLE': 200}, dst_len=24,
+            table=200))
+        self.monitor.handle(self._get_msg(
+            fibmsg.fibmsg, 'RTM_DELRULE', {'FRA_TABLE': 200}, dst_len=0,
+            table=200))
+
+        self.assertEqual({constants.DIRTY_RULE: {(200, '10.0.0.0', 24)}},
+                         self.dirty.pop())
+
+    @mock.patch.object(pyroute2, 'IPRoute')
+    def test_start_stop(self, mock_iproute):
+        ipr = mock_iproute.return_value
+
+        with mock.patch('threading.Thread') as mock_thread:
+            self.monitor.start()
+        ipr.bind.assert_called_once_with(groups=netlink_monitor._GROUPS)
+        mock_thread.return_value.start.assert_called_once_with()
+
+        self.monitor.stop()
+        ipr.close.assert_called_once_with()
+        # The loop ends once the socket is closed
+        self.monitor._run(ipr)
+        ipr.get.assert_not_called()
+
+    def test_run(self):
+        ipr = mock.Mock()
+        self.monitor._ipr = ipr
+
+        def _get():
+            if ipr.get.call_count == 3:
+                self.monitor._ipr = None
+                raise Exception('closed')
+            if ipr.get.call_count == 2:
+                raise Exception('No buffer space available')
+            # A failure handling a notification does not stop the others
+            return [mock.Mock(get=mock.Mock(side_effect=Exception('boom'))),
+                    self._get_route_msg()]
+
+        ipr.get.side_effect = _get
+        self.dirty.full_sync_started()
+
+        self.monitor._run(ipr)
+
+        self.assertEqual(3, ipr.get.call_count)
+        self.assertEqual({constants.DIRTY_ROUTE: {(200, '10.0.0.1', 32)}},
+                         self.dirty.pop())
+        # The notifications missed may hide some drift
+        self.assertTrue(self.dirty.full_sync_due())
@@ -0,0 +1,108 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import prefix_trie
+
+
+class TestPrefixTrie(test_base.TestCase):
+
+    def setUp(self):
+        super(TestPrefixTrie, self).setUp()
+        self.trie = prefix_trie.PrefixTrie()
+
+    def test_add(self):
+        self.assertTrue(self.trie.add('10.0.0.0/24', 'route-1'))
+        self.assertTrue(self.trie.add('10.0.0.0/24', 'route-2'))
+        self.assertFalse(self.trie.add('10.0.0.0/24', 'route-1'))
+        self.assertTrue(self.trie.add('fd00::/64', 'route-3'))
+
+        self.assertEqual(3, len(self.trie))
+        self.assertEqual({'route-1', 'route-2'}, self.trie.get('10.0.0.0/24'))
+        self.assertEqual({'route-3'}, self.trie.get('fd00::/64'))
+
+    def test_add_host_bits(self):
+        self.trie.add('10.0.0.1/24')
+
+        self.assertIn('10.0.0.0/24', self.trie)
+        self.assertNotIn('10.0.0.1', self.trie)
+
+    def test_get_missing(self):
+        self.trie.add('10.0.0.0/24')
+
+        self.assertEqual(set(), self.trie.get('10.0.0.0/16'))
+        self.assertEqual(set(), self.trie.get('10.0.0.0/25'))
+        self.assertEqual(set(), self.trie.get('::/0'))
+
+    def test_remove(self):
+        self.trie.add('10.0.0.0/24', 'route-1')
+        self.trie.add('10.0.0.0/24', 'route-2')
+        self.trie.add('10.0.0.5', 'route-3')
+
+        self.assertTrue(self.trie.remove('10.0.0.0/24', 'route-1'))
+        self.assertFalse(self.trie.remove('10.0.0.0/24', 'route-1'))
+        self.assertFalse(self.trie.remove('10.0.1.0/24', 'route-2'))
+        self.assertEqual({'route-2'}, self.trie.get('10.0.0.0/24'))
+
+        self.assertTrue(self.trie.remove('10.0.0.0/24', 'route-2'))
+        self.assertNotIn('10.0.0.0/24', self.trie)
+        self.assertTrue(self.trie.has_within('10.0.0.0/24'))
+
+        self.assertTrue(self.trie.remove('10.0.0.5', 'route-3'))
+        self.assertEqual(0, len(self.trie))
+        self.assertFalse(self.trie.has_within('0.0.0.0/0'))
+
+    def test_remove_prunes_nodes(self):
+        self.trie.add('10.0.0.5')
+        self.trie.remove('10.0.0.5')
+
+        root = self.trie._roots[4]
+        self.assertEqual([None, None], root.children)
+        self.assertEqual(0, root.count)
+
+    def test_longest_match(self):
+        self.trie.add('10.0.0.0/8', 'route-1')
+        self.trie.add('10.0.0.0/24', 'route-2')
+        self.trie.add('fd00::/64', 'route-3')
+
+        self.assertEqual(('10.0.0.0/24', {'route-2'}),
+                         self.trie.longest_match('10.0.0.5'))
+        self.assertEqual(('10.0.0.0/8', {'route-1'}),
+                         self.trie.longest_match('10.1.0.5'))
+        self.assertEqual(('10.0.0.0/8', {'route-1'}),
+                         self.trie.longest_match('10.0.0.0/16'))
+        self.assertEqual(('fd00::/64', {'route-3'}),
+                         self.trie.longest_match('fd00::1'))
+        self.assertIsNone(self.trie.longest_match('11.0.0.1'))
+        self.assertIsNone(self.trie.longest_match('fd01::1'))
+
+    def test_longest_match_default(self):
+        self.trie.add('0.0.0.0/0', 'default')
+
+        self.assertEqual(('0.0.0.0/0', {'default'}),
+                         self.trie.longest_match('192.168.0.1'))
+        self.assertIsNone(self.trie.longest_match('fd00::1'))
+
+    def test_has_within(self):
+        self.trie.add('10.0.0.5', 'route-1')
+        self.trie.add('fd00::5', 'route-2')
+
+        self.assertTrue(self.trie.has_within('10.0.0.0/26'))
+        self.assertTrue(self.trie.has_within('10.0.0.5/32'))
+        self.assertFalse(self.trie.has_within('10.0.0.64/26'))
+        self.assertTrue(self.trie.has_within('fd00::/64'))
+        self.assertFalse(self.trie.has_within('fd01::/64'))
+
+    def test_invalid_prefix(self):
+        self.assertRaises(ValueError, self.trie.add, 'fake-prefix')
@@ -0,0 +1,143 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from oslo_concurrency import lockutils
+
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import reconciler
+
+
+class TestChunkedReconciler(test_base.TestCase):
+
+    def setUp(self):
+        super(TestChunkedReconciler, self).setUp()
+        self.reconciler = reconciler.ChunkedReconciler('fake-lock')
+        self.mock_lock = mock.patch.object(lockutils, 'lock').start()
+        self.lock_ctx = self.mock_lock.return_value
+        self.lock_ctx.__exit__.return_value = False
+        self.mock_sleep = mock.patch('time.sleep').start()
+        self.done = []
+
+    def _pass(self):
+        for unit in range(5):
+            self.done.append(unit)
+            yield unit
+
+    def test_run(self):
+        def _pass():
+            yield from self._pass()
+            return 'fake-result'
+
+        self.assertEqual('fake-result', self.reconciler.run(_pass))
+
+        self.assertEqual([0, 1, 2, 3, 4], self.done)
+        self.mock_lock.assert_called_once_with('fake-lock')
+        self.mock_sleep.assert_not_called()
+
+    @mock.patch('time.monotonic')
+    def test_run_chunks(self, mock_monotonic):
+        self.reconciler.chunk_time = 10
+        # Each unit takes 4 seconds, so 3 units run per chunk
+        mock_monotonic.side_effect = range(0, 100, 4)
+
+        def _pass():
+            for unit in self._pass():
+                # The lock is held while running the units
+                self.assertEqual(self.lock_ctx.__exit__.call_count + 1,
+                                 self.lock_ctx.__enter__.call_count)
+                yield unit
+
+        self.reconciler.run(_pass)
+
+        self.assertEqual([0, 1, 2, 3, 4], self.done)
+        self.assertEqual(2, self.mock_lock.call_count)
+        self.assertEqual(2, self.lock_ctx.__exit__.call_count)
+        self.mock_sleep.assert_called_once()
+
+    def test_run_exception(self):
+        closed = []
+
+        def _pass():
+            try:
+                for unit in self._pass():
+                    if unit == 2:
+                        raise ValueError('boom')
+                    yield unit
+            finally:
+                closed.append(True)
+
+        self.assertRaises(ValueError, self.reconciler.run, _pass)
+        self.assertEqual([0, 1, 2], self.done)
+        self.assertEqual([True], closed)
+        # The next pass starts from the beginning
+        self.done = []
+        self.reconciler.run(self._pass)
+        self.assertEqual([0, 1, 2, 3, 4], self.done)
+
+    @mock.patch('time.monotonic')
+    def test_run_staged(self, mock_monotonic):
+        self.reconciler.chunk_time = 10
+        # Each unit takes 4 seconds, so 3 units run per chunk
+        mock_monotonic.side_effect = range(0, 100, 4)
+        owner = mock.Mock(state=['old'])
+        staged = reconciler.StagedState(owner, state=[])
+        seen = []
+
+        def _pass():
+            for unit in self._pass():
+                owner.state.append(unit)
+                yield unit
+
+        # The previous state is kept in between the chunks
+        self.mock_sleep.side_effect = lambda _: seen.append(
+            list(owner.state))
+
+        self.reconciler.run(_pass, staged)
+
+        self.assertEqual([['old']], seen)
+        self.assertEqual([0, 1, 2, 3, 4], owner.state)
+
+    def test_run_staged_exception(self):
+        owner = mock.Mock(state=['old'])
+        staged = reconciler.StagedState(owner, state=[])
+
+        def _pass():
+            owner.state.append('new')
+            raise ValueError('boom')
+            yield
+
+        self.assertRaises(ValueError, self.reconciler.run, _pass, staged)
+        self.assertEqual(['old'], owner.state)
+
+    @mock.patch('time.monotonic')
+    def test_run_measure(self, mock_monotonic):
+        self.reconciler.chunk_time = 10
+        # Each unit takes 4 seconds, so 3 units run per chunk
+        mock_monotonic.side_effect = range(0, 100, 4)
+        exposed = {'10.0.0.1'}
+
+        def _pass():
+            for unit in self._pass():
+                exposed.add('10.0.1.{}'.format(unit))
+                yield unit
+            exposed.discard('10.0.0.1')
+            return 1
+
+        # An event exposing an IP in between the chunks is not counted
+        self.mock_sleep.side_effect = lambda _: exposed.add('10.0.2.1')
+
+        self.assertEqual(
+            7, self.reconciler.run(_pass, measure=lambda: exposed))
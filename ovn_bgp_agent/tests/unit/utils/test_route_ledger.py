@@ -0,0 +1,191 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+
+from ovn_bgp_agent import constants
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import route_ledger
+
+
+class TestRoute(test_base.TestCase):
+
+    def test_to_dict(self):
+        route = route_ledger.Route(
+            dev='br-ex', vlan=None, table=7, dst='10.0.0.0', dst_len=24,
+            oif=5, gateway=None, family=constants.AF_INET)
+        self.assertEqual({'dst': '10.0.0.0', 'dst_len': 24, 'oif': 5,
+                          'table': 7, 'proto': 'fake-proto', 'scope': 253},
+                         route.to_dict('fake-proto'))
+
+    def test_to_dict_gateway(self):
+        route = route_ledger.Route(
+            dev='br-ex', vlan=10, table=7, dst='10.0.0.0', dst_len=24,
+            oif=5, gateway='1.1.1.1', family=constants.AF_INET)
+        self.assertEqual({'dst': '10.0.0.0', 'dst_len': 24, 'oif': 5,
+                          'table': 7, 'proto': 'fake-proto', 'scope': 0,
+                          'gateway': '1.1.1.1'},
+                         route.to_dict('fake-proto'))
+
+    def test_to_dict_ipv6(self):
+        route = route_ledger.Route(
+            dev='br-ex', vlan=None, table=7, dst='fd00::', dst_len=64,
+            oif=5, gateway=None, family=constants.AF_INET6)
+        self.assertEqual({'dst': 'fd00::', 'dst_len': 64, 'oif': 5,
+                          'table': 7, 'proto': 'fake-proto',
+                          'family': constants.AF_INET6},
+                         route.to_dict('fake-proto'))
+
+    def test_immutable(self):
+        route = route_ledger.Route(
+            dev='br-ex', vlan=None, table=7, dst='10.0.0.0', dst_len=24,
+            oif=5, gateway=None, family=constants.AF_INET)
+        self.assertRaises(dataclasses.FrozenInstanceError, setattr, route,
+                          'dst', '10.0.1.0')
+        self.assertFalse(hasattr(route, '__dict__'))
+
+
+class TestRouteLedger(test_base.TestCase):
+
+    def setUp(self):
+        super(TestRouteLedger, self).setUp()
+        self.ledger = route_ledger.RouteLedger()
+        self.route = self._get_route('br-ex', 7, '10.0.0.1')
+
+    def _get_route(self, dev, table, dst, gateway=None):
+        return route_ledger.Route(
+            dev=dev, vlan=None, table=table, dst=dst, dst_len=32, oif=5,
+            gateway=gateway, family=constants.AF_INET)
+
+    def test_add(self):
+        self.assertEqual(1, self.ledger.add(self.route))
+        self.assertIn(self.route, self.ledger)
+        self.assertIn(self._get_route('br-ex', 7, '10.0.0.1'), self.ledger)
+        self.assertNotIn(self._get_route('br-ex', 8, '10.0.0.1'),
+                         self.ledger)
+        self.assertEqual(1, len(self.ledger))
+
+    def test_add_duplicated(self):
+        self.ledger.add(self.route)
+        self.assertEqual(1, self.ledger.add(self.route))
+        self.assertEqual(1, len(self.ledger))
+        self.assertEqual(1, self.ledger.get_references(self.route))
+
+    def test_add_shared(self):
+        self.assertEqual(1, self.ledger.add(self.route, owner='a'))
+        self.assertEqual(2, self.ledger.add(self.route, owner='b'))
+        self.assertEqual(1, len(self.ledger))
+
+        self.assertEqual(1, self.ledger.remove(self.route, owner='a'))
+        self.assertIn(self.route, self.ledger)
+        self.assertEqual(0, self.ledger.remove(self.route, owner='b'))
+        self.assertNotIn(self.route, self.ledger)
+
+    def test_remove(self):
+        self.ledger.add(self.route)
+        self.assertEqual(0, self.ledger.remove(self.route))
+        self.assertEqual(0, len(self.ledger))
+        self.assertEqual([], self.ledger.get_devices())
+        self.assertEqual([], self.ledger.get_table_routes(7))
+
+    def test_remove_unknown(self):
+        self.assertEqual(0, self.ledger.remove(self.route))
+        self.ledger.add(self.route, owner='a')
+        self.assertEqual(1, self.ledger.remove(self.route, owner='b'))
+
+    def test_indexes(self):
+        route1 = self._get_route('br-ex', 8, '10.0.0.2')
+        route2 = self._get_route('br-vlan', 7, '10.0.0.3')
+        for route in (self.route, route1, route2):
+            self.ledger.add(route)
+
+        self.assertCountEqual(['br-ex', 'br-vlan'], self.ledger.get_devices())
+        self.assertCountEqual([self.route, route1],
+                              self.ledger.get_device_routes('br-ex'))
+        self.assertCountEqual([self.route, route2],
+                              self.ledger.get_table_routes(7))
+        self.assertEqual([], self.ledger.get_device_routes('br-other'))
+        self.assertCountEqual([self.route, route1, route2], list(self.ledger))
+        self.assertEqual(2, self.ledger.count_device_routes('br-ex'))
+        self.assertEqual(0, self.ledger.count_device_routes('br-other'))
+
+    def test_destination_index(self):
+        route1 = self._get_route('br-ex', 8, '10.0.0.1', gateway='1.1.1.1')
+        route2 = self._get_route('br-vlan', 7, '10.0.0.1')
+        for route in (self.route, route1, route2):
+            self.ledger.add(route)
+
+        self.assertCountEqual(
+            [self.route, route1],
+            self.ledger.get_device_routes('br-ex', dst='10.0.0.1'))
+        self.assertEqual(
+            [], self.ledger.get_device_routes('br-ex', dst='10.0.0.2'))
+
+        self.ledger.remove(route1)
+        self.assertEqual(
+            [self.route],
+            self.ledger.get_device_routes('br-ex', dst='10.0.0.1'))
+        self.ledger.remove_device('br-ex')
+        self.assertEqual(
+            [], self.ledger.get_device_routes('br-ex', dst='10.0.0.1'))
+        self.assertEqual({('br-vlan', '10.0.0.1'): {route2}},
+                         self.ledger._destinations)
+
+    def test_get_owners(self):
+        route1 = self._get_route('br-ex', 7, '10.0.0.1', gateway='1.1.1.1')
+        route2 = self._get_route('br-vlan', 8, '10.0.0.1')
+        self.ledger.add(self.route, owner='a')
+        self.ledger.add(route1, owner='b')
+        self.ledger.add(route2, owner='c')
+
+        self.assertEqual({'a', 'b'}, self.ledger.get_owners(7, '10.0.0.1', 32))
+        self.assertEqual(set(), self.ledger.get_owners(7, '10.0.0.1', 24))
+
+        self.ledger.remove(route1, owner='b')
+        self.assertEqual({'a'}, self.ledger.get_owners(7, '10.0.0.1', 32))
+        self.ledger.remove_device('br-ex')
+        self.assertEqual(set(), self.ledger.get_owners(7, '10.0.0.1', 32))
+        self.assertEqual({(8, '10.0.0.1', 32): {route2}},
+                         self.ledger._prefixes)
+
+    def test_replace(self):
+        route = self._get_route('br-ex', 7, '10.0.0.1', gateway='1.1.1.1')
+        new_route = dataclasses.replace(route, gateway='2.2.2.2')
+        self.ledger.add(route, owner='a')
+        self.ledger.add(route, owner='b')
+
+        self.ledger.replace(route, new_route)
+
+        self.assertNotIn(route, self.ledger)
+        self.assertEqual(2, self.ledger.get_references(new_route))
+        self.assertEqual([new_route], self.ledger.get_table_routes(7))
+        self.assertEqual(
+            [new_route],
+            self.ledger.get_device_routes('br-ex', dst='10.0.0.1'))
+
+    def test_replace_unknown(self):
+        route = self._get_route('br-ex', 7, '10.0.0.1', gateway='1.1.1.1')
+        self.ledger.replace(route, dataclasses.replace(route,
+                                                       gateway='2.2.2.2'))
+        self.assertEqual(0, len(self.ledger))
+
+    def test_remove_device(self):
+        route1 = self._get_route('br-vlan', 7, '10.0.0.3')
+        self.ledger.add(self.route)
+        self.ledger.add(route1)
+
+        self.ledger.remove_device('br-ex')
+
+        self.assertEqual([route1], list(self.ledger))
+        self.assertEqual([route1], self.ledger.get_table_routes(7))
@@ -0,0 +1,92 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from ovn_bgp_agent import constants
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import warm_restart
+
+
+class TestWarmRestart(test_base.TestCase):
+
+    def setUp(self):
+        super(TestWarmRestart, self).setUp()
+        self.warm_restart = warm_restart.WarmRestart(hold_time=60)
+        self.mock_sleep = mock.patch('time.sleep').start()
+        self.mock_monotonic = mock.patch('time.monotonic').start()
+        self.mock_monotonic.return_value = 100
+        self.idl = mock.Mock(change_seqno=1)
+
+    def test_wait_not_started(self):
+        self.assertFalse(self.warm_restart.pending)
+        self.assertTrue(self.warm_restart.wait())
+        self.mock_sleep.assert_not_called()
+
+    def test_wait_converged(self):
+        # The initial dump arrives on the second check, and a change on the
+        # third one
+        self.idl.has_ever_connected.side_effect = (False, True, True, True,
+                                                   True)
+        seqnos = iter((2, 3, 3))
+
+        def _sleep(seconds):
+            self.idl.change_seqno = next(seqnos)
+
+        self.mock_sleep.side_effect = _sleep
+        self.warm_restart.start([self.idl])
+        self.assertTrue(self.warm_restart.pending)
+
+        self.assertTrue(self.warm_restart.wait())
+
+        self.assertEqual(3, self.mock_sleep.call_count)
+        self.mock_sleep.assert_called_with(
+            constants.WARM_RESTART_SETTLE_TIME)
+        self.assertFalse(self.warm_restart.pending)
+        # Only the first re-sync waits
+        self.mock_sleep.reset_mock()
+        self.assertTrue(self.warm_restart.wait())
+        self.mock_sleep.assert_not_called()
+
+    def test_wait_hold_time_expired(self):
+        self.idl.has_ever_connected.return_value = False
+        self.mock_monotonic.side_effect = (100, 130, 159, 160)
+        self.warm_restart.start([self.idl])
+
+        self.assertFalse(self.warm_restart.wait())
+
+        self.assertEqual(2, self.mock_sleep.call_count)
+        self.assertFalse(self.warm_restart.pending)
+
+    def test_wait_no_hold_time(self):
+        self.warm_restart.hold_time = 0
+        self.idl.has_ever_connected.return_value = True
+        self.warm_restart.start([self.idl])
+
+        self.assertFalse(self.warm_restart.wait())
+        self.mock_sleep.assert_not_called()
+
+    def test_wait_lock_released(self):
+        self.idl.has_ever_connected.return_value = True
+
+        def _sleep(seconds):
+            # The lock is not held while waiting for the IDLs
+            self.assertFalse(self.warm_restart._lock.locked())
+
+        self.mock_sleep.side_effect = _sleep
+        self.warm_restart.start([self.idl])
+
+        self.assertTrue(self.warm_restart.wait())
+        self.mock_sleep.assert_called_once_with(
+            constants.WARM_RESTART_SETTLE_TIME)
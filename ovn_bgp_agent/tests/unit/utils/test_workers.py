@@ -0,0 +1,63 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from unittest import mock
+
+from ovn_bgp_agent.tests import base as test_base
+from ovn_bgp_agent.utils import workers
+
+
+class TestRunInParallel(test_base.TestCase):
+
+    def test_run_in_parallel(self):
+        # Both units need to run at the same time to finish
+        barrier = threading.Barrier(2, timeout=5)
+
+        def func(unit):
+            barrier.wait()
+            return unit * 2
+
+        self.assertEqual([2, 4], workers.run_in_parallel(func, [1, 2], 2))
+
+    @mock.patch('concurrent.futures.ThreadPoolExecutor')
+    def test_run_in_parallel_single_worker(self, mock_executor):
+        func = mock.Mock(side_effect=lambda unit: unit * 2)
+
+        self.assertEqual([2, 4, 6],
+                         workers.run_in_parallel(func, (1, 2, 3), 1))
+        func.assert_has_calls([mock.call(1), mock.call(2), mock.call(3)])
+        mock_executor.assert_not_called()
+
+    @mock.patch('concurrent.futures.ThreadPoolExecutor')
+    def test_run_in_parallel_single_unit(self, mock_executor):
+        self.assertEqual([2], workers.run_in_parallel(
+            lambda unit: unit * 2, [1], 4))
+        mock_executor.assert_not_called()
+
+    def test_run_in_parallel_no_units(self):
+        self.assertEqual([], workers.run_in_parallel(mock.Mock(), [], 4))
+
+    def test_run_in_parallel_exception(self):
+        done = []
+
+        def func(unit):
+            if unit == 1:
+                raise ValueError('boom')
+            done.append(unit)
+
+        self.assertRaises(ValueError, workers.run_in_parallel, func,
+                          [1, 2, 3], 2)
+        # The other units are run anyway
+        self.assertEqual([2, 3], sorted(done))
@@ -0,0 +1,63 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class AdaptiveInterval(object):
+    """Time between the runs of a periodic task, adapted to the drift found
+
+    After each run finding nothing to repair, the interval is multiplied by
+    backoff, up to max_interval. After a run repairing something, or after
+    a reset (e.g., on reconnections), it goes back to the base interval.
+    Each returned time is randomly lengthened or shortened by up to a
+    jitter fraction of it, so that the runs of different agents spread.
+    """
+
+    def __init__(self, interval, max_interval=0, jitter=0, backoff=2):
+        self.base_interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.jitter = jitter
+        self.backoff = backoff
+        self.interval = interval
+
+    def initial_delay(self):
+        """Get a random delay for the first run, up to a jitter fraction"""
+        return random.uniform(0, self.base_interval * self.jitter)
+
+    def reset(self):
+        self.interval = self.base_interval
+
+    def next(self, repairs=None):
+        """Get the time until the next run
+
+        :param repairs: (int) number of repairs done by the last run, None
+                        if unknown, which keeps the interval unchanged
+        :return: (float) seconds until the next run
+        """
+        if repairs:
+            if self.interval != self.base_interval:
+                LOG.info("Found %d item(s) to repair, going back to an "
+                         "interval of %s seconds", repairs,
+                         self.base_interval)
+            self.reset()
+        elif repairs is not None:
+            self.interval = min(self.interval * self.backoff,
+                                self.max_interval)
+        return self.interval * random.uniform(1 - self.jitter,
+                                              1 + self.jitter)
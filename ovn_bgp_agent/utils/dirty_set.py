@@ -0,0 +1,143 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import threading
+import time
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class DirtySet(object):
+    """Objects to reprocess on the next incremental reconciliation
+
+    The objects are marked dirty by kind (e.g., constants.DIRTY_PORT) and
+    key (e.g., the port name) when the kernel or OVS monitors find they
+    drifted, e.g., a route removed outside the agent. The incremental
+    reconciliation only reprocesses those, while a full sync, which clears
+    them all, is run at least every full_sync_interval seconds. The drift
+    no monitor reports (e.g., a flow removed) is only repaired by the
+    latter.
+
+    The events apply their changes right away, so the objects they change
+    are only recorded while a full sync rebuilds the state aside: it must
+    reprocess them, and replay the withdrawals, on the new state.
+    """
+
+    def __init__(self, full_sync_interval=0):
+        self.full_sync_interval = full_sync_interval
+        self._lock = threading.Lock()
+        self._dirty = collections.defaultdict(set)
+        self._withdrawn = []
+        self._last_full_sync = None
+        self._full_sync_running = False
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(keys) for keys in self._dirty.values())
+
+    def mark(self, kind, key):
+        if not key:
+            return
+        with self._lock:
+            self._dirty[kind].add(key)
+
+    def mark_changed(self, kind, key):
+        """Mark an object dirty as an event changed it
+
+        It is only recorded while a full sync is running, as the event
+        already applied the change to the current state.
+        """
+        if not key:
+            return
+        with self._lock:
+            if self._full_sync_running:
+                self._dirty[kind].add(key)
+
+    def mark_withdrawn(self, kind, key, withdraw_fn):
+        """Mark an object dirty as an event withdraws it
+
+        As for mark_changed, it is only recorded while a full sync is
+        running.
+
+        :param withdraw_fn: callable withdrawing the object again, from the
+                            current state
+        """
+        with self._lock:
+            if not self._full_sync_running:
+                return
+            if key:
+                self._dirty[kind].add(key)
+            self._withdrawn.append(withdraw_fn)
+
+    def pop(self):
+        """Return the dirty objects per kind, and forget about them"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, collections.defaultdict(set)
+        return dict(dirty)
+
+    def pop_withdrawn(self):
+        """Return the recorded withdrawals, in order, and forget about them"""
+        with self._lock:
+            withdrawn, self._withdrawn = self._withdrawn, []
+        return withdrawn
+
+    def replay(self, withdrawn):
+        """Replay the popped withdrawals, logging the failed ones"""
+        for withdraw_fn in withdrawn:
+            try:
+                withdraw_fn()
+            except Exception as e:
+                LOG.exception("Unexpected exception while replaying a "
+                              "withdrawal: %s", e)
+
+    def process(self, dirty, kind, process_fn):
+        """Reprocess the popped dirty objects of a kind
+
+        The objects that fail are marked dirty again, so that they are
+        retried on the next reconciliation.
+        """
+        for key in dirty.get(kind, ()):
+            try:
+                process_fn(key)
+            except Exception as e:
+                LOG.exception("Unexpected exception while reconciling %s %s: "
+                              "%s", kind, key, e)
+                self.mark(kind, key)
+
+    def full_sync_due(self):
+        if self.full_sync_interval <= 0 or self._last_full_sync is None:
+            return True
+        return (time.monotonic() - self._last_full_sync >=
+                self.full_sync_interval)
+
+    def request_full_sync(self):
+        """Run a full sync on the next reconciliation, e.g., on missed drift"""
+        with self._lock:
+            self._last_full_sync = None
+
+    def full_sync_started(self):
+        """Record a full sync, which reprocesses all the dirty objects"""
+        with self._lock:
+            self._dirty.clear()
+            self._withdrawn = []
+            self._last_full_sync = time.monotonic()
+            self._full_sync_running = True
+
+    def full_sync_finished(self):
+        """Record the end of a full sync, completed or not"""
+        with self._lock:
+            self._full_sync_running = False
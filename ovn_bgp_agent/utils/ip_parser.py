@@ -0,0 +1,111 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import functools
+import ipaddress
+import socket
+
+from neutron_lib._i18n import _
+
+from ovn_bgp_agent import constants
+
+# The same IPs are parsed over and over while (re)syncing, so the parsed
+# ones are cached. 16k entries keep the cache in a few MBs.
+CACHE_SIZE = 16384
+
+ParsedIP = collections.namedtuple(
+    'ParsedIP', ['version', 'address', 'packed', 'prefixlen', 'network',
+                 'is_gua'])
+ParsedIP.__doc__ = """An IP address, or an IP with a prefix, already parsed
+
+version: 4 or 6
+address: the (compressed) IP address, without the prefix
+packed: the IP address in network byte order
+prefixlen: the prefix length, 32 or 128 if there was no prefix
+network: the (compressed) network address for the prefix
+is_gua: whether the IP is an IPv6 global unicast address
+"""
+
+
+def _to_address(family, address_class, address):
+    # inet_pton validates the common addresses much faster than ipaddress,
+    # which still parses the rest, e.g., the IPv6 addresses with a scope
+    try:
+        return address_class(socket.inet_pton(family, address))
+    except OSError:
+        return address_class(address)
+
+
+def _to_str(address):
+    # inet_ntop is much faster than ipaddress compressing the IPv6 addresses,
+    # but formats differently the ones with embedded IPv4 addresses and
+    # drops the scope
+    if address.version == constants.IP_VERSION_4:
+        return socket.inet_ntop(socket.AF_INET, address.packed)
+    text = socket.inet_ntop(socket.AF_INET6, address.packed)
+    if '.' in text or getattr(address, 'scope_id', None):
+        return address.compressed
+    return text
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse_ip(ip):
+    # Building the addresses and doing the prefix math over the integers is
+    # several times faster than building ipaddress (or netaddr) networks
+    address, sep, prefix = ip.partition('/')
+    if ':' in address:
+        address = _to_address(socket.AF_INET6, ipaddress.IPv6Address, address)
+    else:
+        address = _to_address(socket.AF_INET, ipaddress.IPv4Address, address)
+    if not prefix:
+        prefixlen = address.max_prefixlen
+    elif prefix.isdigit():
+        prefixlen = int(prefix)
+        if prefixlen > address.max_prefixlen:
+            raise ValueError(_('Invalid prefix length in %s') % ip)
+    else:
+        # netmask or hostmask
+        prefixlen = ipaddress.ip_interface(ip).network.prefixlen
+    host_bits = address.max_prefixlen - prefixlen
+    value = int(address)
+    network = value >> host_bits << host_bits
+    address_str = _to_str(address)
+    if network != value:
+        network_str = _to_str(address.__class__(network))
+    else:
+        network_str = address_str
+    version = address.version
+    return ParsedIP(
+        version=version,
+        address=address_str,
+        packed=address.packed,
+        prefixlen=prefixlen,
+        network=network_str,
+        is_gua=version == constants.IP_VERSION_6 and address.is_global)
+
+
+def parse_ip(ip):
+    """Parse an IP address, optionally with a prefix (e.g., 10.0.0.1/24)
+
+    The prefix can also be given as a netmask (e.g., 10.0.0.1/255.255.255.0).
+
+    :return: (ParsedIP) the parsed IP
+    :raises ValueError: if the IP is not valid
+    """
+    return _parse_ip(str(ip))
+
+
+def cache_clear():
+    _parse_ip.cache_clear()
@@ -12,12 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+import dataclasses
 import ipaddress
-import random
+import os
 import re
+import struct
 import sys
+import threading
+import zlib
 
-import netaddr
+from oslo_config import cfg
 from oslo_log import log as logging
 import pyroute2
 from pyroute2.netlink import exceptions as netlink_exceptions
@@ -25,18 +30,62 @@ import tenacity
 
 from ovn_bgp_agent import constants
 from ovn_bgp_agent import exceptions as agent_exc
+from ovn_bgp_agent.privileged import batch as priv_batch
 import ovn_bgp_agent.privileged.linux_net
 from ovn_bgp_agent.utils import common as common_utils
+from ovn_bgp_agent.utils import ip_parser
+from ovn_bgp_agent.utils import route_ledger
 
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 RE_TABLE_ROW = re.compile(r"^(?P<table>[0-9]+)\s+(?P<bridge>\S+)")
 
+# Routing tables names parsed from rt_tables and rt_tables.d, keyed by
+# file path, with the file mtime and the (name, number) rows found on it
+_routing_tables_files = {}
+
+# Kernel nexthop objects in use, keyed by (gateway owner, device, ip
+# version), with their gateway and the routes (table, dst, dst_len) pointing
+# to them, and the nexthop key of each of those routes. Shared by the
+# parallel sync workers, so they are only accessed holding _nexthops_lock
+_nexthops = {}
+_nexthop_routes = {}
+_nexthops_loaded = False
+_nexthops_lock = threading.Lock()
+
+# Routing tables whose routes from previous versions were already re-tagged
+_routes_protocol_migrated = set()
+
+
+def _dump_routes(ipr, **filters):
+    """Dump the routes matching the filters
+
+    pyroute2 get_routes() requests the whole routing table and matches the
+    filters in userspace. With an explicit (empty) dump_filter the family,
+    table, protocol, type and oif filters are encoded in the request
+    instead, so a socket with strict checking enabled gets only the
+    matching routes from the kernel.
+
+    :param ipr: pyroute2.IPRoute opened with strict_check=True
+    """
+    return ipr.route('dump', dump_filter={}, **filters)
+
+
+def _dump_addresses(ipr, index, **filters):
+    """Dump the addresses of a device, filtered by the kernel
+
+    Strict address dumps only filter by device (and family), any other
+    filter, e.g., prefixlen, must be applied by the caller.
+
+    :param ipr: pyroute2.IPRoute opened with strict_check=True
+    """
+    return ipr.addr('dump', index=index, dump_filter={}, **filters)
+
 
 def get_ip_version(ip):
-    # IP network can consume both an IP address and a network with cidr
-    # notation
-    return netaddr.IPNetwork(ip).version
+    # It can consume both an IP address and a network with cidr notation
+    return ip_parser.parse_ip(ip).version
 
 
 @tenacity.retry(
@@ -88,9 +137,9 @@ def get_interface_address(nic):
     reraise=True)
 def get_nic_info(nic):
     try:
-        with pyroute2.IPRoute() as ipr:
+        with pyroute2.IPRoute(strict_check=True) as ipr:
             idx = ipr.link_lookup(ifname=nic)[0]
-            nic_addr = ipr.get_addr(index=idx)[0]
+            nic_addr = list(_dump_addresses(ipr, idx))[0]
             ip = '{}/{}'.format(
                 nic_addr.get_attr('IFA_ADDRESS'),
                 nic_addr.get('prefixlen'))
@@ -215,46 +264,132 @@ def disable_learning_vxlan_intf(intf):
     )
 
 
-def ensure_routing_table_for_bridge(ovn_routing_tables, bridge, vrf_table):
-    # check a routing table with the bridge name exists on
-    # /etc/iproute2/rt_tables
-    found_tables = {vrf_table}
+def _get_routing_tables_paths():
+    paths = [constants.ROUTING_TABLES_FILE]
+    try:
+        paths.extend(sorted(
+            os.path.join(constants.ROUTING_TABLES_DIR, f)
+            for f in os.listdir(constants.ROUTING_TABLES_DIR)
+            if f.endswith('.conf')))
+    except FileNotFoundError:
+        pass
+    return paths
+
+
+def _read_routing_tables_file(path):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        _routing_tables_files.pop(path, None)
+        return []
+    cached = _routing_tables_files.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
 
-    with open(constants.ROUTING_TABLES_FILE, 'r') as rt_file:
+    rows = []
+    with open(path, 'r') as rt_file:
         for line in rt_file.readlines():
             match = RE_TABLE_ROW.match(line)
             if match:
-                if match.group('bridge') == bridge:
-                    # We don't need to catch exception for TypeError because
-                    # the regular expression matches only integers
-                    ovn_routing_tables[match.group('bridge')] = int(
-                        match.group('table'))
-                    LOG.debug("Found routing table for %s with: %s",
-                              bridge, match.group('table'))
-                    break
-                else:
-                    found_tables.add(int(match.group('table')))
-        else:
-            LOG.debug("Routing table for bridge %s not configured at ", bridge)
-            try:
-                routing_table_range = set(
-                    range(constants.ROUTING_TABLE_MIN,
-                          constants.ROUTING_TABLE_MAX + 1))
-                table_number = random.choice(
-                    list(routing_table_range - found_tables))
-            except IndexError:
-                LOG.error("No more routing tables available for bridge %s "
-                          "at %s", constants.ROUTING_TABLES_FILE, bridge)
-                sys.exit(1)
-            ovn_bgp_agent.privileged.linux_net.create_routing_table_for_bridge(
-                table_number, bridge)
-            ovn_routing_tables[bridge] = int(table_number)
-            LOG.debug("Added routing table for %s with number: %s",
-                      bridge, table_number)
+                # We don't need to catch exception for TypeError because
+                # the regular expression matches only integers
+                rows.append((match.group('bridge'),
+                             int(match.group('table'))))
+    _routing_tables_files[path] = (mtime, rows)
+    return rows
+
+
+def _get_routing_tables_rows():
+    paths = _get_routing_tables_paths()
+    for path in set(_routing_tables_files) - set(paths):
+        del _routing_tables_files[path]
+    return [row for path in paths for row in _read_routing_tables_file(path)]
+
+
+def _get_agent_routing_tables_path():
+    return os.path.join(constants.ROUTING_TABLES_DIR,
+                        '{}.conf'.format(constants.ROUTES_PROTO_NAME))
+
+
+def get_routing_tables():
+    """Return the routing tables names configured on the host
+
+    Both rt_tables and the rt_tables.d/*.conf files are considered, and
+    they are only parsed again when modified.
+
+    :return: (dict) routing table name -> number
+    """
+    # the first entry wins for names defined more than once
+    return dict(reversed(_get_routing_tables_rows()))
 
+
+def _get_agent_routing_tables():
+    return dict(_read_routing_tables_file(_get_agent_routing_tables_path()))
+
+
+def _allocate_routing_table(bridge, used_tables):
+    # Start probing at a stable hash of the bridge name, so that the same
+    # bridge gets the same table on every host unless already taken
+    size = constants.ROUTING_TABLE_MAX - constants.ROUTING_TABLE_MIN + 1
+    start = zlib.crc32(bridge.encode())
+    for offset in range(size):
+        table = constants.ROUTING_TABLE_MIN + (start + offset) % size
+        if table not in used_tables:
+            return table
+
+
+def ensure_routing_table_for_bridge(ovn_routing_tables, bridge, vrf_table):
+    # check a routing table with the bridge name exists on
+    # /etc/iproute2/rt_tables or /etc/iproute2/rt_tables.d
+    rows = _get_routing_tables_rows()
+    table_number = dict(reversed(rows)).get(bridge)
+
+    if table_number is not None:
+        LOG.debug("Found routing table for %s with: %s", bridge,
+                  table_number)
+    else:
+        LOG.debug("Routing table for bridge %s not configured", bridge)
+        used_tables = {table for _, table in rows}
+        used_tables.add(vrf_table)
+        table_number = _allocate_routing_table(bridge, used_tables)
+        if table_number is None:
+            LOG.error("No more routing tables available for bridge %s "
+                      "at %s", bridge, constants.ROUTING_TABLES_FILE)
+            sys.exit(1)
+        agent_tables = _get_agent_routing_tables()
+        agent_tables[bridge] = table_number
+        ovn_bgp_agent.privileged.linux_net.set_routing_tables(
+            agent_tables, constants.ROUTES_PROTO_NAME)
+        LOG.debug("Added routing table for %s with number: %s",
+                  bridge, table_number)
+    ovn_routing_tables[bridge] = table_number
+
+    migrate_routes_protocol(table_number, bridge)
     return _ensure_routing_table_routes(ovn_routing_tables, bridge)
 
 
+def delete_stale_routing_tables(ovn_routing_tables):
+    """Release the routing tables allocated for bridges no longer in use
+
+    Only the tables allocated by the agent (at rt_tables.d) are released,
+    after removing the agent routes from them.
+
+    :param ovn_routing_tables: (dict) bridge -> routing table in use
+    """
+    agent_tables = _get_agent_routing_tables()
+    stale_tables = {bridge: table for bridge, table in agent_tables.items()
+                    if bridge not in ovn_routing_tables}
+    if not stale_tables:
+        return
+    for bridge, table in stale_tables.items():
+        LOG.info("Releasing routing table %s of bridge %s, no longer in "
+                 "the bridge mappings", table, bridge)
+        delete_routes_from_table(table)
+        del agent_tables[bridge]
+    ovn_bgp_agent.privileged.linux_net.set_routing_tables(
+        agent_tables, constants.ROUTES_PROTO_NAME)
+
+
 @tenacity.retry(
     retry=tenacity.retry_if_exception_type(
         netlink_exceptions.NetlinkDumpInterrupted),
@@ -263,85 +398,52 @@ def ensure_routing_table_for_bridge(ovn_routing_tables, bridge, vrf_table):
     reraise=True)
 def _ensure_routing_table_routes(ovn_routing_tables, bridge):
     # add default route on that table if it does not exist
-    extra_routes = []
     bridge_idx = get_interface_index(bridge)
 
-    with pyroute2.IPRoute() as ip:
-        table_route_dsts = {
-            (r.get_attr('RTA_DST'), r['dst_len'])
-            for r in ip.get_routes(table=ovn_routing_tables[bridge])
-        }
-
-        if not table_route_dsts:
-            r1 = {'dst': 'default', 'oif': bridge_idx,
-                  'table': ovn_routing_tables[bridge], 'scope': 253,
-                  'proto': 3}
-            ovn_bgp_agent.privileged.linux_net.route_create(r1)
-
-            r2 = {'dst': 'default', 'oif': bridge_idx,
-                  'table': ovn_routing_tables[bridge],
-                  'family': constants.AF_INET6,
-                  'proto': 3}
-            ovn_bgp_agent.privileged.linux_net.route_create(r2)
-        else:
-            route_missing = True
-            route6_missing = True
-            for (dst, dst_len) in table_route_dsts:
-                if not dst:  # default route
-                    try:
-                        route = [
-                            r for r in ip.get_routes(
-                                table=ovn_routing_tables[bridge],
-                                family=constants.AF_INET)
-                            if not r.get_attr('RTA_DST')][0]
-                        if bridge_idx == route.get_attr('RTA_OIF'):
-                            route_missing = False
-                        else:
-                            extra_routes.append(route)
-                    except IndexError:
-                        pass  # no ipv4 default rule
-                    try:
-                        route_6 = [
-                            r for r in ip.get_routes(
-                                table=ovn_routing_tables[bridge],
-                                family=constants.AF_INET6)
-                            if not r.get_attr('RTA_DST')][0]
-                        if bridge_idx == route_6.get_attr('RTA_OIF'):
-                            route6_missing = False
-                        else:
-                            extra_routes.append(route_6)
-                    except IndexError:
-                        pass  # no ipv6 default rule
-                else:
-                    if get_ip_version(dst) == constants.IP_VERSION_6:
-                        extra_routes.append(
-                            ip.get_routes(
-                                table=ovn_routing_tables[bridge],
-                                dst=dst,
-                                dst_len=dst_len,
-                                family=constants.AF_INET6)[0])
-                    else:
-                        extra_routes.append(
-                            ip.get_routes(
-                                table=ovn_routing_tables[bridge],
-                                dst=dst,
-                                dst_len=dst_len,
-                                family=constants.AF_INET)[0])
-
-            if route_missing:
-                r = {'dst': 'default', 'oif': bridge_idx,
-                     'table': ovn_routing_tables[bridge], 'scope': 253,
-                     'proto': 3}
-                ovn_bgp_agent.privileged.linux_net.route_create(r)
-            if route6_missing:
-                r = {'dst': 'default', 'oif': bridge_idx,
-                     'table': ovn_routing_tables[bridge],
-                     'family': constants.AF_INET6,
-                     'proto': 3}
-                ovn_bgp_agent.privileged.linux_net.route_create(r)
+    with pyroute2.IPRoute(strict_check=True) as ip:
+        families, extra_routes = _get_bridge_table_routes(
+            ip, ovn_routing_tables[bridge], bridge_idx)
+
+    if constants.AF_INET not in families:
+        r = {'dst': 'default', 'oif': bridge_idx,
+             'table': ovn_routing_tables[bridge], 'scope': 253,
+             'proto': CONF.routes_protocol}
+        ovn_bgp_agent.privileged.linux_net.route_create(r)
+    if constants.AF_INET6 not in families:
+        r = {'dst': 'default', 'oif': bridge_idx,
+             'table': ovn_routing_tables[bridge],
+             'family': constants.AF_INET6,
+             'proto': CONF.routes_protocol}
+        ovn_bgp_agent.privileged.linux_net.route_create(r)
     return extra_routes
 
 
+def _get_bridge_table_routes(ip, table, bridge_idx):
+    """Classify the routes on the routing table of a provider bridge
+
+    The whole table is read with a single (kernel filtered) dump. Only the
+    first default route of each family is considered, as the kernel would
+    do.
+
+    :return: (tuple) set of families with a default route through the
+             bridge and list of the other routes on the table
+    """
+    families = set()
+    extra_routes = []
+    seen = set()
+    for route in _dump_routes(ip, table=table):
+        dst = route.get_attr('RTA_DST')
+        key = (route['family'], dst, route['dst_len'])
+        if key in seen:
+            continue
+        seen.add(key)
+        if not dst and bridge_idx == route.get_attr('RTA_OIF'):
+            families.add(route['family'])
+        else:
+            extra_routes.append(route)
+    return families, extra_routes
+
+
 @tenacity.retry(
     retry=tenacity.retry_if_exception_type(
         netlink_exceptions.NetlinkDumpInterrupted),
@@ -349,55 +451,10 @@ def _ensure_routing_table_routes(ovn_routing_tables, bridge):
     stop=tenacity.stop_after_delay(8),
     reraise=True)
 def get_extra_routing_table_for_bridge(ovn_routing_tables, bridge):
-    extra_routes = []
     bridge_idx = get_interface_index(bridge)
-    with pyroute2.IPRoute() as ip:
-        table_route_dsts = {
-            (r.get_attr('RTA_DST'), r['dst_len'])
-            for r in ip.get_routes(table=ovn_routing_tables[bridge])
-        }
-
-        if not table_route_dsts:
-            return extra_routes
-
-        for (dst, dst_len) in table_route_dsts:
-            if not dst:  # default route
-                try:
-                    route = [
-                        r for r in ip.get_routes(
-                            table=ovn_routing_tables[bridge],
-                            family=constants.AF_INET)
-                        if not r.get_attr('RTA_DST')][0]
-                    if bridge_idx != route.get_attr('RTA_OIF'):
-                        extra_routes.append(route)
-                except IndexError:
-                    pass  # no IPv4 default rule
-                try:
-                    route_6 = [
-                        r for r in ip.get_routes(
-                            table=ovn_routing_tables[bridge],
-                            family=constants.AF_INET6)
-                        if not r.get_attr('RTA_DST')][0]
-                    if bridge_idx != route_6.get_attr('RTA_OIF'):
-                        extra_routes.append(route_6)
-                except IndexError:
-                    pass  # no IPv6 default rule
-            else:
-                if get_ip_version(dst) == constants.IP_VERSION_6:
-                    extra_routes.append(
-                        ip.get_routes(
-                            table=ovn_routing_tables[bridge],
-                            dst=dst,
-                            dst_len=dst_len,
-                            family=constants.AF_INET6)[0])
-                else:
-                    extra_routes.append(
-                        ip.get_routes(
-                            table=ovn_routing_tables[bridge],
-                            dst=dst,
-                            dst_len=dst_len,
-                            family=constants.AF_INET)[0])
-    return extra_routes
+    with pyroute2.IPRoute(strict_check=True) as ip:
+        return _get_bridge_table_routes(
+            ip, ovn_routing_tables[bridge], bridge_idx)[1]
 
 
 def ensure_vlan_device_for_network(bridge, vlan_tag):
@@ -439,9 +496,8 @@ def enable_routing_for_interfaces(*interfaces):
         keys.append((f'net.ipv4.conf.{intf_key}.forwarding', 1))
         keys.append((f'net.ipv6.conf.{intf_key}.forwarding', 1))
 
-    for k, v in keys:
-        LOG.debug('Configure sysctl %s=%s', k, v)
-        ovn_bgp_agent.privileged.linux_net.set_kernel_flag(k, v)
+    LOG.debug('Configure sysctl %s', keys)
+    ovn_bgp_agent.privileged.linux_net.set_kernel_flags(keys)
 
 
 @tenacity.retry(
@@ -453,9 +509,9 @@ def enable_routing_for_interfaces(*interfaces):
 def get_exposed_ips(nic):
     nic_idx = get_interface_index(nic)
     try:
-        with pyroute2.IPRoute() as ipr:
+        with pyroute2.IPRoute(strict_check=True) as ipr:
             return [ip.get_attr('IFA_ADDRESS')
-                    for ip in ipr.get_addr(index=nic_idx)
+                    for ip in _dump_addresses(ipr, nic_idx)
                     if ip['prefixlen'] in (32, 128)]
     except pyroute2.netlink.exceptions.NetlinkError:
         # Nic does not exist
@@ -472,18 +528,12 @@ def get_exposed_ips(nic):
     reraise=True)
 def get_nic_ip(nic, prefixlen_filter=None):
     nic_idx = get_interface_index(nic)
-    with pyroute2.IPRoute() as ipr:
-        if prefixlen_filter:
-            return [
-                ip.get_attr('IFA_ADDRESS')
-                for ip in ipr.get_addr(index=nic_idx,
-                                       prefixlen=prefixlen_filter)
-            ]
-        else:
-            return [
-                ip.get_attr('IFA_ADDRESS')
-                for ip in ipr.get_addr(index=nic_idx)
-            ]
+    with pyroute2.IPRoute(strict_check=True) as ipr:
+        return [
+            ip.get_attr('IFA_ADDRESS')
+            for ip in _dump_addresses(ipr, nic_idx)
+            if not prefixlen_filter or ip['prefixlen'] == prefixlen_filter
+        ]
 
 
 def get_exposed_ips_on_network(nic, network):
@@ -491,26 +541,6 @@ def get_exposed_ips_on_network(nic, network):
     return [ip for ip in exposed_ips if ipaddress.ip_address(ip) in network]
 
 
-@tenacity.retry(
-    retry=tenacity.retry_if_exception_type(
-        netlink_exceptions.NetlinkDumpInterrupted),
-    wait=tenacity.wait_exponential(multiplier=0.02, max=1),
-    stop=tenacity.stop_after_delay(8),
-    reraise=True)
-def get_exposed_routes_on_network(table_ids, network):
-    with pyroute2.NDB() as ndb:
-        # NOTE: skip bgp routes (proto 186)
-        return [
-            r
-            for r in ndb.routes.dump()
-            if r.table in table_ids and
-            r.dst != "" and
-            r.gateway is not None and
-            r.proto != 186 and
-            ipaddress.ip_address(r.gateway) in network
-        ]
-
-
 @tenacity.retry(
     retry=tenacity.retry_if_exception_type(
         netlink_exceptions.NetlinkDumpInterrupted),
@@ -518,19 +548,32 @@ def get_exposed_routes_on_network(table_ids, network):
     stop=tenacity.stop_after_delay(8),
     reraise=True)
 def get_ovn_ip_rules(routing_tables):
+    """Get the ip rules pointing to the given routing tables
+
+    Per IP rules are keyed by their destination, e.g., '10.0.0.5/32', and
+    the aggregated rules (see create_aggregated_rule) by
+    get_aggregated_rule_key.
+    """
     ovn_ip_rules = {}
     with pyroute2.IPRoute() as ipr:
         rules_info = [
-            (rule.get_attr('FRA_TABLE'),
-             "{}/{}".format(rule.get_attr('FRA_DST'), rule['dst_len']),
-             rule['family'])
+            (rule.get_attr('FRA_TABLE'), rule.get_attr('FRA_DST'),
+             rule['dst_len'], rule['family'],
+             rule.get_attr('FRA_SUPPRESS_PREFIXLEN'))
             for rule in (
                 ipr.get_rules(family=constants.AF_INET) +
                 ipr.get_rules(family=constants.AF_INET6))
             if rule.get_attr('FRA_TABLE') in routing_tables
         ]
-        for table, dst, family in rules_info:
-            ovn_ip_rules[dst] = {'table': table, 'family': family}
+        for table, dst, dst_len, family, suppress_prefixlength in rules_info:
+            if dst is None:
+                if suppress_prefixlength == 0:
+                    rule = create_aggregated_rule(table, family)
+                    ovn_ip_rules[get_aggregated_rule_key(table,
+                                                         family)] = rule
+                continue
+            ovn_ip_rules["{}/{}".format(dst, dst_len)] = {'table': table,
+                                                          'family': family}
     return ovn_ip_rules
 
 
@@ -538,37 +581,56 @@ def delete_exposed_ips(ips, nic):
     ovn_bgp_agent.privileged.linux_net.delete_exposed_ips(ips, nic)
 
 
+def add_exposed_routes(ips, nic, table):
+    ovn_bgp_agent.privileged.linux_net.add_exposed_routes(
+        ips, nic, table, CONF.routes_protocol)
+
+
+def delete_exposed_routes(ips, nic, table):
+    ovn_bgp_agent.privileged.linux_net.delete_exposed_routes(
+        ips, nic, table, CONF.routes_protocol)
+
+
+def get_exposed_routes(nic, table):
+    return ovn_bgp_agent.privileged.linux_net.get_exposed_routes(
+        nic, table, CONF.routes_protocol)
+
+
 def delete_ip_rules(ip_rules):
     ovn_bgp_agent.privileged.linux_net.delete_ip_rules(ip_rules)
 
 
 def delete_bridge_ip_routes(routing_tables, routing_tables_routes,
                             extra_routes):
-    for device, routes_info in routing_tables_routes.items():
-        if not extra_routes.get(device):
+    for device, routes in extra_routes.items():
+        if not routes:
             continue
-        for route_info in routes_info:
-            oif = get_interface_index(device)
-            if route_info['vlan']:
-                vlan_device_name = '{}.{}'.format(device,
-                                                  route_info['vlan'])
-                oif = get_interface_index(vlan_device_name)
-            if 'gateway' in route_info['route'].keys():  # subnet route
-                possible_matchings = [
-                    r for r in extra_routes[device]
-                    if (r.get_attr('RTA_DST') == route_info['route']['dst'] and
-                        r['dst_len'] == route_info['route']['dst_len'] and
-                        r.get_attr('RTA_GATEWAY') == route_info['route'][
-                            'gateway'])]
-            else:  # cr-lrp
-                possible_matchings = [
-                    r for r in extra_routes[device]
-                    if (r.get_attr('RTA_DST') == route_info['route']['dst'] and
-                        r['dst_len'] == route_info['route']['dst_len'] and
-                        r.get_attr('RTA_OIF') == oif)]
-            for r in possible_matchings:
-                extra_routes[device].remove(r)
-
+        # Subnet routes are matched by their gateway, cr-lrp ones by the
+        # device they go through
+        oifs = {}
+        kept = set()
+        for route_info in routing_tables_routes.get_device_routes(device):
+            if route_info.gateway:
+                kept.add((route_info.dst, route_info.dst_len, 'gateway',
+                          route_info.gateway))
+                continue
+            if route_info.vlan not in oifs:
+                oif_name = device
+                if route_info.vlan:
+                    oif_name = '{}.{}'.format(device, route_info.vlan)
+                oifs[route_info.vlan] = get_interface_index(oif_name)
+            kept.add((route_info.dst, route_info.dst_len, 'oif',
+                      oifs[route_info.vlan]))
+        if not kept:
+            continue
+        extra_routes[device] = [
+            r for r in routes
+            if ((r.get_attr('RTA_DST'), r['dst_len'], 'gateway',
+                 r.get_attr('RTA_GATEWAY')) not in kept and
+                (r.get_attr('RTA_DST'), r['dst_len'], 'oif',
+                 r.get_attr('RTA_OIF')) not in kept)]
+
+    routes_to_delete = []
     for bridge, routes in extra_routes.items():
         for route in routes:
             r_info = {'dst': route.get_attr('RTA_DST'),
@@ -578,12 +640,15 @@ def delete_bridge_ip_routes(routing_tables, routing_tables_routes,
                       'table': routing_tables[bridge]}
             if route.get_attr('RTA_GATEWAY'):
                 r_info['gateway'] = route.get_attr('RTA_GATEWAY')
-            ovn_bgp_agent.privileged.linux_net.route_delete(r_info)
+            _set_route_nexthop_id(r_info, route)
+            routes_to_delete.append(r_info)
+    if routes_to_delete:
+        ovn_bgp_agent.privileged.linux_net.delete_routes(routes_to_delete)
 
 
 def delete_routes_from_table(table):
-    table_routes = _get_table_routes(table)
-    delete_ip_routes(table_routes)
+    ovn_bgp_agent.privileged.linux_net.flush_routes(table,
+                                                    CONF.routes_protocol)
 
 
 @tenacity.retry(
@@ -592,10 +657,13 @@ def delete_routes_from_table(table):
     wait=tenacity.wait_exponential(multiplier=0.02, max=1),
     stop=tenacity.stop_after_delay(8),
     reraise=True)
-def _get_table_routes(table):
-    with pyroute2.IPRoute() as ipr:
+def _get_table_routes(table, oif=None):
+    filters = {'table': table}
+    if oif:
+        filters['oif'] = oif
+    with pyroute2.IPRoute(strict_check=True) as ipr:
         return [
-            r for r in ipr.get_routes(table=table)
+            r for r in _dump_routes(ipr, **filters)
             if r['scope'] != 254 and r['proto'] != 186
         ]
 
@@ -608,17 +676,19 @@ def _get_table_routes(table):
     reraise=True)
 def get_routes_on_tables(table_ids):
     routes = []
-    with pyroute2.IPRoute() as ipr:
+    with pyroute2.IPRoute(strict_check=True) as ipr:
         for table_id in table_ids:
             table_routes = [
-                r for r in ipr.get_routes(table=table_id)
-                if r.get_attr('RTA_DST') and r['proto'] != 186
+                r for r in _dump_routes(ipr, table=table_id,
+                                        proto=CONF.routes_protocol)
+                if r.get_attr('RTA_DST')
             ]
             routes.extend(table_routes)
     return routes
 
 
 def delete_ip_routes(routes):
+    routes_to_delete = []
     for route in routes:
         r_info = {'dst': route.get('dst'),
                   'dst_len': route['dst_len'],
@@ -626,7 +696,80 @@ def delete_ip_routes(routes):
                   'oif': route.get('oif'),
                   'gateway': route.get('gateway'),
                   'table': route['table']}
-        ovn_bgp_agent.privileged.linux_net.route_delete(r_info)
+        _set_route_nexthop_id(r_info, route)
+        routes_to_delete.append(r_info)
+    if routes_to_delete:
+        ovn_bgp_agent.privileged.linux_net.delete_routes(routes_to_delete)
+
+
+def ensure_routes_protocol():
+    ovn_bgp_agent.privileged.linux_net.register_routes_protocol(
+        CONF.routes_protocol, constants.ROUTES_PROTO_NAME)
+
+
+@tenacity.retry(
+    retry=tenacity.retry_if_exception_type(
+        netlink_exceptions.NetlinkDumpInterrupted),
+    wait=tenacity.wait_exponential(multiplier=0.02, max=1),
+    stop=tenacity.stop_after_delay(8),
+    reraise=True)
+def _get_legacy_routes(table, oifs):
+    with pyroute2.IPRoute(strict_check=True) as ipr:
+        return [r for proto in constants.LEGACY_ROUTES_PROTOS
+                for oif in oifs
+                for r in _dump_routes(ipr, table=table, proto=proto, oif=oif)
+                if r['type'] == 1]
+
+
+def _get_device_oifs(device):
+    # The device and its vlan devices, named <device>.<vlan>
+    oifs = []
+    with pyroute2.IPRoute() as ipr:
+        for link in ipr.get_links():
+            name = link.get_attr('IFLA_IFNAME') or ''
+            if name == device or name.startswith(device + '.'):
+                oifs.append(link['index'])
+    return oifs
+
+
+def migrate_routes_protocol(table, device):
+    """Re-tag the routes left on a table by previous versions
+
+    Previous versions tagged the agent routes with proto boot, and the IPs
+    exposed as routes with proto static, so they would not be found nor
+    flushed by the routes_protocol. Only the routes through the device the
+    agent uses on the table, or its vlan devices, are considered its own;
+    the ones added by other tools are left alone. Each of them is replaced
+    in place with the same route tagged with the routes_protocol, so they
+    are not removed in between. Only done once per table.
+
+    :param table: (int) routing table of the routes
+    :param device: (string) device the agent routes go through
+    """
+    if table in _routes_protocol_migrated:
+        return
+    routes = _get_legacy_routes(table, _get_device_oifs(device))
+    if routes:
+        LOG.info("Re-tagging %d routes through %s on table %s with "
+                 "protocol %s", len(routes), device, table,
+                 CONF.routes_protocol)
+        batch = priv_batch.Batch()
+        for route in routes:
+            r_info = {'dst_len': route['dst_len'],
+                      'family': route['family'],
+                      'table': table,
+                      'scope': route['scope'],
+                      'proto': CONF.routes_protocol}
+            for key, attr in (('dst', 'RTA_DST'), ('oif', 'RTA_OIF'),
+                              ('gateway', 'RTA_GATEWAY'),
+                              ('priority', 'RTA_PRIORITY')):
+                value = route.get_attr(attr)
+                if value is not None:
+                    r_info[key] = value
+            batch.add(ovn_bgp_agent.privileged.linux_net.route_create,
+                      r_info)
+        priv_batch.raise_on_error(batch.execute())
+    _routes_protocol_migrated.add(table)
 
 
 def add_ndp_proxy(ip, dev, vlan=None):
@@ -637,46 +780,87 @@ def del_ndp_proxy(ip, dev, vlan=None):
     ovn_bgp_agent.privileged.linux_net.del_ndp_proxy(ip, dev, vlan)
 
 
+def add_ndp_proxies(ips, dev, vlan=None):
+    ovn_bgp_agent.privileged.linux_net.add_ndp_proxies(ips, dev, vlan)
+
+
+def del_ndp_proxies(ips, dev, vlan=None):
+    ovn_bgp_agent.privileged.linux_net.del_ndp_proxies(ips, dev, vlan)
+
+
+def get_ndp_proxies(dev, vlan=None):
+    return ovn_bgp_agent.privileged.linux_net.get_ndp_proxies(dev, vlan)
+
+
+def sync_ndp_proxies(ips, dev, vlan=None):
+    ovn_bgp_agent.privileged.linux_net.sync_ndp_proxies(ips, dev, vlan)
+
+
 def add_ips_to_dev(nic, ips, clear_local_route_at_table=False):
-    already_added_ips = []
+    batch = priv_batch.Batch()
     for ip in ips:
-        try:
-            ovn_bgp_agent.privileged.linux_net.add_ip_to_dev(ip, nic)
-        except agent_exc.IpAddressAlreadyExists:
-            already_added_ips.append(ip)
+        batch.add(ovn_bgp_agent.privileged.linux_net.add_ip_to_dev, ip, nic)
+    added_ips = []
+    for ip, result in zip(ips, batch.execute()):
+        if isinstance(result, agent_exc.IpAddressAlreadyExists):
+            continue
+        if isinstance(result, Exception):
+            raise result
+        added_ips.append(ip)
 
-    if clear_local_route_at_table:
-        for ip in ips:
-            if ip in already_added_ips:
-                continue
-            oif = get_interface_index(nic)
+    if clear_local_route_at_table and added_ips:
+        oif = get_interface_index(nic)
+        for ip in added_ips:
             route = {'table': clear_local_route_at_table,
                      'proto': 2,
                      'scope': 254,
                      'dst': ip,
                      'oif': oif}
-            ovn_bgp_agent.privileged.linux_net.route_delete(route)
+            batch.add(ovn_bgp_agent.privileged.linux_net.route_delete, route)
+        priv_batch.raise_on_error(batch.execute())
 
 
 def del_ips_from_dev(nic, ips):
+    batch = priv_batch.Batch()
     for ip in ips:
-        ovn_bgp_agent.privileged.linux_net.del_ip_from_dev(ip, nic)
+        batch.add(ovn_bgp_agent.privileged.linux_net.del_ip_from_dev, ip, nic)
+    priv_batch.raise_on_error(batch.execute())
 
 
 def create_rule_from_ip(ip, table):
     try:
-        ip_network = netaddr.IPNetwork(ip)
-    except (netaddr.AddrFormatError, ValueError):
+        parsed_ip = ip_parser.parse_ip(ip)
+    except ValueError:
         raise agent_exc.InvalidPortIP(ip=ip)
 
     return {
-        'dst': str(ip_network.ip),
+        'dst': parsed_ip.address,
         'table': table,
-        'dst_len': ip_network.prefixlen,
-        'family': common_utils.IP_VERSION_FAMILY_MAP[ip_network.version],
+        'dst_len': parsed_ip.prefixlen,
+        'family': common_utils.IP_VERSION_FAMILY_MAP[parsed_ip.version],
     }
 
 
+def create_aggregated_rule(table, family):
+    """Rule sending all the traffic of a family to a table
+
+    The default route of the table is ignored (suppress_prefixlength 0), so
+    only the more specific routes on it, i.e., the ones to the IPs exposed
+    through that bridge, are used. Otherwise the lookup continues on the
+    next rules.
+    """
+    return {'table': table, 'family': family, 'suppress_prefixlength': 0}
+
+
+def get_aggregated_rule_key(table, family):
+    return 'lookup-{}-{}'.format(table, family)
+
+
+def add_aggregated_ip_rule(table, family):
+    ovn_bgp_agent.privileged.linux_net.rule_create(
+        create_aggregated_rule(table, family))
+
+
 def add_ip_rule(ip, table, dev=None, lladdr=None):
     rule = create_rule_from_ip(ip, table)
 
@@ -721,6 +905,25 @@ def add_unreachable_route(vrf_name):
     ovn_bgp_agent.privileged.linux_net.add_unreachable_route(vrf_name)
 
 
+def _get_route_dst(ip_address, mask=None):
+    if not mask:  # default /32 or /128
+        if ip_parser.parse_ip(ip_address).version == constants.IP_VERSION_6:
+            return ip_address, 128
+        return ip_address, 32
+    parsed_ip = ip_parser.parse_ip('{}/{}'.format(ip_address, mask))
+    return parsed_ip.network, parsed_ip.prefixlen
+
+
+def _get_route_info(ip_address, route_table, dev, oif, vlan=None, mask=None,
+                    via=None):
+    net_ip, mask = _get_route_dst(ip_address, mask)
+    family = common_utils.IP_VERSION_FAMILY_MAP[
+        ip_parser.parse_ip(net_ip).version]
+    return route_ledger.Route(dev=dev, vlan=vlan, table=int(route_table),
+                              dst=net_ip, dst_len=mask, oif=oif,
+                              gateway=via or None, family=family)
+
+
 @tenacity.retry(
     retry=tenacity.retry_if_exception_type(
         netlink_exceptions.NetlinkDumpInterrupted),
@@ -728,22 +931,15 @@ def add_unreachable_route(vrf_name):
     stop=tenacity.stop_after_delay(8),
     reraise=True)
 def add_ip_route(ovn_routing_tables_routes, ip_address, route_table, dev,
-                 vlan=None, mask=None, via=None):
-    net_ip = ip_address
-    if not mask:  # default /32 or /128
-        if get_ip_version(ip_address) == constants.IP_VERSION_6:
-            mask = 128
-        else:
-            mask = 32
-    else:
-        ip = '{}/{}'.format(ip_address, mask)
-        if get_ip_version(ip_address) == constants.IP_VERSION_6:
-            net_ip = '{}'.format(ipaddress.IPv6Network(
-                ip, strict=False).network_address)
-        else:
-            net_ip = '{}'.format(ipaddress.IPv4Network(
-                ip, strict=False).network_address)
+                 vlan=None, mask=None, via=None, owner=None,
+                 gateway_owner=None):
+    """Add a route for the owner, creating it if not there yet
 
+    gateway_owner is what the gateway belongs to (e.g., the cr-lrp), so that
+    with kernel_nexthops all its routes share a nexthop object that follows
+    it when its gateway changes (see update_nexthop_gateway).
+    """
+    oif_name = dev
     if vlan:
         oif_name = '{}.{}'.format(dev, vlan)
         try:
@@ -758,45 +954,36 @@ def add_ip_route(ovn_routing_tables_routes, ip_address, route_table, dev,
     else:
         oif = get_interface_index(dev)
 
-    route = {'dst': net_ip, 'dst_len': int(mask), 'oif': oif,
-             'table': int(route_table), 'proto': 3}
-    if via:
-        route['gateway'] = via
-        route['scope'] = 0
-    else:
-        route['scope'] = 253
-    if get_ip_version(net_ip) == constants.IP_VERSION_6:
-        route['family'] = constants.AF_INET6
-        del route['scope']
+    route_info = _get_route_info(ip_address, route_table, dev, oif,
+                                 vlan=vlan, mask=mask, via=via)
+    route = route_info.to_dict(CONF.routes_protocol)
 
     with pyroute2.IPRoute() as ipr:
-        if not ipr.route('show', **route):
+        existing_routes = ipr.route('show', **route)
+    with _get_nexthops_lock(via):
+        if via and CONF.kernel_nexthops:
+            route['nh_id'] = _get_nexthop(ovn_routing_tables_routes,
+                                          gateway_owner, oif_name, oif, via,
+                                          route)
+            # Routes with an inline gateway are moved to the nexthop object
+            existing_routes = [r for r in existing_routes
+                               if get_route_nexthop_id(r) is not None]
+        if not existing_routes:
             LOG.debug("Creating route at table %s: %s", route_table, route)
             ovn_bgp_agent.privileged.linux_net.route_create(route)
             LOG.debug("Route created at table %s: %s", route_table, route)
         else:
             LOG.debug("Route already existing: %s", route)
-    route_info = {'vlan': vlan, 'route': route}
-    ovn_routing_tables_routes.setdefault(dev, []).append(route_info)
+    ovn_routing_tables_routes.add(route_info, owner=owner)
 
 
 def del_ip_route(ovn_routing_tables_routes, ip_address, route_table, dev,
-                 vlan=None, mask=None, via=None):
-    net_ip = ip_address
-    if not mask:  # default /32 or /128
-        if get_ip_version(ip_address) == constants.IP_VERSION_6:
-            mask = 128
-        else:
-            mask = 32
-    else:
-        ip = '{}/{}'.format(ip_address, mask)
-        if get_ip_version(ip_address) == constants.IP_VERSION_6:
-            net_ip = '{}'.format(ipaddress.IPv6Network(
-                ip, strict=False).network_address)
-        else:
-            net_ip = '{}'.format(ipaddress.IPv4Network(
-                ip, strict=False).network_address)
+                 vlan=None, mask=None, via=None, owner=None):
+    """Release the route for the owner, deleting it if no longer used
 
+    :return: False if the route is kept as other owners still use it
+    """
+    oif_name = dev
     try:
         if vlan:
             oif_name = '{}.{}'.format(dev, vlan)
@@ -806,26 +993,217 @@ def del_ip_route(ovn_routing_tables_routes, ip_address, route_table, dev,
     except agent_exc.NetworkInterfaceNotFound:
         LOG.debug("Device %s does not exists, so the associated "
                   "routes should have been automatically deleted.", dev)
-        ovn_routing_tables_routes.pop(dev, None)
+        ovn_routing_tables_routes.remove_device(dev)
+        return True
+
+    route_info = _get_route_info(ip_address, route_table, dev, oif,
+                                 vlan=vlan, mask=mask, via=via)
+    if ovn_routing_tables_routes.remove(route_info, owner=owner):
+        LOG.debug("Route %s is still in use, not deleting it", route_info)
+        return False
+    route = route_info.to_dict(CONF.routes_protocol)
+
+    with _get_nexthops_lock(via):
+        nexthop = None
+        if via and CONF.kernel_nexthops:
+            nexthop = _lookup_route_nexthop(route)
+            if nexthop:
+                route['nh_id'] = nexthop['id']
+
+        LOG.debug("Deleting route at table %s: %s", route_table, route)
+        ovn_bgp_agent.privileged.linux_net.route_delete(dict(route))
+        LOG.debug("Route deleted at table %s: %s", route_table, route)
+        if nexthop:
+            _release_nexthop(route)
+    return True
+
+
+def get_route_nexthop_id(route):
+    """Get the id of the nexthop object a route points to
+
+    :return: the nexthop id, 0 if the route points to a nexthop object whose
+             id could not be decoded, None otherwise
+    """
+    for name, value in route.get('attrs', []):
+        if name == 'RTA_NH_ID':
+            return value
+        if (name == 'UNKNOWN' and
+                value.get('header', {}).get('type') == constants.RTA_NH_ID):
+            return _decode_nexthop_id(value)
+    return None
+
+
+def _decode_nexthop_id(nla):
+    # pyroute2 versions not knowing RTA_NH_ID keep its raw u32 value after
+    # the attribute header
+    try:
+        return struct.unpack_from('=I', nla.data, nla.offset + 4)[0]
+    except (AttributeError, TypeError, struct.error):
+        return 0
+
+
+def _set_route_nexthop_id(r_info, route):
+    nh_id = get_route_nexthop_id(route)
+    if nh_id is not None:
+        r_info['nh_id'] = nh_id
+
+
+@tenacity.retry(
+    retry=tenacity.retry_if_exception_type(
+        netlink_exceptions.NetlinkDumpInterrupted),
+    wait=tenacity.wait_exponential(multiplier=0.02, max=1),
+    stop=tenacity.stop_after_delay(8),
+    reraise=True)
+def _get_protocol_routes():
+    with pyroute2.IPRoute(strict_check=True) as ipr:
+        return list(_dump_routes(ipr, proto=CONF.routes_protocol))
+
+
+def _load_nexthops():
+    global _nexthops_loaded
+    if _nexthops_loaded:
+        return
+    # Adopt the nexthops created before a restart, keyed by their gateway
+    # until a route through them claims them for its gateway owner
+    nexthops = {}
+    for nexthop in ovn_bgp_agent.privileged.linux_net.get_nexthops(
+            CONF.routes_protocol):
+        if nexthop.get('gateway') and nexthop.get('dev'):
+            key = _get_nexthop_key(None, nexthop['dev'], nexthop['gateway'])
+            nexthops[nexthop['id']] = key
+            _nexthops.setdefault(key, {'id': nexthop['id'],
+                                       'gateway': nexthop['gateway'],
+                                       'routes': set()})
+    if nexthops:
+        # Along with the routes still pointing to them, so that releasing
+        # one of those routes does not delete a nexthop in use
+        for route in _get_protocol_routes():
+            key = nexthops.get(get_route_nexthop_id(route))
+            if key is not None:
+                route_key = (route.get_attr('RTA_TABLE'),
+                             route.get_attr('RTA_DST'), route['dst_len'])
+                _nexthops[key]['routes'].add(route_key)
+                _nexthop_routes[route_key] = key
+    _nexthops_loaded = True
+
+
+def _get_nexthops_lock(via):
+    # The nexthop lookup, the route change and the nexthop release happen
+    # under the lock, so that a nexthop is neither allocated twice nor
+    # deleted while another worker points a route to it
+    if via and CONF.kernel_nexthops:
+        return _nexthops_lock
+    return contextlib.nullcontext()
+
+
+def _get_nexthop_key(gateway_owner, dev, gateway):
+    # Routes without a known gateway owner share the nexthop of their gateway
+    return (gateway_owner or gateway, dev,
+            ip_parser.parse_ip(gateway).version)
+
+
+def _lookup_nexthop(key):
+    _load_nexthops()
+    return _nexthops.get(key)
+
+
+def _lookup_route_nexthop(route):
+    _load_nexthops()
+    return _nexthops.get(_nexthop_routes.get(_get_route_key(route)))
+
+
+def _get_route_key(route):
+    return (route['table'], route['dst'], route['dst_len'])
+
+
+def _get_nexthop(ovn_routing_tables_routes, gateway_owner, dev, oif, gateway,
+                 route):
+    key = _get_nexthop_key(gateway_owner, dev, gateway)
+    nexthop = _lookup_nexthop(key)
+    if nexthop is None and gateway_owner:
+        # Claim the nexthop adopted for the gateway, if any
+        nexthop = _nexthops.pop(_get_nexthop_key(None, dev, gateway), None)
+        if nexthop is not None:
+            _nexthops[key] = nexthop
+            for route_key in nexthop['routes']:
+                _nexthop_routes[route_key] = key
+    if nexthop is None:
+        used_ids = {nh['id'] for nh in _nexthops.values()}
+        nexthop = {'id': max(used_ids | {constants.NEXTHOP_ID_BASE - 1}) + 1,
+                   'gateway': gateway, 'routes': set()}
+        LOG.debug("Creating nexthop %s via %s dev %s", nexthop['id'],
+                  gateway, dev)
+        ovn_bgp_agent.privileged.linux_net.nexthop_replace(
+            nexthop['id'], gateway, oif, CONF.routes_protocol)
+        _nexthops[key] = nexthop
+    elif nexthop['gateway'] != gateway:
+        _set_nexthop_gateway(ovn_routing_tables_routes, nexthop, dev, oif,
+                             gateway)
+    route_key = _get_route_key(route)
+    nexthop['routes'].add(route_key)
+    _nexthop_routes[route_key] = key
+    return nexthop['id']
+
+
+def _set_nexthop_gateway(ovn_routing_tables_routes, nexthop, dev, oif,
+                         gateway):
+    LOG.debug("Updating nexthop %s via %s dev %s", nexthop['id'], gateway,
+              dev)
+    ovn_bgp_agent.privileged.linux_net.nexthop_replace(
+        nexthop['id'], gateway, oif, CONF.routes_protocol)
+    # The routes pointing to the nexthop follow it, only the ledger needs
+    # to know about their new gateway
+    for table in {table for table, _, _ in nexthop['routes']}:
+        for route in ovn_routing_tables_routes.get_table_routes(table):
+            if (route.gateway == nexthop['gateway'] and
+                    (route.table, route.dst, route.dst_len) in
+                    nexthop['routes']):
+                ovn_routing_tables_routes.replace(
+                    route, dataclasses.replace(route, gateway=gateway))
+    nexthop['gateway'] = gateway
+
+
+def _release_nexthop(route):
+    key = _nexthop_routes.pop(_get_route_key(route), None)
+    nexthop = _nexthops.get(key)
+    if nexthop is None:
         return
+    nexthop['routes'].discard(_get_route_key(route))
+    if not nexthop['routes']:
+        LOG.debug("Deleting unused nexthop %s via %s dev %s", nexthop['id'],
+                  nexthop['gateway'], key[1])
+        ovn_bgp_agent.privileged.linux_net.nexthop_delete(nexthop['id'])
+        del _nexthops[key]
 
-    route = {'dst': net_ip, 'dst_len': int(mask), 'oif': oif,
-             'table': int(route_table), 'proto': 3}
-    if via:
-        route['gateway'] = via
-        route['scope'] = 0
-    else:
-        route['scope'] = 253
-    if get_ip_version(net_ip) == constants.IP_VERSION_6:
-        route['family'] = constants.AF_INET6
-        del route['scope']
-
-    LOG.debug("Deleting route at table %s: %s", route_table, route)
-    ovn_bgp_agent.privileged.linux_net.route_delete(route)
-    LOG.debug("Route deleted at table %s: %s", route_table, route)
-    route_info = {'vlan': vlan, 'route': route}
-    if route_info in ovn_routing_tables_routes.get(dev, []):
-        ovn_routing_tables_routes[dev].remove(route_info)
+
+def update_nexthop_gateway(ovn_routing_tables_routes, gateway_owner, dev,
+                           gateway, vlan=None):
+    """Move the routes of a gateway owner to its new gateway
+
+    With kernel_nexthops this is a single nexthop update, with no route
+    changes, regardless of the number of routes using it.
+
+    :return: True if the routes were moved, False if there is no nexthop
+             for the gateway owner and the routes must be replaced instead
+    """
+    if not CONF.kernel_nexthops:
+        return False
+    oif_name = dev
+    if vlan:
+        oif_name = '{}.{}'.format(dev, vlan)
+    with _nexthops_lock:
+        nexthop = _lookup_nexthop(_get_nexthop_key(gateway_owner, oif_name,
+                                                   gateway))
+        if nexthop is None:
+            return False
+        if nexthop['gateway'] != gateway:
+            try:
+                oif = get_interface_index(oif_name)
+            except agent_exc.NetworkInterfaceNotFound:
+                return False
+            _set_nexthop_gateway(ovn_routing_tables_routes, nexthop,
+                                 oif_name, oif, gateway)
+    return True
 
 
 def set_device_status(device, status, ndb=None):
@@ -0,0 +1,102 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from oslo_log import log as logging
+import pyroute2
+from pyroute2.netlink import rtnl
+
+from ovn_bgp_agent import constants
+
+LOG = logging.getLogger(__name__)
+
+_GROUPS = (rtnl.RTMGRP_IPV4_IFADDR | rtnl.RTMGRP_IPV6_IFADDR |
+           rtnl.RTMGRP_IPV4_ROUTE | rtnl.RTMGRP_IPV6_ROUTE |
+           rtnl.RTMGRP_IPV4_RULE | rtnl.RTMGRP_IPV6_RULE)
+
+
+class NetlinkMonitor(object):
+    """Mark dirty the addresses, routes and rules removed from the kernel
+
+    It listens to the rtnetlink notifications on a thread, and marks the
+    deletions dirty by kind (constants.DIRTY_ADDRESS, DIRTY_ROUTE and
+    DIRTY_RULE), for the drivers to map them to the objects exposing them
+    on the next incremental reconciliation. The deletions done by the agent
+    itself are marked too, but the drivers find nothing expecting them.
+
+    As the notifications missed (e.g., the socket buffer overflowed) may
+    hide some drift, a full sync is requested then.
+
+    :param dirty: (DirtySet) where the deletions are marked
+    :param routes_protocol: protocol of the routes created by the agent, the
+                            only ones marked
+    """
+
+    def __init__(self, dirty, routes_protocol):
+        self.dirty = dirty
+        self.routes_protocol = routes_protocol
+        self._ipr = None
+        self._thread = None
+
+    def start(self):
+        self._ipr = pyroute2.IPRoute()
+        self._ipr.bind(groups=_GROUPS)
+        self._thread = threading.Thread(target=self._run, args=(self._ipr,),
+                                        name='netlink-monitor', daemon=True)
+        self._thread.start()
+        LOG.info("Monitoring the kernel addresses, routes and rules.")
+
+    def stop(self):
+        ipr, self._ipr = self._ipr, None
+        if ipr is not None:
+            ipr.close()
+
+    def _run(self, ipr):
+        while self._ipr is ipr:
+            try:
+                messages = ipr.get()
+            except Exception as e:
+                if self._ipr is not ipr:
+                    return
+                LOG.warning("Kernel notifications missed, requesting a full "
+                            "sync: %s", e)
+                self.dirty.request_full_sync()
+                continue
+            for msg in messages:
+                try:
+                    self.handle(msg)
+                except Exception as e:
+                    LOG.exception("Unexpected exception while handling a "
+                                  "kernel notification: %s", e)
+
+    def handle(self, msg):
+        event = msg.get('event')
+        if event == 'RTM_DELADDR':
+            ip = msg.get_attr('IFA_LOCAL') or msg.get_attr('IFA_ADDRESS')
+            self.dirty.mark(constants.DIRTY_ADDRESS, ip)
+        elif event == 'RTM_DELROUTE':
+            dst = msg.get_attr('RTA_DST')
+            if not dst or msg['proto'] != self.routes_protocol:
+                return
+            table = msg.get_attr('RTA_TABLE') or msg['table']
+            self.dirty.mark(constants.DIRTY_ROUTE,
+                            (table, dst, msg['dst_len']))
+        elif event == 'RTM_DELRULE':
+            dst = msg.get_attr('FRA_DST')
+            if not dst:
+                return
+            table = msg.get_attr('FRA_TABLE') or msg['table']
+            self.dirty.mark(constants.DIRTY_RULE,
+                            (table, dst, msg['dst_len']))
@@ -0,0 +1,164 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ipaddress
+
+from ovn_bgp_agent import constants
+from ovn_bgp_agent.utils import ip_parser
+
+_ADDRESS_CLASS = {constants.IP_VERSION_4: (ipaddress.IPv4Address, 32),
+                  constants.IP_VERSION_6: (ipaddress.IPv6Address, 128)}
+
+
+class _Node(object):
+    __slots__ = ('children', 'values', 'count')
+
+    def __init__(self):
+        self.children = [None, None]
+        # values of the prefix ending on this node, None if there is none
+        self.values = None
+        # number of values on this node and its descendants
+        self.count = 0
+
+
+def _get_key(prefix):
+    """Return the version, bits and length of the network of a prefix"""
+    parsed_ip = ip_parser.parse_ip(prefix)
+    max_prefixlen = len(parsed_ip.packed) * 8
+    value = int.from_bytes(parsed_ip.packed, 'big')
+    return (parsed_ip.version,
+            value >> (max_prefixlen - parsed_ip.prefixlen),
+            parsed_ip.prefixlen)
+
+
+def _iter_bits(bits, length):
+    for shift in range(length - 1, -1, -1):
+        yield (bits >> shift) & 1
+
+
+class PrefixTrie(object):
+    """Binary trie of IPv4 and IPv6 prefixes
+
+    Every prefix (e.g., a subnet, or an IP as a /32 or /128) holds a set of
+    values, such as the routes using it. As the nodes count the values
+    below them, both finding the longest prefix covering an IP and checking
+    if there is any entry inside a prefix take O(prefix length).
+    """
+
+    def __init__(self):
+        self._roots = {constants.IP_VERSION_4: _Node(),
+                       constants.IP_VERSION_6: _Node()}
+
+    def __len__(self):
+        return sum(root.count for root in self._roots.values())
+
+    def __contains__(self, prefix):
+        return bool(self.get(prefix))
+
+    def add(self, prefix, value=None):
+        """Add a value to a prefix
+
+        :return: (bool) False if the prefix already had the value
+        """
+        version, bits, length = _get_key(prefix)
+        path = [self._roots[version]]
+        for bit in _iter_bits(bits, length):
+            node = path[-1]
+            if node.children[bit] is None:
+                node.children[bit] = _Node()
+            path.append(node.children[bit])
+        node = path[-1]
+        if node.values is None:
+            node.values = set()
+        elif value in node.values:
+            return False
+        node.values.add(value)
+        for node in path:
+            node.count += 1
+        return True
+
+    def remove(self, prefix, value=None):
+        """Remove a value from a prefix
+
+        :return: (bool) False if the prefix did not have the value
+        """
+        version, bits, length = _get_key(prefix)
+        path = [(self._roots[version], None)]
+        for bit in _iter_bits(bits, length):
+            node = path[-1][0].children[bit]
+            if node is None:
+                return False
+            path.append((node, bit))
+        node = path[-1][0]
+        if node.values is None or value not in node.values:
+            return False
+        node.values.remove(value)
+        if not node.values:
+            node.values = None
+        for node, _ in path:
+            node.count -= 1
+        # Prune the nodes left without values below them
+        for index in range(len(path) - 1, 0, -1):
+            node, bit = path[index]
+            if node.count:
+                break
+            path[index - 1][0].children[bit] = None
+        return True
+
+    def get(self, prefix):
+        """Return the values of a prefix, an empty set if there are none"""
+        version, bits, length = _get_key(prefix)
+        node = self._roots[version]
+        for bit in _iter_bits(bits, length):
+            node = node.children[bit]
+            if node is None:
+                return set()
+        return set(node.values or ())
+
+    def longest_match(self, ip):
+        """Return the longest prefix covering an IP (or a prefix)
+
+        :return: (tuple) the prefix and its values, or None if no prefix
+                 covers the IP
+        """
+        version, bits, length = _get_key(ip)
+        node = self._roots[version]
+        match = None
+        depth = 0
+        while True:
+            if node.values:
+                match = (depth, node.values)
+            if depth == length:
+                break
+            node = node.children[(bits >> (length - depth - 1)) & 1]
+            if node is None:
+                break
+            depth += 1
+        if match is None:
+            return None
+        depth, values = match
+        address_class, max_prefixlen = _ADDRESS_CLASS[version]
+        network = address_class(
+            bits >> (length - depth) << (max_prefixlen - depth))
+        return '{}/{}'.format(network, depth), set(values)
+
+    def has_within(self, prefix):
+        """Check if there is any entry inside a prefix (or equal to it)"""
+        version, bits, length = _get_key(prefix)
+        node = self._roots[version]
+        for bit in _iter_bits(bits, length):
+            node = node.children[bit]
+            if node is None:
+                return False
+        return node.count > 0
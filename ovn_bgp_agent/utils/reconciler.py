@@ -0,0 +1,146 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from oslo_concurrency import lockutils
+from oslo_log import log as logging
+
+from ovn_bgp_agent import constants
+
+LOG = logging.getLogger(__name__)
+
+
+class StagedState(object):
+    """Attributes of an object that a pass rebuilds from scratch
+
+    The pass rebuilds them in new structures, that are only set on the
+    object while its chunks run. In between the chunks, the events see the
+    previous, complete, state, which the new one replaces once the pass is
+    completed. If the pass fails, the previous state is kept.
+    """
+
+    def __init__(self, obj, **attrs):
+        self._obj = obj
+        self._staged = attrs
+        self._previous = None
+
+    def swap_in(self):
+        self._previous = {}
+        for name, value in self._staged.items():
+            self._previous[name] = getattr(self._obj, name, None)
+            setattr(self._obj, name, value)
+
+    def swap_out(self):
+        if self._previous is None:
+            return
+        for name, value in self._previous.items():
+            # the pass may have replaced the structures, not just filled them
+            self._staged[name] = getattr(self._obj, name)
+            setattr(self._obj, name, value)
+        self._previous = None
+
+    def commit(self):
+        self._previous = None
+
+
+class ChunkedReconciler(object):
+    """Run the reconciliation passes in chunks, under a time budget
+
+    A pass is a generator that yields after each unit of work (e.g., after
+    each port), so it keeps its position between the chunks. Each chunk
+    runs the units under the driver lock until its time budget is spent,
+    and then releases the lock so that the events waiting for it are
+    processed before the pass resumes. With no budget, the whole pass runs
+    at once.
+    """
+
+    def __init__(self, lock_name, chunk_time=0):
+        self.lock_name = lock_name
+        self.chunk_time = chunk_time
+        # serializes the passes, e.g., a sync triggered by an event while
+        # the periodic one is running
+        self._pass_lock = threading.Lock()
+
+    def run(self, pass_fn, staged=None, measure=None):
+        """Run a reconciliation pass to completion
+
+        :param pass_fn: generator function of the pass
+        :param staged: (StagedState) the state the pass rebuilds, if any
+        :param measure: callable returning the items the pass repairs
+                        (e.g., the exposed IPs), if any. They are read at the
+                        start and the end of each chunk, so that only the
+                        items changed by the pass itself are counted, and not
+                        the ones changed by the events in between
+        :return: the value returned by the pass, plus the number of items
+                 it changed if measure is given
+        """
+        with self._pass_lock:
+            units = pass_fn()
+            chunks = 1
+            changes = 0
+            try:
+                done, result, chunk_changes = self._run_chunk(
+                    units, staged, measure)
+                changes += chunk_changes
+                while not done:
+                    # Let the threads waiting for the lock take it
+                    time.sleep(constants.SYNC_CHUNK_PAUSE)
+                    chunks += 1
+                    done, result, chunk_changes = self._run_chunk(
+                        units, staged, measure)
+                    changes += chunk_changes
+            finally:
+                units.close()
+            LOG.debug("Reconciliation pass completed in %d chunk(s)", chunks)
+            if measure is None:
+                return result
+            return (result or 0) + changes
+
+    def _run_chunk(self, units, staged=None, measure=None):
+        """Run the units of a pass until the time budget is spent
+
+        :return: (tuple) whether the pass is completed, its result, and the
+                 number of measured items changed by the chunk
+        """
+        with lockutils.lock(self.lock_name):
+            if staged is not None:
+                staged.swap_in()
+            try:
+                before = set(measure()) if measure is not None else set()
+                done, result = self._run_units(units)
+                after = set(measure()) if measure is not None else set()
+            except Exception:
+                if staged is not None:
+                    staged.swap_out()
+                raise
+            if staged is not None:
+                if done:
+                    staged.commit()
+                else:
+                    staged.swap_out()
+            return done, result, len(before.symmetric_difference(after))
+
+    def _run_units(self, units):
+        deadline = None
+        if self.chunk_time > 0:
+            deadline = time.monotonic() + self.chunk_time
+        while True:
+            try:
+                next(units)
+            except StopIteration as e:
+                return True, e.value
+            if deadline is not None and time.monotonic() >= deadline:
+                return False, None
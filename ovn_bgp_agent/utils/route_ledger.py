@@ -0,0 +1,189 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import dataclasses
+import threading
+import typing
+
+from ovn_bgp_agent import constants
+
+
+@dataclasses.dataclass(frozen=True, eq=True)
+class Route:
+    """A route created by the agent on one of its routing tables
+
+    dev is the device the route was requested for (e.g., the provider
+    bridge) and vlan the vlan device on top of it, if any, while oif is the
+    index of the interface actually used by the route.
+    """
+    __slots__ = ('dev', 'vlan', 'table', 'dst', 'dst_len', 'oif',
+                 'gateway', 'family')
+
+    dev: str
+    vlan: typing.Any
+    table: int
+    dst: str
+    dst_len: int
+    oif: int
+    gateway: typing.Optional[str]
+    family: int
+
+    def to_dict(self, proto):
+        """Return the route in the format used by the privileged calls"""
+        route = {'dst': self.dst, 'dst_len': self.dst_len, 'oif': self.oif,
+                 'table': self.table, 'proto': proto}
+        if self.gateway:
+            route['gateway'] = self.gateway
+            route['scope'] = 0
+        else:
+            route['scope'] = 253
+        if self.family == constants.AF_INET6:
+            route['family'] = constants.AF_INET6
+            del route['scope']
+        return route
+
+
+class RouteLedger(object):
+    """Routes created by the agent, indexed per device, table and destination
+
+    Each route keeps the set of owners (e.g., the exposures) that requested
+    it, so a route shared by several of them is only released once all of
+    them are gone. Adding again a route for the same owner is a noop.
+
+    It is safe to use from several threads, e.g., the sync workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # {dev: {route: set(owners)}}
+        self._devices = collections.defaultdict(dict)
+        # {table: set(routes)}
+        self._tables = collections.defaultdict(set)
+        # {(dev, dst): set(routes)}
+        self._destinations = collections.defaultdict(set)
+        # {(table, dst, dst_len): set(routes)}
+        self._prefixes = collections.defaultdict(set)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(routes) for routes in self._devices.values())
+
+    def __iter__(self):
+        with self._lock:
+            routes = [route for dev_routes in self._devices.values()
+                      for route in dev_routes]
+        yield from routes
+
+    def __contains__(self, route):
+        with self._lock:
+            return route in self._devices.get(route.dev, {})
+
+    def add(self, route, owner=None):
+        """Add a reference to a route
+
+        :return: (int) number of references of the route
+        """
+        with self._lock:
+            owners = self._devices[route.dev].setdefault(route, set())
+            owners.add(owner)
+            self._index(route)
+            return len(owners)
+
+    def remove(self, route, owner=None):
+        """Remove a reference to a route
+
+        :return: (int) number of references left for the route, 0 if the
+                 route is no longer (or was never) in the ledger
+        """
+        with self._lock:
+            routes = self._devices.get(route.dev)
+            if not routes or route not in routes:
+                return 0
+            owners = routes[route]
+            owners.discard(owner)
+            if owners:
+                return len(owners)
+            self._forget(route)
+            return 0
+
+    def replace(self, route, new_route):
+        """Replace a route by a new one, keeping its references"""
+        with self._lock:
+            owners = self._devices.get(route.dev, {}).get(route)
+            if owners is None:
+                return
+            self._forget(route)
+            self._devices[new_route.dev].setdefault(
+                new_route, set()).update(owners)
+            self._index(new_route)
+
+    def remove_device(self, dev):
+        """Remove all the routes of a device"""
+        with self._lock:
+            for route in self._devices.pop(dev, {}):
+                self._discard_from_indexes(route)
+
+    def get_devices(self):
+        with self._lock:
+            return list(self._devices)
+
+    def get_device_routes(self, dev, dst=None):
+        with self._lock:
+            if dst is not None:
+                return list(self._destinations.get((dev, dst), ()))
+            return list(self._devices.get(dev, ()))
+
+    def count_device_routes(self, dev):
+        with self._lock:
+            return len(self._devices.get(dev, ()))
+
+    def get_table_routes(self, table):
+        with self._lock:
+            return list(self._tables.get(table, ()))
+
+    def get_references(self, route):
+        with self._lock:
+            return len(self._devices.get(route.dev, {}).get(route, ()))
+
+    def get_owners(self, table, dst, dst_len):
+        """Get the owners of the routes to a prefix on a table"""
+        with self._lock:
+            return {owner
+                    for route in self._prefixes.get((table, dst, dst_len), ())
+                    for owner in self._devices[route.dev][route]}
+
+    def _index(self, route):
+        self._tables[route.table].add(route)
+        self._destinations[route.dev, route.dst].add(route)
+        self._prefixes[route.table, route.dst, route.dst_len].add(route)
+
+    def _forget(self, route):
+        routes = self._devices[route.dev]
+        del routes[route]
+        if not routes:
+            del self._devices[route.dev]
+        self._discard_from_indexes(route)
+
+    def _discard_from_indexes(self, route):
+        for index, key in ((self._tables, route.table),
+                           (self._destinations, (route.dev, route.dst)),
+                           (self._prefixes,
+                            (route.table, route.dst, route.dst_len))):
+            routes = index.get(key)
+            if routes is None:
+                continue
+            routes.discard(route)
+            if not routes:
+                del index[key]
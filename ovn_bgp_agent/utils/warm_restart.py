@@ -0,0 +1,88 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from oslo_log import log as logging
+
+from ovn_bgp_agent import constants
+
+LOG = logging.getLogger(__name__)
+
+
+class WarmRestart(object):
+    """Hold the first re-sync after a warm restart
+
+    On a warm restart, the routes, IPs, flows and FRR configuration left by
+    the previous run are kept, and adopted by the first re-sync, which only
+    fixes the differences. Until the IDLs have the databases contents, that
+    re-sync would withdraw what is still missing from them, so it waits for
+    the IDLs to converge, or for hold_time seconds at most.
+    """
+
+    def __init__(self, hold_time=0):
+        self.hold_time = hold_time
+        self._lock = threading.Lock()
+        self._idls = ()
+        self._started_at = None
+
+    @property
+    def pending(self):
+        return self._started_at is not None
+
+    def start(self, idls):
+        """Hold the next re-sync until the given IDLs converge
+
+        :param idls: the python-ovs IDLs the re-sync reads from
+        """
+        LOG.info("Warm restart: adopting the existing state, the first "
+                 "re-sync waits up to %s seconds for the IDLs to converge",
+                 self.hold_time)
+        with self._lock:
+            self._idls = tuple(idls)
+            self._started_at = time.monotonic()
+
+    def _get_seqnos(self):
+        # None until the IDL got the initial contents of the database
+        return [idl.change_seqno if idl.has_ever_connected() else None
+                for idl in self._idls]
+
+    def wait(self):
+        """Wait for the IDLs to converge, if a warm restart is pending
+
+        The IDLs are converged once they got the initial contents of the
+        databases and those did not change for WARM_RESTART_SETTLE_TIME.
+
+        :returns: False if the hold time expired before they converged
+        """
+        # the lock only guards the state, the IDLs are polled without it
+        with self._lock:
+            if self._started_at is None:
+                return True
+            deadline = self._started_at + self.hold_time
+            self._started_at = None
+
+        seqnos = None
+        while True:
+            current = self._get_seqnos()
+            if None not in current and current == seqnos:
+                LOG.info("Warm restart: IDLs converged, syncing")
+                return True
+            if time.monotonic() >= deadline:
+                LOG.warning("Warm restart: the IDLs did not converge in "
+                            "%s seconds, syncing anyway", self.hold_time)
+                return False
+            seqnos = current
+            time.sleep(constants.WARM_RESTART_SETTLE_TIME)
@@ -0,0 +1,58 @@
+# Copyright 2024 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent import futures
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+def run_in_parallel(func, units, workers):
+    """Run func for each unit on a bounded pool of threads
+
+    The units (e.g., the provider bridges or the gateway ports to sync) are
+    independent from each other, and most of their time is spent waiting
+    for privsep, OVS or the kernel, so they can overlap. With a single
+    worker, or a single unit, they run sequentially on the calling thread.
+
+    :param func: function called with each unit as its only argument
+    :param units: (iterable) the units of work
+    :param workers: (int) maximum number of threads
+    :return: (list) the results of func, in the order of the units
+    :raises: the first exception raised by a unit, once all of them are
+             done
+    """
+    units = list(units)
+    if workers <= 1 or len(units) <= 1:
+        return [func(unit) for unit in units]
+
+    with futures.ThreadPoolExecutor(
+            max_workers=min(workers, len(units)),
+            thread_name_prefix='sync-worker') as executor:
+        pending = [executor.submit(func, unit) for unit in units]
+    results = []
+    error = None
+    for unit, future in zip(units, pending):
+        exc = future.exception()
+        if exc is None:
+            results.append(future.result())
+            continue
+        LOG.error("Unexpected exception while syncing %s: %s", unit, exc)
+        results.append(None)
+        if error is None:
+            error = exc
+    if error is not None:
+        raise error
+    return results